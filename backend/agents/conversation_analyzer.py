@@ -4,17 +4,47 @@ Extrae resumen y dolor del cliente de las transcripciones
 """
 
 import os
+import json
+import hashlib
 import logging
-from typing import Dict, List, Optional
+import threading
+from typing import TYPE_CHECKING, Dict, List, Optional
 from pydantic import BaseModel, Field
-from langchain_openai import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate
-from langchain.output_parsers import PydanticOutputParser
+from storage.cache import SQLiteCache
+from api.circuit_breaker import breaker_from_env
+from api.metrics import track_upstream
+
+# LangChain/OpenAI se importan al crear el analizador (ver get_conversation_analyzer),
+# no al importar el módulo: /health y demás rutas no pagan su tiempo de importación
+if TYPE_CHECKING:
+    from langchain.prompts import ChatPromptTemplate
 
 logger = logging.getLogger(__name__)
 
 # Configuración de OpenAI
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+OPENAI_MODEL = "gpt-4"
+
+# URL base alternativa de la API (ej: servidor local del benchmark); None usa la de OpenAI
+OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL')
+
+# Versión del prompt: incrementar al cambiar el template para invalidar análisis en caché
+PROMPT_VERSION = "2"
+
+# Caché en disco de análisis por contenido (bytes / segundos)
+ANALYSIS_CACHE_MAX_BYTES = int(os.getenv('ANALYSIS_CACHE_MAX_BYTES', 50 * 1024 * 1024))
+ANALYSIS_CACHE_TTL = float(os.getenv('ANALYSIS_CACHE_TTL', 30 * 24 * 3600))
+
+# Análisis por fragmentos (map-reduce) para transcripciones largas (tokens / llamadas concurrentes)
+ANALYSIS_CHUNK_THRESHOLD_TOKENS = int(os.getenv('ANALYSIS_CHUNK_THRESHOLD_TOKENS', 5000))
+ANALYSIS_CHUNK_TOKENS = int(os.getenv('ANALYSIS_CHUNK_TOKENS', 3000))
+ANALYSIS_CHUNK_CONCURRENCY = int(os.getenv('ANALYSIS_CHUNK_CONCURRENCY', 4))
+
+# Circuito de OpenAI: con el circuito abierto se usa el análisis simulado sin esperar al LLM
+openai_breaker = breaker_from_env('OPENAI_', default_slow_call=90)
+
+# Caracteres por token aproximados cuando no hay tokenizer disponible
+CHARS_PER_TOKEN = 4
 
 # Posibles dolores de venta según HubSpot
 SALES_PAIN_OPTIONS = [
@@ -26,6 +56,9 @@ SALES_PAIN_OPTIONS = [
     "Los negocios que generamos son muy pocos"
 ]
 
+class ConversationAnalysisError(Exception):
+    """OpenAI falló o no está disponible y quien llama pidió no usar el análisis simulado"""
+
 class ConversationAnalysis(BaseModel):
     """Modelo para el análisis de la conversación"""
     
@@ -41,20 +74,55 @@ class ConversationAnalysis(BaseModel):
     
     qualification_score: int = Field(description="Puntuación de calificación del prospecto (1-10)")
 
+_token_encoding = None
+_token_encoding_loaded = False
+
+def count_tokens(text: str) -> int:
+    """
+    Cuenta los tokens de un texto para el modelo configurado
+    
+    Usa tiktoken si su vocabulario está disponible; si no, estima por número de caracteres
+    
+    Args:
+        text: Texto a medir
+        
+    Returns:
+        int: Número de tokens (exacto o estimado)
+    """
+    global _token_encoding, _token_encoding_loaded
+    
+    if not _token_encoding_loaded:
+        try:
+            import tiktoken
+            _token_encoding = tiktoken.encoding_for_model(OPENAI_MODEL)
+        except Exception as e:
+            logger.warning(f"Tokenizer no disponible, se estimarán los tokens por caracteres: {str(e)}")
+            _token_encoding = None
+        _token_encoding_loaded = True
+    
+    if _token_encoding is not None:
+        return len(_token_encoding.encode(text))
+    
+    return len(text) // CHARS_PER_TOKEN + 1
+
 class ConversationAnalyzer:
     """Agente para analizar conversaciones y extraer información relevante"""
     
     def __init__(self):
         """Inicializa el analizador con el modelo de OpenAI"""
         
+        from langchain_openai import ChatOpenAI
+        from langchain.output_parsers import PydanticOutputParser
+        
         if not OPENAI_API_KEY:
             logger.warning("OPENAI_API_KEY no configurada, el análisis será simulado")
             self.llm = None
         else:
             self.llm = ChatOpenAI(
-                model="gpt-4",
+                model=OPENAI_MODEL,
                 temperature=0.1,
-                api_key=OPENAI_API_KEY
+                api_key=OPENAI_API_KEY,
+                base_url=OPENAI_BASE_URL
             )
         
         # Configurar el parser de salida
@@ -62,8 +130,18 @@ class ConversationAnalyzer:
         
         # Crear el prompt template
         self.prompt_template = self._create_prompt_template()
+        self.chunk_prompt_template = self._create_chunk_prompt_template()
+        self.reduce_prompt_template = self._create_reduce_prompt_template()
+        
+        # Análisis ya calculados, indexados por hash de transcripción + contexto + modelo + prompt
+        self.cache = SQLiteCache(
+            "analysis_cache.db",
+            max_bytes=ANALYSIS_CACHE_MAX_BYTES,
+            default_ttl=ANALYSIS_CACHE_TTL,
+            name="conversation_analysis"
+        )
     
-    def _create_prompt_template(self) -> ChatPromptTemplate:
+    def _create_prompt_template(self) -> 'ChatPromptTemplate':
         """Crea el template de prompt para el análisis"""
         
         prompt_text = """
@@ -93,18 +171,92 @@ CONTEXTO ADICIONAL:
 Analiza la conversación y proporciona el análisis en el formato JSON solicitado.
 """
 
+        from langchain.prompts import ChatPromptTemplate
+        return ChatPromptTemplate.from_template(prompt_text)
+    
+    def _create_chunk_prompt_template(self) -> 'ChatPromptTemplate':
+        """Crea el template de prompt para analizar un fragmento de una transcripción larga"""
+        
+        prompt_text = """
+Eres un experto analista de conversaciones de ventas. Vas a analizar el FRAGMENTO {chunk_number} de {total_chunks} de una transcripción de una conversación entre un SDR (Sales Development Representative) y un prospecto.
+
+INSTRUCCIONES:
+1. Analiza únicamente el fragmento proporcionado
+2. Identifica el dolor del cliente que aparezca en este fragmento
+3. Resume lo ocurrido en este fragmento
+4. Extrae insights clave del fragmento
+5. Anota compromisos o próximos pasos mencionados
+Si el fragmento no contiene evidencia suficiente, usa una confianza y puntuación bajas.
+
+DOLORES DE VENTA VÁLIDOS:
+{sales_pain_options}
+
+FORMATO DE SALIDA:
+{format_instructions}
+
+FRAGMENTO DE LA TRANSCRIPCIÓN:
+{transcript}
+
+CONTEXTO ADICIONAL:
+- Empresa: {company}
+- Rol del prospecto: {role}
+- Email: {email}
+
+Analiza el fragmento y proporciona el análisis en el formato JSON solicitado.
+"""
+
+        from langchain.prompts import ChatPromptTemplate
+        return ChatPromptTemplate.from_template(prompt_text)
+    
+    def _create_reduce_prompt_template(self) -> 'ChatPromptTemplate':
+        """Crea el template de prompt para combinar los análisis parciales en uno final"""
+        
+        prompt_text = """
+Eres un experto analista de conversaciones de ventas. Una transcripción larga entre un SDR (Sales Development Representative) y un prospecto se analizó por fragmentos consecutivos. Tu tarea es combinar los análisis parciales en un único análisis de toda la conversación.
+
+INSTRUCCIONES:
+1. Escribe un resumen ejecutivo de toda la conversación (no de cada fragmento)
+2. Elige el dolor principal considerando la evidencia de todos los fragmentos
+3. Consolida los insights clave sin repetirlos
+4. Define los próximos pasos según lo acordado al final de la conversación
+5. Asigna una confianza y una puntuación de calificación para la conversación completa
+
+DOLORES DE VENTA VÁLIDOS:
+{sales_pain_options}
+
+FORMATO DE SALIDA:
+{format_instructions}
+
+ANÁLISIS PARCIALES (en orden):
+{partial_analyses}
+
+CONTEXTO ADICIONAL:
+- Empresa: {company}
+- Rol del prospecto: {role}
+- Email: {email}
+
+Combina los análisis y proporciona el análisis final en el formato JSON solicitado.
+"""
+
+        from langchain.prompts import ChatPromptTemplate
         return ChatPromptTemplate.from_template(prompt_text)
     
-    def analyze_conversation(self, transcript: List[Dict], prospect_data: Dict) -> ConversationAnalysis:
+    def analyze_conversation(self, transcript: List[Dict], prospect_data: Dict,
+                             raise_on_error: bool = False) -> ConversationAnalysis:
         """
         Analiza una transcripción de conversación
         
         Args:
             transcript: Lista de mensajes de la conversación
             prospect_data: Datos del prospecto
+            raise_on_error: Si OpenAI falla, lanzar ConversationAnalysisError en lugar de retornar
+                el análisis simulado (la cola de trabajos reintenta más tarde)
             
         Returns:
             ConversationAnalysis: Análisis estructurado de la conversación
+        
+        Raises:
+            ConversationAnalysisError: Solo con raise_on_error
         """
         
         try:
@@ -115,32 +267,223 @@ Analiza la conversación y proporciona el análisis en el formato JSON solicitad
             # Convertir transcript a texto
             transcript_text = self._format_transcript(transcript)
             
-            # Preparar el prompt
-            prompt = self.prompt_template.format(
-                sales_pain_options="\n".join([f"- {pain}" for pain in SALES_PAIN_OPTIONS]),
-                format_instructions=self.parser.get_format_instructions(),
-                transcript=transcript_text,
-                company=prospect_data.get('compania', 'N/A'),
-                role=prospect_data.get('rol', 'N/A'),
-                email=prospect_data.get('emailCorporativo', 'N/A')
-            )
+            # Una transcripción idéntica ya analizada no vuelve a llamar al LLM
+            cache_key = self._cache_key(transcript_text, prospect_data)
+            cached_analysis = self.cache.get(cache_key)
+            if cached_analysis is not None:
+                logger.info("⚡ Análisis obtenido de caché")
+                return ConversationAnalysis(**cached_analysis)
             
-            logger.info("🤖 Iniciando análisis de conversación con LangChain")
-            
-            # Ejecutar el análisis
-            response = self.llm.invoke(prompt)
-            
-            # Parsear la respuesta
-            analysis = self.parser.parse(response.content)
+            # Transcripciones largas se analizan por fragmentos para no acercarse al límite de contexto
+            analysis = openai_breaker.call(self._run_llm_analysis, transcript_text, prospect_data,
+                                           fallback=lambda: None)
+            if analysis is None:
+                if raise_on_error:
+                    raise ConversationAnalysisError("OpenAI no disponible (circuito abierto)")
+                logger.warning("⚠️ OpenAI no disponible (circuito abierto), usando análisis simulado")
+                return self._simulate_analysis(transcript, prospect_data)
             
             logger.info(f"✅ Análisis completado. Dolor identificado: {analysis.pain_point}")
             
+            self.cache.set(cache_key, analysis.model_dump())
+            
             return analysis
             
+        except ConversationAnalysisError:
+            raise
+            
         except Exception as e:
             logger.error(f"Error en análisis de conversación: {str(e)}")
+            if raise_on_error:
+                raise ConversationAnalysisError(f"Error en análisis de conversación: {str(e)}") from e
             return self._simulate_analysis(transcript, prospect_data)
     
+    def _run_llm_analysis(self, transcript_text: str, prospect_data: Dict) -> ConversationAnalysis:
+        """
+        Ejecuta el análisis con el LLM (directo o por fragmentos según el tamaño)
+        
+        Args:
+            transcript_text: Transcripción formateada
+            prospect_data: Datos del prospecto
+            
+        Returns:
+            ConversationAnalysis: Análisis de la conversación
+        """
+        
+        token_count = count_tokens(transcript_text)
+        if token_count > ANALYSIS_CHUNK_THRESHOLD_TOKENS:
+            logger.info(f"🧩 Transcripción de ~{token_count} tokens, análisis por fragmentos")
+            return self._analyze_in_chunks(transcript_text, prospect_data)
+        
+        # Preparar el prompt
+        prompt = self.prompt_template.format(
+            sales_pain_options=self._format_pain_options(),
+            format_instructions=self.parser.get_format_instructions(),
+            transcript=transcript_text,
+            **self._prospect_context(prospect_data)
+        )
+        
+        logger.info("🤖 Iniciando análisis de conversación con LangChain")
+        
+        # Ejecutar el análisis
+        with track_upstream('openai', 'chat'):
+            response = self.llm.invoke(prompt)
+        
+        # Parsear la respuesta
+        return self.parser.parse(response.content)
+    
+    def _analyze_in_chunks(self, transcript_text: str, prospect_data: Dict) -> ConversationAnalysis:
+        """
+        Analiza una transcripción larga en modo map-reduce
+        
+        Cada fragmento se analiza en paralelo (map) y los análisis parciales se combinan
+        en una llamada final (reduce)
+        
+        Args:
+            transcript_text: Transcripción formateada
+            prospect_data: Datos del prospecto
+            
+        Returns:
+            ConversationAnalysis: Análisis de la conversación completa
+        """
+        
+        chunks = self._split_transcript(transcript_text, ANALYSIS_CHUNK_TOKENS)
+        context = self._prospect_context(prospect_data)
+        format_instructions = self.parser.get_format_instructions()
+        
+        chunk_prompts = [
+            self.chunk_prompt_template.format(
+                chunk_number=index + 1,
+                total_chunks=len(chunks),
+                sales_pain_options=self._format_pain_options(),
+                format_instructions=format_instructions,
+                transcript=chunk,
+                **context
+            )
+            for index, chunk in enumerate(chunks)
+        ]
+        
+        logger.info(f"🤖 Analizando {len(chunks)} fragmentos (concurrencia {ANALYSIS_CHUNK_CONCURRENCY})")
+        
+        with track_upstream('openai', 'chat.batch'):
+            responses = self.llm.batch(
+                chunk_prompts,
+                config={"max_concurrency": ANALYSIS_CHUNK_CONCURRENCY},
+                return_exceptions=True
+            )
+        
+        partial_analyses = []
+        for index, response in enumerate(responses):
+            try:
+                if isinstance(response, Exception):
+                    raise response
+                partial_analyses.append(self.parser.parse(response.content))
+            except Exception as e:
+                # Un fragmento fallido no invalida el resto del análisis
+                logger.warning(f"⚠️ Fragmento {index + 1}/{len(chunks)} sin análisis: {str(e)}")
+        
+        if not partial_analyses:
+            raise ValueError("No se pudo analizar ningún fragmento de la transcripción")
+        
+        if len(partial_analyses) == 1:
+            return partial_analyses[0]
+        
+        partial_text = "\n\n".join(
+            f"FRAGMENTO {index + 1}:\n{json.dumps(partial.model_dump(), ensure_ascii=False, indent=2)}"
+            for index, partial in enumerate(partial_analyses)
+        )
+        
+        reduce_prompt = self.reduce_prompt_template.format(
+            sales_pain_options=self._format_pain_options(),
+            format_instructions=format_instructions,
+            partial_analyses=partial_text,
+            **context
+        )
+        
+        logger.info(f"🤖 Combinando {len(partial_analyses)} análisis parciales")
+        
+        with track_upstream('openai', 'chat'):
+            response = self.llm.invoke(reduce_prompt)
+        return self.parser.parse(response.content)
+    
+    def _split_transcript(self, transcript_text: str, max_tokens: int) -> List[str]:
+        """
+        Divide una transcripción formateada en fragmentos de hasta max_tokens
+        
+        Los cortes se hacen entre mensajes; un mensaje que por sí solo excede el
+        presupuesto se corta por caracteres
+        
+        Args:
+            transcript_text: Transcripción formateada (un mensaje por línea)
+            max_tokens: Presupuesto de tokens por fragmento
+            
+        Returns:
+            List[str]: Fragmentos en orden
+        """
+        
+        chunks = []
+        current_lines = []
+        current_tokens = 0
+        
+        for line in transcript_text.split("\n"):
+            line_tokens = count_tokens(line) + 1
+            
+            if line_tokens > max_tokens:
+                if current_lines:
+                    chunks.append("\n".join(current_lines))
+                    current_lines, current_tokens = [], 0
+                
+                step = max_tokens * CHARS_PER_TOKEN
+                chunks.extend(line[start:start + step] for start in range(0, len(line), step))
+                continue
+            
+            if current_tokens + line_tokens > max_tokens and current_lines:
+                chunks.append("\n".join(current_lines))
+                current_lines, current_tokens = [], 0
+            
+            current_lines.append(line)
+            current_tokens += line_tokens
+        
+        if current_lines:
+            chunks.append("\n".join(current_lines))
+        
+        return chunks
+    
+    def _prospect_context(self, prospect_data: Dict) -> Dict:
+        """Datos del prospecto incluidos en los prompts"""
+        
+        return {
+            "company": prospect_data.get('compania', 'N/A'),
+            "role": prospect_data.get('rol', 'N/A'),
+            "email": prospect_data.get('emailCorporativo', 'N/A')
+        }
+    
+    def _format_pain_options(self) -> str:
+        """Lista de dolores válidos para los prompts"""
+        
+        return "\n".join([f"- {pain}" for pain in SALES_PAIN_OPTIONS])
+    
+    def _cache_key(self, transcript_text: str, prospect_data: Dict) -> str:
+        """
+        Calcula la clave de caché de un análisis
+        
+        Args:
+            transcript_text: Transcripción formateada
+            prospect_data: Datos del prospecto (solo los usados en el prompt)
+            
+        Returns:
+            str: Hash SHA-256 del contenido que determina el análisis
+        """
+        
+        key_material = json.dumps({
+            "transcript": transcript_text,
+            "context": self._prospect_context(prospect_data),
+            "model": OPENAI_MODEL,
+            "prompt_version": PROMPT_VERSION
+        }, sort_keys=True, ensure_ascii=False)
+        
+        return hashlib.sha256(key_material.encode('utf-8')).hexdigest()
+    
     def _format_transcript(self, transcript: List[Dict]) -> str:
         """Convierte la transcripción a formato de texto legible"""
         
@@ -226,5 +569,27 @@ Analiza la conversación y proporciona el análisis en el formato JSON solicitad
         
         return pain_mapping.get(pain_point, "No tengo CRM o siento que no lo aprovecho lo suficiente")
 
-# Instancia global del analizador
-conversation_analyzer = ConversationAnalyzer()
+# Instancia global del analizador, creada en el primer uso
+_conversation_analyzer = None
+_conversation_analyzer_lock = threading.Lock()
+
+def get_conversation_analyzer() -> ConversationAnalyzer:
+    """
+    Retorna el analizador global, creándolo (e importando LangChain) en el primer uso
+    
+    Returns:
+        ConversationAnalyzer: Instancia compartida por todos los hilos del proceso
+    """
+    global _conversation_analyzer
+    
+    if _conversation_analyzer is None:
+        with _conversation_analyzer_lock:
+            if _conversation_analyzer is None:
+                _conversation_analyzer = ConversationAnalyzer()
+    return _conversation_analyzer
+
+def __getattr__(name):
+    # Compatibilidad: `from agents.conversation_analyzer import conversation_analyzer` sigue funcionando
+    if name == 'conversation_analyzer':
+        return get_conversation_analyzer()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
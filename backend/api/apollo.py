@@ -2,74 +2,224 @@ import json
 import os
 import requests
 import logging
+from storage.cache import InMemoryCache
+from api.single_flight import SingleFlight
+from api.http_client import client_from_env
+from api.circuit_breaker import breaker_from_env
+from api.structured_logging import cap
 
 logger = logging.getLogger(__name__)
 
 # Configuración de Apollo API
 APOLLO_API_KEY = os.getenv('APOLLO_API_KEY', 'ATpjar6DGtZOKVJWSTiGXQ')
-APOLLO_BASE_URL = 'https://api.apollo.io/api/v1'
+APOLLO_BASE_URL = os.getenv('APOLLO_BASE_URL', 'https://api.apollo.io/api/v1')
 
-def enrich_company_data(domain):
+# Cliente compartido con límite de tasa (APOLLO_RATE_LIMIT, APOLLO_RATE_BURST) y reintentos ante 429/5xx
+apollo_client = client_from_env('APOLLO_', APOLLO_BASE_URL, headers={
+    'Cache-Control': 'no-cache',
+    'Content-Type': 'application/json',
+    'accept': 'application/json',
+    'x-api-key': APOLLO_API_KEY
+}, default_read_timeout=30, default_rate=1, default_burst=5)
+
+# Caché de enriquecimiento por dominio normalizado (TTL en segundos)
+APOLLO_CACHE_TTL = float(os.getenv('APOLLO_CACHE_TTL', 6 * 3600))
+APOLLO_CACHE_NEGATIVE_TTL = float(os.getenv('APOLLO_CACHE_NEGATIVE_TTL', 30 * 60))
+APOLLO_CACHE_MAX_ENTRIES = int(os.getenv('APOLLO_CACHE_MAX_ENTRIES', 1000))
+
+# Copia de respaldo de resultados exitosos para responder mientras Apollo no está disponible
+APOLLO_CACHE_STALE_TTL = float(os.getenv('APOLLO_CACHE_STALE_TTL', 7 * 24 * 3600))
+
+apollo_cache = InMemoryCache(
+    max_entries=APOLLO_CACHE_MAX_ENTRIES,
+    default_ttl=APOLLO_CACHE_TTL,
+    name="apollo_enrich"
+)
+
+apollo_stale_cache = InMemoryCache(
+    max_entries=APOLLO_CACHE_MAX_ENTRIES,
+    default_ttl=APOLLO_CACHE_STALE_TTL,
+    name="apollo_enrich_stale"
+)
+
+# Peticiones concurrentes por el mismo dominio comparten una sola llamada a Apollo
+apollo_flight = SingleFlight(name="apollo_enrich")
+
+# Circuito de Apollo: errores o llamadas de más de APOLLO_BREAKER_SLOW_CALL segundos seguidas lo abren
+apollo_breaker = breaker_from_env('APOLLO_', default_slow_call=10)
+
+# Perfiles de lectura: secciones de process_apollo_data devueltas a cada llamador y si incluyen la respuesta cruda
+#   minimal: lo que usa build_contact_properties al crear o importar contactos
+#   agent_context: todas las secciones procesadas, sin la respuesta cruda (contexto del agente y resúmenes)
+#   full: secciones procesadas y raw_data (endpoints de diagnóstico)
+APOLLO_SECTIONS = [
+    "informacion_basica", "contacto", "financiera", "ubicaciones", "empleados_clave", "resumen_ejecutivo"
+]
+
+READ_PROFILES = {
+    "minimal": {"sections": ["informacion_basica", "contacto", "financiera"], "raw_data": False},
+    "agent_context": {"sections": APOLLO_SECTIONS, "raw_data": False},
+    "full": {"sections": APOLLO_SECTIONS, "raw_data": True}
+}
+
+def normalize_domain(domain):
+    """
+    Normaliza un dominio o URL para usarlo como clave (ej: https://www.Example.com/about -> example.com)
+    
+    Args:
+        domain (str): Dominio o URL de la empresa
+    
+    Returns:
+        str: Dominio normalizado
+    """
+    
+    domain = domain.strip().lower()
+    domain = domain.replace('https://', '').replace('http://', '')
+    
+    # Quitar path, query, puerto y punto final
+    domain = domain.split('/', 1)[0].split('?', 1)[0].split(':', 1)[0].rstrip('.')
+    
+    if domain.startswith('www.'):
+        domain = domain[4:]
+    
+    return domain
+
+def enrich_company_data(domain, profile="full"):
     """
     Enriquece los datos de una empresa usando Apollo API
     
+    Los resultados exitosos y los NOT_FOUND se guardan en caché por dominio normalizado; la caché
+    guarda el resultado completo y cada llamador recibe solo las secciones de su perfil
+    
     Args:
         domain (str): Dominio de la empresa (ej: example.com)
+        profile (str): Perfil de lectura (minimal, agent_context, full); solo full incluye raw_data
     
     Returns:
         dict: Datos enriquecidos de la empresa o error
     """
     
+    if profile not in READ_PROFILES:
+        raise ValueError(f"Perfil de lectura desconocido: {profile} (disponibles: {', '.join(READ_PROFILES)})")
+    
     if not domain:
         return {
             "success": False,
             "error": "Dominio es requerido"
         }
     
-    # Limpiar el dominio (remover protocolo si existe)
-    domain = domain.replace('https://', '').replace('http://', '').replace('www.', '')
+    domain = normalize_domain(domain)
+    
+    cached_result = apollo_cache.get(domain)
+    if cached_result is not None:
+        logger.info(f"⚡ Resultado de Apollo obtenido de caché para dominio: {domain}")
+        return project_result(cached_result, profile)
+    
+    return project_result(apollo_flight.do(domain, _fetch_and_cache_company_data, domain), profile)
+
+def project_result(result, profile):
+    """
+    Reduce un resultado de enriquecimiento a las secciones del perfil sin modificar el original
+    
+    Args:
+        result (dict): Resultado completo (compartido con la caché y el single-flight)
+        profile (str): Perfil de lectura
+    
+    Returns:
+        dict: Resultado con data limitado a las secciones del perfil y raw_data solo si el perfil lo pide
+    """
+    
+    read_profile = READ_PROFILES[profile]
+    data = result.get('data')
+    
+    if not result.get('success') or not isinstance(data, dict) or 'error' in data:
+        return result
+    
+    projected = {key: value for key, value in result.items() if key != 'raw_data' or read_profile["raw_data"]}
+    projected['data'] = {
+        key: value for key, value in data.items()
+        if key not in APOLLO_SECTIONS or key in read_profile["sections"]
+    }
+    
+    return projected
+
+def _fetch_and_cache_company_data(domain):
+    """Consulta Apollo (a través del circuito) y guarda en caché los resultados exitosos y NOT_FOUND"""
+    
+    result = apollo_breaker.call(
+        fetch_company_data, domain,
+        is_failure=lambda result: not result.get('success') and result.get('code') != 'NOT_FOUND',
+        fallback=lambda: _degraded_company_data(domain)
+    )
+    
+    if result.get('stale') or result.get('code') == 'CIRCUIT_OPEN':
+        return result
+    
+    if result.get('success'):
+        apollo_cache.set(domain, result)
+        apollo_stale_cache.set(domain, result)
+    elif result.get('code') == 'NOT_FOUND':
+        apollo_cache.set(domain, result, ttl=APOLLO_CACHE_NEGATIVE_TTL)
+    
+    return result
+
+def _degraded_company_data(domain):
+    """Resultado con el circuito abierto: última copia conocida del dominio o error inmediato"""
+    
+    stale_result = apollo_stale_cache.get(domain)
+    if stale_result is not None:
+        logger.warning(f"⚠️ Apollo no disponible, usando datos anteriores para dominio: {domain}")
+        return {**stale_result, "stale": True}
+    
+    logger.warning(f"⚠️ Apollo no disponible (circuito abierto), omitiendo enriquecimiento de: {domain}")
+    return {
+        "success": False,
+        "error": "Apollo no disponible temporalmente",
+        "code": "CIRCUIT_OPEN"
+    }
+
+def fetch_company_data(domain):
+    """
+    Consulta el endpoint /organizations/enrich de Apollo sin pasar por la caché
+    
+    Args:
+        domain (str): Dominio normalizado de la empresa
+    
+    Returns:
+        dict: Datos enriquecidos de la empresa o error
+    """
     
     try:
         # URL del endpoint de Apollo
         url = f"{APOLLO_BASE_URL}/organizations/enrich"
         
-        # Headers para la API de Apollo
-        headers = {
-            'Cache-Control': 'no-cache',
-            'Content-Type': 'application/json',
-            'accept': 'application/json',
-            'x-api-key': APOLLO_API_KEY
-        }
-        
         # Parámetros de la consulta
         params = {
             'domain': domain
         }
         
         logger.info(f"🔍 Consultando Apollo API para dominio: {domain}")
-        logger.info(f"📡 URL: {url}")
-        logger.info(f"📋 Parámetros: {params}")
+        logger.debug("📡 URL: %s, parámetros: %s", url, params)
         
         # Realizar la petición a Apollo
-        response = requests.get(url, headers=headers, params=params, timeout=30)
+        response = apollo_client.get(url, params=params)
         
-        logger.info(f"📊 Status Code: {response.status_code}")
-        logger.info(f"⏱️  Tiempo de respuesta: {response.elapsed.total_seconds():.2f}s")
+        logger.info("📊 Apollo %s: status %s en %.2fs", domain, response.status_code,
+                    response.elapsed.total_seconds())
         
         if response.status_code == 200:
             data = response.json()
-            logger.info(f"✅ Datos enriquecidos obtenidos de Apollo para {domain}")
-            
-            # Log detallado de la respuesta
-            organization = data.get('organization', {})
-            people = data.get('people', [])
             
-            logger.info(f"🏢 Organización encontrada: {organization.get('name', 'N/A')}")
-            logger.info(f"👥 Empleados encontrados: {len(people)}")
-            logger.info(f"🏭 Industria: {organization.get('industry', 'N/A')}")
-            logger.info(f"👨‍💼 Tamaño: {organization.get('estimated_num_employees', 'N/A')} empleados")
-            logger.info(f"💰 Ingresos: {organization.get('annual_revenue', 'N/A')}")
-            logger.info(f"🌍 Ubicaciones: {len(organization.get('locations', []))}")
+            # Un solo evento resumido; el detalle por campo, empleado y ubicación queda en DEBUG
+            organization = data.get('organization') or {}
+            logger.info("✅ Datos enriquecidos obtenidos de Apollo para %s", domain, extra={"fields": {
+                "organizacion": organization.get('name'),
+                "industria": organization.get('industry'),
+                "tamaño": organization.get('estimated_num_employees'),
+                "ingresos": organization.get('annual_revenue'),
+                "personas": len(data.get('people') or []),
+                "ubicaciones": len(organization.get('locations') or [])
+            }})
             
             # Procesar y estructurar los datos relevantes
             enriched_data = process_apollo_data(data)
@@ -90,7 +240,7 @@ def enrich_company_data(domain):
         
         else:
             error_msg = f"Error de Apollo API: {response.status_code} - {response.text}"
-            logger.error(error_msg)
+            logger.error("Error de Apollo API: %s - %s", response.status_code, cap(response.text))
             return {
                 "success": False,
                 "error": error_msg,
@@ -126,20 +276,15 @@ def process_apollo_data(apollo_response):
     """
     
     try:
-        logger.info("🔄 Procesando datos de Apollo...")
-        
         # Extraer la organización principal
         organization = apollo_response.get('organization', {})
-        logger.info(f"📋 Campos disponibles en organization: {list(organization.keys())}")
         
-        # Log de campos importantes
-        important_fields = ['name', 'industry', 'estimated_num_employees', 'annual_revenue', 'founded_year']
-        for field in important_fields:
-            value = organization.get(field)
-            if value:
-                logger.info(f"  • {field}: {value}")
-            else:
-                logger.info(f"  • {field}: No disponible")
+        # Detalle de campos solo en DEBUG
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("📋 Campos disponibles en organization: %s", cap(list(organization.keys())))
+            important_fields = ['name', 'industry', 'estimated_num_employees', 'annual_revenue', 'founded_year']
+            for field in important_fields:
+                logger.debug("  • %s: %s", field, organization.get(field) or "No disponible")
         
         # Información básica de la empresa
         company_info = {
@@ -173,7 +318,6 @@ def process_apollo_data(apollo_response):
         
         # Información de ubicaciones
         locations = organization.get('locations', [])
-        logger.info(f"🌍 Procesando {len(locations)} ubicaciones...")
         ubicaciones = []
         for i, location in enumerate(locations[:3], 1):  # Máximo 3 ubicaciones
             ubicacion_data = {
@@ -183,11 +327,11 @@ def process_apollo_data(apollo_response):
                 "direccion": location.get('address', '')
             }
             ubicaciones.append(ubicacion_data)
-            logger.info(f"  📍 Ubicación {i}: {ubicacion_data['ciudad']}, {ubicacion_data['estado']}, {ubicacion_data['pais']}")
+            logger.debug("  📍 Ubicación %d: %s, %s, %s", i, ubicacion_data['ciudad'],
+                         ubicacion_data['estado'], ubicacion_data['pais'])
         
         # Información de empleados clave (primeros 5)
         employees = apollo_response.get('people', [])
-        logger.info(f"👥 Procesando {len(employees)} empleados...")
         empleados_clave = []
         for i, employee in enumerate(employees[:5], 1):
             empleado_data = {
@@ -198,7 +342,7 @@ def process_apollo_data(apollo_response):
                 "departamento": employee.get('department', '')
             }
             empleados_clave.append(empleado_data)
-            logger.info(f"  👤 Empleado {i}: {empleado_data['nombre']} - {empleado_data['cargo']}")
+            logger.debug("  👤 Empleado %d: %s - %s", i, empleado_data['nombre'], empleado_data['cargo'])
         
         # Crear resumen ejecutivo
         resumen_ejecutivo = create_executive_summary(company_info, financial_info, empleados_clave)
@@ -0,0 +1,259 @@
+"""
+Importación masiva de prospectos desde CSV o JSONL
+Deduplica por email, enriquece con Apollo una vez por dominio y hace upsert en HubSpot en lotes de 100
+"""
+
+import csv
+import io
+import json
+import os
+import uuid
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+from api.apollo import enrich_company_data, normalize_domain
+from api import hubspot
+from storage.sqlite_db import DATA_DIR
+
+logger = logging.getLogger(__name__)
+
+# Llamadas concurrentes a Apollo / lotes concurrentes a HubSpot por importación
+BULK_IMPORT_CONCURRENCY = int(os.getenv('BULK_IMPORT_CONCURRENCY', 4))
+
+# Máximo de filas aceptadas por importación
+BULK_IMPORT_MAX_ROWS = int(os.getenv('BULK_IMPORT_MAX_ROWS', 20000))
+
+# Directorio de los archivos de resultado por fila
+BULK_IMPORT_RESULTS_DIR = os.path.abspath(os.path.join(DATA_DIR, 'bulk_imports'))
+
+REQUIRED_FIELDS = ['nombres', 'apellidos', 'compania', 'emailCorporativo', 'rol']
+
+# Estados de una fila en el archivo de resultados
+ROW_CREATED = 'created'
+ROW_UPDATED = 'updated'
+ROW_SIMULATED = 'simulated'
+ROW_DUPLICATE = 'duplicate'
+ROW_INVALID = 'invalid'
+ROW_ERROR = 'error'
+
+def detect_format(filename: Optional[str] = None, content_type: Optional[str] = None) -> str:
+    """
+    Determina el formato de entrada por extensión o content type
+
+    Args:
+        filename (str): Nombre del archivo subido
+        content_type (str): Content-Type de la petición
+
+    Returns:
+        str: 'csv' o 'jsonl'
+    """
+    filename = (filename or '').lower()
+    content_type = (content_type or '').lower()
+
+    if filename.endswith(('.jsonl', '.ndjson')) or 'ndjson' in content_type or 'jsonl' in content_type:
+        return 'jsonl'
+    return 'csv'
+
+def parse_rows(content: str, input_format: str) -> List[Dict]:
+    """
+    Convierte el contenido CSV (con encabezados) o JSONL en una lista de filas
+
+    Args:
+        content (str): Contenido del archivo
+        input_format (str): 'csv' o 'jsonl'
+
+    Returns:
+        List[Dict]: Filas en el orden del archivo
+    """
+    if input_format == 'jsonl':
+        rows = []
+        for line_number, line in enumerate(content.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                rows.append({"_parse_error": f"Línea {line_number}: JSON inválido ({str(e)})"})
+        return rows
+
+    reader = csv.DictReader(io.StringIO(content.lstrip('\ufeff')))
+    return [
+        {key.strip(): (value or '').strip() for key, value in row.items() if key}
+        for row in reader
+    ]
+
+def _validate_row(row: Dict) -> Optional[str]:
+    """Retorna el error de validación de una fila o None si es válida"""
+    if not isinstance(row, dict):
+        return "Fila inválida: se esperaba un objeto"
+    if row.get('_parse_error'):
+        return row['_parse_error']
+
+    missing = [field for field in REQUIRED_FIELDS if not row.get(field)]
+    if missing:
+        return f"Campos requeridos faltantes: {', '.join(missing)}"
+
+    # En JSONL los valores pueden ser números, listas u objetos: solo se aceptan textos
+    not_text = [field for field in REQUIRED_FIELDS + ['websiteUrl']
+                if row.get(field) is not None and not isinstance(row[field], str)]
+    if not_text:
+        return f"Campos con valor no textual: {', '.join(not_text)}"
+    if not row['emailCorporativo'].strip():
+        return "Campos requeridos faltantes: emailCorporativo"
+    return None
+
+def _enrich_domains(domains: List[str], concurrency: int) -> Iterator[tuple]:
+    """Enriquece cada dominio único con Apollo; produce (dominio, datos o None) a medida que terminan"""
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='bulk-apollo') as executor:
+        futures = {executor.submit(enrich_company_data, domain, 'minimal'): domain for domain in domains}
+
+        for future in as_completed(futures):
+            domain = futures[future]
+            try:
+                result = future.result()
+                yield domain, result.get('data') if result.get('success') else None
+            except Exception as e:
+                logger.warning(f"⚠️ Error enriqueciendo {domain} con Apollo: {str(e)}")
+                yield domain, None
+
+def run_bulk_import(rows: List[Dict], concurrency: int = BULK_IMPORT_CONCURRENCY,
+                    results_path: Optional[str] = None) -> Iterator[Dict]:
+    """
+    Importa prospectos en bloque y produce eventos de progreso
+
+    Args:
+        rows (List[Dict]): Filas con los campos de /api/prospect
+        concurrency (int): Llamadas concurrentes a Apollo y lotes concurrentes a HubSpot
+        results_path (str): Archivo JSONL de resultados por fila (por defecto en data/bulk_imports/)
+
+    Yields:
+        Dict: Eventos {"event": "started" | "progress" | "done", ...}
+    """
+    import_id = f"{datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    if results_path is None:
+        os.makedirs(BULK_IMPORT_RESULTS_DIR, exist_ok=True)
+        results_path = os.path.join(BULK_IMPORT_RESULTS_DIR, f"{import_id}.jsonl")
+
+    row_results = [None] * len(rows)
+    first_row_by_email = {}
+    domain_by_row = {}
+
+    # Validación y deduplicación por email (gana la primera aparición)
+    for index, row in enumerate(rows):
+        error = _validate_row(row)
+        if error:
+            row_results[index] = {"row": index, "email": None, "status": ROW_INVALID, "error": error}
+            continue
+
+        email = row['emailCorporativo'].strip().lower()
+        if email in first_row_by_email:
+            row_results[index] = {
+                "row": index,
+                "email": email,
+                "status": ROW_DUPLICATE,
+                "duplicate_of": first_row_by_email[email]
+            }
+            continue
+
+        first_row_by_email[email] = index
+        if row.get('websiteUrl'):
+            domain_by_row[index] = normalize_domain(row['websiteUrl'])
+
+    unique_rows = list(first_row_by_email.values())
+    unique_domains = sorted(set(domain_by_row.values()))
+
+    logger.info(f"📥 Importación {import_id}: {len(rows)} filas, {len(unique_rows)} emails únicos, "
+                f"{len(unique_domains)} dominios únicos")
+
+    yield {
+        "event": "started",
+        "import_id": import_id,
+        "total_rows": len(rows),
+        "unique_contacts": len(unique_rows),
+        "unique_domains": len(unique_domains)
+    }
+
+    # Apollo: una llamada por dominio único
+    apollo_by_domain = {}
+    for domain, apollo_data in _enrich_domains(unique_domains, concurrency):
+        apollo_by_domain[domain] = apollo_data
+        yield {"event": "progress", "stage": "apollo", "done": len(apollo_by_domain), "total": len(unique_domains)}
+
+    # HubSpot: upsert por email en lotes de HUBSPOT_BATCH_SIZE
+    contacts = {}
+    for index in unique_rows:
+        apollo_data = apollo_by_domain.get(domain_by_row.get(index))
+        properties = hubspot.build_contact_properties(rows[index], apollo_data)
+        properties['email'] = properties['email'].strip().lower()
+        contacts[index] = properties
+        row_results[index] = {
+            "row": index,
+            "email": properties['email'],
+            "domain": domain_by_row.get(index),
+            "apollo_enriched": apollo_data is not None
+        }
+
+    batches = [
+        unique_rows[start:start + hubspot.HUBSPOT_BATCH_SIZE]
+        for start in range(0, len(unique_rows), hubspot.HUBSPOT_BATCH_SIZE)
+    ]
+
+    if not hubspot.HUBSPOT_API_KEY:
+        logger.warning("API Key de HubSpot no configurada, simulando upsert de contactos")
+
+    contacts_done = 0
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='bulk-hubspot') as executor:
+        futures = {}
+        for batch in batches:
+            if hubspot.HUBSPOT_API_KEY:
+                future = executor.submit(hubspot.upsert_contacts_batch, [contacts[index] for index in batch])
+            else:
+                future = executor.submit(lambda: {"success": True, "data": [], "simulated": True})
+            futures[future] = batch
+
+        for future in as_completed(futures):
+            batch = futures[future]
+            try:
+                batch_result = future.result()
+            except Exception as e:
+                batch_result = {"success": False, "data": [], "error": str(e)}
+
+            upserted_by_email = {contact['email']: contact for contact in batch_result.get('data', [])}
+
+            for index in batch:
+                result = row_results[index]
+                upserted = upserted_by_email.get(result['email'])
+
+                if batch_result.get('simulated'):
+                    result.update({"status": ROW_SIMULATED, "contact_id": "simulated_contact_id"})
+                elif upserted:
+                    result.update({
+                        "status": ROW_CREATED if upserted['created'] else ROW_UPDATED,
+                        "contact_id": upserted['contact_id']
+                    })
+                else:
+                    result.update({
+                        "status": ROW_ERROR,
+                        "error": batch_result.get('error', "HubSpot no retornó el contacto")
+                    })
+
+            contacts_done += len(batch)
+            yield {"event": "progress", "stage": "hubspot", "done": contacts_done, "total": len(unique_rows)}
+
+    with open(results_path, 'w', encoding='utf-8') as f:
+        for result in row_results:
+            f.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+    summary = {}
+    for result in row_results:
+        summary[result['status']] = summary.get(result['status'], 0) + 1
+
+    logger.info(f"✅ Importación {import_id} finalizada: {summary}")
+
+    yield {
+        "event": "done",
+        "import_id": import_id,
+        "summary": summary,
+        "results_file": results_path
+    }
@@ -0,0 +1,181 @@
+"""
+Circuit breaker por proveedor
+Tras varios fallos o llamadas lentas seguidas, las llamadas fallan rápido con un resultado degradado
+en lugar de ocupar workers esperando a un proveedor caído; luego se prueba con una llamada (half-open)
+"""
+
+import os
+import time
+import threading
+import logging
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Estados del circuito
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+class CircuitOpenError(Exception):
+    """El circuito está abierto y no se indicó un resultado degradado"""
+
+class CircuitBreaker:
+    """
+    Circuit breaker con umbral de fallos consecutivos y de latencia
+
+    - closed: las llamadas pasan; un fallo o una llamada más lenta que slow_call_threshold
+      suma al contador y al llegar a failure_threshold el circuito se abre
+    - open: las llamadas no se ejecutan y retornan el fallback durante reset_timeout
+    - half_open: una sola llamada de prueba; si es exitosa el circuito se cierra, si no se reabre
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, slow_call_threshold: float = 10.0,
+                 reset_timeout: float = 30.0):
+        """
+        Inicializa el circuito
+
+        Args:
+            name (str): Nombre del proveedor para logs y métricas
+            failure_threshold (int): Fallos o llamadas lentas consecutivas para abrir el circuito
+            slow_call_threshold (float): Segundos a partir de los cuales una llamada cuenta como fallo
+            reset_timeout (float): Segundos abierto antes de permitir una llamada de prueba
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.slow_call_threshold = slow_call_threshold
+        self.reset_timeout = reset_timeout
+
+        self._lock = threading.Lock()
+        self._state = STATE_CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._counters = {"calls": 0, "failures": 0, "slow_calls": 0, "rejected": 0, "opened": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def _allow(self) -> bool:
+        """Decide si la llamada se ejecuta; en half-open solo pasa una prueba a la vez"""
+        with self._lock:
+            if self._state == STATE_OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = STATE_HALF_OPEN
+                self._probe_in_flight = False
+                logger.info(f"🟡 Circuito {self.name}: half-open, probando proveedor")
+
+            if self._state == STATE_CLOSED:
+                self._counters["calls"] += 1
+                return True
+
+            if self._state == STATE_HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                self._counters["calls"] += 1
+                return True
+
+            self._counters["rejected"] += 1
+            return False
+
+    def _record(self, failed: bool, slow: bool):
+        with self._lock:
+            if slow:
+                self._counters["slow_calls"] += 1
+            if failed:
+                self._counters["failures"] += 1
+
+            if not failed and not slow:
+                if self._state != STATE_CLOSED:
+                    logger.info(f"🟢 Circuito {self.name}: cerrado, proveedor recuperado")
+                self._state = STATE_CLOSED
+                self._consecutive_failures = 0
+                self._probe_in_flight = False
+                return
+
+            self._consecutive_failures += 1
+            if self._state == STATE_HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != STATE_OPEN:
+                    self._counters["opened"] += 1
+                    logger.warning(f"🔴 Circuito {self.name}: abierto tras {self._consecutive_failures} "
+                                   f"fallos/llamadas lentas; fallo rápido por {self.reset_timeout}s")
+                self._state = STATE_OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def call(self, fn: Callable, *args, is_failure: Optional[Callable[[Any], bool]] = None,
+             fallback: Optional[Callable[[], Any]] = None, **kwargs) -> Any:
+        """
+        Ejecuta fn(*args, **kwargs) si el circuito lo permite
+
+        Args:
+            fn (Callable): Llamada al proveedor
+            is_failure (Callable): Indica si un resultado (sin excepción) cuenta como fallo
+            fallback (Callable): Resultado degradado cuando el circuito está abierto
+
+        Returns:
+            Any: Resultado de fn, o del fallback si el circuito está abierto
+        """
+        if not self._allow():
+            if fallback is None:
+                raise CircuitOpenError(f"Circuito {self.name} abierto")
+            return fallback()
+
+        started = time.monotonic()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self._record(failed=True, slow=time.monotonic() - started > self.slow_call_threshold)
+            raise
+
+        failed = bool(is_failure and is_failure(result))
+        self._record(failed=failed, slow=time.monotonic() - started > self.slow_call_threshold)
+        return result
+
+    def stats(self) -> Dict:
+        """Retorna el estado y los contadores del circuito"""
+        with self._lock:
+            return {
+                "name": self.name,
+                "state": self._state,
+                "consecutive_failures": self._consecutive_failures,
+                **self._counters
+            }
+
+# Registro de circuitos del proceso para exponer su estado
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def breaker_from_env(prefix: str, default_slow_call: float, default_failures: int = 5,
+                     default_reset: float = 30.0) -> CircuitBreaker:
+    """
+    Crea (o retorna, si ya existe) el circuito configurado por variables de entorno
+
+    Variables (con prefijo, ej: APOLLO_):
+        {prefix}BREAKER_FAILURES, {prefix}BREAKER_SLOW_CALL, {prefix}BREAKER_RESET
+
+    Args:
+        prefix (str): Prefijo de las variables de entorno
+        default_slow_call (float): Segundos a partir de los cuales una llamada cuenta como fallo
+        default_failures (int): Fallos consecutivos para abrir el circuito
+        default_reset (float): Segundos abierto antes de probar
+
+    Returns:
+        CircuitBreaker: Circuito compartido
+    """
+    name = prefix.rstrip('_').lower()
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(
+                name,
+                failure_threshold=int(os.getenv(f'{prefix}BREAKER_FAILURES', default_failures)),
+                slow_call_threshold=float(os.getenv(f'{prefix}BREAKER_SLOW_CALL', default_slow_call)),
+                reset_timeout=float(os.getenv(f'{prefix}BREAKER_RESET', default_reset))
+            )
+        return _breakers[name]
+
+def get_breaker_stats() -> Dict:
+    """Retorna el estado de todos los circuitos registrados"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.stats() for breaker in breakers}
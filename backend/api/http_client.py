@@ -0,0 +1,172 @@
+"""
+Cliente HTTP compartido con pool de conexiones keep-alive
+Reutiliza conexiones TCP/TLS entre llamadas a un mismo proveedor y aplica su límite de tasa y reintentos
+"""
+
+import os
+import logging
+from typing import Dict, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from api.rate_limiter import OutboundProvider, TokenBucket, RETRYABLE_STATUS_CODES, parse_retry_after, provider_from_env
+from api.metrics import track_upstream, endpoint_family
+
+logger = logging.getLogger(__name__)
+
+# Métodos que se pueden repetir sin efectos duplicados ante 5xx o errores de conexión
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'PATCH', 'DELETE'}
+
+class HTTPClient:
+    """
+    Cliente HTTP basado en requests.Session con pool de conexiones,
+    timeouts por defecto y headers construidos una sola vez
+    """
+
+    def __init__(self, base_url: str, headers: Optional[Dict] = None, pool_size: int = 10,
+                 connect_timeout: float = 5.0, read_timeout: float = 30.0, name: str = "http",
+                 provider: Optional[OutboundProvider] = None, path_limits: Optional[Dict[str, TokenBucket]] = None):
+        """
+        Inicializa el cliente
+
+        Args:
+            base_url (str): URL base del proveedor (ej: https://api.hubapi.com)
+            headers (Dict): Headers comunes a todas las peticiones (auth, content-type)
+            pool_size (int): Conexiones keep-alive máximas por host y por worker
+            connect_timeout (float): Timeout de conexión en segundos
+            read_timeout (float): Timeout de lectura en segundos
+            name (str): Nombre del proveedor para logs
+            provider (OutboundProvider): Límite de tasa y reintentos del proveedor (None: sin límite)
+            path_limits (Dict[str, TokenBucket]): Límites adicionales para URLs que contienen el fragmento
+        """
+        self.base_url = base_url.rstrip('/')
+        self.name = name
+        self.timeout = (connect_timeout, read_timeout)
+        self.provider = provider
+        self.path_limits = path_limits or {}
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        if headers:
+            self.session.headers.update(headers)
+
+    def _build_url(self, path: str) -> str:
+        """Construye la URL completa a partir de un path relativo o una URL absoluta"""
+        if path.startswith('http://') or path.startswith('https://'):
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def request(self, method: str, path: str, idempotent: Optional[bool] = None, **kwargs) -> requests.Response:
+        """
+        Ejecuta una petición usando la sesión compartida
+
+        Los 429 siempre se reintentan (respetando Retry-After); los 5xx y errores de
+        conexión solo si la petición es idempotente.
+
+        Args:
+            method (str): Método HTTP
+            path (str): Path relativo a base_url o URL absoluta
+            idempotent (bool): Forzar si la petición se puede repetir (ej: POST de búsqueda);
+                               por defecto según el método
+            **kwargs: Argumentos adicionales para requests (params, json, timeout...)
+
+        Returns:
+            requests.Response: Respuesta del proveedor (la última, si se agotaron los reintentos)
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        url = self._build_url(path)
+
+        if self.provider is None:
+            return self._send(method, url, **kwargs)
+
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+
+        extra_buckets = [bucket for fragment, bucket in self.path_limits.items() if fragment in url]
+
+        return self.provider.call(
+            lambda: self._send(method, url, **kwargs),
+            lambda response, error: self._retry_decision(response, error, idempotent),
+            extra_buckets=extra_buckets
+        )
+
+    def _send(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Un intento de la petición, medido por proveedor y familia de endpoint"""
+        with track_upstream(self.name, endpoint_family(url)) as outcome:
+            response = self.session.request(method, url, **kwargs)
+            outcome["status"] = response.status_code
+        return response
+
+    @staticmethod
+    def _retry_decision(response: Optional[requests.Response], error: Optional[Exception],
+                        idempotent: bool) -> Optional[Dict]:
+        """Decide si un intento se reintenta y por qué"""
+        if error is not None:
+            # Un timeout de conexión garantiza que la petición no llegó al proveedor
+            if isinstance(error, requests.exceptions.ConnectTimeout) or (
+                    idempotent and isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))):
+                return {"reason": "connection_errors", "retry_after": None}
+            return None
+
+        if response.status_code == 429:
+            return {"reason": "throttled", "retry_after": parse_retry_after(response.headers.get('Retry-After'))}
+
+        if response.status_code in RETRYABLE_STATUS_CODES and idempotent:
+            return {"reason": "server_errors", "retry_after": parse_retry_after(response.headers.get('Retry-After'))}
+
+        return None
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return self.request('POST', path, **kwargs)
+
+    def patch(self, path: str, **kwargs) -> requests.Response:
+        return self.request('PATCH', path, **kwargs)
+
+    def close(self):
+        """Cierra las conexiones del pool"""
+        self.session.close()
+
+def client_from_env(prefix: str, base_url: str, headers: Optional[Dict] = None,
+                    default_read_timeout: float = 30.0, default_rate: float = 10.0,
+                    default_burst: float = 10.0, path_limits: Optional[Dict[str, TokenBucket]] = None) -> HTTPClient:
+    """
+    Crea un cliente leyendo la configuración del pool y del límite de tasa desde variables de entorno
+
+    Variables (con prefijo, ej: HUBSPOT_):
+        {prefix}POOL_SIZE, {prefix}CONNECT_TIMEOUT, {prefix}READ_TIMEOUT
+        {prefix}RATE_LIMIT, {prefix}RATE_BURST, {prefix}MAX_RETRIES, {prefix}MAX_QUEUE_WAIT
+
+    Args:
+        prefix (str): Prefijo de las variables de entorno
+        base_url (str): URL base del proveedor
+        headers (Dict): Headers comunes
+        default_read_timeout (float): Timeout de lectura si no se configura
+        default_rate (float): Peticiones por segundo si no se configura
+        default_burst (float): Ráfaga si no se configura
+        path_limits (Dict[str, TokenBucket]): Límites adicionales por endpoint
+
+    Returns:
+        HTTPClient: Cliente configurado
+    """
+    pool_size = int(os.getenv(f'{prefix}POOL_SIZE', 10))
+    connect_timeout = float(os.getenv(f'{prefix}CONNECT_TIMEOUT', 5))
+    read_timeout = float(os.getenv(f'{prefix}READ_TIMEOUT', default_read_timeout))
+
+    logger.info(f"🔌 Cliente HTTP {prefix.rstrip('_').lower()}: pool={pool_size}, "
+                f"timeouts=({connect_timeout}s, {read_timeout}s)")
+
+    return HTTPClient(
+        base_url,
+        headers=headers,
+        pool_size=pool_size,
+        connect_timeout=connect_timeout,
+        read_timeout=read_timeout,
+        name=prefix.rstrip('_').lower(),
+        provider=provider_from_env(prefix, default_rate, default_burst),
+        path_limits=path_limits
+    )
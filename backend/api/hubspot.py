@@ -1,9 +1,19 @@
-import json
 import os
-import requests
+import heapq
 import logging
-from datetime import datetime, timedelta
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime, timedelta, timezone
+from urllib.parse import quote
 from dotenv import load_dotenv
+from api.http_client import client_from_env
+from api.rate_limiter import TokenBucket, per_process_limit
+from api.circuit_breaker import breaker_from_env
+from api.structured_logging import log_payload
+from api.single_flight import SingleFlight
+from storage.cache import SQLiteCache
+from storage.hubspot_mirror import hubspot_mirror
+from api.metrics import metrics
 
 # Cargar variables de entorno desde .env
 load_dotenv()
@@ -13,14 +23,278 @@ logger = logging.getLogger(__name__)
 # Configuración de HubSpot API
 HUBSPOT_API_KEY = os.getenv('HUBSPOT_API_KEY')
 HUBSPOT_PORTAL_ID = os.getenv('HUBSPOT_PORTAL_ID')
-HUBSPOT_BASE_URL = 'https://api.hubapi.com'
+HUBSPOT_BASE_URL = os.getenv('HUBSPOT_BASE_URL', 'https://api.hubapi.com')
 
-def get_contact_info(email):
+# Límites publicados de HubSpot para apps privadas: 100 peticiones / 10 s y 5 búsquedas / s por cuenta
+HUBSPOT_SEARCH_RATE_LIMIT = float(os.getenv('HUBSPOT_SEARCH_RATE_LIMIT', 4))
+
+# Cliente compartido: una sola sesión keep-alive para todas las llamadas a HubSpot
+# Pool y timeouts configurables con HUBSPOT_POOL_SIZE, HUBSPOT_CONNECT_TIMEOUT, HUBSPOT_READ_TIMEOUT
+# Límite de tasa y reintentos con HUBSPOT_RATE_LIMIT, HUBSPOT_RATE_BURST, HUBSPOT_MAX_RETRIES, HUBSPOT_MAX_QUEUE_WAIT
+hubspot_client = client_from_env('HUBSPOT_', HUBSPOT_BASE_URL, headers={
+    "Authorization": f"Bearer {HUBSPOT_API_KEY}",
+    "Content-Type": "application/json"
+}, default_rate=10, default_burst=10, path_limits={
+    "/search": TokenBucket(per_process_limit(HUBSPOT_SEARCH_RATE_LIMIT),
+                           max(1.0, per_process_limit(HUBSPOT_SEARCH_RATE_LIMIT)), name="hubspot_search")
+})
+
+# Fan-out concurrente de get_contact_info: workers por proceso y deadline por enriquecimiento (segundos)
+HUBSPOT_FANOUT_WORKERS = int(os.getenv('HUBSPOT_FANOUT_WORKERS', 8))
+HUBSPOT_ENRICHMENT_TIMEOUT = float(os.getenv('HUBSPOT_ENRICHMENT_TIMEOUT', 20))
+
+# Executor de las ramas paralelas a la cadena contacto -> empresa -> negocios (engagements)
+_fanout_executor = ThreadPoolExecutor(max_workers=HUBSPOT_FANOUT_WORKERS, thread_name_prefix='hubspot-fanout')
+
+# Executor separado para la lectura por tipo de engagement: la rama de engagements corre
+# en _fanout_executor y espera a estas tareas, así que no pueden compartir workers
+_engagement_executor = ThreadPoolExecutor(max_workers=HUBSPOT_FANOUT_WORKERS, thread_name_prefix='hubspot-engagements')
+
+# Engagements por enriquecimiento (los más recientes) y tipos a consultar
+HUBSPOT_ENGAGEMENTS_MAX = int(os.getenv('HUBSPOT_ENGAGEMENTS_MAX', 50))
+HUBSPOT_ENGAGEMENT_TYPES = [
+    engagement_type.strip().upper()
+    for engagement_type in os.getenv('HUBSPOT_ENGAGEMENT_TYPES', 'MEETING,CALL,EMAIL,TASK,NOTE').split(',')
+    if engagement_type.strip()
+]
+
+# Máximo de objetos por petición en los endpoints batch de la API CRM v3
+HUBSPOT_BATCH_SIZE = 100
+
+CONTACT_PROPERTIES = [
+    "id", "email", "firstname", "lastname", "company", "jobtitle",
+    "phone", "mobilephone", "website", "address", "city", "state", 
+    "country", "zip", "industry", "num_employees", "annualrevenue",
+    "createdate", "lastmodifieddate", "hs_lead_status", "lifecyclestage",
+    "hs_analytics_source", "hs_analytics_source_data_1", "hs_analytics_source_data_2",
+    "hs_analytics_last_visit_timestamp", "hs_analytics_num_visits",
+    "hs_analytics_num_page_views", "hs_analytics_num_event_completions",
+    "hs_email_optout", "hs_email_open", "hs_email_click",
+    "hs_latest_source", "hs_latest_source_data_1", "hs_latest_source_data_2",
+    "hubspot_owner_id", "hs_lead_score", "hs_predictivecontactscore",
+    "description", "notes_last_contacted", "notes_last_activity_date",
+    "notes_next_activity_date", "num_contacted_notes", "num_notes",
+    "recent_deal_amount", "recent_deal_close_date", "recent_conversion_event_name",
+    "recent_conversion_date", "recent_source", "recent_source_data_1"
+]
+
+COMPANY_PROPERTIES = [
+    "id", "name", "domain", "industry", "type", "description",
+    "phone", "address", "city", "state", "country", "zip",
+    "num_employees", "annualrevenue", "createdate", "lastmodifieddate",
+    "hubspot_owner_id", "hs_lead_status", "lifecyclestage",
+    "website", "linkedin_company_page", "twitterhandle", "facebook_company_page",
+    "hs_analytics_source", "hs_analytics_source_data_1", "hs_analytics_source_data_2",
+    "hs_analytics_num_visits", "hs_analytics_num_page_views",
+    "hs_analytics_last_visit_timestamp", "hs_analytics_first_visit_timestamp",
+    "recent_deal_amount", "recent_deal_close_date", "total_revenue"
+]
+
+# Secciones de process_contact_data / process_company_data: {sección: {campo procesado: propiedad}}
+# (el id y el nombre del contacto, compuesto de firstname y lastname, se agregan aparte)
+CONTACT_SECTIONS = {
+    "informacion_basica": {
+        "email": "email", "empresa": "company", "cargo": "jobtitle", "telefono": "phone",
+        "telefono_movil": "mobilephone", "sitio_web": "website", "industria": "industry",
+        "descripcion": "description"
+    },
+    "direccion": {
+        "direccion": "address", "ciudad": "city", "estado": "state", "pais": "country", "codigo_postal": "zip"
+    },
+    "informacion_empresa": {
+        "num_empleados": "num_employees", "ingresos_anuales": "annualrevenue"
+    },
+    "actividad": {
+        "fecha_creacion": "createdate", "ultima_modificacion": "lastmodifieddate",
+        "ultima_actividad": "notes_last_activity_date", "proxima_actividad": "notes_next_activity_date",
+        "ultimo_contacto": "notes_last_contacted"
+    },
+    "analiticas": {
+        "fuente": "hs_analytics_source", "fuente_datos": "hs_analytics_source_data_1",
+        "ultima_visita": "hs_analytics_last_visit_timestamp", "num_visitas": "hs_analytics_num_visits",
+        "num_paginas_vistas": "hs_analytics_num_page_views",
+        "num_eventos_completados": "hs_analytics_num_event_completions"
+    },
+    "email_marketing": {
+        "opt_out": "hs_email_optout", "emails_abiertos": "hs_email_open", "emails_clicados": "hs_email_click"
+    },
+    "estado": {
+        "estado_lead": "hs_lead_status", "etapa_ciclo_vida": "lifecyclestage", "puntaje_lead": "hs_lead_score",
+        "puntaje_predictivo": "hs_predictivecontactscore", "propietario": "hubspot_owner_id"
+    },
+    "notas": {
+        "num_notas": "num_notes", "num_notas_contactadas": "num_contacted_notes"
+    }
+}
+
+COMPANY_SECTIONS = {
+    "informacion_basica": {
+        "nombre": "name", "dominio": "domain", "industria": "industry", "tipo": "type",
+        "descripcion": "description", "sitio_web": "website", "telefono": "phone"
+    },
+    "direccion": {
+        "direccion": "address", "ciudad": "city", "estado": "state", "pais": "country", "codigo_postal": "zip"
+    },
+    "informacion_financiera": {
+        "num_empleados": "num_employees", "ingresos_anuales": "annualrevenue", "ingresos_totales": "total_revenue",
+        "monto_negocio_reciente": "recent_deal_amount", "fecha_cierre_negocio_reciente": "recent_deal_close_date"
+    },
+    "redes_sociales": {
+        "linkedin": "linkedin_company_page", "twitter": "twitterhandle", "facebook": "facebook_company_page"
+    },
+    "actividad": {
+        "fecha_creacion": "createdate", "ultima_modificacion": "lastmodifieddate",
+        "ultima_visita": "hs_analytics_last_visit_timestamp", "primera_visita": "hs_analytics_first_visit_timestamp",
+        "num_visitas": "hs_analytics_num_visits", "num_paginas_vistas": "hs_analytics_num_page_views"
+    },
+    "estado": {
+        "estado_lead": "hs_lead_status", "etapa_ciclo_vida": "lifecyclestage", "propietario": "hubspot_owner_id",
+        "fuente": "hs_analytics_source", "fuente_datos": "hs_analytics_source_data_1"
+    }
+}
+
+# Perfiles de lectura: cada llamador elige cuántas propiedades pide y qué secciones se construyen
+#   minimal: identificación y estado del contacto (ej: decidir si ya existe y a quién pertenece)
+#   agent_context: lo que consumen el resumen ejecutivo y el contexto del agente
+#   full: todas las propiedades y secciones (endpoints que devuelven el detalle completo)
+READ_PROFILES = {
+    "minimal": {
+        "contact": ["informacion_basica", "estado"],
+        "company": ["informacion_basica"]
+    },
+    "agent_context": {
+        "contact": ["informacion_basica", "actividad", "analiticas", "estado"],
+        "company": ["informacion_basica", "informacion_financiera"]
+    },
+    "full": {
+        "contact": list(CONTACT_SECTIONS),
+        "company": list(COMPANY_SECTIONS)
+    }
+}
+
+def read_profile(profile, object_type):
+    """
+    Resuelve las secciones y propiedades de un perfil de lectura para contactos o empresas
+    
+    Args:
+        profile (str): Nombre del perfil (minimal, agent_context, full)
+        object_type (str): contact o company
+    
+    Returns:
+        tuple: (secciones a construir, propiedades a pedir a HubSpot)
+    """
+    
+    if profile not in READ_PROFILES:
+        raise ValueError(f"Perfil de lectura desconocido: {profile} (disponibles: {', '.join(READ_PROFILES)})")
+    
+    sections = READ_PROFILES[profile][object_type]
+    
+    if profile == "full":
+        return sections, CONTACT_PROPERTIES if object_type == "contact" else COMPANY_PROPERTIES
+    
+    section_map = CONTACT_SECTIONS if object_type == "contact" else COMPANY_SECTIONS
+    properties = ["firstname", "lastname"] if object_type == "contact" else []
+    for section in sections:
+        properties.extend(section_map[section].values())
+    
+    return sections, list(dict.fromkeys(properties))
+
+# Tipo de engagement -> (objeto CRM v3, {propiedad: campo procesado}) con las propiedades leídas por defecto
+# Los cuerpos HTML de los emails (hs_email_html) no se piden: ningún consumidor los usa
+ENGAGEMENT_OBJECTS = {
+    "MEETING": ("meetings", {
+        "hs_meeting_title": "titulo",
+        "hs_meeting_body": "descripcion",
+        "hs_meeting_start_time": "fecha_inicio",
+        "hs_meeting_end_time": "fecha_fin",
+        "hs_meeting_location": "ubicacion",
+        "hs_meeting_outcome": "estado"
+    }),
+    "CALL": ("calls", {
+        "hs_call_title": "titulo",
+        "hs_call_duration": "duracion",
+        "hs_call_status": "estado",
+        "hs_call_direction": "direccion",
+        "hs_call_disposition": "disposition",
+        "hs_call_recording_url": "grabacion_url"
+    }),
+    "EMAIL": ("emails", {
+        "hs_email_subject": "asunto",
+        "hs_email_from_email": "de",
+        "hs_email_to_email": "para",
+        "hs_email_status": "estado",
+        "hs_email_direction": "direccion",
+        "hs_email_text": "texto"
+    }),
+    "TASK": ("tasks", {
+        "hs_task_subject": "titulo",
+        "hs_task_body": "descripcion",
+        "hs_task_status": "estado",
+        "hs_task_priority": "prioridad",
+        "hs_task_type": "tipo_tarea"
+    }),
+    "NOTE": ("notes", {
+        "hs_note_body": "contenido"
+    })
+}
+
+DEAL_PROPERTIES = [
+    "id", "dealname", "dealstage", "amount", "closedate", "createdate",
+    "lastmodifieddate", "hs_lead_status", "pipeline", "hs_deal_stage_probability",
+    "description", "hubspot_owner_id", "hs_analytics_source",
+    "hs_analytics_source_data_1", "hs_analytics_source_data_2"
+]
+
+# Enriquecimientos concurrentes del mismo email comparten una sola cadena de lecturas
+hubspot_contact_flight = SingleFlight(name="hubspot_contact_info")
+
+# Circuito de las lecturas de HubSpot (las escrituras no pasan por él)
+hubspot_read_breaker = breaker_from_env('HUBSPOT_READ_', default_slow_call=10)
+
+# Caché de lectura de contactos, empresas y negocios por ID (y de email -> ID de contacto), con TTL corto
+# En SQLite para compartirla entre los workers del host: una escritura en un worker la invalida en todos
+# HUBSPOT_CACHE_TTL=0 la desactiva
+HUBSPOT_CACHE_TTL = float(os.getenv('HUBSPOT_CACHE_TTL', 120))
+HUBSPOT_CACHE_MAX_BYTES = int(os.getenv('HUBSPOT_CACHE_MAX_BYTES', 20 * 1024 * 1024))
+
+hubspot_cache = SQLiteCache(
+    "hubspot_cache.db",
+    max_bytes=HUBSPOT_CACHE_MAX_BYTES,
+    default_ttl=HUBSPOT_CACHE_TTL,
+    name="hubspot_objects"
+) if HUBSPOT_CACHE_TTL > 0 else None
+
+# Réplica local de contactos y empresas (api/hubspot_sync.py la mantiene al día por lastmodifieddate)
+# get_contact_info la usa si el último sync exitoso tiene menos de HUBSPOT_MIRROR_MAX_LAG segundos
+HUBSPOT_MIRROR_ENABLED = os.getenv('HUBSPOT_MIRROR_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+HUBSPOT_MIRROR_MAX_LAG = float(os.getenv('HUBSPOT_MIRROR_MAX_LAG', 300))
+
+def _wait_result(future, deadline, fallback):
+    """
+    Espera el resultado de una rama hasta el deadline del enriquecimiento
+    
+    Args:
+        future (Future): Rama en ejecución
+        deadline (float): Instante límite (time.monotonic())
+        fallback (dict): Resultado a usar si la rama no termina a tiempo
+    
+    Returns:
+        dict: Resultado de la rama o fallback
+    """
+    
+    try:
+        return future.result(timeout=max(0.0, deadline - time.monotonic()))
+    except FutureTimeoutError:
+        logger.warning(f"⏱️ Rama de HubSpot excedió el deadline de {HUBSPOT_ENRICHMENT_TIMEOUT}s")
+        return fallback
+
+def get_contact_info(email, profile="full"):
     """
     Obtiene información detallada de un contacto en HubSpot por email
     
     Args:
         email (str): Email del contacto
+        profile (str): Perfil de lectura del contacto y la empresa (ver READ_PROFILES)
     
     Returns:
         dict: Información del contacto o error
@@ -39,49 +313,351 @@ def get_contact_info(email):
             "error": "API Key de HubSpot no configurada"
         }
     
+    read_profile(profile, "contact")
+    
+    if HUBSPOT_MIRROR_ENABLED:
+        mirrored = _contact_info_from_mirror(email, profile)
+        if mirrored is not None:
+            return mirrored
+    
+    return hubspot_contact_flight.do(f"{email.strip().lower()}|{profile}", _fetch_contact_info_guarded, email, profile)
+
+def _fetch_contact_info_guarded(email, profile):
+    """Ejecuta la cadena de lecturas a través del circuito; con el circuito abierto falla de inmediato"""
+    
+    return hubspot_read_breaker.call(
+        _fetch_contact_info, email, profile,
+        is_failure=lambda result: not result.get('success') and result.get('code') != 'NOT_FOUND',
+        fallback=lambda: {
+            "success": False,
+            "error": "HubSpot no disponible temporalmente",
+            "code": "CIRCUIT_OPEN"
+        }
+    )
+
+def _fetch_contact_info(email, profile):
+    """
+    Ejecuta la cadena de lecturas de get_contact_info para un email
+    
+    Tres viajes en serie: contacto por email (propiedades + IDs de empresa y engagements asociados),
+    empresa (propiedades + IDs de negocios) y negocios en batch; los engagements (un batch read por
+    tipo con IDs) van en paralelo
+    """
+    
     try:
-        # Buscar contacto por email
-        contact_data = search_contact_by_email(email)
+        # Contacto con las propiedades del perfil y los IDs de su empresa y engagements en una sola lectura
+        contact_result = get_contact_by_email(email, profile=profile, engagement_types=HUBSPOT_ENGAGEMENT_TYPES)
         
-        if not contact_data.get('success'):
-            return contact_data
+        if not contact_result.get('success'):
+            return contact_result
         
-        contact_id = contact_data.get('contact_id')
+        contact_id = contact_result.get('contact_id')
+        deadline = time.monotonic() + HUBSPOT_ENRICHMENT_TIMEOUT
         
-        # Obtener información detallada del contacto
-        detailed_info = get_contact_details(contact_id)
+        # Los engagements solo dependen de sus IDs: se leen mientras se lee la empresa
+        engagements_future = _fanout_executor.submit(
+            get_contact_engagements, contact_id, association_ids=contact_result.get('engagement_ids')
+        )
         
-        if detailed_info.get('success'):
-            # Obtener engagements del contacto
-            engagements = get_contact_engagements(contact_id)
-            
-            # Obtener información de la empresa asociada
-            company_info = get_contact_company_info(contact_id)
-            
-            # Combinar toda la información
-            combined_info = {
-                "contact_info": detailed_info.get('data'),
-                "engagements": engagements.get('data', []),
-                "company_info": company_info.get('data', {}),
-                "contact_id": contact_id
+        company_ids = contact_result.get('company_ids', [])
+        if company_ids:
+            company_info = get_company_info(company_ids[0], profile=profile)
+        else:
+            logger.info(f"No se encontró empresa asociada al contacto: {contact_id}")
+            company_info = {"success": True, "data": {}}
+        
+        engagements = _wait_result(engagements_future, deadline, {"success": False, "data": []})
+        
+        # Combinar toda la información
+        combined_info = {
+            "contact_info": contact_result.get('data'),
+            "engagements": engagements.get('data', []),
+            "company_info": company_info.get('data', {}),
+            "contact_id": contact_id
+        }
+        
+        logger.info(f"✅ Información completa del contacto obtenida: {email}")
+        return {
+            "success": True,
+            "data": combined_info
+        }
+    
+    except Exception as e:
+        error_msg = f"Error obteniendo información del contacto: {str(e)}"
+        logger.error(error_msg)
+        return {
+            "success": False,
+            "error": error_msg
+        }
+
+def _contact_info_from_mirror(email, profile):
+    """
+    Construye el resultado de get_contact_info desde la réplica local
+    
+    Contacto y empresa salen de la réplica; negocios y engagements se siguen leyendo de HubSpot
+    (en paralelo). Retorna None para leer todo de HubSpot si el sync de contactos está atrasado
+    o el contacto no está en la réplica o quedó desactualizado por una escritura propia
+    
+    Args:
+        email (str): Email del contacto
+        profile (str): Perfil de lectura del contacto y la empresa
+    
+    Returns:
+        dict: Mismo formato que _fetch_contact_info, o None
+    """
+    
+    try:
+        lag = hubspot_mirror.sync_lag('contacts')
+        if lag is None or lag > HUBSPOT_MIRROR_MAX_LAG:
+            metrics.inc('hubspot_mirror_reads_total', {"result": "lagging"})
+            return None
+        
+        entry = hubspot_mirror.get_contact_by_email(email)
+        if entry is None or entry['stale']:
+            metrics.inc('hubspot_mirror_reads_total', {"result": "stale" if entry else "miss"})
+            return None
+    
+    except Exception as e:
+        logger.warning(f"⚠️ Réplica de HubSpot no disponible, se lee de la API: {str(e)}")
+        return None
+    
+    metrics.inc('hubspot_mirror_reads_total', {"result": "hit"})
+    
+    contact_sections, _ = read_profile(profile, "contact")
+    company_sections, _ = read_profile(profile, "company")
+    contact_data = entry['data']
+    contact_id = contact_data.get('id')
+    company_id = contact_data.get('properties', {}).get('associatedcompanyid')
+    deadline = time.monotonic() + HUBSPOT_ENRICHMENT_TIMEOUT
+    
+    engagements_future = _fanout_executor.submit(get_contact_engagements, contact_id)
+    
+    if company_id:
+        try:
+            company_entry = hubspot_mirror.get_object('companies', company_id)
+        except Exception as e:
+            logger.warning(f"⚠️ Empresa {company_id} no disponible en la réplica, se lee de la API: {str(e)}")
+            company_entry = None
+        
+        if company_entry is not None and not company_entry['stale']:
+            deals_future = _fanout_executor.submit(get_company_deals, company_id)
+            company_info = {
+                "company_details": process_company_data(company_entry['data'], company_sections),
+                "deals": _wait_result(deals_future, deadline, {"success": False, "data": []}).get('data', [])
             }
+        else:
+            company_info = get_company_info(company_id, profile=profile).get('data', {})
+    else:
+        company_info = {}
+    
+    engagements = _wait_result(engagements_future, deadline, {"success": False, "data": []})
+    
+    logger.info(f"⚡ Contacto obtenido de la réplica local: {email}")
+    return {
+        "success": True,
+        "data": {
+            "contact_info": process_contact_data(contact_data, contact_sections),
+            "engagements": engagements.get('data', []),
+            "company_info": company_info,
+            "contact_id": contact_id
+        }
+    }
+
+def _association_ids(object_data, to_object_type):
+    """
+    Extrae los IDs asociados incluidos en una lectura con associations=<tipo>
+    
+    La API v3 repite un objeto por cada tipo de asociación (ej: primaria y sin etiqueta);
+    los IDs se deduplican conservando el orden, con las asociaciones primarias primero
+    
+    Args:
+        object_data (dict): Objeto leído de la API CRM v3
+        to_object_type (str): Tipo asociado (companies, deals)
+    
+    Returns:
+        tuple: (lista de IDs, True si la API indicó más páginas de asociaciones)
+    """
+    
+    association = (object_data.get('associations') or {}).get(to_object_type) or {}
+    results = association.get('results', [])
+    primary = [item['id'] for item in results if not item.get('type', '').endswith('unlabeled')]
+    others = [item['id'] for item in results if item.get('type', '').endswith('unlabeled')]
+    
+    has_more = bool((association.get('paging') or {}).get('next'))
+    return list(dict.fromkeys(str(object_id) for object_id in primary + others)), has_more
+
+def _cached_object(object_type, object_id, properties, associations=()):
+    """
+    Busca un objeto crudo en la caché de lectura
+    
+    Solo hay acierto si el objeto se leyó con al menos las propiedades y asociaciones pedidas
+    
+    Args:
+        object_type (str): contacts, companies o deals
+        object_id (str): ID del objeto en HubSpot
+        properties (list): Propiedades que necesita el llamador
+        associations (tuple): Tipos de asociación que necesita el llamador
+    
+    Returns:
+        dict: Objeto como lo retornó la API, o None
+    """
+    
+    if hubspot_cache is None or not object_id:
+        return None
+    
+    entry = hubspot_cache.get(f"{object_type}:{object_id}")
+    if not entry or 'object' not in entry:
+        return None
+    
+    if not set(properties) <= set(entry['properties']) or not set(associations) <= set(entry['associations']):
+        return None
+    
+    return entry['object']
+
+def _cache_put(key, value, read_started):
+    """
+    Guarda una lectura en la caché, salvo que una escritura propia haya invalidado la clave
+    después de iniciada la lectura (el dato leído podría ser anterior a esa escritura)
+    """
+    
+    if hubspot_cache is None:
+        return
+    
+    current = hubspot_cache.peek(key)
+    if current and current.get('invalidated_at', 0) >= read_started:
+        logger.debug(f"Caché de HubSpot: {key} se escribió durante la lectura, no se guarda")
+        return
+    
+    hubspot_cache.set(key, value)
+
+def _cache_object(object_type, object_data, properties, read_started, associations=()):
+    """Guarda un objeto leído de HubSpot junto con las propiedades y asociaciones con que se leyó"""
+    
+    _cache_put(f"{object_type}:{object_data.get('id')}", {
+        "object": object_data,
+        "properties": list(properties),
+        "associations": list(associations)
+    }, read_started)
+
+def invalidate_contact(contact_id=None, email=None):
+    """
+    Invalida un contacto en la caché de lectura (y en la réplica local) tras una escritura propia
+    
+    La entrada se reemplaza por una marca con la hora de la escritura para que las lecturas
+    que ya estaban en curso no vuelvan a guardar datos anteriores a ella
+    
+    Args:
+        contact_id (str): ID del contacto en HubSpot
+        email (str): Email del contacto
+    """
+    
+    if HUBSPOT_MIRROR_ENABLED:
+        try:
+            hubspot_mirror.mark_stale('contacts', contact_id, email)
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo marcar el contacto como desactualizado en la réplica: {str(e)}")
+    
+    if hubspot_cache is None:
+        return
+    
+    marker = {"invalidated_at": time.time()}
+    if contact_id:
+        hubspot_cache.set(f"contacts:{contact_id}", marker)
+    if email:
+        hubspot_cache.set(f"contact_email:{email.strip().lower()}", marker)
+
+def get_contact_by_email(email, profile="full", engagement_types=None):
+    """
+    Lee un contacto por email con sus propiedades y las empresas asociadas en una sola petición
+    
+    Usa la lectura por idProperty=email en lugar del endpoint de búsqueda, que además
+    tiene un límite de tasa propio (5 búsquedas/s por cuenta)
+    
+    Args:
+        email (str): Email del contacto
+        profile (str): Perfil de lectura (propiedades pedidas y secciones procesadas)
+        engagement_types (list): Tipos de engagement cuyos IDs asociados se leen en la misma petición;
+            se guardan en caché con el contacto (create_conversation_engagement invalida la entrada)
+    
+    Returns:
+        dict: contact_id, data (procesada), company_ids, engagement_ids (si se pidieron tipos) y
+            contact_data crudo, o error (code NOT_FOUND)
+    """
+    
+    normalized_email = email.strip().lower()
+    sections, properties = read_profile(profile, "contact")
+    associations = tuple(["companies"] + _engagement_object_types(engagement_types or []))
+    read_started = time.time()
+    
+    # Una lectura con las asociaciones de engagements sirve también a las que solo piden empresas
+    email_entry = hubspot_cache.get(f"contact_email:{normalized_email}") if hubspot_cache is not None else None
+    contact_data = _cached_object('contacts', (email_entry or {}).get('contact_id'), properties, associations)
+    
+    if contact_data is not None:
+        logger.info(f"⚡ Contacto obtenido de caché: {normalized_email}")
+        return _contact_by_email_result(contact_data, sections, engagement_types)
+    
+    try:
+        url = f"/crm/v3/objects/contacts/{quote(normalized_email, safe='')}"
+        
+        params = {
+            "idProperty": "email",
+            "properties": properties,
+            "associations": ",".join(associations)
+        }
+        
+        logger.info(f"🔍 Leyendo contacto por email: {normalized_email}")
+        
+        response = hubspot_client.get(url, params=params)
+        
+        if response.status_code == 200:
+            contact_data = response.json()
+            _cache_object('contacts', contact_data, properties, read_started, associations=associations)
+            _cache_put(f"contact_email:{normalized_email}", {"contact_id": contact_data.get('id')}, read_started)
             
-            logger.info(f"✅ Información completa del contacto obtenida: {email}")
+            logger.info(f"✅ Contacto encontrado: {contact_data.get('id')}")
+            return _contact_by_email_result(contact_data, sections, engagement_types)
+        elif response.status_code == 404:
+            logger.warning(f"No se encontró contacto con email: {normalized_email}")
             return {
-                "success": True,
-                "data": combined_info
+                "success": False,
+                "error": "Contacto no encontrado",
+                "code": "NOT_FOUND"
             }
         else:
-            return detailed_info
+            error_msg = f"Error leyendo contacto: {response.status_code} - {response.text}"
+            logger.error(error_msg)
+            return {
+                "success": False,
+                "error": error_msg
+            }
     
     except Exception as e:
-        error_msg = f"Error obteniendo información del contacto: {str(e)}"
+        error_msg = f"Error leyendo contacto por email: {str(e)}"
         logger.error(error_msg)
         return {
             "success": False,
             "error": error_msg
         }
 
+def _contact_by_email_result(contact_data, sections, engagement_types=None):
+    """Resultado de get_contact_by_email a partir del contacto crudo (de la API o de la caché)"""
+    
+    company_ids, _ = _association_ids(contact_data, 'companies')
+    
+    result = {
+        "success": True,
+        "contact_id": contact_data.get('id'),
+        "data": process_contact_data(contact_data, sections),
+        "company_ids": company_ids,
+        "contact_data": contact_data
+    }
+    
+    if engagement_types:
+        result["engagement_ids"] = _inline_engagement_ids(contact_data, engagement_types)
+    
+    return result
+
 def search_contact_by_email(email):
     """
     Busca un contacto en HubSpot por email
@@ -94,12 +670,7 @@ def search_contact_by_email(email):
     """
     
     try:
-        url = f"{HUBSPOT_BASE_URL}/crm/v3/objects/contacts/search"
-        
-        headers = {
-            "Authorization": f"Bearer {HUBSPOT_API_KEY}",
-            "Content-Type": "application/json"
-        }
+        url = "/crm/v3/objects/contacts/search"
         
         payload = {
             "filterGroups": [{
@@ -109,17 +680,13 @@ def search_contact_by_email(email):
                     "value": email
                 }]
             }],
-            "properties": [
-                "id", "email", "firstname", "lastname", "company", "jobtitle",
-                "phone", "website", "createdate", "lastmodifieddate", 
-                "hs_lead_status", "lifecyclestage", "hs_analytics_source",
-                "hs_analytics_source_data_1", "hs_analytics_source_data_2"
-            ]
+            # Las mismas propiedades que get_contact_details: el resultado ya sirve para process_contact_data
+            "properties": CONTACT_PROPERTIES
         }
         
         logger.info(f"🔍 Buscando contacto por email: {email}")
         
-        response = requests.post(url, headers=headers, json=payload)
+        response = hubspot_client.post(url, json=payload, idempotent=True)
         
         if response.status_code == 200:
             data = response.json()
@@ -156,54 +723,46 @@ def search_contact_by_email(email):
             "error": error_msg
         }
 
-def get_contact_details(contact_id):
+def get_contact_details(contact_id, profile="full"):
     """
     Obtiene información detallada de un contacto por ID
     
     Args:
         contact_id (str): ID del contacto en HubSpot
+        profile (str): Perfil de lectura (propiedades pedidas y secciones procesadas)
     
     Returns:
         dict: Información detallada del contacto
     """
     
-    try:
-        url = f"{HUBSPOT_BASE_URL}/crm/v3/objects/contacts/{contact_id}"
-        
-        headers = {
-            "Authorization": f"Bearer {HUBSPOT_API_KEY}",
-            "Content-Type": "application/json"
+    sections, properties = read_profile(profile, "contact")
+    read_started = time.time()
+    
+    cached_contact = _cached_object('contacts', contact_id, properties)
+    if cached_contact is not None:
+        logger.info(f"⚡ Detalles del contacto obtenidos de caché: {contact_id}")
+        return {
+            "success": True,
+            "data": process_contact_data(cached_contact, sections)
         }
+    
+    try:
+        url = f"/crm/v3/objects/contacts/{contact_id}"
         
-        # Propiedades adicionales para obtener más información
         params = {
-            "properties": [
-                "id", "email", "firstname", "lastname", "company", "jobtitle",
-                "phone", "mobilephone", "website", "address", "city", "state", 
-                "country", "zip", "industry", "num_employees", "annualrevenue",
-                "createdate", "lastmodifieddate", "hs_lead_status", "lifecyclestage",
-                "hs_analytics_source", "hs_analytics_source_data_1", "hs_analytics_source_data_2",
-                "hs_analytics_last_visit_timestamp", "hs_analytics_num_visits",
-                "hs_analytics_num_page_views", "hs_analytics_num_event_completions",
-                "hs_email_optout", "hs_email_open", "hs_email_click",
-                "hs_latest_source", "hs_latest_source_data_1", "hs_latest_source_data_2",
-                "hubspot_owner_id", "hs_lead_score", "hs_predictivecontactscore",
-                "description", "notes_last_contacted", "notes_last_activity_date",
-                "notes_next_activity_date", "num_contacted_notes", "num_notes",
-                "recent_deal_amount", "recent_deal_close_date", "recent_conversion_event_name",
-                "recent_conversion_date", "recent_source", "recent_source_data_1"
-            ]
+            "properties": properties
         }
         
         logger.info(f"📋 Obteniendo detalles del contacto: {contact_id}")
         
-        response = requests.get(url, headers=headers, params=params)
+        response = hubspot_client.get(url, params=params)
         
         if response.status_code == 200:
             contact_data = response.json()
+            _cache_object('contacts', contact_data, properties, read_started)
             
             # Procesar y estructurar los datos
-            processed_data = process_contact_data(contact_data)
+            processed_data = process_contact_data(contact_data, sections)
             
             logger.info(f"✅ Detalles del contacto obtenidos: {contact_id}")
             return {
@@ -226,55 +785,251 @@ def get_contact_details(contact_id):
             "error": error_msg
         }
 
-def get_contact_engagements(contact_id):
+class EngagementReadError(Exception):
+    """Error de HubSpot al leer asociaciones u objetos de engagements"""
+
+def _parse_timestamp(value):
+    """Convierte hs_timestamp (ISO 8601 o milisegundos epoch) a datetime UTC, o None"""
+    
+    if not value:
+        return None
+    try:
+        if str(value).isdigit():
+            return datetime.fromtimestamp(int(value) / 1000, tz=timezone.utc)
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+
+def _list_association_ids(contact_id, object_type):
+    """
+    Lista todos los IDs de objetos de un tipo asociados al contacto (API v4, paginada)
+    
+    Solo viajan IDs (hasta 500 por página); las propiedades se leen después en batch y a demanda
+    """
+    
+    url = f"/crm/v4/objects/contacts/{contact_id}/associations/{object_type}"
+    ids = []
+    after = None
+    
+    while True:
+        params = {"limit": 500}
+        if after:
+            params["after"] = after
+        
+        response = hubspot_client.get(url, params=params)
+        
+        if response.status_code != 200:
+            raise EngagementReadError(f"Error listando {object_type} del contacto: {response.status_code} - {response.text}")
+        
+        data = response.json()
+        ids.extend(str(item.get('toObjectId') or item.get('id')) for item in data.get('results', []))
+        
+        after = ((data.get('paging') or {}).get('next') or {}).get('after')
+        if not after:
+            return list(dict.fromkeys(ids))
+
+def _engagement_object_types(engagement_types):
+    """Tipos de objeto CRM (meetings, calls...) de los tipos de engagement conocidos"""
+    
+    return [ENGAGEMENT_OBJECTS[engagement_type][0] for engagement_type in engagement_types
+            if engagement_type in ENGAGEMENT_OBJECTS]
+
+def _inline_engagement_ids(contact_data, engagement_types):
+    """
+    IDs de engagements por tipo incluidos en una lectura del contacto con associations=<tipos>
+    
+    Si la API indica más páginas de un tipo, la lista completa se lee de la API v4
+    
+    Returns:
+        dict: {tipo de engagement: [IDs]}
     """
-    Obtiene los engagements de un contacto (reuniones, llamadas, emails, etc.)
+    
+    engagement_ids = {}
+    for engagement_type in engagement_types:
+        if engagement_type not in ENGAGEMENT_OBJECTS:
+            continue
+        object_type = ENGAGEMENT_OBJECTS[engagement_type][0]
+        object_ids, has_more = _association_ids(contact_data, object_type)
+        engagement_ids[engagement_type] = (
+            _list_association_ids(contact_data.get('id'), object_type) if has_more else object_ids
+        )
+    return engagement_ids
+
+def get_engagement_ids(contact_id, engagement_types):
+    """
+    Lee en una sola petición los IDs de los engagements asociados al contacto, por tipo
     
     Args:
         contact_id (str): ID del contacto en HubSpot
+        engagement_types (list): Tipos de engagement (MEETING, CALL, EMAIL, TASK, NOTE)
     
     Returns:
-        dict: Lista de engagements del contacto
+        dict: {tipo de engagement: [IDs]}
+    
+    Raises:
+        EngagementReadError: HubSpot respondió con error
     """
     
-    try:
-        # Obtener engagements del contacto
-        url = f"{HUBSPOT_BASE_URL}/engagements/v1/engagements/associated/contact/{contact_id}/paged"
-        
-        headers = {
-            "Authorization": f"Bearer {HUBSPOT_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        
-        params = {
-            "limit": 50,  # Límite de engagements a obtener
-            "offset": 0
-        }
+    object_types = _engagement_object_types(engagement_types)
+    if not object_types:
+        return {}
+    
+    response = hubspot_client.get(f"/crm/v3/objects/contacts/{contact_id}", params={
+        "properties": "hs_object_id",
+        "associations": ",".join(object_types)
+    })
+    
+    if response.status_code != 200:
+        raise EngagementReadError(f"Error leyendo engagements asociados al contacto: {response.status_code} - {response.text}")
+    
+    return _inline_engagement_ids(response.json(), engagement_types)
+
+def _read_objects_batch(object_type, object_ids, properties):
+    """Lee hasta HUBSPOT_BATCH_SIZE objetos de un tipo con las propiedades indicadas"""
+    
+    response = hubspot_client.post(f"/crm/v3/objects/{object_type}/batch/read", json={
+        "properties": properties,
+        "inputs": [{"id": object_id} for object_id in object_ids]
+    }, idempotent=True)
+    
+    # 207 Multi-Status: algunos IDs no existen, el resto viene en 'results'
+    if response.status_code not in [200, 207]:
+        raise EngagementReadError(f"Error leyendo {object_type}: {response.status_code} - {response.text}")
+    
+    return response.json().get('results', [])
+
+def _engagement_stream(object_ids, engagement_type, since, chunk_size, fields):
+    """
+    Genera los engagements de un tipo, del más reciente al más antiguo, leyendo un lote a la vez
+    
+    Los IDs se recorren de mayor a menor (los objetos más nuevos tienen IDs mayores) y cada lote
+    se ordena por hs_timestamp. Con since, la lectura termina en el primer lote que ya incluye
+    engagements anteriores a esa fecha
+    """
+    
+    object_type, field_names = ENGAGEMENT_OBJECTS[engagement_type]
+    properties = ["hs_timestamp"] + list(fields or field_names)
+    object_ids = sorted(object_ids, key=int, reverse=True)
+    
+    for start in range(0, len(object_ids), chunk_size):
+        engagements = [
+            process_engagement_object(engagement_type, object_data)
+            for object_data in _read_objects_batch(object_type, object_ids[start:start + chunk_size], properties)
+        ]
+        engagements.sort(key=_engagement_sort_key, reverse=True)
         
-        logger.info(f"📞 Obteniendo engagements del contacto: {contact_id}")
+        recent = [
+            engagement for engagement in engagements
+            if since is None or (_parse_timestamp(engagement['timestamp']) or since) >= since
+        ]
+        yield from recent
         
-        response = requests.get(url, headers=headers, params=params)
+        if len(recent) < len(engagements):
+            return
+
+def _engagement_sort_key(engagement):
+    return _parse_timestamp(engagement.get('timestamp')) or datetime.min.replace(tzinfo=timezone.utc)
+
+def _start_in_background(stream):
+    """
+    Avanza un generador hasta su primer elemento en _engagement_executor
+    
+    Así la primera página de cada tipo se lee en paralelo; el resto se lee a demanda
+    """
+    
+    first = _engagement_executor.submit(next, stream, None)
+    
+    def resumed():
+        engagement = first.result()
+        if engagement is None:
+            return
+        yield engagement
+        yield from stream
+    
+    return resumed()
+
+def iter_contact_engagements(contact_id, types=None, since=None, max_count=None, fields=None,
+                             chunk_size=HUBSPOT_BATCH_SIZE, association_ids=None):
+    """
+    Recorre los engagements de un contacto de forma perezosa, del más reciente al más antiguo
+    
+    Los IDs de todos los tipos llegan en una lectura del contacto (o de association_ids) y las
+    propiedades con batch read v3 por tipo de objeto; solo se leen los lotes necesarios para cubrir
+    max_count y since, y los tipos sin engagements no generan peticiones
+    
+    Args:
+        contact_id (str): ID del contacto en HubSpot
+        types (list): Tipos (MEETING, CALL, EMAIL, TASK, NOTE); por defecto HUBSPOT_ENGAGEMENT_TYPES
+        since (datetime): Solo engagements con hs_timestamp igual o posterior (sin zona horaria: UTC)
+        max_count (int): Máximo de engagements a generar (None: todos)
+        fields (dict): {tipo: [propiedades]} para leer otras propiedades que las de ENGAGEMENT_OBJECTS
+        chunk_size (int): Objetos por batch read (máximo HUBSPOT_BATCH_SIZE)
+        association_ids (dict): {tipo: [IDs]} ya leídos con el contacto (ver get_contact_by_email)
+    
+    Yields:
+        dict: Engagement procesado (ver process_engagement_object)
+    
+    Raises:
+        EngagementReadError: HubSpot respondió con error
+    """
+    
+    if max_count is not None and max_count <= 0:
+        return
+    
+    types = [engagement_type for engagement_type in (types or HUBSPOT_ENGAGEMENT_TYPES)
+             if engagement_type in ENGAGEMENT_OBJECTS]
+    if since is not None and since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    fields = fields or {}
+    
+    # Con un presupuesto pequeño no tiene sentido leer lotes completos
+    chunk_size = min(chunk_size, HUBSPOT_BATCH_SIZE, max_count or HUBSPOT_BATCH_SIZE)
+    
+    if association_ids is None:
+        association_ids = get_engagement_ids(contact_id, types)
+    
+    streams = [
+        _start_in_background(_engagement_stream(association_ids[engagement_type], engagement_type, since,
+                                                chunk_size, fields.get(engagement_type)))
+        for engagement_type in types if association_ids.get(engagement_type)
+    ]
+    
+    merged = heapq.merge(*streams, key=_engagement_sort_key, reverse=True)
+    for count, engagement in enumerate(merged, start=1):
+        yield engagement
+        if max_count is not None and count >= max_count:
+            return
+
+def get_contact_engagements(contact_id, types=None, since=None, max_count=HUBSPOT_ENGAGEMENTS_MAX, fields=None,
+                            association_ids=None):
+    """
+    Obtiene los engagements más recientes de un contacto (reuniones, llamadas, emails, etc.)
+    
+    Args:
+        contact_id (str): ID del contacto en HubSpot
+        types (list): Tipos de engagement; por defecto HUBSPOT_ENGAGEMENT_TYPES
+        since (datetime): Solo engagements desde esta fecha
+        max_count (int): Máximo de engagements (por defecto HUBSPOT_ENGAGEMENTS_MAX)
+        fields (dict): Propiedades a leer por tipo
+        association_ids (dict): IDs por tipo ya leídos con el contacto
+    
+    Returns:
+        dict: Lista de engagements del contacto (los leídos hasta el error, si lo hubo)
+    """
+    
+    logger.info(f"📞 Obteniendo engagements del contacto: {contact_id}")
+    
+    engagements = []
+    try:
+        for engagement in iter_contact_engagements(contact_id, types, since, max_count, fields,
+                                                   association_ids=association_ids):
+            engagements.append(engagement)
         
-        if response.status_code == 200:
-            data = response.json()
-            engagements = data.get('results', [])
-            
-            # Procesar engagements
-            processed_engagements = process_engagements(engagements)
-            
-            logger.info(f"✅ {len(processed_engagements)} engagements obtenidos para contacto: {contact_id}")
-            return {
-                "success": True,
-                "data": processed_engagements
-            }
-        else:
-            error_msg = f"Error obteniendo engagements: {response.status_code} - {response.text}"
-            logger.error(error_msg)
-            return {
-                "success": False,
-                "error": error_msg,
-                "data": []
-            }
+        logger.info(f"✅ {len(engagements)} engagements obtenidos para contacto: {contact_id}")
+        return {
+            "success": True,
+            "data": engagements
+        }
     
     except Exception as e:
         error_msg = f"Error obteniendo engagements: {str(e)}"
@@ -282,15 +1037,16 @@ def get_contact_engagements(contact_id):
         return {
             "success": False,
             "error": error_msg,
-            "data": []
+            "data": engagements
         }
 
-def get_contact_company_info(contact_id):
+def get_contact_company_info(contact_id, profile="full"):
     """
-    Obtiene información de la empresa asociada al contacto
+    Obtiene información de la empresa asociada a un contacto del que solo se conoce el ID
     
     Args:
         contact_id (str): ID del contacto en HubSpot
+        profile (str): Perfil de lectura de la empresa
     
     Returns:
         dict: Información de la empresa
@@ -298,16 +1054,11 @@ def get_contact_company_info(contact_id):
     
     try:
         # Obtener asociaciones del contacto con empresas
-        url = f"{HUBSPOT_BASE_URL}/crm/v4/objects/contacts/{contact_id}/associations/companies"
-        
-        headers = {
-            "Authorization": f"Bearer {HUBSPOT_API_KEY}",
-            "Content-Type": "application/json"
-        }
+        url = f"/crm/v4/objects/contacts/{contact_id}/associations/companies"
         
         logger.info(f"🏢 Obteniendo información de empresa para contacto: {contact_id}")
         
-        response = requests.get(url, headers=headers)
+        response = hubspot_client.get(url)
         
         if response.status_code == 200:
             data = response.json()
@@ -316,26 +1067,7 @@ def get_contact_company_info(contact_id):
             if company_associations:
                 # La API v4 usa 'toObjectId' en lugar de 'id'
                 company_id = company_associations[0].get('toObjectId') or company_associations[0].get('id')
-                
-                # Obtener detalles de la empresa
-                company_details = get_company_details(company_id)
-                
-                if company_details.get('success'):
-                    # Obtener negocios asociados a la empresa
-                    deals = get_company_deals(company_id)
-                    
-                    company_info = {
-                        "company_details": company_details.get('data'),
-                        "deals": deals.get('data', [])
-                    }
-                    
-                    logger.info(f"✅ Información de empresa obtenida: {company_id}")
-                    return {
-                        "success": True,
-                        "data": company_info
-                    }
-                else:
-                    return company_details
+                return get_company_info(company_id, profile=profile)
             else:
                 logger.info(f"No se encontró empresa asociada al contacto: {contact_id}")
                 return {
@@ -358,54 +1090,83 @@ def get_contact_company_info(contact_id):
             "error": error_msg
         }
 
-def get_company_details(company_id):
+def get_company_info(company_id, profile="full"):
+    """
+    Obtiene los detalles de una empresa y sus negocios en dos peticiones
+    
+    La lectura de la empresa incluye los IDs de sus negocios (associations=deals),
+    que luego se leen con un solo batch read
+    
+    Args:
+        company_id (str): ID de la empresa en HubSpot
+        profile (str): Perfil de lectura de la empresa
+    
+    Returns:
+        dict: company_details y deals
+    """
+    
+    company_details = get_company_details(company_id, include_deal_ids=True, profile=profile)
+    
+    if not company_details.get('success'):
+        return company_details
+    
+    # Más asociaciones de las que la API incluye en línea: se consulta la lista completa
+    if company_details.get('more_deals'):
+        deals = get_company_deals(company_id)
+    else:
+        deals = get_deals_batch(company_details.get('deal_ids', []))
+    
+    logger.info(f"✅ Información de empresa obtenida: {company_id}")
+    return {
+        "success": True,
+        "data": {
+            "company_details": company_details.get('data'),
+            "deals": deals.get('data', [])
+        }
+    }
+
+def get_company_details(company_id, include_deal_ids=False, profile="full"):
     """
     Obtiene detalles de una empresa por ID
     
     Args:
         company_id (str): ID de la empresa en HubSpot
+        include_deal_ids (bool): Incluir los IDs de los negocios asociados en la misma petición
+        profile (str): Perfil de lectura (propiedades pedidas y secciones procesadas)
     
     Returns:
-        dict: Detalles de la empresa
+        dict: Detalles de la empresa (y deal_ids / more_deals si se pidieron)
     """
     
+    sections, properties = read_profile(profile, "company")
+    associations = ('deals',) if include_deal_ids else ()
+    read_started = time.time()
+    
+    company_data = _cached_object('companies', company_id, properties, associations)
+    if company_data is not None:
+        logger.info(f"⚡ Detalles de empresa obtenidos de caché: {company_id}")
+        return _company_details_result(company_data, sections, include_deal_ids)
+    
     try:
-        url = f"{HUBSPOT_BASE_URL}/crm/v3/objects/companies/{company_id}"
-        
-        headers = {
-            "Authorization": f"Bearer {HUBSPOT_API_KEY}",
-            "Content-Type": "application/json"
-        }
+        url = f"/crm/v3/objects/companies/{company_id}"
         
         params = {
-            "properties": [
-                "id", "name", "domain", "industry", "type", "description",
-                "phone", "address", "city", "state", "country", "zip",
-                "num_employees", "annualrevenue", "createdate", "lastmodifieddate",
-                "hubspot_owner_id", "hs_lead_status", "lifecyclestage",
-                "website", "linkedin_company_page", "twitterhandle", "facebook_company_page",
-                "hs_analytics_source", "hs_analytics_source_data_1", "hs_analytics_source_data_2",
-                "hs_analytics_num_visits", "hs_analytics_num_page_views",
-                "hs_analytics_last_visit_timestamp", "hs_analytics_first_visit_timestamp",
-                "recent_deal_amount", "recent_deal_close_date", "total_revenue"
-            ]
+            "properties": properties
         }
         
+        if include_deal_ids:
+            params["associations"] = "deals"
+        
         logger.info(f"🏢 Obteniendo detalles de empresa: {company_id}")
         
-        response = requests.get(url, headers=headers, params=params)
+        response = hubspot_client.get(url, params=params)
         
         if response.status_code == 200:
             company_data = response.json()
-            
-            # Procesar datos de la empresa
-            processed_data = process_company_data(company_data)
+            _cache_object('companies', company_data, properties, read_started, associations)
             
             logger.info(f"✅ Detalles de empresa obtenidos: {company_id}")
-            return {
-                "success": True,
-                "data": processed_data
-            }
+            return _company_details_result(company_data, sections, include_deal_ids)
         else:
             error_msg = f"Error obteniendo detalles de empresa: {response.status_code} - {response.text}"
             logger.error(error_msg)
@@ -422,6 +1183,19 @@ def get_company_details(company_id):
             "error": error_msg
         }
 
+def _company_details_result(company_data, sections, include_deal_ids):
+    """Resultado de get_company_details a partir de la empresa cruda (de la API o de la caché)"""
+    
+    result = {
+        "success": True,
+        "data": process_company_data(company_data, sections)
+    }
+    
+    if include_deal_ids:
+        result["deal_ids"], result["more_deals"] = _association_ids(company_data, 'deals')
+    
+    return result
+
 def get_company_deals(company_id):
     """
     Obtiene los negocios (deals) asociados a una empresa
@@ -434,30 +1208,21 @@ def get_company_deals(company_id):
     """
     
     try:
-        url = f"{HUBSPOT_BASE_URL}/crm/v4/objects/companies/{company_id}/associations/deals"
-        
-        headers = {
-            "Authorization": f"Bearer {HUBSPOT_API_KEY}",
-            "Content-Type": "application/json"
-        }
+        url = f"/crm/v4/objects/companies/{company_id}/associations/deals"
         
         logger.info(f"💰 Obteniendo negocios de empresa: {company_id}")
         
-        response = requests.get(url, headers=headers)
+        response = hubspot_client.get(url)
         
         if response.status_code == 200:
             data = response.json()
             deal_associations = data.get('results', [])
             
-            deals = []
-            for association in deal_associations:
-                # La API v4 usa 'toObjectId' en lugar de 'id'
-                deal_id = association.get('toObjectId') or association.get('id')
-                
-                # Obtener detalles del deal
-                deal_details = get_deal_details(deal_id)
-                if deal_details.get('success'):
-                    deals.append(deal_details.get('data'))
+            # La API v4 usa 'toObjectId' en lugar de 'id'
+            deal_ids = [association.get('toObjectId') or association.get('id') for association in deal_associations]
+            
+            # Obtener detalles de todos los deals con batch read (una petición por cada 100)
+            deals = get_deals_batch(deal_ids).get('data', [])
             
             logger.info(f"✅ {len(deals)} negocios obtenidos para empresa: {company_id}")
             return {
@@ -494,23 +1259,13 @@ def get_deal_details(deal_id):
     """
     
     try:
-        url = f"{HUBSPOT_BASE_URL}/crm/v3/objects/deals/{deal_id}"
-        
-        headers = {
-            "Authorization": f"Bearer {HUBSPOT_API_KEY}",
-            "Content-Type": "application/json"
-        }
+        url = f"/crm/v3/objects/deals/{deal_id}"
         
         params = {
-            "properties": [
-                "id", "dealname", "dealstage", "amount", "closedate", "createdate",
-                "lastmodifieddate", "hs_lead_status", "pipeline", "hs_deal_stage_probability",
-                "description", "hubspot_owner_id", "hs_analytics_source",
-                "hs_analytics_source_data_1", "hs_analytics_source_data_2"
-            ]
+            "properties": DEAL_PROPERTIES
         }
         
-        response = requests.get(url, headers=headers, params=params)
+        response = hubspot_client.get(url, params=params)
         
         if response.status_code == 200:
             deal_data = response.json()
@@ -534,216 +1289,147 @@ def get_deal_details(deal_id):
             "error": f"Error obteniendo deal: {str(e)}"
         }
 
-def process_contact_data(contact_data):
+def get_deals_batch(deal_ids):
+    """
+    Obtiene detalles de varios negocios usando el endpoint batch read de HubSpot
+    
+    Args:
+        deal_ids (list): IDs de los negocios en HubSpot
+    
+    Returns:
+        dict: Lista de negocios procesados
+    """
+    
+    deals_by_id = {}
+    errors = []
+    read_started = time.time()
+    
+    # Eliminar duplicados conservando el orden de las asociaciones
+    unique_ids = list(dict.fromkeys(str(deal_id) for deal_id in deal_ids if deal_id))
+    
+    # Solo se piden a HubSpot los negocios que no están en caché
+    for deal_id in unique_ids:
+        cached_deal = _cached_object('deals', deal_id, DEAL_PROPERTIES)
+        if cached_deal is not None:
+            deals_by_id[deal_id] = cached_deal
+    
+    missing_ids = [deal_id for deal_id in unique_ids if deal_id not in deals_by_id]
+    
+    for start in range(0, len(missing_ids), HUBSPOT_BATCH_SIZE):
+        chunk = missing_ids[start:start + HUBSPOT_BATCH_SIZE]
+        
+        try:
+            url = "/crm/v3/objects/deals/batch/read"
+            
+            payload = {
+                "properties": DEAL_PROPERTIES,
+                "inputs": [{"id": deal_id} for deal_id in chunk]
+            }
+            
+            response = hubspot_client.post(url, json=payload, idempotent=True)
+            
+            # 207 Multi-Status: algunos IDs no existen, el resto viene en 'results'
+            if response.status_code in [200, 207]:
+                for deal_data in response.json().get('results', []):
+                    deals_by_id[str(deal_data.get('id'))] = deal_data
+                    _cache_object('deals', deal_data, DEAL_PROPERTIES, read_started)
+            else:
+                errors.append(f"Error obteniendo deals: {response.status_code}")
+        
+        except Exception as e:
+            errors.append(f"Error obteniendo deals: {str(e)}")
+    
+    result = {
+        "success": not errors,
+        "data": [process_deal_data(deals_by_id[deal_id]) for deal_id in unique_ids if deal_id in deals_by_id]
+    }
+    
+    if errors:
+        result["error"] = "; ".join(errors)
+        logger.error(f"Errores en batch read de deals: {result['error']}")
+    
+    return result
+
+def _build_sections(properties, section_map, sections):
+    """Construye {sección: {campo: valor}} con las secciones pedidas"""
+    
+    return {
+        section: {field: properties.get(property_name, '') for field, property_name in section_map[section].items()}
+        for section in sections
+    }
+
+def process_contact_data(contact_data, sections=None):
     """
     Procesa y estructura los datos del contacto
     
     Args:
         contact_data (dict): Datos crudos del contacto
+        sections (list): Secciones a construir (por defecto todas las de CONTACT_SECTIONS)
     
     Returns:
         dict: Datos procesados del contacto
     """
     
     properties = contact_data.get('properties', {})
+    processed = _build_sections(properties, CONTACT_SECTIONS, sections or CONTACT_SECTIONS)
     
-    return {
-        "informacion_basica": {
+    if "informacion_basica" in processed:
+        processed["informacion_basica"] = {
             "id": contact_data.get('id'),
             "nombre": f"{properties.get('firstname', '')} {properties.get('lastname', '')}".strip(),
-            "email": properties.get('email', ''),
-            "empresa": properties.get('company', ''),
-            "cargo": properties.get('jobtitle', ''),
-            "telefono": properties.get('phone', ''),
-            "telefono_movil": properties.get('mobilephone', ''),
-            "sitio_web": properties.get('website', ''),
-            "industria": properties.get('industry', ''),
-            "descripcion": properties.get('description', '')
-        },
-        "direccion": {
-            "direccion": properties.get('address', ''),
-            "ciudad": properties.get('city', ''),
-            "estado": properties.get('state', ''),
-            "pais": properties.get('country', ''),
-            "codigo_postal": properties.get('zip', '')
-        },
-        "informacion_empresa": {
-            "num_empleados": properties.get('num_employees', ''),
-            "ingresos_anuales": properties.get('annualrevenue', '')
-        },
-        "actividad": {
-            "fecha_creacion": properties.get('createdate', ''),
-            "ultima_modificacion": properties.get('lastmodifieddate', ''),
-            "ultima_actividad": properties.get('notes_last_activity_date', ''),
-            "proxima_actividad": properties.get('notes_next_activity_date', ''),
-            "ultimo_contacto": properties.get('notes_last_contacted', '')
-        },
-        "analiticas": {
-            "fuente": properties.get('hs_analytics_source', ''),
-            "fuente_datos": properties.get('hs_analytics_source_data_1', ''),
-            "ultima_visita": properties.get('hs_analytics_last_visit_timestamp', ''),
-            "num_visitas": properties.get('hs_analytics_num_visits', ''),
-            "num_paginas_vistas": properties.get('hs_analytics_num_page_views', ''),
-            "num_eventos_completados": properties.get('hs_analytics_num_event_completions', '')
-        },
-        "email_marketing": {
-            "opt_out": properties.get('hs_email_optout', ''),
-            "emails_abiertos": properties.get('hs_email_open', ''),
-            "emails_clicados": properties.get('hs_email_click', '')
-        },
-        "estado": {
-            "estado_lead": properties.get('hs_lead_status', ''),
-            "etapa_ciclo_vida": properties.get('lifecyclestage', ''),
-            "puntaje_lead": properties.get('hs_lead_score', ''),
-            "puntaje_predictivo": properties.get('hs_predictivecontactscore', ''),
-            "propietario": properties.get('hubspot_owner_id', '')
-        },
-        "notas": {
-            "num_notas": properties.get('num_notes', ''),
-            "num_notas_contactadas": properties.get('num_contacted_notes', '')
+            **processed["informacion_basica"]
         }
-    }
+    
+    return processed
 
-def process_engagements(engagements):
+def process_engagement_object(engagement_type, object_data):
     """
-    Procesa y estructura los engagements del contacto
+    Procesa un engagement leído de la API CRM v3
     
     Args:
-        engagements (list): Lista de engagements crudos
+        engagement_type (str): Tipo de engagement (MEETING, CALL, EMAIL, TASK, NOTE)
+        object_data (dict): Objeto crudo (id, properties, archived)
     
     Returns:
-        list: Lista de engagements procesados
+        dict: id, tipo, timestamp, activo y las propiedades leídas con su nombre en español
     """
     
-    processed_engagements = []
+    properties = object_data.get('properties', {})
+    field_names = ENGAGEMENT_OBJECTS.get(engagement_type, ("", {}))[1]
     
-    for engagement in engagements:
-        engagement_type = engagement.get('engagement', {}).get('type', '')
-        metadata = engagement.get('metadata', {})
-        
-        processed_engagement = {
-            "id": engagement.get('engagement', {}).get('id'),
-            "tipo": engagement_type,
-            "timestamp": engagement.get('engagement', {}).get('timestamp'),
-            "activo": engagement.get('engagement', {}).get('active', False)
-        }
-        
-        # Procesar según el tipo de engagement
-        if engagement_type == 'MEETING':
-            processed_engagement.update({
-                "titulo": metadata.get('title', ''),
-                "descripcion": metadata.get('description', ''),
-                "fecha_inicio": metadata.get('startTime', ''),
-                "fecha_fin": metadata.get('endTime', ''),
-                "ubicacion": metadata.get('location', ''),
-                "organizador": metadata.get('organizer', ''),
-                "asistentes": metadata.get('attendees', []),
-                "estado": metadata.get('state', '')
-            })
-        
-        elif engagement_type == 'CALL':
-            processed_engagement.update({
-                "duracion": metadata.get('durationMilliseconds', 0),
-                "estado": metadata.get('state', ''),
-                "direccion": metadata.get('direction', ''),
-                "disposition": metadata.get('disposition', ''),
-                "grabacion_url": metadata.get('recordingUrl', ''),
-                "transcripcion": metadata.get('transcript', '')
-            })
-        
-        elif engagement_type == 'EMAIL':
-            processed_engagement.update({
-                "asunto": metadata.get('subject', ''),
-                "de": metadata.get('from', ''),
-                "para": metadata.get('to', []),
-                "cc": metadata.get('cc', []),
-                "bcc": metadata.get('bcc', []),
-                "estado": metadata.get('state', ''),
-                "direccion": metadata.get('direction', ''),
-                "html": metadata.get('html', ''),
-                "texto": metadata.get('text', '')
-            })
-        
-        elif engagement_type == 'TASK':
-            processed_engagement.update({
-                "titulo": metadata.get('title', ''),
-                "descripcion": metadata.get('description', ''),
-                "estado": metadata.get('state', ''),
-                "prioridad": metadata.get('priority', ''),
-                "fecha_vencimiento": metadata.get('dueDate', ''),
-                "tipo": metadata.get('type', '')
-            })
-        
-        elif engagement_type == 'NOTE':
-            processed_engagement.update({
-                "contenido": metadata.get('body', ''),
-                "fuente": metadata.get('source', ''),
-                "tipo": metadata.get('sourceType', '')
-            })
-        
-        processed_engagements.append(processed_engagement)
-    
-    return processed_engagements
-
-def process_company_data(company_data):
+    processed_engagement = {
+        "id": object_data.get('id'),
+        "tipo": engagement_type,
+        "timestamp": properties.get('hs_timestamp'),
+        "activo": not object_data.get('archived', False)
+    }
+    
+    for property_name, value in properties.items():
+        if property_name in ('hs_timestamp', 'hs_object_id', 'hs_createdate', 'hs_lastmodifieddate'):
+            continue
+        processed_engagement[field_names.get(property_name, property_name)] = value or ''
+    
+    return processed_engagement
+
+def process_company_data(company_data, sections=None):
     """
     Procesa y estructura los datos de la empresa
     
     Args:
         company_data (dict): Datos crudos de la empresa
+        sections (list): Secciones a construir (por defecto todas las de COMPANY_SECTIONS)
     
     Returns:
         dict: Datos procesados de la empresa
     """
     
     properties = company_data.get('properties', {})
+    processed = _build_sections(properties, COMPANY_SECTIONS, sections or COMPANY_SECTIONS)
     
-    return {
-        "informacion_basica": {
-            "id": company_data.get('id'),
-            "nombre": properties.get('name', ''),
-            "dominio": properties.get('domain', ''),
-            "industria": properties.get('industry', ''),
-            "tipo": properties.get('type', ''),
-            "descripcion": properties.get('description', ''),
-            "sitio_web": properties.get('website', ''),
-            "telefono": properties.get('phone', '')
-        },
-        "direccion": {
-            "direccion": properties.get('address', ''),
-            "ciudad": properties.get('city', ''),
-            "estado": properties.get('state', ''),
-            "pais": properties.get('country', ''),
-            "codigo_postal": properties.get('zip', '')
-        },
-        "informacion_financiera": {
-            "num_empleados": properties.get('num_employees', ''),
-            "ingresos_anuales": properties.get('annualrevenue', ''),
-            "ingresos_totales": properties.get('total_revenue', ''),
-            "monto_negocio_reciente": properties.get('recent_deal_amount', ''),
-            "fecha_cierre_negocio_reciente": properties.get('recent_deal_close_date', '')
-        },
-        "redes_sociales": {
-            "linkedin": properties.get('linkedin_company_page', ''),
-            "twitter": properties.get('twitterhandle', ''),
-            "facebook": properties.get('facebook_company_page', '')
-        },
-        "actividad": {
-            "fecha_creacion": properties.get('createdate', ''),
-            "ultima_modificacion": properties.get('lastmodifieddate', ''),
-            "ultima_visita": properties.get('hs_analytics_last_visit_timestamp', ''),
-            "primera_visita": properties.get('hs_analytics_first_visit_timestamp', ''),
-            "num_visitas": properties.get('hs_analytics_num_visits', ''),
-            "num_paginas_vistas": properties.get('hs_analytics_num_page_views', '')
-        },
-        "estado": {
-            "estado_lead": properties.get('hs_lead_status', ''),
-            "etapa_ciclo_vida": properties.get('lifecyclestage', ''),
-            "propietario": properties.get('hubspot_owner_id', ''),
-            "fuente": properties.get('hs_analytics_source', ''),
-            "fuente_datos": properties.get('hs_analytics_source_data_1', '')
-        }
-    }
+    if "informacion_basica" in processed:
+        processed["informacion_basica"] = {"id": company_data.get('id'), **processed["informacion_basica"]}
+    
+    return processed
 
 def process_deal_data(deal_data):
     """
@@ -781,6 +1467,198 @@ def process_deal_data(deal_data):
         }
     }
 
+def build_contact_properties(prospect_data, enriched_data=None):
+    """
+    Construye las propiedades de un contacto de HubSpot a partir del prospecto y los datos de Apollo
+    
+    Args:
+        prospect_data (dict): Datos del prospecto del formulario
+        enriched_data (dict): Datos de la empresa enriquecidos por Apollo
+    
+    Returns:
+        dict: Propiedades del contacto (incluye email como clave de upsert)
+    """
+    
+    contact_properties = {
+        "email": prospect_data['emailCorporativo'],
+        "firstname": prospect_data['nombres'],
+        "lastname": prospect_data['apellidos'],
+        "company": prospect_data['compania'],
+        "jobtitle": prospect_data['rol'],
+        "website": prospect_data.get('websiteUrl', ''),
+        "hs_lead_status": "Unqualified",  # Valor válido según el error
+        "lifecyclestage": "lead"
+    }
+    
+    # Agregar datos enriquecidos de Apollo si están disponibles
+    if enriched_data:
+        company_info = enriched_data.get('informacion_basica', {})
+        contact_info = enriched_data.get('contacto', {})
+        financial_info = enriched_data.get('financiera', {})
+        
+        # Información básica de la empresa (solo propiedades válidas para contactos)
+        if company_info.get('industria'):
+            # Mapear industria de Apollo a valores válidos de HubSpot
+            industry_mapping = {
+                'farming': 'Consumo masivo',
+                'agriculture': 'Consumo masivo',
+                'agroindustria': 'Consumo masivo',
+                'software': 'Software y tecnologías SaaS',
+                'technology': 'Software y tecnologías SaaS',
+                'healthcare': 'Servicios de salud',
+                'finance': 'Servicios financieros',
+                'construction': 'Construcción',
+                'retail': 'Retail y ventas on-line'
+            }
+            mapped_industry = industry_mapping.get(company_info['industria'].lower(), 'Otro')
+            contact_properties['industry'] = mapped_industry
+        # Nota: description, num_employees, linkedin_company_page no existen en contactos
+        
+        # Información de contacto adicional
+        if contact_info.get('telefono'):
+            contact_properties['phone'] = contact_info['telefono']
+        if contact_info.get('direccion'):
+            contact_properties['address'] = contact_info['direccion']
+        
+        # Información financiera
+        if financial_info.get('ingresos_anuales'):
+            contact_properties['annualrevenue'] = financial_info['ingresos_anuales']
+    
+    return contact_properties
+
+def upsert_contacts_batch(contacts):
+    """
+    Crea o actualiza contactos por email usando el endpoint batch upsert de HubSpot
+    
+    Una petición por cada HUBSPOT_BATCH_SIZE contactos, sin búsqueda previa
+    
+    Args:
+        contacts (list): Propiedades de cada contacto; deben incluir 'email'
+    
+    Returns:
+        dict: Lista de {"email", "contact_id", "created"} por contacto procesado
+    """
+    
+    upserted = []
+    errors = []
+    
+    # HubSpot rechaza emails repetidos en un mismo lote: se conserva la última versión
+    unique_contacts = {}
+    for properties in contacts:
+        email = (properties.get('email') or '').strip().lower()
+        if email:
+            unique_contacts[email] = {**properties, "email": email}
+        else:
+            errors.append("Contacto sin email omitido")
+    
+    emails = list(unique_contacts)
+    
+    for start in range(0, len(emails), HUBSPOT_BATCH_SIZE):
+        chunk = emails[start:start + HUBSPOT_BATCH_SIZE]
+        
+        try:
+            url = "/crm/v3/objects/contacts/batch/upsert"
+            
+            payload = {
+                "inputs": [
+                    {"idProperty": "email", "id": email, "properties": unique_contacts[email]}
+                    for email in chunk
+                ]
+            }
+            
+            response = hubspot_client.post(url, json=payload, idempotent=True)
+            
+            # 207 Multi-Status: algunos contactos fallaron, el resto viene en 'results'
+            if response.status_code in [200, 201, 207]:
+                response_data = response.json()
+                
+                for contact_data in response_data.get('results', []):
+                    invalidate_contact(contact_data.get('id'))
+                    upserted.append({
+                        "email": (contact_data.get('properties', {}).get('email') or '').lower(),
+                        "contact_id": contact_data.get('id'),
+                        "created": contact_data.get('new', False)
+                    })
+                
+                for error in response_data.get('errors', []):
+                    errors.append(f"Error en upsert de contactos: {error.get('message', error)}")
+            else:
+                errors.append(f"Error en upsert de contactos: {response.status_code} - {response.text}")
+        
+        except Exception as e:
+            errors.append(f"Error en upsert de contactos: {str(e)}")
+        
+        # Aun si la respuesta falló, el upsert pudo aplicarse: las lecturas por email van a HubSpot
+        for email in chunk:
+            invalidate_contact(email=email)
+    
+    result = {
+        "success": not errors,
+        "data": upserted
+    }
+    
+    if errors:
+        result["error"] = "; ".join(errors)
+        logger.error(f"Errores en batch upsert de contactos: {result['error']}")
+    
+    return result
+
+def upsert_contact(contact_properties):
+    """
+    Crea o actualiza un contacto por email en una sola petición
+    
+    Args:
+        contact_properties (dict): Propiedades del contacto; deben incluir 'email'
+    
+    Returns:
+        dict: Resultado con contact_id y si el contacto fue creado
+    """
+    
+    result = upsert_contacts_batch([contact_properties])
+    
+    if not result['data']:
+        return {"success": False, "error": result.get('error', "HubSpot no retornó el contacto")}
+    
+    contact = result['data'][0]
+    action = "creado" if contact['created'] else "actualizado"
+    logger.info(f"✅ Contacto {action} exitosamente en HubSpot. ID: {contact['contact_id']}")
+    
+    return {
+        "success": True,
+        "contact_id": contact['contact_id'],
+        "created": contact['created']
+    }
+
+def find_conversation_call(contact_id, call_timestamp, title):
+    """
+    Busca entre las llamadas del contacto una creada con el hs_timestamp y el título indicados
+    
+    Un reintento del procesamiento de una transcripción la usa antes de crear la llamada: si el
+    intento anterior la creó (y luego venció el timeout o murió el worker), no se duplica.
+    Se lee por asociaciones y batch read, que reflejan la llamada de inmediato (la búsqueda no)
+    
+    Args:
+        contact_id (str): ID del contacto en HubSpot
+        call_timestamp (int): hs_timestamp en milisegundos con que se creó la llamada
+        title (str): hs_call_title de la llamada
+    
+    Returns:
+        str o None: ID de la llamada existente
+    
+    Raises:
+        EngagementReadError: HubSpot respondió con error (no se sabe si la llamada existe)
+    """
+    
+    if not HUBSPOT_API_KEY:
+        return None
+    
+    created_at = datetime.fromtimestamp(call_timestamp / 1000, tz=timezone.utc)
+    for call in iter_contact_engagements(contact_id, types=["CALL"], since=created_at,
+                                         fields={"CALL": ["hs_call_title"]}):
+        if _parse_timestamp(call['timestamp']) == created_at and call.get('titulo') == title:
+            return call['id']
+    return None
+
 def create_conversation_engagement(contact_id, conversation_data):
     """
     Crea una llamada en HubSpot usando la API de calls v3 con información de la conversación
@@ -803,11 +1681,6 @@ def create_conversation_engagement(contact_id, conversation_data):
         }
     
     try:
-        headers = {
-            "Authorization": f"Bearer {HUBSPOT_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        
         # Crear llamada usando la API de calls v3
         logger.info(f"📞 Creando llamada para contacto: {contact_id}")
         logger.info(f"📝 Resumen a incluir: {conversation_data.get('summary', '')[:100]}...")
@@ -817,7 +1690,8 @@ def create_conversation_engagement(contact_id, conversation_data):
         summary=create_detailed_note_content(conversation_data)
         call_data = {
             "properties": {
-                "hs_timestamp": int(datetime.now().timestamp() * 1000),  # Timestamp en milisegundos
+                # Timestamp en milisegundos; uno fijo por conversación permite reconocer la llamada en un reintento
+                "hs_timestamp": conversation_data.get('timestamp') or int(datetime.now().timestamp() * 1000),
                 "hs_call_title": conversation_data.get('title', 'Conversación con IA - Triario'),
                 "hs_call_body":summary,
                 "hs_call_duration": conversation_data.get('duration', 0),
@@ -883,14 +1757,18 @@ def create_conversation_engagement(contact_id, conversation_data):
         #     full_body += "\n\n".join(additional_info)
         #     call_data["properties"]["hs_call_body"] = full_body
         
-        call_url = f"{HUBSPOT_BASE_URL}/crm/v3/objects/calls"
-        call_response = requests.post(call_url, headers=headers, json=call_data)
+        call_url = "/crm/v3/objects/calls"
+        call_response = hubspot_client.post(call_url, json=call_data)
         
         if call_response.status_code in [200, 201]:
             call_data_response = call_response.json()
             call_id = call_data_response.get('id')
             logger.info(f"✅ Llamada creada exitosamente. ID: {call_id}")
-            logger.info(f"📋 Datos enviados: {json.dumps(call_data, indent=2, ensure_ascii=False)}")
+            
+            # La llamada cambia la actividad del contacto (ej: notes_last_activity_date)
+            invalidate_contact(contact_id)
+            log_payload(logger, "📋 Llamada enviada a HubSpot", call_data,
+                        call_id=call_id, body_chars=len(call_data["properties"].get("hs_call_body") or ""))
             
             return {
                 "success": True,
@@ -1047,12 +1925,13 @@ Tarea generada automáticamente por el sistema de conversaciones simuladas
     
     return task_content
 
-def enrich_prospect_with_hubspot_data(prospect_data):
+def enrich_prospect_with_hubspot_data(prospect_data, profile="full"):
     """
     Enriquece los datos del prospecto con información de HubSpot
     
     Args:
         prospect_data (dict): Datos del prospecto
+        profile (str): Perfil de lectura del contacto y la empresa (ver READ_PROFILES)
     
     Returns:
         dict: Datos enriquecidos con información de HubSpot
@@ -1069,7 +1948,7 @@ def enrich_prospect_with_hubspot_data(prospect_data):
     logger.info(f"🔄 Enriqueciendo prospecto con datos de HubSpot: {email}")
     
     # Obtener información del contacto
-    hubspot_info = get_contact_info(email)
+    hubspot_info = get_contact_info(email, profile=profile)
     
     if hubspot_info.get('success'):
         logger.info(f"✅ Datos de HubSpot obtenidos para: {email}")
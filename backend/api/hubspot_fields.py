@@ -4,19 +4,18 @@ Específicamente para el campo dolores_de_venta
 """
 
 import os
-import requests
 import logging
 from typing import Dict, Optional
 from dotenv import load_dotenv
+from api.hubspot import hubspot_client, invalidate_contact
 
 # Cargar variables de entorno desde .env
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
-# Configuración de HubSpot API
+# Configuración de HubSpot API (las llamadas usan el cliente compartido de api.hubspot)
 HUBSPOT_API_KEY = os.getenv('HUBSPOT_API_KEY')
-HUBSPOT_BASE_URL = 'https://api.hubapi.com'
 
 def update_contact_pain_field(contact_id: str, pain_value: str) -> Dict:
     """
@@ -37,12 +36,7 @@ def update_contact_pain_field(contact_id: str, pain_value: str) -> Dict:
     
     try:
         # URL para actualizar el contacto
-        url = f"{HUBSPOT_BASE_URL}/crm/v3/objects/contacts/{contact_id}"
-        
-        headers = {
-            "Authorization": f"Bearer {HUBSPOT_API_KEY}",
-            "Content-Type": "application/json"
-        }
+        url = f"/crm/v3/objects/contacts/{contact_id}"
         
         # Datos para actualizar
         payload = {
@@ -54,9 +48,10 @@ def update_contact_pain_field(contact_id: str, pain_value: str) -> Dict:
         logger.info(f"📝 Actualizando campo dolores_de_venta para contacto {contact_id}: {pain_value}")
         
         # Realizar la petición
-        response = requests.patch(url, headers=headers, json=payload)
+        response = hubspot_client.patch(url, json=payload)
         
         if response.status_code == 200:
+            invalidate_contact(contact_id)
             logger.info(f"✅ Campo dolores_de_venta actualizado exitosamente para contacto {contact_id}")
             return {
                 "success": True,
@@ -96,18 +91,13 @@ def get_contact_pain_field(contact_id: str) -> Optional[str]:
         return None
     
     try:
-        url = f"{HUBSPOT_BASE_URL}/crm/v3/objects/contacts/{contact_id}"
-        
-        headers = {
-            "Authorization": f"Bearer {HUBSPOT_API_KEY}",
-            "Content-Type": "application/json"
-        }
+        url = f"/crm/v3/objects/contacts/{contact_id}"
         
         params = {
             "properties": ["dolores_de_venta"]
         }
         
-        response = requests.get(url, headers=headers, params=params)
+        response = hubspot_client.get(url, params=params)
         
         if response.status_code == 200:
             contact_data = response.json()
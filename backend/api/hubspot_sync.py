@@ -0,0 +1,224 @@
+"""
+Sync incremental de contactos y empresas de HubSpot hacia la réplica local
+Cada pasada pide a la API de búsqueda los objetos con lastmodifieddate >= watermark, en orden
+ascendente y paginados, y avanza el watermark página a página
+"""
+
+import os
+import socket
+import time
+import threading
+import logging
+from typing import Dict, List, Optional
+from api import hubspot
+from api.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Segundos entre pasadas del sync y duración del turno de sincronización entre procesos
+HUBSPOT_MIRROR_SYNC_INTERVAL = float(os.getenv('HUBSPOT_MIRROR_SYNC_INTERVAL', 60))
+HUBSPOT_MIRROR_LEASE = float(os.getenv('HUBSPOT_MIRROR_LEASE', 300))
+
+# La API de búsqueda no pagina más allá de 10.000 resultados por consulta: al llegar al tope
+# se reinicia la consulta desde el último lastmodifieddate recibido
+HUBSPOT_SEARCH_MAX_RESULTS = 10000
+HUBSPOT_SEARCH_PAGE_SIZE = 100
+
+# Tipo replicado -> (propiedad de última modificación, propiedades pedidas)
+# associatedcompanyid permite resolver la empresa del contacto sin la API de asociaciones
+MIRROR_OBJECTS = {
+    "contacts": ("lastmodifieddate", hubspot.CONTACT_PROPERTIES + ["associatedcompanyid"]),
+    "companies": ("hs_lastmodifieddate", hubspot.COMPANY_PROPERTIES + ["hs_lastmodifieddate"])
+}
+
+def _lease_owner() -> str:
+    """Identificador del proceso para el turno de sincronización"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def _search_page(object_type: str, watermark: float, after: Optional[str]) -> Dict:
+    """Una página de objetos modificados desde el watermark (segundos epoch), del más antiguo al más reciente"""
+    modified_property, properties = MIRROR_OBJECTS[object_type]
+
+    payload = {
+        "filterGroups": [{"filters": [{
+            "propertyName": modified_property,
+            "operator": "GTE",
+            "value": str(int(watermark * 1000))
+        }]}],
+        "sorts": [{"propertyName": modified_property, "direction": "ASCENDING"}],
+        "properties": properties,
+        "limit": HUBSPOT_SEARCH_PAGE_SIZE
+    }
+    if after:
+        payload["after"] = after
+
+    response = hubspot.hubspot_client.post(f"/crm/v3/objects/{object_type}/search", json=payload, idempotent=True)
+
+    if response.status_code != 200:
+        raise RuntimeError(f"Error en búsqueda de {object_type}: {response.status_code} - {response.text}")
+
+    return response.json()
+
+def _last_modified(object_type: str, obj: Dict) -> Optional[float]:
+    modified_property = MIRROR_OBJECTS[object_type][0]
+    properties = obj.get('properties', {})
+    modified = hubspot._parse_timestamp(properties.get(modified_property) or properties.get('lastmodifieddate'))
+    return modified.timestamp() if modified else None
+
+def sync_object_type(object_type: str, full: bool = False, min_interval: float = 0) -> Dict:
+    """
+    Trae a la réplica los objetos de un tipo modificados desde el último sync
+
+    La consulta usa GTE sobre el watermark: los objetos con la misma marca de tiempo que el
+    último guardado se vuelven a traer (el upsert es idempotente) en lugar de perderse
+
+    Si otro proceso tiene el turno, o ya sincronizó el tipo hace menos de min_interval segundos,
+    no se sincroniza (skipped) y no cuenta como error
+
+    Args:
+        object_type (str): contacts o companies
+        full (bool): Desde cero; al terminar elimina los objetos que HubSpot ya no retorna
+        min_interval (float): Segundos mínimos desde la última pasada de cualquier proceso
+
+    Returns:
+        dict: objects, pages, deleted y watermark final, o skipped con el motivo
+    """
+    mirror = hubspot.hubspot_mirror
+    owner = _lease_owner()
+    started_at = time.time()
+    summary = {"object_type": object_type, "objects": 0, "pages": 0, "deleted": 0}
+
+    # El turno se toma antes de tocar el estado: un --full sin turno no reinicia el watermark de otro sync
+    if not mirror.acquire_lease(object_type, owner, HUBSPOT_MIRROR_LEASE):
+        logger.debug(f"Sync de {object_type} en curso en otro proceso, se omite")
+        return {**summary, "skipped": "lease"}
+
+    last_attempt_at = mirror.get_state(object_type)['last_attempt_at']
+    if not full and min_interval and last_attempt_at and started_at - last_attempt_at < min_interval:
+        mirror.release_lease(object_type, owner)
+        return {**summary, "skipped": "recent"}
+
+    try:
+        if full:
+            mirror.reset_watermark(object_type)
+
+        watermark = mirror.get_state(object_type)['watermark']
+        after = None
+
+        while True:
+            # Renovar el turno en cada página; si venció y lo tomó otro proceso, se cede en silencio
+            if not mirror.acquire_lease(object_type, owner, HUBSPOT_MIRROR_LEASE):
+                logger.warning(f"⚠️ Turno de sync de {object_type} perdido tras {summary['pages']} páginas")
+                return {**summary, "skipped": "lease_lost"}
+
+            fetched_at = time.time()
+            page = _search_page(object_type, watermark, after)
+            results = page.get('results', [])
+
+            objects = [{**obj, "last_modified": _last_modified(object_type, obj)} for obj in results]
+            mirror.upsert_objects(object_type, objects, fetched_at)
+
+            page_watermark = max([obj['last_modified'] for obj in objects if obj['last_modified']], default=watermark)
+            mirror.save_watermark(object_type, page_watermark, len(objects))
+            metrics.inc('hubspot_mirror_synced_total', {"object_type": object_type}, amount=len(objects))
+
+            summary["objects"] += len(objects)
+            summary["pages"] += 1
+
+            after = ((page.get('paging') or {}).get('next') or {}).get('after')
+            if not after or not results:
+                break
+
+            if int(after) >= HUBSPOT_SEARCH_MAX_RESULTS:
+                # Tope de la búsqueda: nueva consulta desde el último lastmodifieddate guardado
+                watermark, after = page_watermark, None
+
+        if full:
+            summary["deleted"] = mirror.delete_not_synced_since(object_type, started_at)
+
+        mirror.record_sync_result(object_type, started_at)
+        summary["watermark"] = mirror.get_state(object_type)['watermark']
+
+        if summary["objects"]:
+            logger.info(f"🔄 Réplica de HubSpot: {summary['objects']} {object_type} sincronizados "
+                        f"en {summary['pages']} páginas")
+        return summary
+
+    except Exception as e:
+        mirror.record_sync_result(object_type, started_at, error=str(e))
+        metrics.inc('hubspot_mirror_sync_errors_total', {"object_type": object_type})
+        raise
+
+    finally:
+        mirror.release_lease(object_type, owner)
+
+def run_sync(full: bool = False, object_types: Optional[List[str]] = None, min_interval: float = 0) -> Dict:
+    """
+    Sincroniza los tipos replicados (contactos y empresas)
+
+    Args:
+        full (bool): Resincronización completa desde cero
+        object_types (list): Tipos a sincronizar (por defecto todos)
+        min_interval (float): Omitir los tipos sincronizados hace menos de estos segundos
+
+    Returns:
+        dict: Resumen por tipo, o el error si falló
+    """
+    results = {}
+    for object_type in object_types or list(MIRROR_OBJECTS):
+        try:
+            results[object_type] = sync_object_type(object_type, full=full, min_interval=min_interval)
+        except Exception as e:
+            logger.warning(f"⚠️ Sync de {object_type} con HubSpot falló: {str(e)}")
+            results[object_type] = {"object_type": object_type, "error": str(e)}
+    return results
+
+class MirrorSyncWorker:
+    """
+    Hilo que ejecuta run_sync cada HUBSPOT_MIRROR_SYNC_INTERVAL segundos
+
+    Cada worker de gunicorn arranca su hilo, pero el turno en SQLite hace que solo uno
+    sincronice cada tipo a la vez, y una pasada reciente de otro worker hace que los demás la omitan
+    """
+
+    def __init__(self, interval: float = HUBSPOT_MIRROR_SYNC_INTERVAL):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def _loop(self):
+        while True:
+            try:
+                run_sync(min_interval=self.interval)
+            except Exception as e:
+                logger.error(f"Error en el sync de la réplica de HubSpot: {str(e)}")
+            time.sleep(self.interval)
+
+    def ensure_running(self):
+        """Arranca el hilo en el proceso actual si no está corriendo (los hilos no sobreviven al fork)"""
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+
+            self._thread = threading.Thread(target=self._loop, name="hubspot-mirror-sync", daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+            logger.info(f"🔄 Sync de la réplica de HubSpot activo cada {self.interval:.0f}s (pid {os.getpid()})")
+
+mirror_sync_worker = MirrorSyncWorker()
+
+def collect_mirror_stats():
+    """Lag del último sync exitoso y objetos replicados por tipo (comunes a todos los workers)"""
+    samples = []
+    for object_type in MIRROR_OBJECTS:
+        lag = hubspot.hubspot_mirror.sync_lag(object_type)
+        if lag is not None:
+            samples.append(('hubspot_mirror_sync_lag_seconds', {"object_type": object_type}, lag))
+        samples.append(('hubspot_mirror_objects', {"object_type": object_type},
+                        hubspot.hubspot_mirror.count(object_type)))
+    return samples
+
+if hubspot.HUBSPOT_MIRROR_ENABLED:
+    metrics.register_collector(collect_mirror_stats, shared=True)
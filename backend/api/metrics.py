@@ -0,0 +1,397 @@
+"""
+Métricas en formato de exposición de Prometheus
+Cada proceso acumula contadores e histogramas en memoria y publica periódicamente una copia en
+SQLite; /metrics suma las copias de todos los workers de gunicorn
+"""
+
+import os
+import re
+import json
+import math
+import time
+import uuid
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+from storage.sqlite_db import SQLiteDatabase
+from storage.cache import get_cache_stats
+from api.rate_limiter import get_provider_stats
+from api.circuit_breaker import get_breaker_stats, STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN
+
+logger = logging.getLogger(__name__)
+
+# Segundos entre publicaciones de la copia de cada proceso
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 5))
+
+# Las copias de procesos terminados siguen sumando a los contadores durante este tiempo (segundos)
+METRICS_SNAPSHOT_RETENTION = float(os.getenv('METRICS_SNAPSHOT_RETENTION', 24 * 3600))
+
+# Buckets de latencia en segundos (de llamadas locales rápidas hasta análisis del LLM)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+COUNTER = 'counter'
+GAUGE = 'gauge'
+HISTOGRAM = 'histogram'
+
+METRICS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS metrics_snapshots (
+    process TEXT PRIMARY KEY,
+    pid INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    payload TEXT NOT NULL
+);
+"""
+
+# Segmentos de path que identifican un objeto (IDs, emails) y no una familia de endpoints
+_ID_SEGMENT = re.compile(r'(\d|@)')
+
+def endpoint_family(url: str) -> str:
+    """
+    Reduce una URL a su familia de endpoint para acotar la cardinalidad de las etiquetas
+
+    Ej: https://api.hubapi.com/crm/v3/objects/contacts/123/associations -> /crm/v3/objects/contacts/:id/associations
+    (los segmentos de versión como v3 se conservan)
+
+    Args:
+        url (str): URL absoluta o path
+
+    Returns:
+        str: Path con los identificadores reemplazados por :id
+    """
+    segments = []
+    for segment in urlparse(url).path.split('/'):
+        if segment and _ID_SEGMENT.search(segment) and not re.fullmatch(r'v\d+', segment):
+            segment = ':id'
+        segments.append(segment)
+    return '/'.join(segments) or '/'
+
+def _labels_key(labels: Dict[str, str]) -> str:
+    return json.dumps(labels, sort_keys=True)
+
+class MetricsRegistry:
+    """
+    Registro de métricas del proceso
+
+    - counter: se suma entre workers (incluye workers ya terminados, dentro de la retención)
+    - gauge: se suma (o se toma el máximo) entre los workers vivos
+    - histogram: buckets acumulados que se suman entre workers
+    """
+
+    def __init__(self, db_file: str = "metrics.db"):
+        """
+        Inicializa el registro
+
+        Args:
+            db_file (str): Base SQLite compartida por los workers para publicar sus copias
+        """
+        self.db_file = db_file
+        self._db = None
+        self._lock = threading.Lock()
+        self._families = {}
+        self._values = {}
+        self._collectors = []
+        self._shared_collectors = []
+        self._flusher_pid = None
+        self._process_pid = None
+        self._process_key = None
+
+    def describe(self, name: str, metric_type: str, help_text: str, aggregate: str = 'sum'):
+        """
+        Declara una métrica
+
+        Args:
+            name (str): Nombre de la métrica
+            metric_type (str): counter, gauge o histogram
+            help_text (str): Descripción para # HELP
+            aggregate (str): Para gauges, cómo combinar workers: 'sum' o 'max'
+        """
+        with self._lock:
+            self._families.setdefault(name, {"type": metric_type, "help": help_text, "aggregate": aggregate})
+
+    def inc(self, name: str, labels: Optional[Dict[str, str]] = None, amount: float = 1.0):
+        """Incrementa un contador"""
+        key = _labels_key(labels or {})
+        with self._lock:
+            series = self._values.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + amount
+        self._ensure_flusher()
+
+    def set(self, name: str, value: float, labels: Optional[Dict[str, str]] = None):
+        """Fija el valor de un gauge"""
+        key = _labels_key(labels or {})
+        with self._lock:
+            self._values.setdefault(name, {})[key] = value
+        self._ensure_flusher()
+
+    def observe(self, name: str, seconds: float, labels: Optional[Dict[str, str]] = None):
+        """Registra una observación en un histograma de latencia"""
+        key = _labels_key(labels or {})
+        with self._lock:
+            series = self._values.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = {"buckets": [0] * len(LATENCY_BUCKETS), "sum": 0.0, "count": 0}
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    histogram["buckets"][index] += 1
+            histogram["sum"] += seconds
+            histogram["count"] += 1
+        self._ensure_flusher()
+
+    def register_collector(self, collector: Callable[[], List[Tuple]], shared: bool = False):
+        """
+        Registra una función que produce muestras al momento de publicar o exponer
+
+        Args:
+            collector (Callable): Retorna [(nombre, labels, valor), ...]; los nombres deben estar declarados
+            shared (bool): True si el valor es común a todos los workers (ej: profundidad de la cola en SQLite)
+                           y se calcula una sola vez al exponer en lugar de sumarse por proceso
+        """
+        with self._lock:
+            (self._shared_collectors if shared else self._collectors).append(collector)
+
+    def _collect(self, collectors: List[Callable]) -> Dict:
+        """Ejecuta los colectores y retorna {nombre: {labels: valor}}"""
+        values = {}
+        for collector in collectors:
+            try:
+                for name, labels, value in collector():
+                    values.setdefault(name, {})[_labels_key(labels)] = value
+            except Exception as e:
+                logger.warning(f"⚠️ Error en colector de métricas: {str(e)}")
+        return values
+
+    def snapshot(self) -> Dict:
+        """Copia de los valores del proceso, incluidos los colectores por proceso"""
+        with self._lock:
+            collectors = list(self._collectors)
+            values = json.loads(json.dumps(self._values))
+        values.update(self._collect(collectors))
+        return values
+
+    def _database(self) -> SQLiteDatabase:
+        if self._db is None:
+            self._db = SQLiteDatabase(self.db_file, schema=METRICS_SCHEMA)
+        return self._db
+
+    def flush(self):
+        """Publica la copia del proceso para que cualquier worker pueda exponerla"""
+        # Clave única por proceso: un PID reutilizado tras un reinicio no pisa la copia de otro proceso
+        if self._process_pid != os.getpid():
+            self._process_pid = os.getpid()
+            self._process_key = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+        now = time.time()
+        db = self._database()
+        db.execute(
+            "INSERT OR REPLACE INTO metrics_snapshots (process, pid, updated_at, payload) VALUES (?, ?, ?, ?)",
+            (self._process_key, os.getpid(), now, json.dumps(self.snapshot()))
+        )
+        db.execute("DELETE FROM metrics_snapshots WHERE updated_at < ?", (now - METRICS_SNAPSHOT_RETENTION,))
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(METRICS_FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"⚠️ Error publicando métricas: {str(e)}")
+
+    def _ensure_flusher(self):
+        """Arranca el hilo de publicación en el proceso actual (los hilos no sobreviven al fork)"""
+        if self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True).start()
+            self._flusher_pid = os.getpid()
+
+    def _aggregate(self) -> Dict:
+        """Suma las copias publicadas por todos los workers"""
+        self.flush()
+        rows = self._database().execute("SELECT updated_at, payload FROM metrics_snapshots").fetchall()
+
+        # Los gauges solo se toman de procesos que publicaron recientemente (vivos)
+        live_after = time.time() - 3 * METRICS_FLUSH_INTERVAL
+        aggregated = {}
+
+        for row in rows:
+            payload = json.loads(row['payload'])
+            for name, series in payload.items():
+                family = self._families.get(name)
+                if family is None:
+                    continue
+                if family["type"] == GAUGE and row['updated_at'] < live_after:
+                    continue
+
+                target = aggregated.setdefault(name, {})
+                for key, value in series.items():
+                    current = target.get(key)
+                    if family["type"] == HISTOGRAM:
+                        if current is None:
+                            target[key] = {"buckets": list(value["buckets"]), "sum": value["sum"],
+                                           "count": value["count"]}
+                        else:
+                            current["buckets"] = [a + b for a, b in zip(current["buckets"], value["buckets"])]
+                            current["sum"] += value["sum"]
+                            current["count"] += value["count"]
+                    elif current is None:
+                        target[key] = value
+                    elif family["aggregate"] == 'max':
+                        target[key] = max(current, value)
+                    else:
+                        target[key] = current + value
+
+        with self._lock:
+            shared_collectors = list(self._shared_collectors)
+        aggregated.update(self._collect(shared_collectors))
+        return aggregated
+
+    def render(self) -> str:
+        """
+        Genera el texto de exposición de Prometheus (versión 0.0.4) con los valores de todos los workers
+
+        Returns:
+            str: Cuerpo de la respuesta de /metrics
+        """
+        aggregated = self._aggregate()
+        _add_cache_hit_ratios(aggregated)
+
+        lines = []
+        for name in sorted(aggregated):
+            family = self._families.get(name)
+            if family is None:
+                continue
+            lines.append(f"# HELP {name} {family['help']}")
+            lines.append(f"# TYPE {name} {family['type']}")
+
+            for key in sorted(aggregated[name]):
+                labels = json.loads(key)
+                value = aggregated[name][key]
+                if family["type"] == HISTOGRAM:
+                    for bound, count in zip(LATENCY_BUCKETS, value["buckets"]):
+                        lines.append(f"{name}_bucket{_format_labels({**labels, 'le': _format_value(bound)})} {count}")
+                    lines.append(f"{name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {value['count']}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(value['sum'])}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {value['count']}")
+                else:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+def _add_cache_hit_ratios(aggregated: Dict):
+    """Calcula la tasa de aciertos de cada caché a partir de los contadores ya sumados"""
+    hits = aggregated.get('cache_hits_total', {})
+    misses = aggregated.get('cache_misses_total', {})
+    ratios = {}
+    for key in set(hits) | set(misses):
+        lookups = hits.get(key, 0) + misses.get(key, 0)
+        ratios[key] = hits.get(key, 0) / lookups if lookups else 0.0
+    if ratios:
+        aggregated['cache_hit_ratio'] = ratios
+
+def _escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(labels: Dict) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape_label(value)}"' for key, value in sorted(labels.items())) + '}'
+
+def _format_value(value: float) -> str:
+    if isinstance(value, float) and math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+# Registro global del proceso (la base se comparte entre workers)
+metrics = MetricsRegistry(db_file=os.getenv('METRICS_DB', 'metrics.db'))
+
+metrics.describe('http_requests_total', COUNTER, "Peticiones HTTP atendidas por ruta, método y estado")
+metrics.describe('http_request_duration_seconds', HISTOGRAM, "Latencia de las peticiones HTTP por ruta")
+metrics.describe('http_requests_in_flight', GAUGE, "Peticiones HTTP en curso")
+metrics.describe('upstream_requests_total', COUNTER,
+                 "Llamadas a proveedores externos por proveedor, familia de endpoint y resultado")
+metrics.describe('upstream_request_duration_seconds', HISTOGRAM,
+                 "Latencia de cada intento de llamada a un proveedor externo")
+metrics.describe('upstream_rate_limit_events_total', COUNTER,
+                 "Eventos del límite de tasa y reintentos por proveedor (retries, throttled, queued...)")
+metrics.describe('upstream_queue_wait_seconds_total', COUNTER,
+                 "Segundos esperando un token del límite de tasa por proveedor")
+metrics.describe('circuit_breaker_state', GAUGE,
+                 "Estado del circuito por proveedor (0 cerrado, 1 half-open, 2 abierto; peor worker)",
+                 aggregate='max')
+metrics.describe('circuit_breaker_events_total', COUNTER, "Fallos, llamadas lentas, rechazos y aperturas por circuito")
+metrics.describe('cache_hits_total', COUNTER, "Aciertos por caché")
+metrics.describe('cache_misses_total', COUNTER, "Fallos por caché")
+metrics.describe('cache_evictions_total', COUNTER, "Entradas evictadas por caché")
+metrics.describe('cache_entries', GAUGE, "Entradas en la caché (máximo entre workers)", aggregate='max')
+metrics.describe('cache_hit_ratio', GAUGE, "Tasa de aciertos por caché (todos los workers)")
+metrics.describe('job_queue_jobs', GAUGE, "Trabajos en la cola por estado", aggregate='max')
+metrics.describe('hubspot_mirror_sync_lag_seconds', GAUGE,
+                 "Segundos desde el último sync exitoso de la réplica de HubSpot por tipo", aggregate='max')
+metrics.describe('hubspot_mirror_objects', GAUGE, "Objetos en la réplica de HubSpot por tipo", aggregate='max')
+metrics.describe('hubspot_mirror_synced_total', COUNTER, "Objetos traídos de HubSpot a la réplica por tipo")
+metrics.describe('hubspot_mirror_sync_errors_total', COUNTER, "Pasadas del sync de la réplica fallidas por tipo")
+metrics.describe('hubspot_mirror_reads_total', COUNTER,
+                 "Lecturas de contacto en la réplica por resultado (hit, miss, stale, lagging)")
+
+@contextmanager
+def track_upstream(provider: str, endpoint: str):
+    """
+    Mide una llamada a un proveedor externo
+
+    El bloque puede fijar outcome["status"] (ej: código HTTP); una excepción se registra como 'error'
+
+    Args:
+        provider (str): Proveedor (hubspot, apollo, openai, resend)
+        endpoint (str): Familia de endpoint (ver endpoint_family)
+
+    Yields:
+        Dict: outcome, con status 'ok' por defecto
+    """
+    started = time.monotonic()
+    outcome = {"status": "ok"}
+    try:
+        yield outcome
+    except Exception:
+        outcome["status"] = "error"
+        raise
+    finally:
+        labels = {"provider": provider, "endpoint": endpoint}
+        metrics.inc('upstream_requests_total', {**labels, "status": str(outcome["status"])})
+        metrics.observe('upstream_request_duration_seconds', time.monotonic() - started, labels)
+
+_BREAKER_STATE_VALUES = {STATE_CLOSED: 0, STATE_HALF_OPEN: 1, STATE_OPEN: 2}
+_PROVIDER_EVENTS = ['calls', 'attempts', 'retries', 'throttled', 'server_errors', 'connection_errors',
+                    'queued', 'queue_timeouts']
+_BREAKER_EVENTS = ['calls', 'failures', 'slow_calls', 'rejected', 'opened']
+
+def _collect_process_stats() -> List[Tuple]:
+    """Contadores de límite de tasa, circuitos y cachés del proceso"""
+    samples = []
+
+    for name, stats in get_provider_stats().items():
+        for event in _PROVIDER_EVENTS:
+            samples.append(('upstream_rate_limit_events_total', {"provider": name, "event": event}, stats[event]))
+        samples.append(('upstream_queue_wait_seconds_total', {"provider": name}, stats['queue_wait_seconds']))
+
+    for name, stats in get_breaker_stats().items():
+        samples.append(('circuit_breaker_state', {"breaker": name}, _BREAKER_STATE_VALUES[stats['state']]))
+        for event in _BREAKER_EVENTS:
+            samples.append(('circuit_breaker_events_total', {"breaker": name, "event": event}, stats[event]))
+
+    for name, stats in get_cache_stats().items():
+        labels = {"cache": name}
+        samples.append(('cache_hits_total', labels, stats['hits']))
+        samples.append(('cache_misses_total', labels, stats['misses']))
+        samples.append(('cache_evictions_total', labels, stats['evictions']))
+        samples.append(('cache_entries', labels, stats['size']))
+
+    return samples
+
+metrics.register_collector(_collect_process_stats)
@@ -0,0 +1,307 @@
+"""
+Capa compartida de llamadas salientes: token bucket por proveedor y reintentos con backoff
+Respeta Retry-After en 429 y encola (espera un token) en lugar de fallar ante ráfagas
+"""
+
+import os
+import time
+import random
+import threading
+import logging
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Estados HTTP que indican saturación o fallo transitorio del proveedor
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class RateLimitExceeded(Exception):
+    """No hubo token disponible dentro de la espera máxima permitida"""
+
+class TokenBucket:
+    """
+    Token bucket con reservas: cada llamador reserva un token y espera su turno
+
+    Los tokens pueden quedar en negativo; así los llamadores concurrentes se
+    ordenan en cola en lugar de competir por el mismo token.
+    """
+
+    def __init__(self, rate: float, capacity: float, name: str = "bucket"):
+        """
+        Inicializa el bucket
+
+        Args:
+            rate (float): Tokens por segundo
+            capacity (float): Ráfaga máxima
+            name (str): Nombre para logs
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.name = name
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, max_wait: float) -> Optional[float]:
+        """
+        Reserva un token
+
+        Args:
+            max_wait (float): Segundos máximos que el llamador acepta esperar
+
+        Returns:
+            float o None: Segundos a esperar antes de llamar, o None si excede max_wait
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            wait = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+            if wait > max_wait:
+                return None
+            self._tokens -= 1
+            return wait
+
+    def release(self):
+        """Devuelve un token reservado que no se usó (ej: otro límite de la misma llamada la rechazó)"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens + 1)
+
+    def penalize(self, seconds: float):
+        """Vacía el bucket para que nadie llame durante los próximos segundos (ej: tras un 429)"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Interpreta el header Retry-After (segundos o fecha HTTP)
+
+    Args:
+        value (str): Valor del header
+
+    Returns:
+        float o None: Segundos a esperar
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+class OutboundProvider:
+    """
+    Política de llamadas salientes de un proveedor: límite de tasa, reintentos y contadores
+    """
+
+    def __init__(self, name: str, rate: float, burst: float, max_retries: int = 3,
+                 backoff_base: float = 0.5, backoff_max: float = 30.0, max_queue_wait: float = 30.0):
+        """
+        Inicializa el proveedor
+
+        Args:
+            name (str): Nombre del proveedor (ej: hubspot)
+            rate (float): Peticiones por segundo permitidas en este proceso (ver per_process_limit)
+            burst (float): Ráfaga máxima de peticiones
+            max_retries (int): Reintentos tras 429, 5xx o errores de conexión
+            backoff_base (float): Segundos base del backoff exponencial
+            backoff_max (float): Espera máxima entre intentos; un Retry-After mayor no se reintenta
+            max_queue_wait (float): Segundos máximos esperando un token antes de fallar
+        """
+        self.name = name
+        self.bucket = TokenBucket(rate, burst, name=name)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_queue_wait = max_queue_wait
+
+        self._lock = threading.Lock()
+        self._counters = {
+            "calls": 0,
+            "attempts": 0,
+            "retries": 0,
+            "throttled": 0,
+            "server_errors": 0,
+            "connection_errors": 0,
+            "queued": 0,
+            "queue_timeouts": 0,
+            "queue_wait_seconds": 0.0
+        }
+
+    def _count(self, counter: str, amount: float = 1):
+        with self._lock:
+            self._counters[counter] += amount
+
+    def _acquire(self, buckets: List[TokenBucket]):
+        """
+        Espera un token de cada bucket aplicable (proveedor y, si hay, endpoint)
+
+        Se reservan todos antes de esperar; si uno no tiene capacidad se devuelven los ya
+        reservados para que una llamada rechazada no consuma cupo del proveedor
+        """
+        reserved = []
+        wait = 0.0
+        for bucket in buckets:
+            bucket_wait = bucket.reserve(self.max_queue_wait)
+            if bucket_wait is None:
+                for taken in reserved:
+                    taken.release()
+                self._count("queue_timeouts")
+                raise RateLimitExceeded(
+                    f"Límite de tasa de {self.name} ({bucket.name}): sin capacidad en {self.max_queue_wait}s"
+                )
+            reserved.append(bucket)
+            wait = max(wait, bucket_wait)
+
+        if wait > 0:
+            self._count("queued")
+            self._count("queue_wait_seconds", wait)
+            time.sleep(wait)
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        if retry_after is not None:
+            # Retry-After es un mínimo: se agrega un poco de jitter para no volver todos a la vez
+            return retry_after + random.uniform(0, self.backoff_base)
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+    def call(self, fn: Callable[[], Any], should_retry: Callable[[Any, Optional[Exception]], Optional[Dict]],
+             extra_buckets: Optional[List[TokenBucket]] = None) -> Any:
+        """
+        Ejecuta una llamada respetando el límite de tasa y reintentando fallos transitorios
+
+        Args:
+            fn (Callable): Realiza la llamada al proveedor
+            should_retry (Callable): Recibe (resultado, excepción) y retorna None si no se debe
+                                     reintentar, o {"reason": str, "retry_after": float o None}
+            extra_buckets (List[TokenBucket]): Límites adicionales (ej: por endpoint)
+
+        Returns:
+            Any: Resultado de la última llamada (la excepción se propaga si el último intento falló)
+        """
+        self._count("calls")
+        buckets = [self.bucket] + list(extra_buckets or [])
+        attempt = 0
+
+        while True:
+            attempt += 1
+            self._acquire(buckets)
+            self._count("attempts")
+
+            result, error = None, None
+            try:
+                result = fn()
+            except Exception as e:
+                error = e
+
+            decision = should_retry(result, error)
+            if decision is None:
+                if error is not None:
+                    raise error
+                return result
+
+            reason = decision.get("reason")
+            retry_after = decision.get("retry_after")
+            if reason in self._counters:
+                self._count(reason)
+
+            if reason == "throttled":
+                # Un 429 afecta a todos los llamadores del proceso, no solo a este
+                for bucket in buckets:
+                    bucket.penalize(retry_after if retry_after is not None else self.backoff_base)
+
+            if attempt > self.max_retries or (retry_after is not None and retry_after > self.backoff_max):
+                logger.warning(f"⚠️ {self.name}: sin más reintentos tras {attempt} intentos ({reason})")
+                if error is not None:
+                    raise error
+                return result
+
+            delay = self._backoff(attempt, retry_after)
+            self._count("retries")
+            logger.warning(f"🔁 {self.name}: {reason}, reintento {attempt}/{self.max_retries} en {delay:.2f}s")
+            time.sleep(delay)
+
+    def stats(self) -> Dict:
+        """Retorna los contadores del proveedor"""
+        with self._lock:
+            counters = dict(self._counters)
+        counters["queue_wait_seconds"] = round(counters["queue_wait_seconds"], 3)
+        return {
+            "name": self.name,
+            "rate": self.bucket.rate,
+            "burst": self.bucket.capacity,
+            **counters
+        }
+
+# Registro de proveedores del proceso para exponer sus contadores
+_providers = {}
+_providers_lock = threading.Lock()
+
+def process_count() -> int:
+    """Procesos que comparten la cuenta de cada proveedor (WEB_CONCURRENCY, fijado por gunicorn.conf.py)"""
+    try:
+        return max(1, int(os.getenv('WEB_CONCURRENCY', 1)))
+    except ValueError:
+        return 1
+
+def per_process_limit(account_limit: float) -> float:
+    """
+    Reparte un límite por cuenta entre los procesos worker
+
+    Los token buckets viven en memoria de cada proceso: con N workers cada uno recibe 1/N del límite
+    para que entre todos no superen el límite publicado del proveedor
+
+    Args:
+        account_limit (float): Peticiones por segundo (o ráfaga) permitidas para toda la cuenta
+
+    Returns:
+        float: Límite de este proceso
+    """
+    return account_limit / process_count()
+
+def provider_from_env(prefix: str, default_rate: float, default_burst: float) -> OutboundProvider:
+    """
+    Crea (o retorna, si ya existe) el proveedor configurado por variables de entorno
+
+    Variables (con prefijo, ej: HUBSPOT_):
+        {prefix}RATE_LIMIT, {prefix}RATE_BURST, {prefix}MAX_RETRIES, {prefix}MAX_QUEUE_WAIT
+
+    RATE_LIMIT y RATE_BURST son por cuenta: cada proceso usa su parte (per_process_limit);
+    la ráfaga nunca baja de un token
+
+    Args:
+        prefix (str): Prefijo de las variables de entorno
+        default_rate (float): Peticiones por segundo según los límites publicados del proveedor
+        default_burst (float): Ráfaga por defecto para toda la cuenta
+
+    Returns:
+        OutboundProvider: Proveedor compartido por todos los clientes con ese prefijo
+    """
+    name = prefix.rstrip('_').lower()
+    with _providers_lock:
+        if name not in _providers:
+            _providers[name] = OutboundProvider(
+                name,
+                rate=per_process_limit(float(os.getenv(f'{prefix}RATE_LIMIT', default_rate))),
+                burst=max(1.0, per_process_limit(float(os.getenv(f'{prefix}RATE_BURST', default_burst)))),
+                max_retries=int(os.getenv(f'{prefix}MAX_RETRIES', 3)),
+                max_queue_wait=float(os.getenv(f'{prefix}MAX_QUEUE_WAIT', 30))
+            )
+        return _providers[name]
+
+def get_provider_stats() -> Dict:
+    """Retorna los contadores de todos los proveedores registrados"""
+    with _providers_lock:
+        providers = list(_providers.values())
+    return {provider.name: provider.stats() for provider in providers}
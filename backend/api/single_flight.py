@@ -0,0 +1,91 @@
+"""
+Coalescencia de peticiones concurrentes (single-flight)
+Los llamadores que piden la misma clave al mismo tiempo comparten una sola llamada al proveedor
+"""
+
+import copy
+import threading
+import logging
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+class _InFlightCall:
+    """Llamada en curso compartida por todos los llamadores de una clave"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Ejecuta una sola vez una función por clave mientras haya llamadores concurrentes
+
+    El primer llamador (líder) ejecuta la función; los demás esperan y reciben
+    una copia del resultado o la misma excepción. Al terminar, la clave se libera y
+    la siguiente petición vuelve a llamar al proveedor.
+    """
+
+    def __init__(self, name: str = "single_flight"):
+        """
+        Inicializa el grupo
+
+        Args:
+            name (str): Nombre del grupo para logs y métricas
+        """
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._executed = 0
+        self._shared = 0
+
+    def do(self, key: str, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Ejecuta fn(*args, **kwargs) o se une a la ejecución en curso para la misma clave
+
+        Args:
+            key (str): Clave de coalescencia (ej: dominio o email normalizado)
+            fn (Callable): Función que llama al proveedor
+
+        Returns:
+            Any: Resultado de la función
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _InFlightCall()
+                self._calls[key] = call
+                self._executed += 1
+            else:
+                self._shared += 1
+
+        if not is_leader:
+            logger.info(f"🔗 {self.name}: esperando petición en curso para {key}")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            # Copia propia: un seguidor que modifica el resultado no altera el del líder ni el de los demás
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def stats(self) -> Dict:
+        """Retorna los contadores del grupo"""
+        with self._lock:
+            return {
+                "name": self.name,
+                "in_flight": len(self._calls),
+                "executed": self._executed,
+                "shared": self._shared
+            }
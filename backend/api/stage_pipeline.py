@@ -0,0 +1,151 @@
+"""
+Pipeline de etapas con dependencias y presupuesto de latencia por petición
+Las etapas independientes corren en paralelo; cada etapa empieza en cuanto sus dependencias terminan
+"""
+
+import os
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Estados de una etapa
+STAGE_OK = 'ok'
+STAGE_ERROR = 'error'
+STAGE_TIMEOUT = 'timeout'
+
+# Workers compartidos por todos los pipelines del proceso
+PIPELINE_WORKERS = int(os.getenv('PIPELINE_WORKERS', 16))
+
+# Las etapas se envían en orden de declaración (dependencias primero), así una etapa que
+# espera a otra nunca ocupa el worker que su dependencia necesita para arrancar
+_pipeline_executor = ThreadPoolExecutor(max_workers=PIPELINE_WORKERS, thread_name_prefix='pipeline')
+
+class _Stage:
+    """Etapa declarada en el pipeline"""
+
+    def __init__(self, name: str, fn: Callable, depends_on: List[str], timeout: Optional[float]):
+        self.name = name
+        self.fn = fn
+        self.depends_on = depends_on
+        self.timeout = timeout
+        self.deadline = None
+        self.future = None
+
+class StagePipeline:
+    """
+    Ejecuta un grupo de etapas con dependencias dentro de un presupuesto de latencia
+
+    Una etapa que no termina antes de su deadline se reporta como 'timeout' y el
+    pipeline retorna sin esperarla (resultado parcial). Las etapas que dependen de
+    ella reciben None en lugar de su resultado.
+    """
+
+    def __init__(self, budget: float, name: str = "pipeline"):
+        """
+        Inicializa el pipeline
+
+        Args:
+            budget (float): Presupuesto total de la petición en segundos
+            name (str): Nombre del pipeline para logs
+        """
+        self.budget = budget
+        self.name = name
+        self._stages = {}
+
+    def add_stage(self, name: str, fn: Callable, depends_on: Optional[List[str]] = None,
+                  timeout: Optional[float] = None) -> 'StagePipeline':
+        """
+        Declara una etapa
+
+        Args:
+            name (str): Nombre de la etapa
+            fn (Callable): Función de la etapa; recibe los resultados de sus dependencias en orden
+            depends_on (List[str]): Etapas declaradas previamente cuyo resultado necesita
+            timeout (float): Deadline propio de la etapa en segundos (acotado por el presupuesto)
+
+        Returns:
+            StagePipeline: El mismo pipeline, para encadenar declaraciones
+        """
+        depends_on = list(depends_on or [])
+        for dependency in depends_on:
+            if dependency not in self._stages:
+                raise ValueError(f"La etapa {name} depende de {dependency}, que no fue declarada antes")
+
+        self._stages[name] = _Stage(name, fn, depends_on, timeout)
+        return self
+
+    def run(self) -> Dict:
+        """
+        Ejecuta las etapas y espera hasta que terminen o venza su deadline
+
+        Returns:
+            Dict: {"values": resultado por etapa (None si falló o no llegó a tiempo),
+                   "stages": estado y tiempos por etapa, "total_ms", "partial"}
+        """
+        started = time.monotonic()
+        request_deadline = started + self.budget
+
+        for stage in self._stages.values():
+            stage.deadline = request_deadline
+            if stage.timeout is not None:
+                stage.deadline = min(request_deadline, started + stage.timeout)
+
+            dependencies = [self._stages[dependency] for dependency in stage.depends_on]
+            stage.future = _pipeline_executor.submit(self._run_stage, stage, dependencies, started)
+
+        values = {}
+        stages = {}
+        for stage in self._stages.values():
+            outcome = self._wait_outcome(stage)
+            if outcome is None:
+                elapsed_ms = round((time.monotonic() - started) * 1000, 1)
+                logger.warning(f"⏱️ {self.name}: etapa {stage.name} excedió su deadline ({elapsed_ms} ms)")
+                outcome = {"status": STAGE_TIMEOUT, "value": None, "elapsed_ms": elapsed_ms}
+
+            values[stage.name] = outcome.pop("value")
+            stages[stage.name] = outcome
+
+        total_ms = round((time.monotonic() - started) * 1000, 1)
+        partial = any(stage['status'] != STAGE_OK for stage in stages.values())
+        logger.info(f"⏱️ {self.name}: {total_ms} ms, etapas: "
+                    + ", ".join(f"{name}={stage['status']}/{stage['elapsed_ms']}ms" for name, stage in stages.items()))
+
+        return {
+            "values": values,
+            "stages": stages,
+            "total_ms": total_ms,
+            "partial": partial
+        }
+
+    @staticmethod
+    def _wait_outcome(stage: _Stage) -> Optional[Dict]:
+        """Espera el resultado de una etapa hasta su deadline; None si no terminó a tiempo"""
+        try:
+            return dict(stage.future.result(timeout=max(0.0, stage.deadline - time.monotonic())))
+        except FutureTimeoutError:
+            return None
+
+    def _run_stage(self, stage: _Stage, dependencies: List[_Stage], started: float) -> Dict:
+        """Espera las dependencias de la etapa y la ejecuta"""
+        dependency_values = []
+        for dependency in dependencies:
+            outcome = self._wait_outcome(dependency)
+            dependency_values.append(outcome['value'] if outcome and outcome['status'] == STAGE_OK else None)
+
+        stage_started = time.monotonic()
+        outcome = {"started_ms": round((stage_started - started) * 1000, 1)}
+
+        try:
+            outcome["value"] = stage.fn(*dependency_values)
+            outcome["status"] = STAGE_OK
+        except Exception as e:
+            logger.error(f"❌ {self.name}: error en etapa {stage.name}: {str(e)}")
+            outcome["value"] = None
+            outcome["status"] = STAGE_ERROR
+            outcome["error"] = str(e)
+
+        outcome["elapsed_ms"] = round((time.monotonic() - stage_started) * 1000, 1)
+        return outcome
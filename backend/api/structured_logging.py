@@ -0,0 +1,125 @@
+"""
+Logging estructurado con campos acotados y muestreo de payloads grandes
+Formato texto (por defecto) o una línea JSON por evento (LOG_FORMAT=json); los payloads se
+resumen en INFO y su contenido, truncado, solo se registra en DEBUG para una muestra de eventos
+"""
+
+import os
+import sys
+import json
+import random
+import reprlib
+import logging
+from typing import Any, Dict
+
+# Formato de salida: 'text' o 'json'
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text').lower()
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+
+# Caracteres máximos por campo y por mensaje
+LOG_MAX_FIELD_CHARS = int(os.getenv('LOG_MAX_FIELD_CHARS', 300))
+LOG_MAX_MESSAGE_CHARS = int(os.getenv('LOG_MAX_MESSAGE_CHARS', 2000))
+
+# Fracción de eventos cuyo payload (truncado) se registra en DEBUG
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv('LOG_PAYLOAD_SAMPLE_RATE', 0.01))
+
+# repr acotado: el costo no depende del tamaño del valor (ej: una transcripción completa)
+_bounded_repr = reprlib.Repr()
+_bounded_repr.maxlevel = 3
+_bounded_repr.maxdict = 10
+_bounded_repr.maxlist = 10
+_bounded_repr.maxstring = LOG_MAX_FIELD_CHARS
+_bounded_repr.maxother = LOG_MAX_FIELD_CHARS
+
+def cap(value: Any, limit: int = LOG_MAX_FIELD_CHARS) -> Any:
+    """
+    Acota un valor para registrarlo
+
+    Args:
+        value (Any): Valor a registrar
+        limit (int): Caracteres máximos
+
+    Returns:
+        Any: Números, booleanos y None sin cambios; el resto como texto de hasta limit caracteres
+    """
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    text = value if isinstance(value, str) else _bounded_repr.repr(value)
+    if len(text) > limit:
+        return f"{text[:limit]}…(+{len(text) - limit} caracteres)"
+    return text
+
+def payload_summary(payload: Any) -> Dict:
+    """Resumen de tamaño constante de un payload (claves o número de elementos)"""
+    if isinstance(payload, dict):
+        return {"keys": ",".join(sorted(str(key) for key in list(payload)[:20]))}
+    if isinstance(payload, (list, tuple)):
+        return {"items": len(payload)}
+    if isinstance(payload, str):
+        return {"chars": len(payload)}
+    return {"type": type(payload).__name__}
+
+def log_payload(logger: logging.Logger, message: str, payload: Any, level: int = logging.INFO, **fields):
+    """
+    Registra un evento con un resumen del payload y, para una muestra en DEBUG, su contenido truncado
+
+    Args:
+        logger (logging.Logger): Logger del módulo
+        message (str): Mensaje del evento
+        payload (Any): Payload completo (no se serializa salvo en la muestra de DEBUG)
+        level (int): Nivel del evento resumido
+        **fields: Campos adicionales del evento (ej: conversation_id)
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, message, extra={"fields": {**payload_summary(payload), **fields}})
+
+    if logger.isEnabledFor(logging.DEBUG) and random.random() < LOG_PAYLOAD_SAMPLE_RATE:
+        logger.debug("%s (muestra del payload)", message, extra={"fields": {"payload": payload}})
+
+def _record_fields(record: logging.LogRecord) -> Dict:
+    fields = getattr(record, 'fields', None) or {}
+    return {key: cap(value) for key, value in fields.items()}
+
+class TextFormatter(logging.Formatter):
+    """Formato de texto de siempre, con los campos estructurados al final (clave=valor)"""
+
+    def __init__(self):
+        super().__init__('%(levelname)s:%(name)s:%(message)s')
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = cap(super().format(record), LOG_MAX_MESSAGE_CHARS)
+        fields = _record_fields(record)
+        if fields:
+            line += " | " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+class JSONFormatter(logging.Formatter):
+    """Una línea JSON por evento con timestamp, nivel, logger, mensaje, PID y campos"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": cap(record.getMessage(), LOG_MAX_MESSAGE_CHARS),
+            "pid": record.process
+        }
+        entry.update(_record_fields(record))
+        if record.exc_info:
+            entry["exc"] = cap(self.formatException(record.exc_info), LOG_MAX_MESSAGE_CHARS)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+def configure_logging():
+    """
+    Configura el logger raíz según LOG_FORMAT y LOG_LEVEL
+
+    Igual que logging.basicConfig, no hace nada si el logger raíz ya tiene handlers
+    """
+    root = logging.getLogger()
+    if root.handlers:
+        return
+
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JSONFormatter() if LOG_FORMAT == 'json' else TextFormatter())
+    root.addHandler(handler)
+    root.setLevel(LOG_LEVEL)
@@ -1,16 +1,33 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, send_file, g
 from flask_cors import CORS
 import os
+import re
+import json
+import time
 import logging
 import resend
-import requests
 from datetime import datetime
 from dotenv import load_dotenv
 from api.apollo import enrich_company_data
-from api.hubspot import enrich_prospect_with_hubspot_data, get_contact_info, create_conversation_engagement
+from api.hubspot import (
+    enrich_prospect_with_hubspot_data, get_contact_info, create_conversation_engagement,
+    find_conversation_call, build_contact_properties, upsert_contact, EngagementReadError,
+    HUBSPOT_MIRROR_ENABLED
+)
+from api.hubspot_sync import mirror_sync_worker
 from storage.conversation_storage import conversation_storage
-from agents.conversation_analyzer import conversation_analyzer
+from storage.job_queue import job_queue, STATUS_DONE, STATUS_FAILED
+from storage.idempotency_store import webhook_idempotency
+from agents.conversation_analyzer import get_conversation_analyzer, ConversationAnalysisError
 from api.hubspot_fields import update_contact_pain_field, validate_pain_value
+from api.stage_pipeline import StagePipeline
+from api.rate_limiter import provider_from_env, get_provider_stats
+from api.circuit_breaker import get_breaker_stats
+from api.metrics import metrics, track_upstream
+from api.structured_logging import configure_logging, log_payload
+from api.bulk_import import (
+    run_bulk_import, parse_rows, detect_format, BULK_IMPORT_MAX_ROWS, BULK_IMPORT_RESULTS_DIR
+)
 
 # Cargar variables de entorno desde .env
 load_dotenv()
@@ -27,14 +44,45 @@ CORS(app, origins=[
     'https://*.vercel.app'  # Cualquier subdominio de Vercel
 ])
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO)
+# Configurar logging (LOG_FORMAT=text|json, LOG_LEVEL)
+configure_logging()
 logger = logging.getLogger(__name__)
 
+@app.before_request
+def start_request_metrics():
+    g.request_started = time.monotonic()
+    metrics.inc('http_requests_in_flight')
+
+@app.after_request
+def record_request_metrics(response):
+    """Cuenta y mide cada petición por plantilla de ruta (ej: /api/conversation/<conversation_id>/status)"""
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    started = g.get('request_started')
+    
+    metrics.inc('http_requests_total', {"route": route, "method": request.method, "status": str(response.status_code)})
+    if started is not None:
+        metrics.observe('http_request_duration_seconds', time.monotonic() - started,
+                        {"route": route, "method": request.method})
+    return response
+
+@app.teardown_request
+def finish_request_metrics(error=None):
+    if g.pop('request_started', None) is not None:
+        metrics.inc('http_requests_in_flight', amount=-1)
+
+def collect_job_queue_depth():
+    """Trabajos por estado en la cola compartida por todos los workers"""
+    return [('job_queue_jobs', {"status": status}, total) for status, total in job_queue.queue_depth().items()]
+
+metrics.register_collector(collect_job_queue_depth, shared=True)
+
 # Configuración de Resend
 RESEND_API_KEY = os.getenv('RESEND_API_KEY')
 FROM_EMAIL = os.getenv('FROM_EMAIL')
 
+# Límite publicado de Resend: 2 peticiones por segundo (RESEND_RATE_LIMIT, RESEND_RATE_BURST)
+resend_provider = provider_from_env('RESEND_', default_rate=2, default_burst=2)
+
 # Configuración de HubSpot
 HUBSPOT_API_KEY = os.getenv('HUBSPOT_API_KEY')
 HUBSPOT_PORTAL_ID = os.getenv('HUBSPOT_PORTAL_ID')
@@ -42,11 +90,23 @@ HUBSPOT_PORTAL_ID = os.getenv('HUBSPOT_PORTAL_ID')
 # Link de reunión de HubSpot
 HUBSPOT_MEETING_LINK = "https://meetings.hubspot.com/diego-bustamante1?uuid=1867c207-8b62-46dd-9a59-a942352c3dd2"
 
+# Presupuesto de latencia de create_prospect / enrich-prospect y deadline de cada enriquecimiento (segundos)
+PROSPECT_LATENCY_BUDGET = float(os.getenv('PROSPECT_LATENCY_BUDGET', 25))
+PROSPECT_ENRICHMENT_TIMEOUT = float(os.getenv('PROSPECT_ENRICHMENT_TIMEOUT', 10))
+
+# Procesamiento de transcripciones: 'async' (cola de trabajos, responde 202) o 'sync' (dentro del webhook)
+TRANSCRIPT_PROCESSING_MODE = os.getenv('TRANSCRIPT_PROCESSING_MODE', 'async')
+TRANSCRIPT_JOB_TYPE = 'conversation_transcript'
+
 @app.route('/webhook', methods=['POST'])
 def handle_webhook():
     try:
         data = request.json
-        logger.info(f"Webhook recibido: {data}")
+        # Solo un resumen: el cuerpo incluye la transcripción completa
+        log_payload(logger, "Webhook recibido", data,
+                    event_type=data.get('event_type'),
+                    conversation_id=data.get('conversation_id'),
+                    content_length=request.content_length)
         
         # Verificar si es una transcripción de conversación
         if 'transcript' in data['properties']:
@@ -60,24 +120,25 @@ def handle_webhook():
 
 def handle_conversation_transcript(data):
     """
-    Maneja el procesamiento de transcripciones de conversaciones
+    Maneja la recepción de transcripciones de conversaciones
+    
+    En modo async persiste la transcripción en la cola de trabajos y responde 202;
+    el análisis y las actualizaciones en HubSpot se ejecutan en los workers
     
     Args:
         data: Datos del webhook con transcript y replica_id
         
     Returns:
-        JSON response con el resultado del procesamiento
+        JSON response con el resultado del procesamiento o el trabajo encolado
     """
     try:
         replica_id = data['properties'].get('replica_id')
         transcript = data['properties'].get('transcript', [])
         conversation_id = data.get('conversation_id')
         
-        logger.info(f"🎙️ Procesando transcripción de conversación. Replica ID: {replica_id}")
+        logger.info(f"🎙️ Transcripción recibida. Replica ID: {replica_id}")
         
         # Buscar el mapeo conversation_id -> hubspot_id
-    
-        
         mapping = conversation_storage.get_mapping(conversation_id)
         
         if not mapping:
@@ -87,70 +148,50 @@ def handle_conversation_transcript(data):
                 "message": f"No se encontró información del prospecto para la conversación {conversation_id}"
             })
         
-        hubspot_id = mapping.get('hubspot_id')
-        prospect_data = mapping.get('prospect_data', {})
+        # Tavus reintenta webhooks: un evento ya recibido retorna el resultado original
+        fingerprint = webhook_idempotency.fingerprint(conversation_id, data.get('event_type', 'transcript'), transcript)
+        is_new, event_record = webhook_idempotency.claim(fingerprint, conversation_id)
         
-        logger.info(f"📋 Procesando conversación para contacto HubSpot: {hubspot_id}")
-        
-        # Analizar la transcripción con LangChain
-        logger.info("🤖 Iniciando análisis de transcripción con IA")
-        analysis = conversation_analyzer.analyze_conversation(transcript, prospect_data)
-        
-        # Validar y mapear el dolor identificado
-        pain_value = conversation_analyzer.get_pain_mapping(analysis.pain_point)
-        
-        if not validate_pain_value(pain_value):
-            logger.warning(f"⚠️ Valor de dolor inválido: {pain_value}")
-            pain_value = "No tengo CRM o siento que no lo aprovecho lo suficiente"  # Default
-        
-        # Actualizar el campo dolores_de_venta en HubSpot
-        logger.info(f"📝 Actualizando campo dolores_de_venta: {pain_value}")
-        pain_update_result = update_contact_pain_field(hubspot_id, pain_value)
-        
-        # Crear engagement de conversación en HubSpot
-        conversation_data = {
-            "title": f"Conversación con {prospect_data.get('nombres', '')} {prospect_data.get('apellidos', '')}",
-            "duration": len(transcript) * 30,  # Estimación de duración
-            "conversation_type": "video_call",
-            "ai_agent": "Wayne (SDR Triario)",
-            "engagement_score": analysis.qualification_score,
-            "company": prospect_data.get('compania', ''),
-            "job_title": prospect_data.get('rol', ''),
-            "pain_points": [analysis.pain_point],
-            "key_insights": analysis.key_insights,
-            "next_steps": analysis.next_steps,
-            "summary": analysis.summary,
-            "transcript": "\n".join([f"{msg.get('role', 'unknown')}: {msg.get('content', '')}" for msg in transcript]),
+        if not is_new:
+            duplicate_response = build_duplicate_webhook_response(event_record, conversation_id)
+            if duplicate_response is not None:
+                return duplicate_response
+            
+            # El procesamiento original falló o quedó abandonado: solo uno de los reintentos concurrentes lo retoma
+            if not webhook_idempotency.reclaim(fingerprint, event_record):
+                is_new, event_record = webhook_idempotency.claim(fingerprint, conversation_id)
+                if not is_new:
+                    return build_duplicate_webhook_response(event_record, conversation_id, allow_reprocess=False)
+        
+        # Hora de la llamada fija por evento (la del primer registro): los reintentos y reprocesos
+        # la reutilizan para reconocer una llamada ya creada en HubSpot
+        job_payload = {
             "conversation_id": conversation_id,
-            "follow_up_required": analysis.qualification_score >= 7
+            "replica_id": replica_id,
+            "transcript": transcript,
+            "call_timestamp": int(event_record['created_at'] * 1000)
         }
         
-        logger.info("📞 Creando engagement de conversación en HubSpot")
-        engagement_result = create_conversation_engagement(hubspot_id, conversation_data)
+        try:
+            if TRANSCRIPT_PROCESSING_MODE == 'sync':
+                result = process_conversation_transcript(job_payload)
+                webhook_idempotency.save_result(fingerprint, result)
+                return jsonify(result)
+            
+            job_id = job_queue.enqueue(TRANSCRIPT_JOB_TYPE, job_payload, job_key=conversation_id)
+            webhook_idempotency.attach_job(fingerprint, job_id)
         
-        # Preparar respuesta
-        response_data = {
-            "status": "success",
-            "message": "Conversación procesada exitosamente",
-            "conversation_id": conversation_id,
-            "hubspot_id": hubspot_id,
-            "analysis": {
-                "summary": analysis.summary,
-                "pain_point": pain_value,
-                "pain_confidence": analysis.pain_confidence,
-                "qualification_score": analysis.qualification_score,
-                "key_insights": analysis.key_insights,
-                "next_steps": analysis.next_steps
-            },
-            "updates": {
-                "pain_field_updated": pain_update_result.get('success', False),
-                "call_created": engagement_result.get('success', False),
-                "call_id": engagement_result.get('call_id')
-            }
-        }
+        except Exception:
+            webhook_idempotency.release(fingerprint)
+            raise
         
-        logger.info(f"✅ Conversación procesada exitosamente para {hubspot_id}")
-        return jsonify(response_data)
+        return jsonify({
+            "status": "accepted",
+            "message": "Transcripción recibida, procesamiento en cola",
+            "conversation_id": conversation_id,
+            "job_id": job_id,
+            "status_url": f"/api/conversation/{conversation_id}/processing"
+        }), 202
         
     except Exception as e:
         logger.error(f"Error procesando transcripción: {str(e)}")
@@ -159,6 +200,181 @@ def handle_conversation_transcript(data):
             "message": f"Error procesando transcripción: {str(e)}"
         }), 500
 
+def build_duplicate_webhook_response(event_record, conversation_id, allow_reprocess=True):
+    """
+    Construye la respuesta para un webhook duplicado a partir del procesamiento original
+    
+    Args:
+        event_record (dict): Registro del evento en el almacén de idempotencia
+        conversation_id (str): ID de la conversación
+        allow_reprocess (bool): False si otro reintento ya retomó el evento
+        
+    Returns:
+        Response o None: Respuesta original, o None si el original falló y debe reprocesarse
+    """
+    logger.info(f"♻️ Webhook duplicado para conversation_id: {conversation_id}")
+    
+    # Modo sync: el resultado quedó guardado con el evento
+    if event_record.get('result') is not None:
+        return jsonify({**event_record['result'], "duplicate": True})
+    
+    job = job_queue.get_job(event_record['job_id']) if event_record.get('job_id') else None
+    
+    if job and job['status'] == STATUS_DONE:
+        return jsonify({**(job['result'] or {}), "duplicate": True})
+    
+    if allow_reprocess:
+        # Falló definitivamente o el trabajo ya no existe: reprocesar
+        if event_record.get('job_id') and (job is None or job['status'] == STATUS_FAILED):
+            return None
+        
+        # Tomado sin resultado ni trabajo durante más de in_progress_timeout: el proceso original murió
+        if webhook_idempotency.is_abandoned(event_record):
+            return None
+    
+    if not job:
+        # Procesamiento en la petición original (modo sync), sin trabajo que consultar:
+        # un código no 2xx hace que Tavus reintente, y el reintento retoma el evento si quedó abandonado
+        return jsonify({
+            "status": "processing",
+            "message": "Transcripción ya recibida, procesamiento en curso; reintenta más tarde",
+            "conversation_id": conversation_id,
+            "duplicate": True
+        }), 409
+    
+    return jsonify({
+        "status": "accepted",
+        "message": "Transcripción ya recibida, procesamiento en curso",
+        "conversation_id": conversation_id,
+        "job_id": job['id'],
+        "status_url": f"/api/conversation/{conversation_id}/processing",
+        "duplicate": True
+    }), 202
+
+class TranscriptProcessingError(Exception):
+    """Fallo reintentable al procesar una transcripción (OpenAI o HubSpot)"""
+
+def process_conversation_transcript(job_payload):
+    """
+    Analiza una transcripción y actualiza HubSpot (dolor + llamada)
+    
+    Se ejecuta en los workers de la cola; una excepción provoca un reintento con backoff
+    
+    Args:
+        job_payload (dict): conversation_id, replica_id y transcript
+        
+    Returns:
+        dict: Resultado del procesamiento
+    
+    Raises:
+        TranscriptProcessingError: Falló OpenAI o una actualización en HubSpot (el trabajo se reintenta)
+    """
+    transcript = job_payload.get('transcript', [])
+    conversation_id = job_payload.get('conversation_id')
+    
+    logger.info(f"🎙️ Procesando transcripción de conversación. Replica ID: {job_payload.get('replica_id')}")
+    
+    mapping = conversation_storage.get_mapping(conversation_id)
+    
+    if not mapping:
+        logger.warning(f"⚠️ No se encontró mapeo para conversation_id: {conversation_id}")
+        return {
+            "status": "warning",
+            "message": f"No se encontró información del prospecto para la conversación {conversation_id}"
+        }
+    
+    hubspot_id = mapping.get('hubspot_id')
+    prospect_data = mapping.get('prospect_data', {})
+    
+    logger.info(f"📋 Procesando conversación para contacto HubSpot: {hubspot_id}")
+    
+    # Analizar la transcripción con LangChain
+    logger.info("🤖 Iniciando análisis de transcripción con IA")
+    conversation_analyzer = get_conversation_analyzer()
+    try:
+        analysis = conversation_analyzer.analyze_conversation(transcript, prospect_data, raise_on_error=True)
+    except ConversationAnalysisError as e:
+        raise TranscriptProcessingError(str(e)) from e
+    
+    # Validar y mapear el dolor identificado
+    pain_value = conversation_analyzer.get_pain_mapping(analysis.pain_point)
+    
+    if not validate_pain_value(pain_value):
+        logger.warning(f"⚠️ Valor de dolor inválido: {pain_value}")
+        pain_value = "No tengo CRM o siento que no lo aprovecho lo suficiente"  # Default
+    
+    # Actualizar el campo dolores_de_venta en HubSpot
+    logger.info(f"📝 Actualizando campo dolores_de_venta: {pain_value}")
+    pain_update_result = update_contact_pain_field(hubspot_id, pain_value)
+    
+    # Antes de crear la llamada: un reintento no debe duplicarla
+    if not pain_update_result.get('success'):
+        raise TranscriptProcessingError(f"No se pudo actualizar dolores_de_venta: {pain_update_result.get('error')}")
+    
+    # Crear engagement de conversación en HubSpot
+    conversation_data = {
+        "title": f"Conversación con {prospect_data.get('nombres', '')} {prospect_data.get('apellidos', '')}",
+        "duration": len(transcript) * 30,  # Estimación de duración
+        "conversation_type": "video_call",
+        "ai_agent": "Wayne (SDR Triario)",
+        "engagement_score": analysis.qualification_score,
+        "company": prospect_data.get('compania', ''),
+        "job_title": prospect_data.get('rol', ''),
+        "pain_points": [analysis.pain_point],
+        "key_insights": analysis.key_insights,
+        "next_steps": analysis.next_steps,
+        "summary": analysis.summary,
+        "transcript": "\n".join([f"{msg.get('role', 'unknown')}: {msg.get('content', '')}" for msg in transcript]),
+        "conversation_id": conversation_id,
+        "follow_up_required": analysis.qualification_score >= 7
+    }
+    
+    # Un intento anterior pudo crear la llamada y fallar después (timeout, worker caído): no duplicarla
+    call_timestamp = job_payload.get('call_timestamp')
+    existing_call_id = None
+    if call_timestamp:
+        conversation_data["timestamp"] = call_timestamp
+        try:
+            existing_call_id = find_conversation_call(hubspot_id, call_timestamp, conversation_data["title"])
+        except EngagementReadError as e:
+            raise TranscriptProcessingError(f"No se pudo verificar si la llamada ya existe: {str(e)}") from e
+    
+    if existing_call_id:
+        logger.info(f"♻️ La llamada de la conversación {conversation_id} ya existe en HubSpot: {existing_call_id}")
+        engagement_result = {"success": True, "call_id": existing_call_id}
+    else:
+        logger.info("📞 Creando engagement de conversación en HubSpot")
+        engagement_result = create_conversation_engagement(hubspot_id, conversation_data)
+    
+    if not engagement_result.get('success'):
+        raise TranscriptProcessingError(f"No se pudo crear la llamada en HubSpot: {engagement_result.get('error')}")
+    
+    # Preparar respuesta
+    response_data = {
+        "status": "success",
+        "message": "Conversación procesada exitosamente",
+        "conversation_id": conversation_id,
+        "hubspot_id": hubspot_id,
+        "analysis": {
+            "summary": analysis.summary,
+            "pain_point": pain_value,
+            "pain_confidence": analysis.pain_confidence,
+            "qualification_score": analysis.qualification_score,
+            "key_insights": analysis.key_insights,
+            "next_steps": analysis.next_steps
+        },
+        "updates": {
+            "pain_field_updated": pain_update_result.get('success', False),
+            "call_created": engagement_result.get('success', False),
+            "call_id": engagement_result.get('call_id')
+        }
+    }
+    
+    logger.info(f"✅ Conversación procesada exitosamente para {hubspot_id}")
+    return response_data
+
+job_queue.register_handler(TRANSCRIPT_JOB_TYPE, process_conversation_transcript)
+
 def execute_tool(tool_name, arguments):
     """Ejecuta la herramienta correspondiente basada en el nombre"""
     
@@ -294,6 +510,16 @@ def schedule_meeting(arguments):
         logger.error(f"Error enviando email: {str(e)}")
         return f"Error enviando email: {str(e)}"
 
+def resend_retry_decision(response, error):
+    """
+    Decide si se reintenta un envío de Resend
+    
+    Solo se reintentan los 429: un 5xx pudo haber enviado el email y reintentarlo lo duplicaría
+    """
+    if error is not None and str(getattr(error, 'code', '')) == '429':
+        return {"reason": "throttled", "retry_after": None}
+    return None
+
 def send_email(to_email, subject, text_body, html_body):
     """Envía un email usando Resend"""
     
@@ -310,14 +536,18 @@ def send_email(to_email, subject, text_body, html_body):
         # Configurar API key de Resend
         resend.api_key = RESEND_API_KEY
         
-        # Enviar el email
-        response = resend.Emails.send({
-            "from": FROM_EMAIL,
-            "to": [to_email],
-            "subject": subject,
-            "html": html_body,
-            "text": text_body
-        })
+        def send_attempt():
+            with track_upstream('resend', '/emails'):
+                return resend.Emails.send({
+                    "from": FROM_EMAIL,
+                    "to": [to_email],
+                    "subject": subject,
+                    "html": html_body,
+                    "text": text_body
+                })
+        
+        # Enviar el email (espera turno si se excede el límite de tasa de Resend)
+        response = resend_provider.call(send_attempt, resend_retry_decision)
         
         # Log detallado de la respuesta
         logger.info(f"Email enviado a {to_email}")
@@ -352,31 +582,41 @@ def create_prospect():
         else:
             logger.info("⚠️ No se proporcionó conversation_id")
         
-        # Enriquecer datos de la empresa con Apollo
-        apollo_enriched_data = None
+        # Apollo y la lectura de HubSpot corren en paralelo; la creación del contacto
+        # arranca en cuanto Apollo termina (o vence su deadline)
+        pipeline = StagePipeline(PROSPECT_LATENCY_BUDGET, name="create_prospect")
+        
         if data.get('websiteUrl'):
             logger.info(f"Enriqueciendo datos de empresa para dominio: {data['websiteUrl']}")
-            apollo_result = enrich_company_data(data['websiteUrl'])
-            
-            if apollo_result.get('success'):
-                apollo_enriched_data = apollo_result.get('data')
-                logger.info(f"✅ Datos de Apollo obtenidos para {data['compania']}")
-            else:
-                logger.warning(f"⚠️ No se pudieron enriquecer datos de Apollo: {apollo_result.get('error')}")
-        
-        # Enriquecer datos del prospecto con información de HubSpot
-        hubspot_enriched_data = None
+            pipeline.add_stage('apollo', lambda: enrich_company_data(data['websiteUrl'], profile='agent_context'),
+                               timeout=PROSPECT_ENRICHMENT_TIMEOUT)
+        
         logger.info(f"Enriqueciendo prospecto con datos de HubSpot: {data['emailCorporativo']}")
-        hubspot_result = enrich_prospect_with_hubspot_data(data)
+        pipeline.add_stage('hubspot_enrichment', lambda: enrich_prospect_with_hubspot_data(data, profile='agent_context'),
+                           timeout=PROSPECT_ENRICHMENT_TIMEOUT)
+        
+        def create_contact_stage(apollo_result=None):
+            apollo_data = apollo_result.get('data') if apollo_result and apollo_result.get('success') else None
+            return create_hubspot_contact(data, apollo_data)
+        
+        pipeline.add_stage('hubspot_contact', create_contact_stage,
+                           depends_on=['apollo'] if data.get('websiteUrl') else [])
         
-        if hubspot_result.get('success'):
-            hubspot_enriched_data = hubspot_result.get('data')
+        pipeline_result = pipeline.run()
+        stage_values = pipeline_result['values']
+        
+        apollo_enriched_data = stage_data(stage_values.get('apollo'), "Apollo")
+        if apollo_enriched_data:
+            logger.info(f"✅ Datos de Apollo obtenidos para {data['compania']}")
+        
+        hubspot_enriched_data = stage_data(stage_values['hubspot_enrichment'], "HubSpot")
+        if hubspot_enriched_data:
             logger.info(f"✅ Datos de HubSpot obtenidos para {data['emailCorporativo']}")
-        else:
-            logger.warning(f"⚠️ No se pudieron enriquecer datos de HubSpot: {hubspot_result.get('error')}")
         
-        # Crear contacto en HubSpot
-        hubspot_contact_result = create_hubspot_contact(data, apollo_enriched_data)
+        hubspot_contact_result = stage_values['hubspot_contact'] or {
+            "success": False,
+            "error": f"Creación del contacto: {pipeline_result['stages']['hubspot_contact']['status']}"
+        }
         
         if hubspot_contact_result.get('success'):
             hubspot_id = hubspot_contact_result.get('contact_id')
@@ -399,7 +639,10 @@ def create_prospect():
                 "message": "Prospecto creado exitosamente",
                 "hubspot_id": hubspot_id,
                 "conversation_id": conversation_id,
-                "prospect_data": data
+                "prospect_data": data,
+                "partial": pipeline_result['partial'],
+                "stage_timings": pipeline_result['stages'],
+                "total_ms": pipeline_result['total_ms']
             }
             
             # Incluir datos enriquecidos de Apollo si están disponibles
@@ -418,15 +661,37 @@ def create_prospect():
             return jsonify({
                 "status": "error",
                 "message": "Error creando prospecto en HubSpot",
-                "error": hubspot_contact_result.get('error')
+                "error": hubspot_contact_result.get('error'),
+                "stage_timings": pipeline_result['stages'],
+                "total_ms": pipeline_result['total_ms']
             }), 500
     
     except Exception as e:
         logger.error(f"Error procesando prospecto: {str(e)}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+def stage_data(stage_result, provider):
+    """
+    Extrae los datos de un resultado de enriquecimiento de una etapa del pipeline
+    
+    Args:
+        stage_result (dict): Resultado del proveedor, o None si la etapa falló o no llegó a tiempo
+        provider (str): Nombre del proveedor para logs
+    
+    Returns:
+        dict o None: Datos enriquecidos si la etapa fue exitosa
+    """
+    if stage_result is None:
+        return None
+    
+    if stage_result.get('success'):
+        return stage_result.get('data')
+    
+    logger.warning(f"⚠️ No se pudieron enriquecer datos de {provider}: {stage_result.get('error')}")
+    return None
+
 def create_hubspot_contact(prospect_data, enriched_data=None):
-    """Crea un contacto en HubSpot CRM con datos enriquecidos de Apollo"""
+    """Crea o actualiza (upsert por email) un contacto en HubSpot CRM con datos enriquecidos de Apollo"""
     
     if not HUBSPOT_API_KEY:
         logger.warning("API Key de HubSpot no configurada, simulando creación de contacto")
@@ -434,199 +699,77 @@ def create_hubspot_contact(prospect_data, enriched_data=None):
         return {"success": True, "contact_id": "simulated_contact_id"}
     
     try:
-        # URL de la API de HubSpot para crear contactos
-        url = f"https://api.hubapi.com/crm/v3/objects/contacts"
-        
-        # Headers para la API de HubSpot
-        headers = {
-            "Authorization": f"Bearer {HUBSPOT_API_KEY}",
-            "Content-Type": "application/json"
-        }
+        contact_properties = build_contact_properties(prospect_data, enriched_data)
         
-        # Preparar los datos del contacto
-        contact_properties = {
-            "email": prospect_data['emailCorporativo'],
-            "firstname": prospect_data['nombres'],
-            "lastname": prospect_data['apellidos'],
-            "company": prospect_data['compania'],
-            "jobtitle": prospect_data['rol'],
-            "website": prospect_data.get('websiteUrl', ''),
-            "hs_lead_status": "Unqualified",  # Valor válido según el error
-            "lifecyclestage": "lead"
-        }
-        
-        # Agregar datos enriquecidos de Apollo si están disponibles
         if enriched_data:
-            company_info = enriched_data.get('informacion_basica', {})
-            contact_info = enriched_data.get('contacto', {})
-            financial_info = enriched_data.get('financiera', {})
-            
-            # Información básica de la empresa (solo propiedades válidas para contactos)
-            if company_info.get('industria'):
-                # Mapear industria de Apollo a valores válidos de HubSpot
-                industry_mapping = {
-                    'farming': 'Consumo masivo',
-                    'agriculture': 'Consumo masivo',
-                    'agroindustria': 'Consumo masivo',
-                    'software': 'Software y tecnologías SaaS',
-                    'technology': 'Software y tecnologías SaaS',
-                    'healthcare': 'Servicios de salud',
-                    'finance': 'Servicios financieros',
-                    'construction': 'Construcción',
-                    'retail': 'Retail y ventas on-line'
-                }
-                mapped_industry = industry_mapping.get(company_info['industria'].lower(), 'Otro')
-                contact_properties['industry'] = mapped_industry
-            # Nota: description, num_employees, linkedin_company_page no existen en contactos
-            
-            # Información de contacto adicional
-            if contact_info.get('telefono'):
-                contact_properties['phone'] = contact_info['telefono']
-            if contact_info.get('direccion'):
-                contact_properties['address'] = contact_info['direccion']
-            
-            # Información financiera
-            if financial_info.get('ingresos_anuales'):
-                contact_properties['annualrevenue'] = financial_info['ingresos_anuales']
-            
             logger.info("Datos enriquecidos de Apollo agregados al contacto de HubSpot")
         
-        # Datos para enviar a HubSpot
-        payload = {
-            "properties": contact_properties
-        }
-        
-        # Realizar la petición a HubSpot
-        response = requests.post(url, headers=headers, json=payload)
-        
-        if response.status_code == 201:
-            contact_data = response.json()
-            contact_id = contact_data.get('id')
-            logger.info(f"✅ Contacto creado exitosamente en HubSpot. ID: {contact_id}")
-            return {"success": True, "contact_id": contact_id}
-        
-        elif response.status_code == 409:
-            # El contacto ya existe, intentar actualizarlo
-            logger.info(f"Contacto ya existe, intentando actualizar: {prospect_data['emailCorporativo']}")
-            return update_existing_hubspot_contact(prospect_data, enriched_data)
-        
-        else:
-            error_msg = f"Error de HubSpot API: {response.status_code} - {response.text}"
-            logger.error(error_msg)
-            return {"success": False, "error": error_msg}
+        # Una sola petición crea el contacto o actualiza el existente con el mismo email
+        return upsert_contact(contact_properties)
     
     except Exception as e:
         error_msg = f"Error creando contacto en HubSpot: {str(e)}"
         logger.error(error_msg)
         return {"success": False, "error": error_msg}
 
-def update_existing_hubspot_contact(prospect_data, enriched_data=None):
-    """Actualiza un contacto existente en HubSpot con datos enriquecidos"""
+@app.route('/api/prospects/bulk', methods=['POST'])
+def bulk_import_prospects():
+    """
+    Importa prospectos en bloque desde CSV o JSONL
     
+    Acepta un archivo en el campo 'file' (multipart) o el contenido en el cuerpo de la petición.
+    Responde en streaming (NDJSON) con eventos de progreso; el último evento incluye el resumen
+    y el import_id para descargar el resultado por fila en /api/prospects/bulk/<import_id>
+    """
     try:
-        # Primero buscar el contacto por email
-        search_url = f"https://api.hubapi.com/crm/v3/objects/contacts/search"
+        uploaded_file = request.files.get('file')
+        if uploaded_file:
+            content = uploaded_file.read().decode('utf-8-sig')
+            input_format = request.args.get('format') or detect_format(uploaded_file.filename, uploaded_file.content_type)
+        else:
+            content = request.get_data(as_text=True)
+            input_format = request.args.get('format') or detect_format(content_type=request.content_type)
         
-        headers = {
-            "Authorization": f"Bearer {HUBSPOT_API_KEY}",
-            "Content-Type": "application/json"
-        }
+        if not content.strip():
+            return jsonify({"error": "Se requiere un archivo CSV o JSONL con prospectos"}), 400
         
-        search_payload = {
-            "filterGroups": [{
-                "filters": [{
-                    "propertyName": "email",
-                    "operator": "EQ",
-                    "value": prospect_data['emailCorporativo']
-                }]
-            }],
-            "properties": ["id", "email", "firstname", "lastname"]
-        }
+        rows = parse_rows(content, input_format)
         
-        search_response = requests.post(search_url, headers=headers, json=search_payload)
+        if len(rows) > BULK_IMPORT_MAX_ROWS:
+            return jsonify({"error": f"Máximo {BULK_IMPORT_MAX_ROWS} filas por importación, recibidas {len(rows)}"}), 413
         
-        if search_response.status_code == 200:
-            search_data = search_response.json()
-            results = search_data.get('results', [])
-            
-            if results:
-                contact_id = results[0]['id']
-                
-                # Actualizar el contacto
-                update_url = f"https://api.hubapi.com/crm/v3/objects/contacts/{contact_id}"
-                
-                contact_properties = {
-                    "firstname": prospect_data['nombres'],
-                    "lastname": prospect_data['apellidos'],
-                    "company": prospect_data['compania'],
-                    "jobtitle": prospect_data['rol'],
-                    "website": prospect_data.get('websiteUrl', ''),
-                    "hs_lead_status": "Unqualified",  # Valor válido según el error
-                    "lifecyclestage": "lead"
-                }
-                
-                # Agregar datos enriquecidos de Apollo si están disponibles
-                if enriched_data:
-                    company_info = enriched_data.get('informacion_basica', {})
-                    contact_info = enriched_data.get('contacto', {})
-                    financial_info = enriched_data.get('financiera', {})
-                    
-                    # Información básica de la empresa (solo propiedades válidas para contactos)
-                    if company_info.get('industria'):
-                        # Mapear industria de Apollo a valores válidos de HubSpot
-                        industry_mapping = {
-                            'farming': 'Consumo masivo',
-                            'agriculture': 'Consumo masivo',
-                            'agroindustria': 'Consumo masivo',
-                            'software': 'Software y tecnologías SaaS',
-                            'technology': 'Software y tecnologías SaaS',
-                            'healthcare': 'Servicios de salud',
-                            'finance': 'Servicios financieros',
-                            'construction': 'Construcción',
-                            'retail': 'Retail y ventas on-line'
-                        }
-                        mapped_industry = industry_mapping.get(company_info['industria'].lower(), 'Otro')
-                        contact_properties['industry'] = mapped_industry
-                    # Nota: description, num_employees, linkedin_company_page no existen en contactos
-                    
-                    # Información de contacto adicional
-                    if contact_info.get('telefono'):
-                        contact_properties['phone'] = contact_info['telefono']
-                    if contact_info.get('direccion'):
-                        contact_properties['address'] = contact_info['direccion']
-                    
-                    # Información financiera
-                    if financial_info.get('ingresos_anuales'):
-                        contact_properties['annualrevenue'] = financial_info['ingresos_anuales']
-                    
-                    logger.info("Datos enriquecidos de Apollo agregados al contacto actualizado de HubSpot")
-                
-                update_payload = {
-                    "properties": contact_properties
-                }
-                
-                update_response = requests.patch(update_url, headers=headers, json=update_payload)
-                
-                if update_response.status_code == 200:
-                    logger.info(f"✅ Contacto actualizado exitosamente en HubSpot. ID: {contact_id}")
-                    return {"success": True, "contact_id": contact_id}
-                else:
-                    error_msg = f"Error actualizando contacto: {update_response.status_code} - {update_response.text}"
-                    logger.error(error_msg)
-                    return {"success": False, "error": error_msg}
-            else:
-                error_msg = "Contacto no encontrado para actualizar"
-                logger.error(error_msg)
-                return {"success": False, "error": error_msg}
-        else:
-            error_msg = f"Error buscando contacto: {search_response.status_code} - {search_response.text}"
-            logger.error(error_msg)
-            return {"success": False, "error": error_msg}
+        logger.info(f"📥 Importación masiva recibida: {len(rows)} filas ({input_format})")
+        
+        def generate_events():
+            try:
+                for event in run_bulk_import(rows):
+                    if event['event'] == 'done':
+                        # No exponer rutas del servidor: el resultado se descarga por import_id
+                        event.pop('results_file', None)
+                        event['results_url'] = f"/api/prospects/bulk/{event['import_id']}"
+                    yield json.dumps(event, ensure_ascii=False) + "\n"
+            except Exception as e:
+                logger.error(f"Error en importación masiva: {str(e)}")
+                yield json.dumps({"event": "error", "message": str(e)}, ensure_ascii=False) + "\n"
+        
+        return Response(stream_with_context(generate_events()), mimetype='application/x-ndjson')
     
     except Exception as e:
-        error_msg = f"Error actualizando contacto en HubSpot: {str(e)}"
-        logger.error(error_msg)
-        return {"success": False, "error": error_msg}
+        logger.error(f"Error procesando importación masiva: {str(e)}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@app.route('/api/prospects/bulk/<import_id>', methods=['GET'])
+def get_bulk_import_results(import_id):
+    """Descarga el archivo de resultados por fila (JSONL) de una importación masiva"""
+    if not re.fullmatch(r'[0-9]{14}-[0-9a-f]{8}', import_id):
+        return jsonify({"error": "import_id inválido"}), 400
+    
+    results_path = os.path.join(BULK_IMPORT_RESULTS_DIR, f"{import_id}.jsonl")
+    if not os.path.exists(results_path):
+        return jsonify({"error": "Importación no encontrada"}), 404
+    
+    return send_file(results_path, mimetype='application/x-ndjson',
+                     as_attachment=True, download_name=f"{import_id}.jsonl")
 
 @app.route('/api/enrich-context', methods=['POST'])
 def enrich_and_send_context():
@@ -640,7 +783,7 @@ def enrich_and_send_context():
         
         # Enriquecer datos con Apollo
         logger.info(f"Enriqueciendo contexto para dominio: {data['websiteUrl']}")
-        apollo_result = enrich_company_data(data['websiteUrl'])
+        apollo_result = enrich_company_data(data['websiteUrl'], profile='agent_context')
         
         if apollo_result.get('success'):
             enriched_data = apollo_result.get('data')
@@ -903,28 +1046,27 @@ def enrich_prospect_complete():
         email = data['emailCorporativo']
         logger.info(f"🔄 ENRIQUECIMIENTO COMPLETO INICIADO PARA: {email}")
         
-        # Enriquecer datos de la empresa con Apollo (si se proporciona websiteUrl)
-        apollo_data = None
+        # Apollo y HubSpot son independientes: se consultan en paralelo
+        pipeline = StagePipeline(PROSPECT_LATENCY_BUDGET, name="enrich_prospect")
+        
         if data.get('websiteUrl'):
             logger.info(f"🔍 Enriqueciendo datos de empresa con Apollo para: {data['websiteUrl']}")
-            apollo_result = enrich_company_data(data['websiteUrl'])
-            
-            if apollo_result.get('success'):
-                apollo_data = apollo_result.get('data')
-                logger.info(f"✅ Datos de Apollo obtenidos para empresa")
-            else:
-                logger.warning(f"⚠️ No se pudieron obtener datos de Apollo: {apollo_result.get('error')}")
+            pipeline.add_stage('apollo', lambda: enrich_company_data(data['websiteUrl'], profile='agent_context'),
+                               timeout=PROSPECT_ENRICHMENT_TIMEOUT)
         
-        # Enriquecer datos del contacto con HubSpot
         logger.info(f"🔍 Enriqueciendo datos de contacto con HubSpot para: {email}")
-        hubspot_result = enrich_prospect_with_hubspot_data(data)
+        pipeline.add_stage('hubspot_enrichment', lambda: enrich_prospect_with_hubspot_data(data, profile='full'),
+                           timeout=PROSPECT_ENRICHMENT_TIMEOUT)
+        
+        pipeline_result = pipeline.run()
+        
+        apollo_data = stage_data(pipeline_result['values'].get('apollo'), "Apollo")
+        if apollo_data:
+            logger.info(f"✅ Datos de Apollo obtenidos para empresa")
         
-        hubspot_data = None
-        if hubspot_result.get('success'):
-            hubspot_data = hubspot_result.get('data')
+        hubspot_data = stage_data(pipeline_result['values']['hubspot_enrichment'], "HubSpot")
+        if hubspot_data:
             logger.info(f"✅ Datos de HubSpot obtenidos para contacto")
-        else:
-            logger.warning(f"⚠️ No se pudieron obtener datos de HubSpot: {hubspot_result.get('error')}")
         
         # Crear respuesta combinada
         response_data = {
@@ -939,7 +1081,10 @@ def enrich_prospect_complete():
                 "has_contact_data": hubspot_data is not None,
                 "has_engagements": hubspot_data and bool(hubspot_data.get('hubspot_data', {}).get('engagements')),
                 "has_company_deals": hubspot_data and bool(hubspot_data.get('hubspot_data', {}).get('company_info', {}).get('deals'))
-            }
+            },
+            "partial": pipeline_result['partial'],
+            "stage_timings": pipeline_result['stages'],
+            "total_ms": pipeline_result['total_ms']
         }
         
         # Incluir datos de Apollo si están disponibles
@@ -975,7 +1120,7 @@ def test_apollo_enrichment():
         logger.info(f"🧪 INICIANDO PRUEBA DE APOLLO PARA: {domain}")
         
         # Enriquecer datos con Apollo
-        apollo_result = enrich_company_data(domain)
+        apollo_result = enrich_company_data(domain, profile='full')
         
         if apollo_result.get('success'):
             enriched_data = apollo_result.get('data')
@@ -1131,6 +1276,38 @@ def get_hubspot_id_by_conversation(conversation_id):
         logger.error(f"Error consultando hubspot_id: {str(e)}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+@app.route('/api/conversation/<conversation_id>/processing', methods=['GET'])
+def get_conversation_processing_status(conversation_id):
+    """Obtiene el estado del procesamiento asíncrono de la transcripción de una conversación"""
+    try:
+        job = job_queue.get_latest_by_key(conversation_id)
+        
+        if not job:
+            return jsonify({
+                "status": "not_found",
+                "message": f"No hay procesamiento registrado para conversation_id: {conversation_id}",
+                "conversation_id": conversation_id
+            }), 404
+        
+        return jsonify({
+            "status": "success",
+            "conversation_id": conversation_id,
+            "job": {
+                "id": job['id'],
+                "status": job['status'],
+                "attempts": job['attempts'],
+                "max_attempts": job['max_attempts'],
+                "error": job['error'],
+                "result": job['result'],
+                "created_at": job['created_at'],
+                "updated_at": job['updated_at']
+            }
+        })
+    
+    except Exception as e:
+        logger.error(f"Error consultando estado de procesamiento: {str(e)}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
 @app.route('/api/send-chat-message', methods=['POST'])
 def send_chat_message():
     """Endpoint para enviar mensajes al chat de la conversación"""
@@ -1166,6 +1343,16 @@ def send_chat_message():
         logger.error(f"Error enviando mensaje al chat: {str(e)}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+@app.route('/api/providers/stats', methods=['GET'])
+def get_providers_stats():
+    """Contadores de llamadas salientes por proveedor (límite de tasa, reintentos, 429, esperas en cola) y estado de los circuitos"""
+    return jsonify({"providers": get_provider_stats(), "breakers": get_breaker_stats(), "pid": os.getpid()})
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Métricas de todos los workers en formato de exposición de Prometheus"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Endpoint de salud para verificar que el servidor está funcionando"""
@@ -1176,6 +1363,9 @@ if __name__ == '__main__':
     debug = os.getenv('FLASK_ENV') == 'development'
     
     logger.info(f"Iniciando servidor en puerto {port}")
+    job_queue.ensure_workers()
+    if HUBSPOT_MIRROR_ENABLED:
+        mirror_sync_worker.ensure_running()
     app.run(host='0.0.0.0', port=port, debug=debug)
 
 # Para Vercel
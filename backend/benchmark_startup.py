@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Benchmark de tiempo de arranque
+Mide en procesos nuevos el tiempo de importación de cada módulo (python -X importtime),
+el tiempo hasta responder /health y el costo de crear el analizador de conversaciones
+
+Uso:
+    python benchmark_startup.py [--runs 3] [--top 15] [--json]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Módulos propios medidos por separado (cada uno en un proceso nuevo)
+MODULES = [
+    'app',
+    'agents.conversation_analyzer',
+    'api.hubspot',
+    'api.hubspot_fields',
+    'api.apollo',
+    'api.bulk_import',
+    'storage.conversation_storage',
+    'storage.job_queue',
+    'storage.idempotency_store',
+    'langchain_openai',
+]
+
+HEALTH_SNIPPET = """
+import time
+started = time.perf_counter()
+from app import app
+imported = time.perf_counter()
+response = app.test_client().get('/health')
+answered = time.perf_counter()
+from agents.conversation_analyzer import get_conversation_analyzer
+get_conversation_analyzer()
+analyzer_ready = time.perf_counter()
+assert response.status_code == 200
+print(f"{(imported - started) * 1000:.1f} {(answered - started) * 1000:.1f} {(analyzer_ready - answered) * 1000:.1f}")
+"""
+
+def run_python(args):
+    """Ejecuta el intérprete actual desde backend/ y retorna (stdout, stderr)"""
+    result = subprocess.run(
+        [sys.executable] + args,
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return result.stdout, result.stderr
+
+def parse_importtime(stderr):
+    """
+    Interpreta la salida de -X importtime
+
+    Returns:
+        Dict: {módulo: (propio_ms, acumulado_ms)}
+    """
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        times[module.strip()] = (int(self_us) / 1000, int(cumulative_us) / 1000)
+    return times
+
+def module_import_ms(module, runs):
+    """Mediana del tiempo acumulado de importar un módulo en un proceso nuevo"""
+    samples = []
+    breakdown = {}
+    for _ in range(runs):
+        _, stderr = run_python(['-X', 'importtime', '-c', f'import {module}'])
+        breakdown = parse_importtime(stderr)
+        samples.append(breakdown.get(module, (0.0, 0.0))[1])
+    samples.sort()
+    return samples[len(samples) // 2], breakdown
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de importación por módulo y de arranque de la app")
+    parser.add_argument('--runs', type=int, default=3, help="Repeticiones por medición (se reporta la mediana)")
+    parser.add_argument('--top', type=int, default=15, help="Dependencias más costosas a listar al importar app")
+    parser.add_argument('--json', action='store_true', help="Imprimir el resultado en JSON")
+    args = parser.parse_args()
+
+    modules = {}
+    app_breakdown = {}
+    for module in MODULES:
+        modules[module], breakdown = module_import_ms(module, args.runs)
+        if module == 'app':
+            app_breakdown = breakdown
+
+    startup_samples = []
+    for _ in range(args.runs):
+        stdout, _ = run_python(['-c', HEALTH_SNIPPET])
+        startup_samples.append([float(value) for value in stdout.split()[-3:]])
+    startup_samples.sort()
+    import_ms, health_ms, analyzer_ms = startup_samples[len(startup_samples) // 2]
+
+    top_dependencies = sorted(app_breakdown.items(), key=lambda item: item[1][0], reverse=True)[:args.top]
+
+    result = {
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "module_import_ms": {module: round(ms, 1) for module, ms in modules.items()},
+        "app_import_ms": import_ms,
+        "first_health_response_ms": health_ms,
+        "analyzer_first_use_ms": analyzer_ms,
+        "app_top_self_import_ms": {module: round(times[0], 1) for module, times in top_dependencies}
+    }
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+
+    print("⏱️ TIEMPO DE IMPORTACIÓN POR MÓDULO (acumulado, mediana)")
+    print("=" * 60)
+    for module, ms in result["module_import_ms"].items():
+        print(f"  {module:<35} {ms:>9.1f} ms")
+
+    print("\n🚀 ARRANQUE DE LA APP")
+    print("=" * 60)
+    print(f"  Importar app:                       {import_ms:>9.1f} ms")
+    print(f"  Primera respuesta de /health:       {health_ms:>9.1f} ms")
+    print(f"  Primer uso del analizador (LLM):    {analyzer_ms:>9.1f} ms")
+
+    print("\n📦 DEPENDENCIAS MÁS COSTOSAS AL IMPORTAR app (tiempo propio)")
+    print("=" * 60)
+    for module, ms in result["app_top_self_import_ms"].items():
+        print(f"  {module:<50} {ms:>7.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,544 @@
+#!/usr/bin/env python3
+"""
+Servidores HTTP locales que imitan a HubSpot, Apollo, OpenAI y Resend
+Responden con la forma de las APIs reales y permiten configurar latencia, tasa de errores 5xx
+y de respuestas 429, para medir la app sin red ni credenciales reales
+
+Uso (servidores sueltos, ej: para ejecutar la app a mano contra ellos):
+    python benchmark_stubs.py [--latency-ms 50] [--error-rate 0.01] [--rate-limit-rate 0.02]
+"""
+
+import re
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from datetime import datetime, timezone
+from urllib.parse import urlparse, parse_qs, unquote
+
+class StubBehavior:
+    """
+    Comportamiento de un servidor simulado: latencia y fallos inyectados
+    """
+
+    def __init__(self, latency_ms: float = 50, jitter_ms: float = 0, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, retry_after: float = 1, seed: int = None):
+        """
+        Args:
+            latency_ms (float): Latencia base de cada respuesta
+            jitter_ms (float): Variación aleatoria sumada a la latencia (0 a jitter_ms)
+            error_rate (float): Fracción de respuestas 503
+            rate_limit_rate (float): Fracción de respuestas 429
+            retry_after (float): Segundos del header Retry-After en los 429
+            seed (int): Semilla para repetir la misma secuencia de fallos
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self):
+        """
+        Sortea la latencia y el fallo de una respuesta
+
+        Returns:
+            Tuple: (segundos de espera, código a inyectar o None)
+        """
+        with self._lock:
+            delay = (self.latency_ms + self._random.uniform(0, self.jitter_ms)) / 1000
+            roll = self._random.random()
+
+        if roll < self.rate_limit_rate:
+            return delay, 429
+        if roll < self.rate_limit_rate + self.error_rate:
+            return delay, 503
+        return delay, None
+
+    def to_dict(self):
+        return {
+            "latency_ms": self.latency_ms,
+            "jitter_ms": self.jitter_ms,
+            "error_rate": self.error_rate,
+            "rate_limit_rate": self.rate_limit_rate,
+            "retry_after": self.retry_after
+        }
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    """Servidor que ignora las conexiones cerradas por el cliente (ej: timeouts de la app)"""
+
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+class StubServer:
+    """
+    Servidor simulado de un proveedor, en un hilo propio
+
+    Las rutas son tuplas (método, regex del path, handler); el handler recibe el match,
+    el cuerpo JSON y los parámetros de la URL y retorna (código, cuerpo)
+    """
+
+    def __init__(self, name: str, routes, behavior: StubBehavior = None, host: str = '127.0.0.1', port: int = 0):
+        self.name = name
+        self.routes = [(method, re.compile(pattern), handler) for method, pattern, handler in routes]
+        self.behavior = behavior or StubBehavior()
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+        self._server = _QuietHTTPServer((host, port), self._build_handler())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        """Arranca el servidor y retorna su URL base"""
+        self._thread = threading.Thread(target=self._server.serve_forever, name=f"stub-{self.name}", daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def stats(self):
+        """
+        Peticiones recibidas por ruta
+
+        Returns:
+            Dict: {"MÉTODO patrón": {"requests", "injected_429", "injected_503"}}
+        """
+        with self._stats_lock:
+            return {route: dict(counters) for route, counters in self._stats.items()}
+
+    def _count(self, route: str, injected):
+        with self._stats_lock:
+            counters = self._stats.setdefault(route, {"requests": 0, "injected_429": 0, "injected_503": 0})
+            counters["requests"] += 1
+            if injected:
+                counters[f"injected_{injected}"] += 1
+
+    def _dispatch(self, method: str, raw_path: str, body):
+        parsed = urlparse(raw_path)
+        query = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+
+        for route_method, pattern, handler in self.routes:
+            match = pattern.fullmatch(parsed.path)
+            if route_method == method and match:
+                route = f"{method} {pattern.pattern}"
+                delay, injected = self.behavior.draw()
+                self._count(route, injected)
+                time.sleep(delay)
+
+                if injected == 429:
+                    return 429, {"status": "error", "message": "Rate limit simulado"}, \
+                        {"Retry-After": str(self.behavior.retry_after)}
+                if injected == 503:
+                    return 503, {"status": "error", "message": "Error simulado"}, {}
+
+                status, payload = handler(match, body, query)
+                return status, payload, {}
+
+        self._count(f"{method} (sin ruta)", None)
+        return 404, {"status": "error", "message": f"Ruta no simulada: {method} {parsed.path}"}, {}
+
+    def _build_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _handle(self, method):
+                length = int(self.headers.get('Content-Length') or 0)
+                raw_body = self.rfile.read(length) if length else b''
+                try:
+                    body = json.loads(raw_body) if raw_body else {}
+                except ValueError:
+                    body = {}
+
+                status, payload, headers = stub._dispatch(method, self.path, body)
+                encoded = json.dumps(payload).encode()
+
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(encoded)))
+                for header, value in headers.items():
+                    self.send_header(header, value)
+                self.end_headers()
+                self.wfile.write(encoded)
+
+            def do_GET(self):
+                self._handle('GET')
+
+            def do_POST(self):
+                self._handle('POST')
+
+            def do_PATCH(self):
+                self._handle('PATCH')
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+def _parse_iso_millis(value: str) -> int:
+    return int(datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp() * 1000)
+
+def _stable_id(value: str, base: int) -> str:
+    """ID numérico estable a partir de un texto (el mismo email siempre da el mismo contacto)"""
+    return str(base + int(hashlib.md5(value.encode()).hexdigest()[:8], 16) % 1000000)
+
+# Engagements asociados a cada contacto simulado, por tipo de objeto
+ENGAGEMENTS_PER_CONTACT = {"meetings": 2, "calls": 3, "emails": 5, "tasks": 1, "notes": 4}
+
+# Asociaciones incluidas en la lectura de un objeto (associations=...) antes de paginar
+INLINE_ASSOCIATIONS_LIMIT = 100
+
+def _engagement_ids(contact_id: str, object_type: str):
+    """IDs de los engagements de un tipo asociados al contacto simulado"""
+    if object_type not in ENGAGEMENTS_PER_CONTACT:
+        return []
+    first_id = (int(contact_id) * 10 + list(ENGAGEMENTS_PER_CONTACT).index(object_type)) * 10000
+    return [first_id + index for index in range(ENGAGEMENTS_PER_CONTACT[object_type])]
+
+# Propiedad de última modificación por tipo, usada por el sync de la réplica
+MODIFIED_PROPERTIES = {"contacts": "lastmodifieddate", "companies": "hs_lastmodifieddate"}
+
+def _iso_millis(epoch_ms: int) -> str:
+    return datetime.fromtimestamp(epoch_ms / 1000, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+def mirror_dataset(contacts: int, start_ms: int = 1700000000000, step_ms: int = 1000):
+    """
+    Contactos y empresas modificados en orden (uno cada step_ms) para la búsqueda por lastmodifieddate
+
+    Los IDs coinciden con los de la lectura por email: contactoN@example.com tiene el mismo ID y la
+    misma empresa asociada que retorna GET /crm/v3/objects/contacts/{email}?idProperty=email
+    """
+    dataset = {"contacts": [], "companies": []}
+    for index in range(contacts):
+        email = f"contacto{index}@example.com"
+        contact_id = _stable_id(email, 100000000)
+        company_id = _stable_id(contact_id, 200000000)
+        modified = _iso_millis(start_ms + index * step_ms)
+        dataset["contacts"].append({"id": contact_id, "properties": {
+            "email": email, "firstname": "Ana", "lastname": f"Réplica {index}", "jobtitle": "Gerente Comercial",
+            "lifecyclestage": "lead", "associatedcompanyid": company_id, "lastmodifieddate": modified
+        }})
+        dataset["companies"].append({"id": company_id, "properties": {
+            "name": f"Empresa {company_id}", "domain": "empresa.com", "industry": "COMPUTER_SOFTWARE",
+            "hs_lastmodifieddate": modified
+        }})
+    return dataset
+
+def hubspot_routes(dataset=None, search_max_results: int = 10000):
+    """
+    Rutas de la API de HubSpot que usa la app (CRM v3/v4 y engagements v1)
+
+    Args:
+        dataset (dict): Objetos por tipo que retorna la búsqueda por última modificación (ver mirror_dataset);
+            se puede modificar mientras el servidor corre
+        search_max_results (int): Tope de paginación de la búsqueda (10.000 en HubSpot)
+    """
+    dataset = dataset if dataset is not None else {}
+    # Llamadas creadas con POST /calls: quedan asociadas al contacto y se leen en batch como la API real
+    created_calls = {}
+
+    def engagement_ids(contact_id, object_type):
+        object_ids = _engagement_ids(contact_id, object_type)
+        if object_type == 'calls':
+            object_ids += [int(call_id) for call_id, call in created_calls.items() if call['contact_id'] == contact_id]
+        return object_ids
+
+    def search_modified(object_type, filters, body):
+        # GTE sobre la última modificación, en orden ascendente y paginado por posición como la API real
+        modified_property = MODIFIED_PROPERTIES[object_type]
+        since = int(filters[0].get('value', 0))
+        objects = sorted(
+            (obj for obj in dataset.get(object_type, [])
+             if int(_parse_iso_millis(obj['properties'][modified_property])) >= since),
+            key=lambda obj: obj['properties'][modified_property]
+        )
+        start = int(body.get('after', 0))
+        if start >= search_max_results:
+            return 400, {"status": "error", "message": f"after debe ser menor a {search_max_results}"}
+
+        end = min(len(objects), start + int(body.get('limit', 10)))
+        page = {"total": len(objects), "results": objects[start:end]}
+        if end < len(objects):
+            page["paging"] = {"next": {"after": str(end)}}
+        return 200, page
+
+    def search_companies(match, body, query):
+        filters = (body.get('filterGroups') or [{}])[0].get('filters') or [{}]
+        return search_modified('companies', filters, body)
+
+    def search_contacts(match, body, query):
+        filters = (body.get('filterGroups') or [{}])[0].get('filters') or [{}]
+        if filters[0].get('propertyName') == MODIFIED_PROPERTIES['contacts']:
+            return search_modified('contacts', filters, body)
+
+        email = filters[0].get('value', 'desconocido@example.com')
+        contact_id = _stable_id(email, 100000000)
+        return 200, {"total": 1, "results": [{
+            "id": contact_id,
+            "properties": {"email": email, "firstname": "Ana", "lastname": "Pérez", "company": "Empresa",
+                           "jobtitle": "Gerente Comercial", "lifecyclestage": "lead",
+                           "lastmodifieddate": "2024-01-01T00:00:00Z"}
+        }]}
+
+    def get_contact(match, body, query):
+        # Lectura por ID o por email (idProperty=email), con asociaciones en línea si se piden
+        if query.get('idProperty') == 'email':
+            email = unquote(match.group(1))
+            contact_id = _stable_id(email, 100000000)
+        else:
+            contact_id = match.group(1)
+            email = f"contacto{contact_id}@example.com"
+
+        contact = {"id": contact_id, "properties": {
+            "email": email, "firstname": "Ana", "lastname": "Pérez",
+            "jobtitle": "Gerente Comercial", "lifecyclestage": "lead", "dolores_de_venta": ""
+        }}
+        requested = query.get('associations', '').split(',')
+        contact["associations"] = {}
+        if 'companies' in requested:
+            company_id = _stable_id(contact_id, 200000000)
+            contact["associations"]["companies"] = {"results": [
+                {"id": company_id, "type": "contact_to_company"},
+                {"id": company_id, "type": "contact_to_company_unlabeled"}
+            ]}
+        for object_type in ENGAGEMENTS_PER_CONTACT:
+            if object_type in requested:
+                # Como la API real, en línea solo viaja la primera página de asociaciones
+                object_ids = engagement_ids(contact_id, object_type)
+                association = {"results": [{"id": str(object_id), "type": f"contact_to_{object_type[:-1]}"}
+                                           for object_id in object_ids[:INLINE_ASSOCIATIONS_LIMIT]]}
+                if len(object_ids) > INLINE_ASSOCIATIONS_LIMIT:
+                    association["paging"] = {"next": {"after": str(INLINE_ASSOCIATIONS_LIMIT), "link": "..."}}
+                contact["associations"][object_type] = association
+        if not contact["associations"]:
+            del contact["associations"]
+        return 200, contact
+
+    def contact_associations(match, body, query):
+        contact_id, object_type = match.group(1), match.group(2)
+        if object_type == 'companies':
+            return 200, {"results": [{"toObjectId": int(_stable_id(contact_id, 200000000))}]}
+
+        # Engagements: cantidad fija por tipo, paginada como la API v4
+        object_ids = engagement_ids(contact_id, object_type)
+        start = int(query.get('after', 0))
+        end = min(len(object_ids), start + int(query.get('limit', 500)))
+        page = {"results": [{"toObjectId": object_id} for object_id in object_ids[start:end]]}
+        if end < len(object_ids):
+            page["paging"] = {"next": {"after": str(end)}}
+        return 200, page
+
+    def batch_read_engagements(match, body, query):
+        object_type = match.group(1)
+        inputs = [item for item in body.get('inputs', []) if str(item["id"]) not in created_calls]
+        created = [{"id": str(item["id"]), "archived": False, "properties": {
+            name: value for name, value in created_calls[str(item["id"])]['properties'].items()
+            if name in body.get('properties', [])
+        }} for item in body.get('inputs', []) if str(item["id"]) in created_calls]
+        return 200, {"status": "COMPLETE", "results": created + [{
+            "id": str(item["id"]),
+            "archived": False,
+            "properties": {
+                **{name: f"{name} {item['id']}" for name in body.get('properties', []) if name != 'hs_timestamp'},
+                # IDs mayores, engagements más recientes (un día por índice)
+                "hs_timestamp": datetime.fromtimestamp(1700000000 + int(item["id"]) % 10000 * 86400,
+                                                       tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+            }
+        } for item in inputs]}
+
+    def get_company(match, body, query):
+        company = {"id": match.group(1), "properties": {
+            "name": f"Empresa {match.group(1)}", "domain": "empresa.com", "industry": "COMPUTER_SOFTWARE",
+            "numberofemployees": "120", "city": "Bogotá", "country": "Colombia"
+        }}
+        if 'deals' in query.get('associations', ''):
+            company["associations"] = {"deals": {"results": [
+                {"id": str(int(match.group(1)) * 10 + index), "type": "company_to_deal"} for index in range(3)
+            ]}}
+        return 200, company
+
+    def company_deals(match, body, query):
+        company_id = int(match.group(1))
+        return 200, {"results": [{"toObjectId": company_id * 10 + index} for index in range(3)]}
+
+    def batch_read_deals(match, body, query):
+        return 200, {"status": "COMPLETE", "results": [{
+            "id": str(item["id"]),
+            "properties": {"dealname": f"Negocio {item['id']}", "amount": "15000", "dealstage": "appointmentscheduled"}
+        } for item in body.get('inputs', [])]}
+
+    def upsert_contacts(match, body, query):
+        return 200, {"status": "COMPLETE", "results": [{
+            "id": _stable_id(item["id"], 100000000),
+            "new": False,
+            "properties": {**item.get("properties", {}), "email": item["id"]}
+        } for item in body.get('inputs', [])]}
+
+    def update_contact(match, body, query):
+        return 200, {"id": match.group(1), "properties": body.get('properties', {})}
+
+    def create_call(match, body, query):
+        call_id = str(random.randint(300000000, 399999999))
+        properties = dict(body.get('properties', {}))
+        # La API retorna hs_timestamp en ISO 8601 aunque se envíe en milisegundos
+        properties['hs_timestamp'] = datetime.fromtimestamp(int(properties.get('hs_timestamp') or 0) / 1000,
+                                                            tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+        contact_id = str((body.get('associations') or [{}])[0].get('to', {}).get('id', ''))
+        created_calls[call_id] = {"contact_id": contact_id, "properties": properties}
+        return 201, {"id": call_id, "properties": properties}
+
+    return [
+        ('POST', r'/crm/v3/objects/contacts/search', search_contacts),
+        ('POST', r'/crm/v3/objects/companies/search', search_companies),
+        ('POST', r'/crm/v3/objects/contacts/batch/upsert', upsert_contacts),
+        ('GET', r'/crm/v3/objects/contacts/([^/]+)', get_contact),
+        ('PATCH', r'/crm/v3/objects/contacts/(\d+)', update_contact),
+        ('GET', r'/crm/v4/objects/contacts/(\d+)/associations/(companies|meetings|calls|emails|tasks|notes)',
+         contact_associations),
+        ('POST', r'/crm/v3/objects/(meetings|calls|emails|tasks|notes)/batch/read', batch_read_engagements),
+        ('GET', r'/crm/v3/objects/companies/(\d+)', get_company),
+        ('GET', r'/crm/v4/objects/companies/(\d+)/associations/deals', company_deals),
+        ('POST', r'/crm/v3/objects/deals/batch/read', batch_read_deals),
+        ('POST', r'/crm/v3/objects/calls', create_call),
+    ]
+
+def apollo_routes():
+    """Ruta /organizations/enrich de Apollo"""
+
+    def enrich_organization(match, body, query):
+        domain = query.get('domain', 'empresa.com')
+        return 200, {"organization": {
+            "name": domain.split('.')[0].title(),
+            "primary_domain": domain,
+            "industry": "information technology & services",
+            "estimated_num_employees": 120,
+            "founded_year": 2012,
+            "annual_revenue": 5000000,
+            "short_description": f"Empresa simulada para {domain}",
+            "locations": [{"city": "Bogotá", "country": "Colombia"}]
+        }, "people": []}
+
+    return [('GET', r'/organizations/enrich', enrich_organization)]
+
+def openai_routes():
+    """Ruta /v1/chat/completions con un análisis válido para ConversationAnalysis"""
+
+    def chat_completion(match, body, query):
+        analysis = {
+            "summary": "El prospecto describe poco seguimiento a sus oportunidades.",
+            "pain_point": "El seguimiento a los prospectos y negocios es minimo",
+            "pain_confidence": 0.8,
+            "key_insights": ["Equipo de 10 vendedores", "Sin CRM centralizado"],
+            "next_steps": "Agendar una demostración",
+            "qualification_score": 7
+        }
+        return 200, {
+            "id": f"chatcmpl-{random.randint(0, 10 ** 9)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get('model', 'gpt-4'),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": json.dumps(analysis, ensure_ascii=False)},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 500, "completion_tokens": 120, "total_tokens": 620}
+        }
+
+    return [('POST', r'/v1/chat/completions', chat_completion)]
+
+def resend_routes():
+    """Ruta /emails de Resend"""
+
+    def send_email(match, body, query):
+        return 200, {"id": f"email-{random.randint(0, 10 ** 9)}"}
+
+    return [('POST', r'/emails', send_email)]
+
+PROVIDER_ROUTES = {
+    "hubspot": hubspot_routes,
+    "apollo": apollo_routes,
+    "openai": openai_routes,
+    "resend": resend_routes,
+}
+
+def start_stub_servers(behaviors=None):
+    """
+    Arranca un servidor simulado por proveedor
+
+    Args:
+        behaviors (Dict): {proveedor: StubBehavior}; los que falten usan StubBehavior()
+
+    Returns:
+        Dict: {proveedor: StubServer} ya iniciados
+    """
+    behaviors = behaviors or {}
+    servers = {}
+    for provider, routes in PROVIDER_ROUTES.items():
+        servers[provider] = StubServer(provider, routes(), behaviors.get(provider))
+        servers[provider].start()
+    return servers
+
+def stub_environment(servers):
+    """
+    Variables de entorno que apuntan la app a los servidores simulados
+
+    Args:
+        servers (Dict): Resultado de start_stub_servers
+
+    Returns:
+        Dict: URLs base y credenciales ficticias (sin ellas la app simula las llamadas y no las mide)
+    """
+    return {
+        "HUBSPOT_BASE_URL": servers["hubspot"].url,
+        "HUBSPOT_API_KEY": "benchmark",
+        "APOLLO_BASE_URL": servers["apollo"].url,
+        "APOLLO_API_KEY": "benchmark",
+        "OPENAI_BASE_URL": f"{servers['openai'].url}/v1",
+        "OPENAI_API_KEY": "benchmark",
+        "RESEND_API_URL": servers["resend"].url,
+        "RESEND_API_KEY": "benchmark",
+        "FROM_EMAIL": "benchmark@example.com",
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidores simulados de HubSpot, Apollo, OpenAI y Resend")
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    behavior = dict(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                    error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate)
+    servers = start_stub_servers({provider: StubBehavior(**behavior) for provider in PROVIDER_ROUTES})
+
+    print("🧪 Servidores simulados activos (Ctrl+C para terminar). Variables para la app:")
+    for key, value in stub_environment(servers).items():
+        print(f"export {key}={value}")
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        for server in servers.values():
+            server.stop()
+
+if __name__ == "__main__":
+    main()
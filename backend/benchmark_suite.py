@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+"""
+Benchmark sin red de las rutas principales contra servidores simulados
+Levanta HubSpot, Apollo, OpenAI y Resend simulados (ver benchmark_stubs.py), arranca la app con
+gunicorn apuntando a ellos y carga /api/prospect, /api/enrich-prospect y /webhook con N clientes.
+Reporta peticiones por segundo y p50/p95/p99 por ruta (medidos en el cliente) y por llamada
+saliente (histogramas de /metrics), y guarda el resultado en JSON para comparar entre commits
+
+Uso:
+    python benchmark_suite.py [--concurrency 16] [--duration 15] [--workers 2] [--latency-ms 50]
+                              [--error-rate 0.01] [--rate-limit-rate 0.02] [--stub openai:latency_ms=800]
+                              [--compare benchmark_results/anterior.json]
+    python benchmark_suite.py --diff benchmark_results/a.json benchmark_results/b.json
+"""
+
+import argparse
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+import requests
+
+from benchmark_stubs import PROVIDER_ROUTES, StubBehavior, start_stub_servers, stub_environment
+from load_test import percentile
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BACKEND_DIR, 'benchmark_results')
+
+ROUTES = ['/api/prospect', '/api/enrich-prospect', '/webhook']
+
+# Límites de tasa del lado de la app: por defecto se levantan para medir el costo del código
+# y no el ritmo permitido por cada proveedor (los 429 los inyectan los servidores simulados)
+UNTHROTTLED_APP_ENV = {
+    "HUBSPOT_RATE_LIMIT": "1000",
+    "HUBSPOT_RATE_BURST": "1000",
+    "HUBSPOT_SEARCH_RATE_LIMIT": "1000",
+    "APOLLO_RATE_LIMIT": "1000",
+    "APOLLO_RATE_BURST": "1000",
+    "RESEND_RATE_LIMIT": "1000",
+    "RESEND_RATE_BURST": "1000",
+}
+
+LABEL_PATTERN = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def git_revision():
+    """Commit actual y si hay cambios sin confirmar"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=BACKEND_DIR,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return "desconocido", False
+
+def parse_stub_overrides(values, defaults):
+    """
+    Interpreta --stub proveedor:clave=valor,clave=valor
+
+    Returns:
+        Dict: {proveedor: StubBehavior}
+    """
+    settings = {provider: dict(defaults) for provider in PROVIDER_ROUTES}
+    for value in values:
+        provider, _, assignments = value.partition(':')
+        if provider not in settings:
+            raise SystemExit(f"Proveedor desconocido en --stub: {provider}")
+        for assignment in filter(None, assignments.split(',')):
+            key, _, number = assignment.partition('=')
+            settings[provider][key.strip()] = float(number)
+    return settings
+
+def parse_metrics(text):
+    """
+    Interpreta el texto de exposición de /metrics
+
+    Returns:
+        Dict: {nombre: {tupla de etiquetas ordenadas: valor}}
+    """
+    samples = {}
+    for line in text.splitlines():
+        if not line or line.startswith('#'):
+            continue
+        series, _, value = line.rpartition(' ')
+        name, _, labels = series.partition('{')
+        key = tuple(sorted(LABEL_PATTERN.findall(labels)))
+        samples.setdefault(name, {})[key] = float(value)
+    return samples
+
+def histogram_quantile(buckets, fraction):
+    """
+    Cuantil estimado a partir de buckets acumulados, interpolando dentro del bucket (como Prometheus)
+
+    Args:
+        buckets (List): [(límite superior, conteo acumulado)] ordenados, con +Inf al final
+        fraction (float): Cuantil (0 a 1)
+
+    Returns:
+        float: Segundos
+    """
+    total = buckets[-1][1] if buckets else 0
+    if not total:
+        return 0.0
+
+    rank = fraction * total
+    lower_bound, lower_count = 0.0, 0
+    for bound, count in buckets:
+        if count >= rank:
+            if bound == float('inf'):
+                return lower_bound
+            if count == lower_count:
+                return bound
+            return lower_bound + (bound - lower_bound) * (rank - lower_count) / (count - lower_count)
+        lower_bound, lower_count = bound, count
+    return lower_bound
+
+def upstream_summary(before, after, elapsed):
+    """
+    Llamadas salientes hechas durante el benchmark, por proveedor y endpoint
+
+    Args:
+        before (Dict): parse_metrics antes de la carga
+        after (Dict): parse_metrics al terminar (incluye el procesamiento en la cola)
+        elapsed (float): Segundos entre ambas lecturas
+
+    Returns:
+        Dict: {"proveedor endpoint": {calls, calls_per_second, statuses, mean_ms, p50_ms, p95_ms, p99_ms}}
+    """
+    def delta(name, key):
+        return after.get(name, {}).get(key, 0) - before.get(name, {}).get(key, 0)
+
+    summary = {}
+    bucket_series = after.get('upstream_request_duration_seconds_bucket', {})
+    grouped = {}
+    for key in bucket_series:
+        labels = dict(key)
+        bound = float(labels.pop('le'))
+        grouped.setdefault((labels['provider'], labels['endpoint']), []).append((bound, delta(
+            'upstream_request_duration_seconds_bucket', key)))
+
+    for (provider, endpoint), buckets in sorted(grouped.items()):
+        buckets.sort()
+        calls = buckets[-1][1]
+        if not calls:
+            continue
+
+        statuses = {}
+        for key in after.get('upstream_requests_total', {}):
+            labels = dict(key)
+            if labels.get('provider') == provider and labels.get('endpoint') == endpoint:
+                count = delta('upstream_requests_total', key)
+                if count:
+                    statuses[labels['status']] = int(count)
+
+        labels = tuple(sorted({"provider": provider, "endpoint": endpoint}.items()))
+        summary[f"{provider} {endpoint}"] = {
+            "calls": int(calls),
+            "calls_per_second": round(calls / elapsed, 1),
+            "statuses": statuses,
+            # La media es exacta (suma / conteo); los cuantiles se interpolan dentro de los buckets
+            "mean_ms": round(delta('upstream_request_duration_seconds_sum', labels) / calls * 1000, 1),
+            "p50_ms": round(histogram_quantile(buckets, 0.50) * 1000, 1),
+            "p95_ms": round(histogram_quantile(buckets, 0.95) * 1000, 1),
+            "p99_ms": round(histogram_quantile(buckets, 0.99) * 1000, 1)
+        }
+    return summary
+
+class RequestFactory:
+    """
+    Genera cuerpos variados por ruta: emails, dominios y transcripciones distintas para que
+    la caché de análisis y la idempotencia de webhooks no conviertan la carga en aciertos
+    """
+
+    def __init__(self, domains: int):
+        self.domains = domains
+        self.conversation_ids = []
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def _next(self):
+        with self._lock:
+            self._counter += 1
+            return self._counter
+
+    def prospect(self):
+        number = self._next()
+        conversation_id = f"bench-conv-{number}"
+        with self._lock:
+            self.conversation_ids.append(conversation_id)
+        return {
+            "nombres": "Ana",
+            "apellidos": f"Pérez {number}",
+            "compania": f"Empresa {number % self.domains}",
+            "emailCorporativo": f"ana.{number}@empresa{number % self.domains}.com",
+            "rol": "Gerente Comercial",
+            "websiteUrl": f"https://empresa{number % self.domains}.com",
+            "conversation_id": conversation_id
+        }
+
+    def enrich_prospect(self):
+        number = self._next()
+        return {
+            "emailCorporativo": f"ana.{number}@empresa{number % self.domains}.com",
+            "websiteUrl": f"https://empresa{number % self.domains}.com"
+        }
+
+    def webhook(self):
+        number = self._next()
+        with self._lock:
+            conversation_id = self.conversation_ids[number % len(self.conversation_ids)]
+        return {
+            "event_type": "application.transcription_ready",
+            "conversation_id": conversation_id,
+            "properties": {
+                "replica_id": "bench-replica",
+                "transcript": [
+                    {"role": "assistant", "content": "Hola, ¿cómo hacen hoy el seguimiento a sus prospectos?"},
+                    {"role": "user", "content": f"Mensaje {number}: no tenemos CRM y perdemos negocios por falta de seguimiento."}
+                ]
+            }
+        }
+
+def drive_route(base_url, route, build_body, concurrency, duration):
+    """
+    Envía POST a una ruta con N clientes keep-alive durante un tiempo fijo
+
+    Returns:
+        Dict: Peticiones, errores, códigos, peticiones por segundo y latencias en ms
+    """
+    latencies, statuses, lock = [], {}, threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client():
+        session = requests.Session()
+        local_latencies, local_statuses = [], {}
+        while time.monotonic() < deadline:
+            body = build_body()
+            started = time.monotonic()
+            try:
+                status = str(session.post(f"{base_url}{route}", json=body, timeout=60).status_code)
+            except requests.exceptions.RequestException:
+                status = "error"
+            local_latencies.append(time.monotonic() - started)
+            local_statuses[status] = local_statuses.get(status, 0) + 1
+        with lock:
+            latencies.extend(local_latencies)
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    started = time.monotonic()
+    clients = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    elapsed = time.monotonic() - started
+    latencies.sort()
+
+    errors = sum(count for status, count in statuses.items() if status == "error" or int(status) >= 400)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": statuses,
+        "duration_s": round(elapsed, 2),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1)
+    }
+
+def scrape_metrics(base_url):
+    return parse_metrics(requests.get(f"{base_url}/metrics", timeout=30).text)
+
+def wait_for_jobs(base_url, timeout, flush_interval):
+    """
+    Espera a que la cola de transcripciones se vacíe
+
+    Returns:
+        Dict: Trabajos por estado al terminar y segundos de espera
+    """
+    started = time.monotonic()
+    depth = {}
+    while time.monotonic() - started < timeout:
+        # Los workers publican sus métricas cada flush_interval: se espera una copia fresca
+        time.sleep(flush_interval * 2)
+        depth = {dict(key).get('status'): int(value)
+                 for key, value in scrape_metrics(base_url).get('job_queue_jobs', {}).items()}
+        if not depth.get('pending') and not depth.get('running'):
+            break
+    return {"jobs": depth, "drain_s": round(time.monotonic() - started, 2)}
+
+def start_app(environment, port, log_path):
+    """Arranca gunicorn con gunicorn.conf.py y espera a que /health responda"""
+    log_file = open(log_path, 'w')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+        cwd=BACKEND_DIR, env=environment, stdout=log_file, stderr=subprocess.STDOUT
+    )
+
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"La app terminó al arrancar (ver {log_path})")
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/health", timeout=2).status_code == 200:
+                return process, log_file
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.2)
+
+    process.terminate()
+    raise SystemExit(f"La app no respondió /health en 60 s (ver {log_path})")
+
+def run_benchmark(args):
+    """
+    Ejecuta el benchmark completo
+
+    Returns:
+        Dict: Configuración, resultados por ruta, por llamada saliente y por servidor simulado
+    """
+    defaults = {"latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms,
+                "error_rate": args.error_rate, "rate_limit_rate": args.rate_limit_rate}
+    behaviors = {provider: StubBehavior(**settings, seed=args.seed)
+                 for provider, settings in parse_stub_overrides(args.stub, defaults).items()}
+    servers = start_stub_servers(behaviors)
+
+    port = free_port()
+    data_dir = tempfile.mkdtemp(prefix='benchmark-data-')
+    flush_interval = 1
+    environment = {
+        **os.environ,
+        **({} if args.production_limits else UNTHROTTLED_APP_ENV),
+        **stub_environment(servers),
+        "PORT": str(port),
+        "WEB_CONCURRENCY": str(args.workers),
+        "DATA_DIR": data_dir,
+        "METRICS_FLUSH_INTERVAL": str(flush_interval),
+        "TRANSCRIPT_PROCESSING_MODE": "async",
+        "LOG_LEVEL": "WARNING",
+        "GUNICORN_LOG_LEVEL": "warning",
+        "GUNICORN_ACCESS_LOG": "",
+    }
+    for assignment in args.app_env:
+        key, _, value = assignment.partition('=')
+        environment[key] = value
+
+    log_path = os.path.join(data_dir, 'app.log')
+    print(f"📝 Log de la app: {log_path}")
+    process, log_file = start_app(environment, port, log_path)
+    base_url = f"http://127.0.0.1:{port}"
+    factory = RequestFactory(args.domains)
+
+    try:
+        time.sleep(flush_interval * 2)
+        before = scrape_metrics(base_url)
+        started = time.monotonic()
+
+        routes = {}
+        builders = {
+            '/api/prospect': factory.prospect,
+            '/api/enrich-prospect': factory.enrich_prospect,
+            '/webhook': factory.webhook,
+        }
+        # /api/prospect va primero: crea los mapeos de conversación que usan los webhooks
+        for route in ROUTES:
+            print(f"🚀 {route}: {args.concurrency} clientes durante {args.duration:.0f} s")
+            routes[route] = drive_route(base_url, route, builders[route], args.concurrency, args.duration)
+
+        print("⏳ Esperando a que la cola procese las transcripciones...")
+        jobs = wait_for_jobs(base_url, args.drain_timeout, flush_interval)
+        # Los trabajos se procesan desde que llega el primer webhook hasta que la cola se vacía
+        processing_s = routes['/webhook']['duration_s'] + jobs['drain_s']
+        jobs["jobs_per_second"] = round(jobs['jobs'].get('done', 0) / processing_s, 1)
+        after = scrape_metrics(base_url)
+        elapsed = time.monotonic() - started
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+        log_file.close()
+        for server in servers.values():
+            server.stop()
+
+    commit, dirty = git_revision()
+    return {
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        "python": sys.version.split()[0],
+        "config": {
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "workers": args.workers,
+            "domains": args.domains,
+            "production_limits": args.production_limits,
+            "app_env": args.app_env,
+            "stubs": {provider: behavior.to_dict() for provider, behavior in behaviors.items()}
+        },
+        "routes": routes,
+        "jobs": jobs,
+        "upstream": upstream_summary(before, after, elapsed),
+        "stub_requests": {provider: server.stats() for provider, server in servers.items()}
+    }
+
+def format_change(old, new):
+    if not old:
+        return ""
+    return f"{(new - old) / old * 100:+.1f}%"
+
+def print_report(result, baseline=None):
+    """Imprime las tablas por ruta y por llamada saliente, con la variación frente a baseline si existe"""
+    baseline = baseline or {}
+
+    print(f"\n📊 RUTAS (commit {result['commit']}{' con cambios' if result['dirty'] else ''})")
+    print("=" * 110)
+    print(f"  {'ruta':<24} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errores':>8}  vs base (req/s, p95)")
+    for route, stats in result["routes"].items():
+        base = baseline.get("routes", {}).get(route, {})
+        comparison = f"{format_change(base.get('requests_per_second'), stats['requests_per_second'])} " \
+                     f"{format_change(base.get('p95_ms'), stats['p95_ms'])}" if base else ""
+        print(f"  {route:<24} {stats['requests_per_second']:>8.1f} {stats['p50_ms']:>9.1f} "
+              f"{stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f} {stats['errors']:>8}  {comparison}")
+
+    jobs = result.get("jobs", {})
+    if jobs:
+        print(f"\n  Cola de transcripciones: {jobs.get('jobs')}, {jobs.get('jobs_per_second')} trabajos/s "
+              f"(vaciada {jobs.get('drain_s')} s después de la carga)")
+
+    print("\n🔌 LLAMADAS SALIENTES (histogramas de /metrics)")
+    print("=" * 110)
+    print(f"  {'proveedor endpoint':<66} {'llamadas':>8} {'media ms':>9} {'p95 ms':>8} {'p99 ms':>8}  vs base (media)")
+    for name, stats in result["upstream"].items():
+        base = baseline.get("upstream", {}).get(name, {})
+        print(f"  {name:<66} {stats['calls']:>8} {stats['mean_ms']:>9.1f} {stats['p95_ms']:>8.1f} "
+              f"{stats['p99_ms']:>8.1f}  {format_change(base.get('mean_ms'), stats['mean_ms']) if base else ''}")
+
+def load_result(path):
+    with open(path, 'r', encoding='utf-8') as result_file:
+        return json.load(result_file)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sin red de /api/prospect, /api/enrich-prospect y /webhook")
+    parser.add_argument('--concurrency', type=int, default=16, help="Clientes concurrentes por ruta")
+    parser.add_argument('--duration', type=float, default=15, help="Segundos de carga por ruta")
+    parser.add_argument('--workers', type=int, default=2, help="Workers de gunicorn (WEB_CONCURRENCY)")
+    parser.add_argument('--domains', type=int, default=50, help="Dominios distintos (define la tasa de aciertos de Apollo)")
+    parser.add_argument('--latency-ms', type=float, default=50, help="Latencia de los servidores simulados")
+    parser.add_argument('--jitter-ms', type=float, default=20, help="Variación aleatoria de la latencia")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fracción de respuestas 503 simuladas")
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help="Fracción de respuestas 429 simuladas")
+    parser.add_argument('--stub', action='append', default=[],
+                        help="Ajuste por proveedor, ej: openai:latency_ms=800,error_rate=0.05")
+    parser.add_argument('--seed', type=int, default=1, help="Semilla de los fallos simulados")
+    parser.add_argument('--production-limits', action='store_true',
+                        help="Mantener los límites de tasa de la app (por defecto se levantan)")
+    parser.add_argument('--app-env', action='append', default=[], help="Variable extra para la app, ej: JOB_QUEUE_WORKERS=4")
+    parser.add_argument('--drain-timeout', type=float, default=300, help="Segundos máximos de espera a la cola")
+    parser.add_argument('--output', help="Archivo JSON de salida (por defecto benchmark_results/<fecha>-<commit>.json)")
+    parser.add_argument('--compare', help="Resultado anterior contra el cual comparar")
+    parser.add_argument('--diff', nargs=2, metavar=('BASE', 'NUEVO'), help="Solo comparar dos resultados guardados")
+    args = parser.parse_args()
+
+    if args.diff:
+        print_report(load_result(args.diff[1]), load_result(args.diff[0]))
+        return
+
+    result = run_benchmark(args)
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = result["timestamp"].replace(':', '').replace('-', '')
+        output = os.path.join(RESULTS_DIR, f"{stamp}-{result['commit']}{'-dirty' if result['dirty'] else ''}.json")
+    with open(output, 'w', encoding='utf-8') as result_file:
+        json.dump(result, result_file, indent=2, ensure_ascii=False)
+
+    print_report(result, load_result(args.compare) if args.compare else None)
+    print(f"\n💾 Resultado guardado en {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Configuración de gunicorn para producción
+Uso (desde backend/): gunicorn -c gunicorn.conf.py app:app
+Todos los valores se pueden ajustar por variables de entorno sin cambiar el comando de inicio
+"""
+
+import os
+
+# Puerto asignado por la plataforma (Railway, Render, Heroku)
+bind = f"0.0.0.0:{os.getenv('PORT', 5003)}"
+
+# Procesos worker; WEB_CONCURRENCY es la variable estándar que fijan Heroku/Render
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+
+# Los límites de tasa (*_RATE_LIMIT) son por cuenta y cada worker usa su parte: se exporta el número
+# de workers antes de importar la app (en el master con preload, o en cada worker sin él)
+os.environ['WEB_CONCURRENCY'] = str(workers)
+
+# gthread: hilos por worker, adecuado para una app que espera sobre todo a APIs externas
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+
+# Segundos que se mantiene abierta una conexión keep-alive entre peticiones
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+# Un worker sin responder durante timeout segundos se reinicia; al apagar o recargar,
+# las peticiones en curso tienen graceful_timeout segundos para terminar
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+
+# Reciclar workers tras N peticiones (0: nunca) con jitter para que no reinicien a la vez
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 0))
+
+# Preload: la app, los clientes HTTP y el analizador (LangChain/OpenAI) se crean una vez en el
+# master y los workers los heredan por fork en lugar de importarlos cada uno
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() in ('1', 'true', 'yes')
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-') or None
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+def post_fork(server, worker):
+    """
+    Registra el arranque de cada worker
+
+    No abre ni cierra conexiones: SQLiteDatabase.connection() compara el PID de la conexión del hilo
+    y crea una nueva en el worker al primer uso, así que nunca se usa la heredada del master
+    """
+    server.log.info(f"⚙️ Worker {worker.pid} iniciado ({worker_class}, {threads} hilos)")
+
+def post_worker_init(worker):
+    """
+    Arranca los hilos de la cola de trabajos en cuanto el worker carga la app (con los handlers ya
+    registrados), así los trabajos pendientes de antes de un reinicio o deploy se retoman sin esperar
+    a que llegue un webhook nuevo
+    """
+    from storage.job_queue import job_queue
+    job_queue.ensure_workers()
+
+    # Sync de la réplica de HubSpot: un hilo por worker; el turno en SQLite y el intervalo mínimo
+    # entre pasadas hacen que solo uno sincronice cada tipo por intervalo
+    from api.hubspot import HUBSPOT_MIRROR_ENABLED
+    if HUBSPOT_MIRROR_ENABLED:
+        from api.hubspot_sync import mirror_sync_worker
+        mirror_sync_worker.ensure_running()
+
+def when_ready(server):
+    """Con preload, crea el analizador en el master; sin preload cada worker lo crea en su primer uso"""
+    if preload_app:
+        from agents.conversation_analyzer import get_conversation_analyzer
+        get_conversation_analyzer()
+        server.log.info("🤖 Analizador de conversaciones precargado")
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Importación masiva de prospectos desde la línea de comandos
+
+Uso:
+    python import_prospects.py asistentes.csv
+    python import_prospects.py asistentes.jsonl --output resultados.jsonl --concurrency 8
+"""
+
+import os
+import sys
+import argparse
+from dotenv import load_dotenv
+
+# Agregar el directorio actual al path para importar los módulos
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+load_dotenv()
+
+from api.bulk_import import run_bulk_import, parse_rows, detect_format, BULK_IMPORT_CONCURRENCY
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa prospectos en bloque a HubSpot enriquecidos con Apollo")
+    parser.add_argument("input_file", help="Archivo CSV (con encabezados) o JSONL con los campos de /api/prospect")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="Formato de entrada (por defecto según la extensión)")
+    parser.add_argument("--output", help="Archivo JSONL de resultados por fila (por defecto en data/bulk_imports/)")
+    parser.add_argument("--concurrency", type=int, default=BULK_IMPORT_CONCURRENCY,
+                        help="Llamadas concurrentes a Apollo y lotes concurrentes a HubSpot")
+    args = parser.parse_args()
+
+    with open(args.input_file, 'r', encoding='utf-8-sig') as f:
+        content = f.read()
+
+    rows = parse_rows(content, args.format or detect_format(args.input_file))
+
+    print(f"📥 {len(rows)} filas leídas de {args.input_file}")
+
+    summary = {}
+    for event in run_bulk_import(rows, concurrency=args.concurrency, results_path=args.output):
+        if event['event'] == 'started':
+            print(f"🔢 {event['unique_contacts']} contactos únicos, {event['unique_domains']} dominios únicos")
+        elif event['event'] == 'progress':
+            print(f"⏳ {event['stage']}: {event['done']}/{event['total']}")
+        elif event['event'] == 'done':
+            summary = event['summary']
+            print(f"✅ Importación {event['import_id']} finalizada: {summary}")
+            print(f"📄 Resultados por fila: {event['results_file']}")
+
+    return 1 if summary.get('error') else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga simple contra un servidor en ejecución
+Mide peticiones por segundo y latencias con N clientes concurrentes durante un tiempo fijo
+
+Uso:
+    python load_test.py --url http://127.0.0.1:5003/health --concurrency 32 --duration 15
+"""
+
+import argparse
+import json
+import threading
+import time
+import requests
+
+def run_client(url, deadline, latencies, errors, lock):
+    """Cliente con conexión keep-alive que envía peticiones hasta el deadline"""
+    session = requests.Session()
+    local_latencies = []
+    local_errors = 0
+
+    while time.monotonic() < deadline:
+        started = time.monotonic()
+        try:
+            response = session.get(url, timeout=30)
+            if response.status_code >= 400:
+                local_errors += 1
+        except requests.exceptions.RequestException:
+            local_errors += 1
+        local_latencies.append(time.monotonic() - started)
+
+    with lock:
+        latencies.extend(local_latencies)
+        errors[0] += local_errors
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def run_load_test(url, concurrency, duration):
+    """
+    Ejecuta la prueba de carga
+
+    Args:
+        url (str): URL a consultar con GET
+        concurrency (int): Clientes concurrentes
+        duration (float): Segundos de prueba
+
+    Returns:
+        Dict: Peticiones, errores, peticiones por segundo y latencias en ms
+    """
+    latencies, errors, lock = [], [0], threading.Lock()
+    started = time.monotonic()
+    deadline = started + duration
+
+    clients = [
+        threading.Thread(target=run_client, args=(url, deadline, latencies, errors, lock), daemon=True)
+        for _ in range(concurrency)
+    ]
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+
+    elapsed = time.monotonic() - started
+    latencies.sort()
+
+    return {
+        "url": url,
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 2),
+        "requests": len(latencies),
+        "errors": errors[0],
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga simple (peticiones por segundo y latencias)")
+    parser.add_argument('--url', default='http://127.0.0.1:5003/health', help="URL a consultar con GET")
+    parser.add_argument('--concurrency', type=int, default=32, help="Clientes concurrentes")
+    parser.add_argument('--duration', type=float, default=15, help="Segundos de prueba")
+    args = parser.parse_args()
+
+    print(json.dumps(run_load_test(args.url, args.concurrency, args.duration), indent=2))
+
+if __name__ == "__main__":
+    main()
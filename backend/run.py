@@ -6,6 +6,9 @@ Script para ejecutar el servidor Flask del webhook handler
 import os
 from dotenv import load_dotenv
 from app import app
+from storage.job_queue import job_queue
+from api.hubspot import HUBSPOT_MIRROR_ENABLED
+from api.hubspot_sync import mirror_sync_worker
 
 # Cargar variables de entorno desde .env
 load_dotenv()
@@ -19,4 +22,7 @@ if __name__ == '__main__':
     print(f"Webhook endpoint: http://localhost:{port}/webhook")
     print(f"Health check: http://localhost:{port}/health")
     
+    job_queue.ensure_workers()
+    if HUBSPOT_MIRROR_ENABLED:
+        mirror_sync_worker.ensure_running()
     app.run(host='0.0.0.0', port=port, debug=debug)
@@ -0,0 +1,289 @@
+"""
+Caché con TTL y evicción LRU para resultados de proveedores externos
+El backend es intercambiable: en memoria del proceso o persistente en disco (SQLite)
+"""
+import copy
+import json
+import threading
+import time
+import logging
+import weakref
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from storage.sqlite_db import SQLiteDatabase
+
+logger = logging.getLogger(__name__)
+
+# Cachés creadas en el proceso, para exponer sus contadores (sin impedir que se liberen)
+_caches = weakref.WeakSet()
+_caches_lock = threading.Lock()
+
+def _register_cache(cache: 'CacheBackend'):
+    with _caches_lock:
+        _caches.add(cache)
+
+def get_cache_stats() -> Dict:
+    """Retorna los contadores de todas las cachés del proceso, por nombre"""
+    with _caches_lock:
+        caches = list(_caches)
+    return {cache.name: cache.stats() for cache in caches}
+
+class CacheBackend(ABC):
+    """
+    Interfaz común de los backends de caché
+
+    get y peek retornan una copia: quien la modifica no altera la entrada ni a otros lectores
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """Retorna el valor almacenado o None si no existe o expiró"""
+
+    @abstractmethod
+    def peek(self, key: str) -> Optional[Any]:
+        """Como get, pero sin contar acierto/fallo ni marcar la entrada como usada"""
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Almacena un valor con TTL en segundos (None usa el TTL por defecto)"""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Elimina una entrada si existe"""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Elimina todas las entradas"""
+
+    @abstractmethod
+    def stats(self) -> Dict:
+        """Retorna los contadores de la caché"""
+
+class InMemoryCache(CacheBackend):
+    """
+    Caché en memoria del proceso con TTL por entrada y evicción LRU
+
+    Los valores se copian al guardar y al leer, igual que al serializarlos en SQLiteCache
+    """
+
+    def __init__(self, max_entries: int = 1000, default_ttl: float = 3600, name: str = "cache"):
+        """
+        Inicializa la caché
+
+        Args:
+            max_entries (int): Número máximo de entradas antes de evictar la menos usada
+            default_ttl (float): TTL por defecto en segundos
+            name (str): Nombre de la caché para logs y métricas
+        """
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.name = name
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        _register_cache(self)
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._expirations += 1
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return copy.deepcopy(value)
+
+    def peek(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                return None
+            return copy.deepcopy(entry[1])
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                evicted_key, _ = self._entries.popitem(last=False)
+                self._evictions += 1
+                logger.debug(f"Caché {self.name}: entrada evictada {evicted_key}")
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "name": self.name,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0
+            }
+
+class SQLiteCache(CacheBackend):
+    """
+    Caché persistente en disco (SQLite) con TTL y evicción por tamaño total (LRU)
+
+    Los valores deben ser serializables en JSON. Se comparte entre workers del mismo host.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS cache_entries (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        expires_at REAL NOT NULL,
+        last_access REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_cache_last_access ON cache_entries(last_access);
+
+    -- Tamaño total mantenido por triggers: set no recorre la tabla para decidir si evictar
+    CREATE TABLE IF NOT EXISTS cache_size (
+        id INTEGER PRIMARY KEY CHECK (id = 0),
+        total INTEGER NOT NULL
+    );
+    CREATE TRIGGER IF NOT EXISTS cache_entries_size_insert AFTER INSERT ON cache_entries BEGIN
+        UPDATE cache_size SET total = total + NEW.size WHERE id = 0;
+    END;
+    CREATE TRIGGER IF NOT EXISTS cache_entries_size_update AFTER UPDATE OF size ON cache_entries BEGIN
+        UPDATE cache_size SET total = total - OLD.size + NEW.size WHERE id = 0;
+    END;
+    CREATE TRIGGER IF NOT EXISTS cache_entries_size_delete AFTER DELETE ON cache_entries BEGIN
+        UPDATE cache_size SET total = total - OLD.size WHERE id = 0;
+    END;
+    -- Bases creadas sin cache_size: el total parte de las entradas existentes (después de los triggers)
+    INSERT OR IGNORE INTO cache_size (id, total) SELECT 0, COALESCE(SUM(size), 0) FROM cache_entries;
+    """
+
+    def __init__(self, db_file: str, max_bytes: int = 50 * 1024 * 1024,
+                 default_ttl: float = 30 * 24 * 3600, name: str = "cache"):
+        """
+        Inicializa la caché
+
+        Args:
+            db_file (str): Archivo SQLite dentro de data/ o ruta absoluta
+            max_bytes (int): Tamaño máximo de los valores almacenados
+            default_ttl (float): TTL por defecto en segundos
+            name (str): Nombre de la caché para logs y métricas
+        """
+        self.db = SQLiteDatabase(db_file, self.SCHEMA)
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.name = name
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        _register_cache(self)
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        row = self.db.execute(
+            "SELECT value, expires_at FROM cache_entries WHERE key = ?", (key,)
+        ).fetchone()
+
+        if row is None or row['expires_at'] <= now:
+            with self._lock:
+                self._misses += 1
+                if row is not None:
+                    self._expirations += 1
+            if row is not None:
+                self.delete(key)
+            return None
+
+        self.db.execute("UPDATE cache_entries SET last_access = ? WHERE key = ?", (now, key))
+        with self._lock:
+            self._hits += 1
+        return json.loads(row['value'])
+
+    def peek(self, key: str) -> Optional[Any]:
+        row = self.db.execute(
+            "SELECT value FROM cache_entries WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return json.loads(row['value']) if row is not None else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        now = time.time()
+        serialized = json.dumps(value, ensure_ascii=False)
+
+        with self.db.transaction() as conn:
+            # Upsert en lugar de INSERT OR REPLACE: el reemplazo no dispara el trigger de borrado
+            conn.execute(
+                """INSERT INTO cache_entries (key, value, size, expires_at, last_access)
+                   VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT(key) DO UPDATE SET
+                       value = excluded.value,
+                       size = excluded.size,
+                       expires_at = excluded.expires_at,
+                       last_access = excluded.last_access""",
+                (key, serialized, len(serialized.encode('utf-8')), now + ttl, now)
+            )
+
+            total_size = conn.execute("SELECT total FROM cache_size WHERE id = 0").fetchone()[0]
+            evicted = 0
+            while total_size > self.max_bytes:
+                oldest = conn.execute(
+                    "SELECT key, size FROM cache_entries WHERE key != ? ORDER BY last_access LIMIT 1", (key,)
+                ).fetchone()
+                if oldest is None:
+                    break
+                conn.execute("DELETE FROM cache_entries WHERE key = ?", (oldest['key'],))
+                total_size -= oldest['size']
+                evicted += 1
+
+        if evicted:
+            with self._lock:
+                self._evictions += evicted
+            logger.debug(f"Caché {self.name}: {evicted} entradas evictadas por tamaño")
+
+    def delete(self, key: str) -> None:
+        self.db.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        self.db.execute("DELETE FROM cache_entries")
+
+    def stats(self) -> Dict:
+        row = self.db.execute(
+            "SELECT (SELECT COUNT(*) FROM cache_entries) AS entries, total AS bytes FROM cache_size WHERE id = 0"
+        ).fetchone()
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "name": self.name,
+                "size": row['entries'],
+                "bytes": row['bytes'],
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0
+            }
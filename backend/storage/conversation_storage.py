@@ -67,12 +67,15 @@ class ConversationStorage:
             bool: True si se almacenó exitosamente
         """
         try:
+            now = datetime.now().isoformat()
+            # Al volver a almacenar se conserva el created_at original (igual que el backend SQLite)
+            previous = self.data.get(conversation_id) or {}
             mapping_data = {
                 "conversation_id": conversation_id,
                 "hubspot_id": hubspot_id,
                 "prospect_data": prospect_data,
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
+                "created_at": previous.get('created_at') or now,
+                "updated_at": now
             }
             
             self.data[conversation_id] = mapping_data
@@ -202,5 +205,25 @@ class ConversationStorage:
             logger.error(f"Error eliminando mapeo: {str(e)}")
             return False
 
+# Backend de almacenamiento: 'sqlite' (por defecto) o 'json' (archivo único)
+CONVERSATION_STORAGE_BACKEND = os.getenv('CONVERSATION_STORAGE_BACKEND', 'sqlite')
+
+def create_conversation_storage(backend: str = CONVERSATION_STORAGE_BACKEND):
+    """
+    Crea el almacenamiento de mapeos según el backend configurado. Ambos backends se comportan
+    igual: volver a almacenar un mapeo actualiza sus datos y updated_at, pero conserva created_at
+    
+    Args:
+        backend (str): 'sqlite' o 'json'
+        
+    Returns:
+        Instancia con la interfaz de ConversationStorage
+    """
+    if backend == 'json':
+        return ConversationStorage()
+    
+    from storage.sqlite_conversation_storage import SQLiteConversationStorage
+    return SQLiteConversationStorage()
+
 # Instancia global del almacenamiento
-conversation_storage = ConversationStorage()
+conversation_storage = create_conversation_storage()
@@ -0,0 +1,229 @@
+"""
+Réplica local de contactos y empresas de HubSpot en SQLite
+La llena el sync incremental (api/hubspot_sync.py) y la leen get_contact_info y el enriquecimiento
+"""
+import json
+import os
+import time
+import logging
+from typing import Dict, Iterable, List, Optional
+from storage.sqlite_db import SQLiteDatabase
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS mirror_objects (
+    object_type TEXT NOT NULL,
+    id TEXT NOT NULL,
+    email TEXT,
+    data TEXT NOT NULL,
+    last_modified REAL,
+    synced_at REAL NOT NULL,
+    stale_at REAL,
+    PRIMARY KEY (object_type, id)
+);
+CREATE INDEX IF NOT EXISTS idx_mirror_email ON mirror_objects(object_type, email);
+CREATE INDEX IF NOT EXISTS idx_mirror_synced_at ON mirror_objects(object_type, synced_at);
+
+CREATE TABLE IF NOT EXISTS mirror_sync_state (
+    object_type TEXT PRIMARY KEY,
+    watermark REAL NOT NULL DEFAULT 0,
+    last_success_at REAL,
+    last_attempt_at REAL,
+    last_error TEXT,
+    objects_synced INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_until REAL
+);
+"""
+
+class HubSpotMirror:
+    """
+    Objetos de HubSpot (tal como los retorna la API) indexados por tipo, ID y email,
+    con el estado del sync por tipo (watermark de lastmodifieddate y último sync exitoso)
+    """
+
+    def __init__(self, db_file: str = "hubspot_mirror.db"):
+        """
+        Inicializa la réplica
+
+        Args:
+            db_file (str): Archivo SQLite dentro de data/ o ruta absoluta
+        """
+        self.db = SQLiteDatabase(db_file, SCHEMA)
+
+    def upsert_objects(self, object_type: str, objects: Iterable[Dict], fetched_at: float) -> int:
+        """
+        Guarda o reemplaza objetos leídos de HubSpot
+
+        Un objeto marcado como desactualizado después de fetched_at (escritura propia durante
+        la lectura) conserva la marca hasta que un sync posterior lo vuelva a traer
+
+        Args:
+            object_type (str): contacts o companies
+            objects (Iterable[Dict]): Objetos con id, properties y last_modified (epoch en segundos)
+            fetched_at (float): Momento en que se inició la lectura en HubSpot
+
+        Returns:
+            int: Objetos guardados
+        """
+        rows = [
+            (object_type, str(obj['id']), (obj.get('properties', {}).get('email') or '').strip().lower() or None,
+             json.dumps({"id": str(obj['id']), "properties": obj.get('properties', {})}, ensure_ascii=False),
+             obj.get('last_modified'), time.time(), fetched_at)
+            for obj in objects
+        ]
+
+        with self.db.transaction() as conn:
+            conn.executemany(
+                """INSERT INTO mirror_objects (object_type, id, email, data, last_modified, synced_at)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(object_type, id) DO UPDATE SET
+                       email = excluded.email, data = excluded.data, last_modified = excluded.last_modified,
+                       synced_at = excluded.synced_at,
+                       stale_at = CASE WHEN stale_at >= ? THEN stale_at ELSE NULL END""",
+                rows
+            )
+
+        return len(rows)
+
+    def get_object(self, object_type: str, object_id: str) -> Optional[Dict]:
+        """Retorna el objeto replicado con su estado (data, synced_at, stale) o None"""
+        row = self.db.execute(
+            "SELECT data, synced_at, stale_at FROM mirror_objects WHERE object_type = ? AND id = ?",
+            (object_type, str(object_id))
+        ).fetchone()
+        return self._row_to_entry(row)
+
+    def get_contact_by_email(self, email: str) -> Optional[Dict]:
+        """Retorna el contacto replicado con ese email (el modificado más recientemente si hay varios) o None"""
+        row = self.db.execute(
+            """SELECT data, synced_at, stale_at FROM mirror_objects
+               WHERE object_type = 'contacts' AND email = ? ORDER BY last_modified DESC LIMIT 1""",
+            (email.strip().lower(),)
+        ).fetchone()
+        return self._row_to_entry(row)
+
+    @staticmethod
+    def _row_to_entry(row) -> Optional[Dict]:
+        if row is None:
+            return None
+        return {"data": json.loads(row['data']), "synced_at": row['synced_at'], "stale": row['stale_at'] is not None}
+
+    def mark_stale(self, object_type: str, object_id: Optional[str] = None, email: Optional[str] = None):
+        """Marca un objeto como desactualizado tras una escritura propia; se lee de HubSpot hasta el próximo sync"""
+        now = time.time()
+        if object_id:
+            self.db.execute("UPDATE mirror_objects SET stale_at = ? WHERE object_type = ? AND id = ?",
+                            (now, object_type, str(object_id)))
+        if email:
+            self.db.execute("UPDATE mirror_objects SET stale_at = ? WHERE object_type = ? AND email = ?",
+                            (now, object_type, email.strip().lower()))
+
+    def delete_not_synced_since(self, object_type: str, since: float) -> int:
+        """Elimina los objetos que un sync completo no volvió a traer (borrados o archivados en HubSpot)"""
+        cursor = self.db.execute(
+            "DELETE FROM mirror_objects WHERE object_type = ? AND synced_at < ?", (object_type, since)
+        )
+        return cursor.rowcount
+
+    def count(self, object_type: str) -> int:
+        """Objetos replicados de un tipo"""
+        return self.db.execute(
+            "SELECT COUNT(*) FROM mirror_objects WHERE object_type = ?", (object_type,)
+        ).fetchone()[0]
+
+    def get_state(self, object_type: str) -> Dict:
+        """Estado del sync de un tipo (watermark en segundos epoch, último sync exitoso, último error)"""
+        row = self.db.execute("SELECT * FROM mirror_sync_state WHERE object_type = ?", (object_type,)).fetchone()
+        if row is None:
+            return {"object_type": object_type, "watermark": 0.0, "last_success_at": None,
+                    "last_attempt_at": None, "last_error": None, "objects_synced": 0}
+        state = dict(row)
+        state.pop('lease_owner')
+        state.pop('lease_until')
+        return state
+
+    def sync_lag(self, object_type: str) -> Optional[float]:
+        """Segundos desde el último sync exitoso del tipo, o None si nunca se sincronizó"""
+        last_success_at = self.get_state(object_type)['last_success_at']
+        return time.time() - last_success_at if last_success_at else None
+
+    def save_watermark(self, object_type: str, watermark: float, objects_synced: int = 0):
+        """Avanza el watermark tras guardar una página (un sync interrumpido continúa desde ahí)"""
+        with self.db.transaction() as conn:
+            self._ensure_state(conn, object_type)
+            conn.execute(
+                """UPDATE mirror_sync_state SET watermark = MAX(watermark, ?), objects_synced = objects_synced + ?
+                   WHERE object_type = ?""",
+                (watermark, objects_synced, object_type)
+            )
+
+    def reset_watermark(self, object_type: str):
+        """Vuelve el watermark a cero para un sync completo"""
+        with self.db.transaction() as conn:
+            self._ensure_state(conn, object_type)
+            conn.execute("UPDATE mirror_sync_state SET watermark = 0 WHERE object_type = ?", (object_type,))
+
+    def record_sync_result(self, object_type: str, started_at: float, error: Optional[str] = None):
+        """Registra el final de un sync; solo uno exitoso actualiza last_success_at (y con él el lag)"""
+        with self.db.transaction() as conn:
+            self._ensure_state(conn, object_type)
+            if error is None:
+                conn.execute(
+                    """UPDATE mirror_sync_state SET last_success_at = ?, last_attempt_at = ?, last_error = NULL
+                       WHERE object_type = ?""",
+                    (started_at, started_at, object_type)
+                )
+            else:
+                conn.execute(
+                    "UPDATE mirror_sync_state SET last_attempt_at = ?, last_error = ? WHERE object_type = ?",
+                    (started_at, error, object_type)
+                )
+
+    def acquire_lease(self, object_type: str, owner: str, duration: float) -> bool:
+        """
+        Toma (o renueva) el turno de sincronizar un tipo; solo un proceso sincroniza a la vez
+
+        Args:
+            object_type (str): contacts o companies
+            owner (str): Identificador del proceso (host:pid)
+            duration (float): Segundos que dura el turno si no se renueva
+
+        Returns:
+            bool: True si el turno es de este proceso
+        """
+        now = time.time()
+        with self.db.transaction() as conn:
+            self._ensure_state(conn, object_type)
+            cursor = conn.execute(
+                """UPDATE mirror_sync_state SET lease_owner = ?, lease_until = ?
+                   WHERE object_type = ? AND (lease_owner IS NULL OR lease_owner = ? OR lease_until < ?)""",
+                (owner, now + duration, object_type, owner, now)
+            )
+            return cursor.rowcount == 1
+
+    def release_lease(self, object_type: str, owner: str):
+        """Libera el turno si lo tiene este proceso"""
+        self.db.execute(
+            "UPDATE mirror_sync_state SET lease_owner = NULL, lease_until = NULL WHERE object_type = ? AND lease_owner = ?",
+            (object_type, owner)
+        )
+
+    @staticmethod
+    def _ensure_state(conn, object_type: str):
+        conn.execute("INSERT OR IGNORE INTO mirror_sync_state (object_type) VALUES (?)", (object_type,))
+
+    def stats(self, object_types: List[str]) -> Dict:
+        """Objetos, lag y último error por tipo"""
+        return {
+            object_type: {
+                "objects": self.count(object_type),
+                "lag_seconds": self.sync_lag(object_type),
+                **self.get_state(object_type)
+            }
+            for object_type in object_types
+        }
+
+# Instancia global de la réplica (compartida por los workers del host)
+hubspot_mirror = HubSpotMirror(db_file=os.getenv('HUBSPOT_MIRROR_DB', 'hubspot_mirror.db'))
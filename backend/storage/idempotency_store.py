@@ -0,0 +1,187 @@
+"""
+Almacén de idempotencia para eventos de webhook
+Detecta reintentos del mismo evento y retorna el resultado original sin reprocesarlo
+"""
+import hashlib
+import json
+import os
+import time
+import logging
+from typing import Dict, Optional, Tuple
+from storage.sqlite_db import SQLiteDatabase
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS webhook_events (
+    fingerprint TEXT PRIMARY KEY,
+    event_key TEXT,
+    job_id INTEGER,
+    result TEXT,
+    started_at REAL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_webhook_events_expires_at ON webhook_events(expires_at);
+CREATE INDEX IF NOT EXISTS idx_webhook_events_created_at ON webhook_events(created_at);
+"""
+
+class IdempotencyStore:
+    """
+    Registro de eventos procesados con retención acotada por TTL y número de entradas
+    """
+
+    def __init__(self, db_file: str = "idempotency.db", ttl: float = 7 * 24 * 3600,
+                 max_entries: int = 100000, evict_every: int = 100, in_progress_timeout: float = 300):
+        """
+        Inicializa el almacén
+
+        Args:
+            db_file (str): Archivo SQLite dentro de data/
+            ttl (float): Segundos que se recuerda un evento
+            max_entries (int): Máximo de eventos recordados; se eliminan los más antiguos
+            evict_every (int): Cada cuántos registros nuevos se ejecuta la limpieza
+            in_progress_timeout (float): Segundos tras los que un evento tomado sin resultado ni
+                trabajo se considera abandonado (el proceso que lo tomó murió) y se puede reprocesar
+        """
+        self.db = SQLiteDatabase(db_file, SCHEMA)
+        self._migrate()
+        self.ttl = ttl
+        self.in_progress_timeout = in_progress_timeout
+        self.max_entries = max_entries
+        self.evict_every = evict_every
+        self._inserts = 0
+
+    def _migrate(self):
+        """Agrega started_at a las bases creadas antes de la marca de procesamiento en curso"""
+        columns = {row['name'] for row in self.db.execute("PRAGMA table_info(webhook_events)")}
+        if 'started_at' not in columns:
+            self.db.execute("ALTER TABLE webhook_events ADD COLUMN started_at REAL")
+
+    @staticmethod
+    def fingerprint(event_key: str, event_type: str, body) -> str:
+        """
+        Calcula la huella de un evento: clave + tipo + hash del contenido
+
+        Args:
+            event_key (str): Clave del evento (ej: conversation_id)
+            event_type (str): Tipo de evento del webhook
+            body: Contenido relevante del evento (ej: transcript), serializable en JSON
+
+        Returns:
+            str: Huella SHA-256 en hexadecimal
+        """
+        body_hash = hashlib.sha256(
+            json.dumps(body, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        ).hexdigest()
+        return hashlib.sha256(f"{event_key}|{event_type}|{body_hash}".encode('utf-8')).hexdigest()
+
+    def claim(self, fingerprint: str, event_key: Optional[str] = None) -> Tuple[bool, Optional[Dict]]:
+        """
+        Registra un evento si es nuevo
+
+        Args:
+            fingerprint (str): Huella del evento
+            event_key (str): Clave del evento para consulta
+
+        Returns:
+            Tuple[bool, Dict]: (True, registro nuevo) si el evento es nuevo; (False, registro) si es un duplicado
+        """
+        now = time.time()
+        with self.db.transaction() as conn:
+            row = conn.execute(
+                "SELECT * FROM webhook_events WHERE fingerprint = ? AND expires_at > ?",
+                (fingerprint, now)
+            ).fetchone()
+
+            if row:
+                record = dict(row)
+                record['result'] = json.loads(record['result']) if record['result'] else None
+                return False, record
+
+            conn.execute(
+                """INSERT OR REPLACE INTO webhook_events (fingerprint, event_key, started_at, created_at, expires_at)
+                   VALUES (?, ?, ?, ?, ?)""",
+                (fingerprint, event_key, now, now, now + self.ttl)
+            )
+
+        self._inserts += 1
+        if self._inserts % self.evict_every == 0:
+            self.evict()
+
+        return True, {"fingerprint": fingerprint, "event_key": event_key, "job_id": None, "result": None,
+                      "started_at": now, "created_at": now, "expires_at": now + self.ttl}
+
+    def reclaim(self, fingerprint: str, record: Dict) -> bool:
+        """
+        Vuelve a tomar un evento cuyo procesamiento falló o quedó abandonado
+
+        Es una comparación e intercambio sobre el registro leído en claim: si otro reintento
+        concurrente ya lo volvió a tomar (o el original terminó), no se modifica
+
+        Args:
+            fingerprint (str): Huella del evento
+            record (dict): Registro retornado por claim para el duplicado
+
+        Returns:
+            bool: True si este proceso tomó el evento y debe procesarlo
+        """
+        now = time.time()
+        with self.db.transaction() as conn:
+            updated = conn.execute(
+                """UPDATE webhook_events SET job_id = NULL, started_at = ?, expires_at = ?
+                   WHERE fingerprint = ? AND result IS NULL AND job_id IS ? AND started_at IS ?""",
+                (now, now + self.ttl, fingerprint, record.get('job_id'), record.get('started_at'))
+            ).rowcount
+        return updated == 1
+
+    def is_abandoned(self, record: Dict) -> bool:
+        """True si el evento se tomó, no tiene resultado ni trabajo y venció in_progress_timeout"""
+        if record.get('result') is not None or record.get('job_id'):
+            return False
+        started_at = record.get('started_at') or record.get('created_at') or 0
+        return time.time() - started_at >= self.in_progress_timeout
+
+    def attach_job(self, fingerprint: str, job_id: int):
+        """Asocia el trabajo que procesa el evento"""
+        self.db.execute("UPDATE webhook_events SET job_id = ? WHERE fingerprint = ?", (job_id, fingerprint))
+
+    def save_result(self, fingerprint: str, result: Dict):
+        """Guarda el resultado del procesamiento del evento"""
+        self.db.execute(
+            "UPDATE webhook_events SET result = ? WHERE fingerprint = ?",
+            (json.dumps(result, ensure_ascii=False), fingerprint)
+        )
+
+    def release(self, fingerprint: str):
+        """Olvida un evento para permitir que se vuelva a procesar (ej: si falló definitivamente)"""
+        self.db.execute("DELETE FROM webhook_events WHERE fingerprint = ?", (fingerprint,))
+
+    def evict(self):
+        """Elimina eventos expirados y los más antiguos por encima de max_entries"""
+        try:
+            with self.db.transaction() as conn:
+                expired = conn.execute(
+                    "DELETE FROM webhook_events WHERE expires_at <= ?", (time.time(),)
+                ).rowcount
+
+                overflow = conn.execute(
+                    """DELETE FROM webhook_events WHERE fingerprint IN (
+                           SELECT fingerprint FROM webhook_events ORDER BY created_at DESC LIMIT -1 OFFSET ?
+                       )""",
+                    (self.max_entries,)
+                ).rowcount
+
+            if expired or overflow:
+                logger.info(f"🧹 Idempotencia: {expired} eventos expirados y {overflow} por límite eliminados")
+
+        except Exception as e:
+            logger.error(f"Error limpiando eventos de idempotencia: {str(e)}")
+
+# Instancia global para los webhooks de Tavus
+webhook_idempotency = IdempotencyStore(
+    db_file=os.getenv('IDEMPOTENCY_DB', 'idempotency.db'),
+    ttl=float(os.getenv('IDEMPOTENCY_TTL', 7 * 24 * 3600)),
+    max_entries=int(os.getenv('IDEMPOTENCY_MAX_ENTRIES', 100000)),
+    in_progress_timeout=float(os.getenv('IDEMPOTENCY_IN_PROGRESS_TIMEOUT', 300))
+)
@@ -0,0 +1,293 @@
+"""
+Cola de trabajos durable en SQLite con workers en hilos
+Los trabajos sobreviven reinicios y se reintentan con backoff exponencial
+"""
+import json
+import os
+import time
+import random
+import threading
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+from storage.sqlite_db import SQLiteDatabase
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_type TEXT NOT NULL,
+    job_key TEXT,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    next_run_at REAL NOT NULL,
+    locked_at REAL,
+    result TEXT,
+    error TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_next_run ON jobs(status, next_run_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_key ON jobs(job_key);
+"""
+
+# Estados de un trabajo
+STATUS_PENDING = 'pending'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+class JobQueue:
+    """
+    Cola durable de trabajos con handlers por tipo y un pool de hilos worker
+    """
+
+    def __init__(self, db_file: str = "jobs.db", num_workers: int = 2, max_attempts: int = 5,
+                 backoff_base: float = 2.0, backoff_max: float = 300.0, lease_timeout: float = 600.0,
+                 poll_interval: float = 1.0, retention: float = 7 * 86400, prune_interval: float = 3600.0):
+        """
+        Inicializa la cola
+
+        Args:
+            db_file (str): Archivo SQLite dentro de data/
+            num_workers (int): Hilos worker por proceso
+            max_attempts (int): Intentos antes de marcar el trabajo como fallido
+            backoff_base (float): Segundos base del backoff exponencial entre reintentos
+            backoff_max (float): Tope del backoff en segundos
+            lease_timeout (float): Segundos tras los cuales un trabajo 'running' se considera huérfano
+            poll_interval (float): Segundos entre consultas cuando la cola está vacía
+            retention (float): Segundos que se conservan los trabajos terminados o fallidos (0: siempre)
+            prune_interval (float): Segundos entre limpiezas de trabajos vencidos
+        """
+        self.db = SQLiteDatabase(db_file, SCHEMA)
+        self.num_workers = num_workers
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease_timeout = lease_timeout
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.prune_interval = prune_interval
+
+        self._handlers = {}
+        self._wakeup = threading.Event()
+        self._workers_lock = threading.Lock()
+        self._workers = []
+        self._workers_pid = None
+        self._last_prune = 0.0
+
+    def register_handler(self, job_type: str, handler: Callable[[Dict], Dict]):
+        """
+        Registra la función que procesa un tipo de trabajo
+
+        Args:
+            job_type (str): Tipo de trabajo
+            handler (Callable): Recibe el payload y retorna un resultado serializable en JSON;
+                                una excepción provoca un reintento
+        """
+        self._handlers[job_type] = handler
+
+    def enqueue(self, job_type: str, payload: Dict, job_key: Optional[str] = None) -> int:
+        """
+        Persiste un trabajo nuevo
+
+        Args:
+            job_type (str): Tipo de trabajo
+            payload (Dict): Datos del trabajo
+            job_key (str): Clave de consulta (ej: conversation_id)
+
+        Returns:
+            int: ID del trabajo
+        """
+        now = datetime.now().isoformat()
+        cursor = self.db.execute(
+            """INSERT INTO jobs (job_type, job_key, payload, status, max_attempts, next_run_at, created_at, updated_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+            (job_type, job_key, json.dumps(payload, ensure_ascii=False), STATUS_PENDING,
+             self.max_attempts, time.time(), now, now)
+        )
+        job_id = cursor.lastrowid
+
+        logger.info(f"📥 Trabajo {job_type} encolado: id={job_id}, key={job_key}")
+
+        self.ensure_workers()
+        self._wakeup.set()
+        return job_id
+
+    def get_job(self, job_id: int) -> Optional[Dict]:
+        """Obtiene un trabajo por ID"""
+        row = self.db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def get_latest_by_key(self, job_key: str) -> Optional[Dict]:
+        """Obtiene el trabajo más reciente para una clave"""
+        row = self.db.execute(
+            "SELECT * FROM jobs WHERE job_key = ? ORDER BY id DESC LIMIT 1",
+            (job_key,)
+        ).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def queue_depth(self) -> Dict:
+        """Cuenta los trabajos por estado"""
+        rows = self.db.execute("SELECT status, COUNT(*) AS total FROM jobs GROUP BY status").fetchall()
+        return {row['status']: row['total'] for row in rows}
+
+    @staticmethod
+    def _row_to_dict(row) -> Dict:
+        job = dict(row)
+        job['payload'] = json.loads(job['payload'])
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def prune(self, older_than: float) -> int:
+        """
+        Elimina los trabajos terminados o fallidos sin cambios en los últimos older_than segundos
+        (el payload guarda la transcripción completa)
+
+        Returns:
+            int: Trabajos eliminados
+        """
+        cutoff = (datetime.now() - timedelta(seconds=older_than)).isoformat()
+        cursor = self.db.execute(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+            (STATUS_DONE, STATUS_FAILED, cutoff)
+        )
+        if cursor.rowcount:
+            logger.info(f"🧹 {cursor.rowcount} trabajos terminados eliminados de la cola")
+        return cursor.rowcount
+
+    def _prune_if_due(self):
+        if not self.retention or time.monotonic() - self._last_prune < self.prune_interval:
+            return
+        self._last_prune = time.monotonic()
+        self.prune(self.retention)
+
+    def _claim_next(self) -> Optional[Dict]:
+        """Toma atómicamente el siguiente trabajo listo (o huérfano) y lo marca como 'running'"""
+        now = time.time()
+        with self.db.transaction() as conn:
+            # Un huérfano que ya agotó sus intentos (ej: el proceso muere siempre con él) se da por fallido
+            orphaned = conn.execute(
+                """UPDATE jobs SET status = ?, error = ?, locked_at = NULL, updated_at = ?
+                   WHERE status = ? AND locked_at <= ? AND attempts >= max_attempts""",
+                (STATUS_FAILED, "Lease vencido tras agotar los intentos", datetime.now().isoformat(),
+                 STATUS_RUNNING, now - self.lease_timeout)
+            )
+            if orphaned.rowcount:
+                logger.error(f"❌ {orphaned.rowcount} trabajos huérfanos fallidos tras agotar los intentos")
+
+            row = conn.execute(
+                """SELECT * FROM jobs
+                   WHERE (status = ? AND next_run_at <= ?) OR (status = ? AND locked_at <= ?)
+                   ORDER BY next_run_at LIMIT 1""",
+                (STATUS_PENDING, now, STATUS_RUNNING, now - self.lease_timeout)
+            ).fetchone()
+
+            if not row:
+                return None
+
+            conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, locked_at = ?, updated_at = ? WHERE id = ?",
+                (STATUS_RUNNING, now, datetime.now().isoformat(), row['id'])
+            )
+
+        job = self._row_to_dict(row)
+        job['attempts'] += 1
+        return job
+
+    def _finish(self, job: Dict, result: Dict):
+        self.db.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = NULL, locked_at = NULL, updated_at = ? WHERE id = ?",
+            (STATUS_DONE, json.dumps(result, ensure_ascii=False), datetime.now().isoformat(), job['id'])
+        )
+
+    def _fail(self, job: Dict, error: str):
+        if job['attempts'] >= job['max_attempts']:
+            status, next_run_at = STATUS_FAILED, time.time()
+            logger.error(f"❌ Trabajo {job['id']} fallido tras {job['attempts']} intentos: {error}")
+        else:
+            # Backoff exponencial con jitter para no reintentar en bloque
+            delay = min(self.backoff_max, self.backoff_base * (2 ** (job['attempts'] - 1)))
+            delay = delay * random.uniform(0.5, 1.0)
+            status, next_run_at = STATUS_PENDING, time.time() + delay
+            logger.warning(f"🔁 Trabajo {job['id']} reintentará en {delay:.1f}s (intento {job['attempts']}): {error}")
+
+        self.db.execute(
+            "UPDATE jobs SET status = ?, error = ?, next_run_at = ?, locked_at = NULL, updated_at = ? WHERE id = ?",
+            (status, error, next_run_at, datetime.now().isoformat(), job['id'])
+        )
+
+    def run_job(self, job: Dict):
+        """Ejecuta un trabajo reclamado con su handler"""
+        handler = self._handlers.get(job['job_type'])
+        if handler is None:
+            self._fail(job, f"No hay handler registrado para {job['job_type']}")
+            return
+
+        try:
+            result = handler(job['payload'])
+            self._finish(job, result)
+            logger.info(f"✅ Trabajo {job['id']} ({job['job_type']}) completado")
+        except Exception as e:
+            self._fail(job, str(e))
+
+    def _worker_loop(self):
+        while True:
+            try:
+                job = self._claim_next()
+            except Exception as e:
+                logger.error(f"Error reclamando trabajo: {str(e)}")
+                job = None
+
+            if job is None:
+                try:
+                    self._prune_if_due()
+                except Exception as e:
+                    logger.error(f"Error limpiando trabajos vencidos: {str(e)}")
+
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            try:
+                self.run_job(job)
+            except Exception as e:
+                # Si falla la escritura del estado, el lease vencido devolverá el trabajo a la cola
+                logger.error(f"Error registrando estado del trabajo {job['id']}: {str(e)}")
+
+    def ensure_workers(self):
+        """
+        Arranca los hilos worker en el proceso actual si no están corriendo
+
+        Se llama al iniciar cada worker (gunicorn.conf.py) para retomar los trabajos pendientes de
+        antes de un reinicio, y en cada enqueue; se comprueba el PID porque los hilos no sobreviven
+        al fork de los workers de gunicorn
+        """
+        with self._workers_lock:
+            if self._workers_pid != os.getpid():
+                self._workers = []
+            self._workers = [worker for worker in self._workers if worker.is_alive()]
+
+            if len(self._workers) >= self.num_workers:
+                return
+
+            for i in range(len(self._workers), self.num_workers):
+                worker = threading.Thread(target=self._worker_loop, name=f"job-worker-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+            self._workers_pid = os.getpid()
+
+            logger.info(f"⚙️ Workers de la cola de trabajos activos: {len(self._workers)} (pid {os.getpid()})")
+
+# Instancia global de la cola (configurable por variables de entorno)
+job_queue = JobQueue(
+    db_file=os.getenv('JOB_QUEUE_DB', 'jobs.db'),
+    num_workers=int(os.getenv('JOB_QUEUE_WORKERS', 2)),
+    max_attempts=int(os.getenv('JOB_QUEUE_MAX_ATTEMPTS', 5)),
+    backoff_base=float(os.getenv('JOB_QUEUE_BACKOFF_BASE', 2)),
+    lease_timeout=float(os.getenv('JOB_QUEUE_LEASE_TIMEOUT', 600)),
+    retention=float(os.getenv('JOB_QUEUE_RETENTION', 7 * 86400))
+)
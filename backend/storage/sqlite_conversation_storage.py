@@ -0,0 +1,304 @@
+"""
+Almacenamiento en SQLite (WAL) de los mapeos conversation_id -> hubspot_id
+Misma interfaz que ConversationStorage, con escrituras por fila en lugar de reescribir el archivo completo
+"""
+import json
+import os
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+from storage.sqlite_db import SQLiteDatabase, DATA_DIR
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversation_mappings (
+    conversation_id TEXT PRIMARY KEY,
+    hubspot_id TEXT,
+    mapping TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_mappings_hubspot_id ON conversation_mappings(hubspot_id);
+CREATE INDEX IF NOT EXISTS idx_mappings_created_at ON conversation_mappings(created_at);
+CREATE TABLE IF NOT EXISTS storage_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+class SQLiteConversationStorage:
+    """
+    Clase para manejar el almacenamiento de mapeos entre conversation_id y hubspot_id en SQLite
+    """
+
+    def __init__(self, db_file: str = "conversation_mappings.db",
+                 legacy_json_file: str = "conversation_mappings.json"):
+        """
+        Inicializa el almacenamiento y migra el archivo JSON anterior si existe
+
+        Args:
+            db_file (str): Archivo SQLite dentro de data/
+            legacy_json_file (str): Archivo JSON del almacenamiento anterior a migrar
+        """
+        self.db = SQLiteDatabase(db_file, SCHEMA)
+        self.full_path = self.db.full_path
+        self.legacy_json_path = os.path.join(DATA_DIR, legacy_json_file)
+
+        self._migrate_from_json()
+
+    def _migrate_from_json(self):
+        """Importa una sola vez los mapeos de data/conversation_mappings.json"""
+        try:
+            if not os.path.exists(self.legacy_json_path):
+                return
+
+            with self.db.transaction() as conn:
+                already_migrated = conn.execute(
+                    "SELECT value FROM storage_meta WHERE key = 'json_migrated_at'"
+                ).fetchone()
+                if already_migrated:
+                    return
+
+                with open(self.legacy_json_path, 'r', encoding='utf-8') as f:
+                    legacy_data = json.load(f)
+
+                rows = [self._to_row(conversation_id, mapping) for conversation_id, mapping in legacy_data.items()]
+
+                # INSERT OR IGNORE: no sobrescribir mapeos escritos ya en SQLite
+                conn.executemany(
+                    """INSERT OR IGNORE INTO conversation_mappings
+                       (conversation_id, hubspot_id, mapping, created_at, updated_at)
+                       VALUES (?, ?, ?, ?, ?)""",
+                    rows
+                )
+                conn.execute(
+                    "INSERT INTO storage_meta (key, value) VALUES ('json_migrated_at', ?)",
+                    (datetime.now().isoformat(),)
+                )
+
+            logger.info(f"✅ {len(rows)} mapeos migrados desde {self.legacy_json_path}")
+
+        except Exception as e:
+            logger.error(f"Error migrando mapeos desde JSON: {str(e)}")
+
+    @staticmethod
+    def _to_row(conversation_id: str, mapping: Dict) -> tuple:
+        """Convierte un mapeo en la tupla de columnas de la tabla"""
+        now = datetime.now().isoformat()
+        return (
+            conversation_id,
+            mapping.get('hubspot_id'),
+            json.dumps(mapping, ensure_ascii=False),
+            mapping.get('created_at') or now,
+            mapping.get('updated_at') or now
+        )
+
+    def store_mapping(self, conversation_id: str, hubspot_id: str, prospect_data: Dict) -> bool:
+        """
+        Almacena el mapeo entre conversation_id y hubspot_id
+
+        Args:
+            conversation_id (str): ID de la conversación
+            hubspot_id (str): ID del contacto en HubSpot
+            prospect_data (Dict): Datos del prospecto
+
+        Returns:
+            bool: True si se almacenó exitosamente
+        """
+        try:
+            mapping_data = {
+                "conversation_id": conversation_id,
+                "hubspot_id": hubspot_id,
+                "prospect_data": prospect_data,
+                "created_at": datetime.now().isoformat(),
+                "updated_at": datetime.now().isoformat()
+            }
+
+            # Al volver a almacenar se conserva el created_at original, también dentro del mapeo
+            self.db.execute(
+                """INSERT INTO conversation_mappings
+                   (conversation_id, hubspot_id, mapping, created_at, updated_at)
+                   VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT(conversation_id) DO UPDATE SET
+                       hubspot_id = excluded.hubspot_id,
+                       mapping = json_set(excluded.mapping, '$.created_at', conversation_mappings.created_at),
+                       updated_at = excluded.updated_at""",
+                self._to_row(conversation_id, mapping_data)
+            )
+
+            logger.info(f"✅ Mapeo almacenado: conversation_id={conversation_id}, hubspot_id={hubspot_id}")
+            return True
+
+        except Exception as e:
+            logger.error(f"Error almacenando mapeo: {str(e)}")
+            return False
+
+    def get_mapping(self, conversation_id: str) -> Optional[Dict]:
+        """
+        Obtiene el mapeo para un conversation_id
+
+        Args:
+            conversation_id (str): ID de la conversación
+
+        Returns:
+            Dict o None: Datos del mapeo si existe
+        """
+        try:
+            row = self.db.execute(
+                "SELECT mapping FROM conversation_mappings WHERE conversation_id = ?",
+                (conversation_id,)
+            ).fetchone()
+
+            if row:
+                logger.info(f"✅ Mapeo encontrado para conversation_id: {conversation_id}")
+                return json.loads(row['mapping'])
+            else:
+                logger.warning(f"⚠️ No se encontró mapeo para conversation_id: {conversation_id}")
+                return None
+
+        except Exception as e:
+            logger.error(f"Error obteniendo mapeo: {str(e)}")
+            return None
+
+    def get_hubspot_id(self, conversation_id: str) -> Optional[str]:
+        """
+        Obtiene el hubspot_id para un conversation_id
+
+        Args:
+            conversation_id (str): ID de la conversación
+
+        Returns:
+            str o None: HubSpot ID si existe
+        """
+        try:
+            row = self.db.execute(
+                "SELECT hubspot_id FROM conversation_mappings WHERE conversation_id = ?",
+                (conversation_id,)
+            ).fetchone()
+            return row['hubspot_id'] if row else None
+
+        except Exception as e:
+            logger.error(f"Error obteniendo hubspot_id: {str(e)}")
+            return None
+
+    def find_by_hubspot_id(self, hubspot_id: str) -> List[Dict]:
+        """
+        Obtiene todos los mapeos de un contacto de HubSpot
+
+        Args:
+            hubspot_id (str): ID del contacto en HubSpot
+
+        Returns:
+            List[Dict]: Mapeos del contacto, más recientes primero
+        """
+        try:
+            rows = self.db.execute(
+                """SELECT mapping FROM conversation_mappings
+                   WHERE hubspot_id = ? ORDER BY created_at DESC""",
+                (hubspot_id,)
+            ).fetchall()
+            return [json.loads(row['mapping']) for row in rows]
+
+        except Exception as e:
+            logger.error(f"Error buscando mapeos por hubspot_id: {str(e)}")
+            return []
+
+    def update_mapping(self, conversation_id: str, **updates) -> bool:
+        """
+        Actualiza un mapeo existente
+
+        Args:
+            conversation_id (str): ID de la conversación
+            **updates: Campos a actualizar
+
+        Returns:
+            bool: True si se actualizó exitosamente
+        """
+        try:
+            with self.db.transaction() as conn:
+                row = conn.execute(
+                    "SELECT mapping FROM conversation_mappings WHERE conversation_id = ?",
+                    (conversation_id,)
+                ).fetchone()
+
+                if not row:
+                    logger.warning(f"⚠️ No se encontró mapeo para actualizar: {conversation_id}")
+                    return False
+
+                mapping = json.loads(row['mapping'])
+                mapping.update(updates)
+                mapping['updated_at'] = datetime.now().isoformat()
+
+                conn.execute(
+                    """UPDATE conversation_mappings
+                       SET hubspot_id = ?, mapping = ?, updated_at = ?
+                       WHERE conversation_id = ?""",
+                    (mapping.get('hubspot_id'), json.dumps(mapping, ensure_ascii=False),
+                     mapping['updated_at'], conversation_id)
+                )
+
+            logger.info(f"✅ Mapeo actualizado para conversation_id: {conversation_id}")
+            return True
+
+        except Exception as e:
+            logger.error(f"Error actualizando mapeo: {str(e)}")
+            return False
+
+    def list_mappings(self, limit: int = 100) -> Dict:
+        """
+        Lista los mapeos más recientes
+
+        Args:
+            limit (int): Límite de mapeos a retornar
+
+        Returns:
+            Dict: Diccionario con los mapeos
+        """
+        try:
+            total_count = self.db.execute("SELECT COUNT(*) FROM conversation_mappings").fetchone()[0]
+            rows = self.db.execute(
+                """SELECT conversation_id, mapping FROM conversation_mappings
+                   ORDER BY created_at DESC LIMIT ?""",
+                (limit,)
+            ).fetchall()
+
+            limited_mappings = {row['conversation_id']: json.loads(row['mapping']) for row in rows}
+
+            logger.info(f"✅ {len(limited_mappings)} mapeos listados")
+            return {
+                "total_count": total_count,
+                "returned_count": len(limited_mappings),
+                "mappings": limited_mappings
+            }
+
+        except Exception as e:
+            logger.error(f"Error listando mapeos: {str(e)}")
+            return {"total_count": 0, "returned_count": 0, "mappings": {}}
+
+    def delete_mapping(self, conversation_id: str) -> bool:
+        """
+        Elimina un mapeo
+
+        Args:
+            conversation_id (str): ID de la conversación
+
+        Returns:
+            bool: True si se eliminó exitosamente
+        """
+        try:
+            cursor = self.db.execute(
+                "DELETE FROM conversation_mappings WHERE conversation_id = ?",
+                (conversation_id,)
+            )
+
+            if cursor.rowcount:
+                logger.info(f"✅ Mapeo eliminado para conversation_id: {conversation_id}")
+                return True
+            else:
+                logger.warning(f"⚠️ No se encontró mapeo para eliminar: {conversation_id}")
+                return False
+
+        except Exception as e:
+            logger.error(f"Error eliminando mapeo: {str(e)}")
+            return False
@@ -0,0 +1,76 @@
+"""
+Acceso compartido a bases SQLite locales en modo WAL
+Una conexión por hilo, con transacciones explícitas para escrituras concurrentes entre workers
+"""
+import os
+import sqlite3
+import threading
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Directorio de las bases locales (DATA_DIR permite aislar pruebas y benchmarks)
+DATA_DIR = os.getenv('DATA_DIR', os.path.join(os.path.dirname(__file__), '..', 'data'))
+
+class SQLiteDatabase:
+    """
+    Envoltorio de una base SQLite con conexiones por hilo
+    """
+
+    def __init__(self, db_file: str, schema: str = "", busy_timeout: float = 30.0):
+        """
+        Inicializa la base y aplica el esquema
+
+        Args:
+            db_file (str): Nombre del archivo dentro de data/ o ruta absoluta
+            schema (str): Sentencias SQL idempotentes (CREATE ... IF NOT EXISTS)
+            busy_timeout (float): Segundos de espera si otro proceso tiene el lock de escritura
+        """
+        if os.path.isabs(db_file):
+            self.full_path = db_file
+        else:
+            self.full_path = os.path.join(DATA_DIR, db_file)
+
+        os.makedirs(os.path.dirname(self.full_path), exist_ok=True)
+
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+
+        if schema:
+            self.connection().executescript(schema)
+
+    def connection(self) -> sqlite3.Connection:
+        """Retorna la conexión del hilo actual, creándola si no existe"""
+        conn = getattr(self._local, 'conn', None)
+        # Con preload de gunicorn el hilo principal del worker hereda la conexión del master tras el fork
+        if conn is None or self._local.pid != os.getpid():
+            # isolation_level=None: autocommit salvo dentro de transaction()
+            conn = sqlite3.connect(self.full_path, timeout=self.busy_timeout, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """
+        Transacción de escritura (BEGIN IMMEDIATE) con commit o rollback automático
+
+        Yields:
+            sqlite3.Connection: Conexión del hilo actual
+        """
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def execute(self, sql: str, params=()) -> sqlite3.Cursor:
+        """Ejecuta una sentencia en autocommit"""
+        return self.connection().execute(sql, params)
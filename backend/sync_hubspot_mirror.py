@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Sincronización de la réplica local de HubSpot desde la línea de comandos
+
+Uso:
+    python sync_hubspot_mirror.py                      # Incremental desde el último watermark
+    python sync_hubspot_mirror.py --full               # Desde cero; elimina los objetos borrados en HubSpot
+    python sync_hubspot_mirror.py --full --object contacts
+"""
+
+import os
+import sys
+import argparse
+from dotenv import load_dotenv
+
+# Agregar el directorio actual al path para importar los módulos
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+load_dotenv()
+
+from api import hubspot
+from api.hubspot_sync import run_sync, MIRROR_OBJECTS
+
+def main():
+    parser = argparse.ArgumentParser(description="Sincroniza contactos y empresas de HubSpot en la réplica local")
+    parser.add_argument("--full", action="store_true",
+                        help="Resincronización completa desde cero (también detecta objetos borrados)")
+    parser.add_argument("--object", choices=list(MIRROR_OBJECTS), action="append", dest="object_types",
+                        help="Tipo a sincronizar (se puede repetir; por defecto todos)")
+    args = parser.parse_args()
+
+    if not hubspot.HUBSPOT_API_KEY:
+        print("❌ API Key de HubSpot no configurada")
+        return 1
+
+    print(f"🔄 Sync {'completo' if args.full else 'incremental'} de la réplica de HubSpot")
+
+    results = run_sync(full=args.full, object_types=args.object_types)
+
+    for object_type, summary in results.items():
+        if summary.get('error'):
+            print(f"❌ {object_type}: {summary['error']}")
+        elif summary.get('skipped'):
+            print(f"⏭️ {object_type}: otro proceso está sincronizando, reintenta en unos minutos")
+        else:
+            print(f"✅ {object_type}: {summary['objects']} objetos en {summary['pages']} páginas, "
+                  f"{summary['deleted']} eliminados")
+
+    print(f"📊 Réplica: {hubspot.hubspot_mirror.stats(list(results))}")
+
+    return 1 if any(summary.get('error') or summary.get('skipped') for summary in results.values()) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Script de prueba de la caché en disco de análisis de conversaciones
+Verifica aciertos, expiración por TTL, evicción LRU por tamaño con el total mantenido por triggers,
+la migración de bases sin ese total, y que una transcripción ya analizada no vuelva a llamar al LLM
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import tempfile
+from types import SimpleNamespace
+
+# Agregar el directorio actual al path para importar el módulo
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from agents.conversation_analyzer import ConversationAnalyzer, SALES_PAIN_OPTIONS
+from storage.cache import SQLiteCache
+
+def build_cache(tmp, **kwargs):
+    return SQLiteCache(os.path.join(tmp, "analysis_cache.db"), name="test_analysis_cache", **kwargs)
+
+def stored_bytes(cache):
+    return cache.db.execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries").fetchone()[0]
+
+def test_hits_and_ttl():
+    """Un valor guardado se lee de vuelta hasta que vence su TTL"""
+
+    print("🧪 PRUEBA DE LA CACHÉ DE ANÁLISIS")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = build_cache(tmp)
+        cache.set("a", {"summary": "Resumen"})
+        cache.set("b", {"summary": "Corto"}, ttl=0.05)
+
+        assert cache.get("a") == {"summary": "Resumen"}
+        assert cache.get("b") == {"summary": "Corto"}
+        time.sleep(0.1)
+        assert cache.get("b") is None and cache.get("c") is None
+
+        stats = cache.stats()
+        print(f"📊 Stats: {stats}")
+        assert stats['hits'] == 2 and stats['misses'] == 2 and stats['expirations'] == 1
+        assert stats['size'] == 1 and stats['bytes'] == stored_bytes(cache)
+
+    print("✅ Aciertos y expiración por TTL")
+
+def test_size_total_and_lru_eviction():
+    """El total sigue a inserciones, reemplazos y borrados; al superar max_bytes se evicta lo menos usado"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = build_cache(tmp, max_bytes=300)
+        for key in ("a", "b", "c"):
+            cache.set(key, "x" * 80)
+
+        cache.set("c", "x" * 20)
+        cache.delete("c")
+        cache.set("c", "x" * 80)
+        assert cache.stats()['bytes'] == stored_bytes(cache) == 3 * 82
+
+        # b es la menos usada tras leer a: se evicta b
+        cache.get("a")
+        cache.set("d", "x" * 80)
+
+        assert cache.peek("b") is None and cache.peek("a") is not None
+        assert cache.stats()['evictions'] == 1
+        assert cache.stats()['bytes'] == stored_bytes(cache) == 3 * 82
+
+        # Otro worker con el mismo archivo ve el mismo total
+        other = build_cache(tmp, max_bytes=300)
+        assert other.stats()['bytes'] == stored_bytes(cache)
+
+        cache.clear()
+        assert other.stats()['bytes'] == 0
+
+def test_migrates_cache_without_size_total():
+    """Una base creada antes de cache_size parte del tamaño de sus entradas"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "analysis_cache.db"))
+        conn.execute("""CREATE TABLE cache_entries (key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,
+                        expires_at REAL NOT NULL, last_access REAL NOT NULL)""")
+        conn.execute("INSERT INTO cache_entries VALUES ('a', '\"hola\"', 6, 9999999999, 0)")
+        conn.commit()
+        conn.close()
+
+        cache = build_cache(tmp)
+        assert cache.stats()['bytes'] == 6
+        cache.set("b", "chao")
+        assert cache.stats()['bytes'] == stored_bytes(cache) == 12
+
+def test_analyzer_reuses_cached_analysis():
+    """La misma transcripción y contexto se analizan una sola vez, también desde otra instancia"""
+
+    class CountingLLM:
+        def __init__(self):
+            self.calls = 0
+
+        def invoke(self, prompt):
+            self.calls += 1
+            return SimpleNamespace(content=json.dumps({
+                "summary": "Resumen", "pain_point": SALES_PAIN_OPTIONS[0], "pain_confidence": 0.9,
+                "key_insights": [], "next_steps": "Demo", "qualification_score": 7
+            }))
+
+    transcript = [{"role": "user", "content": "No tenemos seguimiento de prospectos"}]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        llm = CountingLLM()
+        analyzers = []
+        for _ in range(2):
+            analyzer = ConversationAnalyzer()
+            analyzer.llm = llm
+            analyzer.cache = build_cache(tmp)
+            analyzers.append(analyzer)
+
+        first = analyzers[0].analyze_conversation(transcript, {"compania": "Triario"})
+        second = analyzers[1].analyze_conversation(transcript, {"compania": "Triario"})
+        assert llm.calls == 1 and first == second
+
+        analyzers[1].analyze_conversation(transcript, {"compania": "Otra"})
+        assert llm.calls == 2
+
+if __name__ == "__main__":
+    test_hits_and_ttl()
+    test_size_total_and_lru_eviction()
+    test_migrates_cache_without_size_total()
+    test_analyzer_reuses_cached_analysis()
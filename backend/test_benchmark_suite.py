@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Script de prueba de los servidores simulados y del cálculo de resultados del benchmark
+Verifica que la cadena de lecturas de HubSpot funcione contra el simulador, la inyección de 429/503
+y que los cuantiles por llamada saliente se obtengan de la salida de /metrics
+"""
+
+import os
+import sys
+import tempfile
+import requests
+
+# Agregar el directorio actual al path para importar el módulo
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from api import hubspot
+from api.metrics import MetricsRegistry, COUNTER, HISTOGRAM
+from benchmark_stubs import StubBehavior, StubServer, hubspot_routes, apollo_routes
+from benchmark_suite import histogram_quantile, parse_metrics, upstream_summary
+
+def test_hubspot_chain_against_stub():
+    """get_contact_info recorre contacto, engagements, empresa y negocios en el simulador"""
+
+    print("🧪 PRUEBA DE LA CADENA DE HUBSPOT CONTRA EL SIMULADOR")
+    print("=" * 60)
+
+    server = StubServer("hubspot", hubspot_routes(), StubBehavior(latency_ms=5))
+    original_base_url = hubspot.hubspot_client.base_url
+    original_api_key = hubspot.HUBSPOT_API_KEY
+    original_cache = hubspot.hubspot_cache
+
+    try:
+        hubspot.hubspot_client.base_url = server.start()
+        hubspot.HUBSPOT_API_KEY = "benchmark"
+        hubspot.hubspot_cache = None
+
+        result = hubspot.get_contact_info("ana@empresa.com")
+        stats = server.stats()
+        print(f"📊 Peticiones por ruta: {stats}")
+
+        assert result['success'], result
+        assert len(result['data']['company_info']['deals']) == 3
+        assert stats['GET /crm/v3/objects/contacts/([^/]+)']['requests'] == 1
+        assert stats['POST /crm/v3/objects/deals/batch/read']['requests'] == 1
+        assert not any(route.endswith('(sin ruta)') for route in stats)
+    finally:
+        hubspot.hubspot_client.base_url = original_base_url
+        hubspot.HUBSPOT_API_KEY = original_api_key
+        hubspot.hubspot_cache = original_cache
+        server.stop()
+
+    print("✅ Cadena completa contra el simulador")
+
+def test_injected_failures():
+    """Las tasas configuradas producen 429 con Retry-After y 503"""
+
+    server = StubServer("apollo", apollo_routes(), StubBehavior(latency_ms=0, rate_limit_rate=1.0, retry_after=2))
+    url = server.start()
+    try:
+        response = requests.get(f"{url}/organizations/enrich", params={"domain": "a.com"}, timeout=5)
+        assert response.status_code == 429
+        assert response.headers['Retry-After'] == '2'
+
+        server.behavior.rate_limit_rate, server.behavior.error_rate = 0.0, 1.0
+        assert requests.get(f"{url}/organizations/enrich", timeout=5).status_code == 503
+
+        server.behavior.error_rate = 0.0
+        response = requests.get(f"{url}/organizations/enrich", params={"domain": "a.com"}, timeout=5)
+        assert response.json()['organization']['primary_domain'] == "a.com"
+
+        counters = server.stats()['GET /organizations/enrich']
+        assert counters == {"requests": 3, "injected_429": 1, "injected_503": 1}
+    finally:
+        server.stop()
+
+def test_upstream_summary_from_metrics():
+    """Los cuantiles y la media por endpoint salen de la diferencia entre dos lecturas de /metrics"""
+
+    registry = MetricsRegistry(db_file=os.path.join(tempfile.mkdtemp(), "metrics.db"))
+    registry.describe('upstream_requests_total', COUNTER, "Llamadas")
+    registry.describe('upstream_request_duration_seconds', HISTOGRAM, "Latencia")
+    labels = {"provider": "hubspot", "endpoint": "/crm/v3/objects/contacts/search"}
+
+    registry.observe('upstream_request_duration_seconds', 5.0, labels)
+    registry.inc('upstream_requests_total', {**labels, "status": "200"})
+    before = parse_metrics(registry.render())
+
+    for seconds in [0.02] * 90 + [0.2] * 10:
+        registry.observe('upstream_request_duration_seconds', seconds, labels)
+        registry.inc('upstream_requests_total', {**labels, "status": "200"})
+    after = parse_metrics(registry.render())
+
+    summary = upstream_summary(before, after, elapsed=10)["hubspot /crm/v3/objects/contacts/search"]
+    print(f"📊 Resumen: {summary}")
+
+    assert summary["calls"] == 100
+    assert summary["statuses"] == {"200": 100}
+    assert summary["mean_ms"] == 38.0
+    assert 10 < summary["p50_ms"] <= 25
+    assert 100 < summary["p95_ms"] <= 250
+    assert histogram_quantile([(0.1, 0), (float('inf'), 0)], 0.5) == 0.0
+
+if __name__ == "__main__":
+    test_hubspot_chain_against_stub()
+    test_injected_failures()
+    test_upstream_summary_from_metrics()
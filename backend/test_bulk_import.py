@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para la importación masiva de prospectos
+Usa un servidor HTTP local que simula el batch upsert de HubSpot y un Apollo simulado
+"""
+
+import os
+import sys
+import json
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Agregar el directorio actual al path para importar el módulo
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from api import hubspot
+from api import bulk_import
+
+upsert_requests = []
+apollo_calls = []
+
+class StubHubSpotHandler(BaseHTTPRequestHandler):
+    """Simula el endpoint batch upsert de contactos de HubSpot"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        upsert_requests.append(body)
+
+        results = [
+            {"id": f"id-{item['id']}", "new": True, "properties": item["properties"]}
+            for item in body.get("inputs", [])
+        ]
+
+        payload = json.dumps({"status": "COMPLETE", "results": results}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+def fake_enrich_company_data(domain, profile='full'):
+    apollo_calls.append(domain)
+    return {"success": True, "data": {"informacion_basica": {"industria": "software"}}}
+
+def build_csv(num_contacts, num_domains):
+    lines = ["nombres,apellidos,compania,emailCorporativo,rol,websiteUrl"]
+    for i in range(num_contacts):
+        lines.append(f"Nombre{i},Apellido{i},Empresa{i % num_domains},persona{i}@empresa{i % num_domains}.com,"
+                     f"CEO,https://www.empresa{i % num_domains}.com/")
+    return "\n".join(lines)
+
+def test_bulk_import_batches_and_dedupes():
+    """Verifica deduplicación, una llamada a Apollo por dominio y upserts en lotes de 100"""
+
+    print("🧪 PRUEBA DE IMPORTACIÓN MASIVA")
+    print("=" * 60)
+
+    content = build_csv(250, 10)
+    content += "\nRepetido,Apellido,Empresa0,PERSONA0@empresa0.com,CEO,empresa0.com"
+    content += "\nSin,Email,Empresa,,CEO,"
+
+    rows = bulk_import.parse_rows(content, "csv")
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHubSpotHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    original = (hubspot.hubspot_client.base_url, hubspot.HUBSPOT_API_KEY, hubspot.hubspot_cache,
+                bulk_import.enrich_company_data)
+    hubspot.hubspot_client.base_url = f"http://127.0.0.1:{server.server_port}"
+    hubspot.HUBSPOT_API_KEY = "test-key"
+    hubspot.hubspot_cache = None
+    bulk_import.enrich_company_data = fake_enrich_company_data
+    upsert_requests.clear()
+    apollo_calls.clear()
+
+    results_path = os.path.join(tempfile.mkdtemp(), "resultados.jsonl")
+
+    try:
+        events = list(bulk_import.run_bulk_import(rows, concurrency=4, results_path=results_path))
+    finally:
+        (hubspot.hubspot_client.base_url, hubspot.HUBSPOT_API_KEY, hubspot.hubspot_cache,
+         bulk_import.enrich_company_data) = original
+        server.shutdown()
+
+    with open(results_path, 'r', encoding='utf-8') as f:
+        row_results = [json.loads(line) for line in f]
+
+    summary = events[-1]['summary']
+    print(f"📊 Resumen: {summary}")
+    print(f"📡 Llamadas a Apollo: {len(apollo_calls)}, lotes de upsert: {len(upsert_requests)}")
+
+    assert events[0]['event'] == 'started'
+    assert events[-1]['event'] == 'done'
+    assert summary == {"created": 250, "duplicate": 1, "invalid": 1}
+    assert sorted(apollo_calls) == sorted(f"empresa{i}.com" for i in range(10))
+    assert sorted(len(body["inputs"]) for body in upsert_requests) == [50, 100, 100]
+    assert len(row_results) == 252
+    assert row_results[250]['status'] == 'duplicate' and row_results[250]['duplicate_of'] == 0
+    assert row_results[0]['contact_id'] == "id-persona0@empresa0.com"
+    assert row_results[0]['apollo_enriched']
+
+    print("✅ 252 filas importadas con 10 llamadas a Apollo y 3 lotes de upsert")
+
+def test_non_text_email_is_invalid():
+    """Un email numérico o nulo en JSONL marca la fila como inválida sin abortar la importación"""
+
+    content = "\n".join(json.dumps(row) for row in [
+        {"nombres": "Ana", "apellidos": "Pérez", "compania": "Acme", "emailCorporativo": 12345, "rol": "CEO"},
+        {"nombres": "Luis", "apellidos": "Gómez", "compania": "Acme", "emailCorporativo": None, "rol": "CTO"},
+        {"nombres": "Eva", "apellidos": "Ruiz", "compania": "Acme", "emailCorporativo": "   ", "rol": "CFO"}
+    ])
+    rows = bulk_import.parse_rows(content, "jsonl")
+    results_path = os.path.join(tempfile.mkdtemp(), "resultados.jsonl")
+
+    events = list(bulk_import.run_bulk_import(rows, concurrency=1, results_path=results_path))
+
+    with open(results_path, 'r', encoding='utf-8') as f:
+        row_results = [json.loads(line) for line in f]
+
+    assert events[-1]['summary'] == {"invalid": 3}
+    assert "no textual: emailCorporativo" in row_results[0]['error']
+    assert "faltantes: emailCorporativo" in row_results[1]['error']
+    assert "faltantes: emailCorporativo" in row_results[2]['error']
+
+if __name__ == "__main__":
+    test_bulk_import_batches_and_dedupes()
+    test_non_text_email_is_invalid()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Script de prueba de los backends de caché
+Verifica que la interfaz exija todos sus métodos, que InMemoryCache aplique TTL y LRU, y que ni la
+caché ni el single-flight compartan por referencia el valor que otro llamador puede modificar
+"""
+
+import os
+import sys
+import time
+import threading
+
+# Agregar el directorio actual al path para importar el módulo
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from storage.cache import CacheBackend, InMemoryCache
+from api.single_flight import SingleFlight
+
+def test_backend_requires_full_interface():
+    """Un backend que no implementa toda la interfaz no se puede instanciar"""
+
+    print("🧪 PRUEBA DE BACKENDS DE CACHÉ")
+    print("=" * 60)
+
+    class PartialCache(CacheBackend):
+        def get(self, key):
+            return None
+
+    for cls in (CacheBackend, PartialCache):
+        try:
+            cls()
+            raise AssertionError(f"{cls.__name__} no debería instanciarse")
+        except TypeError as e:
+            print(f"✅ {cls.__name__}: {e}")
+
+def test_in_memory_ttl_and_lru():
+    """Las entradas vencen por TTL y, al superar max_entries, se evicta la menos usada"""
+
+    cache = InMemoryCache(max_entries=2, name="test_lru")
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.peek("b") is None and cache.get("a") == 1 and cache.get("c") == 3
+
+    cache.set("d", 4, ttl=0.05)
+    time.sleep(0.1)
+    assert cache.get("d") is None
+
+    stats = cache.stats()
+    assert stats['evictions'] == 2 and stats['expirations'] == 1
+
+def test_in_memory_returns_copies():
+    """Modificar lo guardado o lo leído no altera la entrada"""
+
+    cache = InMemoryCache(name="test_copies")
+    value = {"data": {"informacion_basica": {"industria": "software"}}}
+    cache.set("acme.com", value)
+    value['data']['informacion_basica']['industria'] = "retail"
+
+    first = cache.get("acme.com")
+    assert first['data']['informacion_basica']['industria'] == "software"
+
+    first['data'].pop('informacion_basica')
+    assert cache.get("acme.com") == cache.peek("acme.com") == {"data": {"informacion_basica": {"industria": "software"}}}
+
+def test_single_flight_followers_get_copies():
+    """Los seguidores reciben su propia copia del resultado del líder"""
+
+    flight = SingleFlight(name="test_copies")
+    release = threading.Event()
+    results = []
+
+    def fetch():
+        release.wait(2)
+        return {"data": {"deals": [1, 2]}}
+
+    def caller():
+        results.append(flight.do("acme.com", fetch))
+
+    threads = [threading.Thread(target=caller) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    while flight.stats()['shared'] < 2:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    results[0]['data']['deals'].append(3)
+    assert [len(result['data']['deals']) for result in results].count(2) == 2
+    assert len({id(result) for result in results}) == 3
+
+if __name__ == "__main__":
+    test_backend_requires_full_interface()
+    test_in_memory_ttl_and_lru()
+    test_in_memory_returns_copies()
+    test_single_flight_followers_get_copies()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Script de prueba del circuit breaker por proveedor
+Verifica apertura por fallos y por latencia, fallo rápido con resultado degradado y prueba half-open
+"""
+
+import os
+import sys
+import time
+
+# Agregar el directorio actual al path para importar el módulo
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from api import apollo
+from api.circuit_breaker import (
+    CircuitBreaker, CircuitOpenError, STATE_CLOSED, STATE_OPEN, STATE_HALF_OPEN
+)
+
+def failing_call():
+    raise ConnectionError("proveedor caído")
+
+def test_breaker_opens_and_fast_fails():
+    """Tras N fallos seguidos el circuito se abre y no vuelve a llamar al proveedor"""
+
+    print("🧪 PRUEBA DE APERTURA DEL CIRCUITO")
+    print("=" * 60)
+
+    breaker = CircuitBreaker("prueba", failure_threshold=3, slow_call_threshold=5, reset_timeout=60)
+    calls = []
+
+    def provider():
+        calls.append(1)
+        return {"success": False}
+
+    for _ in range(3):
+        breaker.call(provider, is_failure=lambda result: not result['success'])
+
+    assert breaker.state == STATE_OPEN
+
+    started = time.monotonic()
+    result = breaker.call(provider, fallback=lambda: {"success": False, "code": "CIRCUIT_OPEN"})
+    assert result['code'] == 'CIRCUIT_OPEN'
+    assert len(calls) == 3
+    assert time.monotonic() - started < 0.05
+
+    try:
+        breaker.call(provider)
+        assert False, "Se esperaba CircuitOpenError sin fallback"
+    except CircuitOpenError:
+        pass
+
+    stats = breaker.stats()
+    print(f"📊 {stats}")
+    assert stats['opened'] == 1 and stats['rejected'] == 2 and stats['failures'] == 3
+
+    print("✅ Circuito abierto tras 3 fallos, llamadas posteriores fallan rápido")
+
+def test_half_open_probe():
+    """Tras reset_timeout pasa una llamada de prueba: si falla se reabre, si funciona se cierra"""
+
+    print("\n🧪 PRUEBA HALF-OPEN")
+    print("=" * 60)
+
+    breaker = CircuitBreaker("prueba_half_open", failure_threshold=2, slow_call_threshold=5, reset_timeout=0.05)
+
+    for _ in range(2):
+        try:
+            breaker.call(failing_call)
+        except ConnectionError:
+            pass
+    assert breaker.state == STATE_OPEN
+
+    time.sleep(0.06)
+    try:
+        breaker.call(failing_call)
+    except ConnectionError:
+        pass
+    assert breaker.state == STATE_OPEN, "Una prueba fallida debe reabrir el circuito"
+
+    time.sleep(0.06)
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == STATE_CLOSED
+
+    print("✅ Prueba fallida reabre el circuito y prueba exitosa lo cierra")
+
+def test_single_probe_while_half_open():
+    """Mientras la prueba está en curso, las demás llamadas reciben el fallback"""
+
+    breaker = CircuitBreaker("prueba_una_sonda", failure_threshold=1, slow_call_threshold=5, reset_timeout=0.01)
+    breaker.call(lambda: None, is_failure=lambda result: True)
+    time.sleep(0.02)
+
+    nested = []
+
+    def probe():
+        assert breaker.state == STATE_HALF_OPEN
+        nested.append(breaker.call(lambda: "no debería ejecutarse", fallback=lambda: "degradado"))
+        return "ok"
+
+    assert breaker.call(probe) == "ok"
+    assert nested == ["degradado"]
+    assert breaker.state == STATE_CLOSED
+
+def test_slow_calls_trip_breaker():
+    """Llamadas exitosas pero más lentas que el umbral también abren el circuito"""
+
+    print("\n🧪 PRUEBA DE LLAMADAS LENTAS")
+    print("=" * 60)
+
+    breaker = CircuitBreaker("prueba_lenta", failure_threshold=2, slow_call_threshold=0.02, reset_timeout=60)
+
+    for _ in range(2):
+        breaker.call(lambda: time.sleep(0.03) or {"success": True})
+
+    assert breaker.state == STATE_OPEN
+    assert breaker.stats()['slow_calls'] == 2
+
+    print("✅ Circuito abierto tras 2 llamadas lentas")
+
+def test_apollo_serves_stale_copy_when_open():
+    """Con el circuito de Apollo abierto se usa la última copia conocida del dominio"""
+
+    print("\n🧪 PRUEBA DE APOLLO CON CIRCUITO ABIERTO")
+    print("=" * 60)
+
+    original_breaker = apollo.apollo_breaker
+    apollo.apollo_breaker = CircuitBreaker("apollo_prueba", failure_threshold=1, slow_call_threshold=5,
+                                           reset_timeout=60)
+    apollo.apollo_stale_cache.set("conocido.com", {"success": True, "data": {"nombre": "Conocido"}})
+
+    try:
+        apollo.apollo_breaker.call(
+            lambda: {"success": False, "code": "TIMEOUT"},
+            is_failure=lambda result: not result['success']
+        )
+        assert apollo.apollo_breaker.state == STATE_OPEN
+
+        stale = apollo._fetch_and_cache_company_data("conocido.com")
+        missing = apollo._fetch_and_cache_company_data("desconocido.com")
+    finally:
+        apollo.apollo_breaker = original_breaker
+        apollo.apollo_stale_cache.clear()
+
+    print(f"📦 Copia anterior: {stale}")
+    print(f"🚫 Sin copia: {missing}")
+
+    assert stale['success'] and stale['stale'] and stale['data']['nombre'] == "Conocido"
+    assert not missing['success'] and missing['code'] == 'CIRCUIT_OPEN'
+    assert apollo.apollo_cache.get("desconocido.com") is None
+
+    print("✅ Apollo degradado sin esperar al timeout del proveedor")
+
+if __name__ == "__main__":
+    test_breaker_opens_and_fast_fails()
+    test_half_open_probe()
+    test_single_probe_while_half_open()
+    test_slow_calls_trip_breaker()
+    test_apollo_serves_stale_copy_when_open()
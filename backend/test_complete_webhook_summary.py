@@ -6,11 +6,29 @@ Script de prueba completa del webhook con verificación del resumen en la llamad
 import json
 import requests
 import sys
+import time
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from storage.conversation_storage import conversation_storage
 
+def wait_for_processing(status_url, timeout=120):
+    """Consulta el estado del procesamiento asíncrono hasta que termine y retorna su resultado"""
+    
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = requests.get(f"http://localhost:5003{status_url}", timeout=10).json().get('job', {})
+        print(f"   ⏳ Estado del procesamiento: {job.get('status')}")
+        
+        if job.get('status') == 'done':
+            return job.get('result') or {}
+        if job.get('status') == 'failed':
+            return {"status": "error", "message": job.get('error')}
+        
+        time.sleep(2)
+    
+    return {"status": "error", "message": "Timeout esperando el procesamiento"}
+
 def test_complete_webhook_with_summary():
     """Prueba completa del webhook verificando que el resumen aparezca en la llamada"""
     
@@ -134,8 +152,13 @@ def test_complete_webhook_with_summary():
         
         print(f"📥 Status Code: {response.status_code}")
         
-        if response.status_code == 200:
+        if response.status_code in [200, 202]:
             response_data = response.json()
+            
+            # El webhook encola el análisis y responde 202: esperar el resultado
+            if response.status_code == 202:
+                response_data = wait_for_processing(response_data['status_url'])
+            
             print(f"📥 Response: {json.dumps(response_data, indent=2, ensure_ascii=False)}")
             
             if response_data.get('status') == 'success':
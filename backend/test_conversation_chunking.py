@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el análisis por fragmentos (map-reduce) de transcripciones largas
+Usa un LLM simulado que registra las llamadas realizadas
+"""
+
+import os
+import sys
+import json
+import threading
+from types import SimpleNamespace
+
+# Agregar el directorio actual al path para importar el módulo
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from agents import conversation_analyzer as analyzer_module
+from agents.conversation_analyzer import ConversationAnalyzer, SALES_PAIN_OPTIONS
+from storage.cache import InMemoryCache
+
+class FakeLLM:
+    """LLM simulado: responde un análisis JSON válido y cuenta las llamadas"""
+
+    def __init__(self):
+        self.invoke_calls = []
+        self.batch_calls = []
+        self._lock = threading.Lock()
+
+    def _response(self, summary):
+        return SimpleNamespace(content=json.dumps({
+            "summary": summary,
+            "pain_point": SALES_PAIN_OPTIONS[2],
+            "pain_confidence": 0.8,
+            "key_insights": ["Sin seguimiento a prospectos"],
+            "next_steps": "Agendar demo",
+            "qualification_score": 8
+        }))
+
+    def invoke(self, prompt):
+        with self._lock:
+            self.invoke_calls.append(prompt)
+        return self._response("Resumen final")
+
+    def batch(self, prompts, config=None, return_exceptions=False):
+        self.batch_calls.append((len(prompts), config))
+        return [self._response(f"Resumen fragmento {i + 1}") for i in range(len(prompts))]
+
+def build_transcript(num_messages):
+    """Genera una conversación alternando prospecto y agente"""
+
+    transcript = []
+    for i in range(num_messages):
+        role = 'user' if i % 2 == 0 else 'assistant'
+        transcript.append({"role": role, "content": f"Mensaje {i} sobre el seguimiento de prospectos " * 5})
+    return transcript
+
+def build_analyzer():
+    analyzer = ConversationAnalyzer()
+    analyzer.llm = FakeLLM()
+    analyzer.cache = InMemoryCache(name="test_analysis")
+    return analyzer
+
+def test_split_respects_budget():
+    """Verifica que los fragmentos no excedan el presupuesto de tokens ni pierdan mensajes"""
+
+    print("🧪 PRUEBA DE DIVISIÓN DE TRANSCRIPCIÓN")
+    print("=" * 60)
+
+    analyzer = build_analyzer()
+    transcript_text = analyzer._format_transcript(build_transcript(200))
+
+    chunks = analyzer._split_transcript(transcript_text, 500)
+
+    print(f"📊 Fragmentos: {len(chunks)}")
+
+    assert len(chunks) > 1
+    assert all(analyzer_module.count_tokens(chunk) <= 500 for chunk in chunks)
+    assert "\n".join(chunks) == transcript_text
+
+    print("✅ Fragmentos dentro del presupuesto y en orden")
+
+def test_long_transcript_uses_map_reduce():
+    """Verifica que una transcripción larga se analice por fragmentos y se combine en un análisis"""
+
+    print("🧪 PRUEBA DE ANÁLISIS MAP-REDUCE")
+    print("=" * 60)
+
+    original_threshold = analyzer_module.ANALYSIS_CHUNK_THRESHOLD_TOKENS
+    original_chunk_tokens = analyzer_module.ANALYSIS_CHUNK_TOKENS
+    analyzer_module.ANALYSIS_CHUNK_THRESHOLD_TOKENS = 1000
+    analyzer_module.ANALYSIS_CHUNK_TOKENS = 500
+
+    try:
+        analyzer = build_analyzer()
+
+        short_analysis = analyzer.analyze_conversation(build_transcript(4), {"compania": "Triario"})
+        assert analyzer.llm.batch_calls == []
+        assert len(analyzer.llm.invoke_calls) == 1
+
+        analyzer.llm = FakeLLM()
+        long_analysis = analyzer.analyze_conversation(build_transcript(200), {"compania": "Triario"})
+    finally:
+        analyzer_module.ANALYSIS_CHUNK_THRESHOLD_TOKENS = original_threshold
+        analyzer_module.ANALYSIS_CHUNK_TOKENS = original_chunk_tokens
+
+    num_chunks, config = analyzer.llm.batch_calls[0]
+    print(f"📊 Fragmentos analizados: {num_chunks} (concurrencia {config['max_concurrency']})")
+    print(f"📊 Llamadas de reducción: {len(analyzer.llm.invoke_calls)}")
+
+    assert short_analysis.summary == "Resumen final"
+    assert num_chunks > 1
+    assert len(analyzer.llm.invoke_calls) == 1
+    assert "FRAGMENTO 1" in analyzer.llm.invoke_calls[0]
+    assert long_analysis.summary == "Resumen final"
+    assert long_analysis.pain_point == SALES_PAIN_OPTIONS[2]
+
+    print("✅ Transcripción larga analizada por fragmentos y combinada")
+
+if __name__ == "__main__":
+    test_split_respects_budget()
+    test_long_transcript_uses_map_reduce()
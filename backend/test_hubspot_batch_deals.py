@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el batch read de deals en get_company_deals
+Usa un servidor HTTP local que simula HubSpot y cuenta las peticiones
+"""
+
+import os
+import sys
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Agregar el directorio actual al path para importar el módulo
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from api import hubspot
+
+NUM_DEALS = 25
+received_requests = []
+
+class StubHubSpotHandler(BaseHTTPRequestHandler):
+    """Simula los endpoints de asociaciones y deals de HubSpot"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, body):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        received_requests.append(('GET', self.path))
+        path = self.path.split('?')[0]
+
+        if path.endswith('/associations/deals'):
+            return self._send_json({"results": [{"toObjectId": str(i)} for i in range(NUM_DEALS)]})
+
+        deal_id = path.rsplit('/', 1)[-1]
+        return self._send_json({"id": deal_id, "properties": {"dealname": f"Deal {deal_id}"}})
+
+    def do_POST(self):
+        received_requests.append(('POST', self.path))
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+
+        if self.path.endswith('/deals/batch/read'):
+            return self._send_json({
+                "status": "COMPLETE",
+                "results": [
+                    {"id": item["id"], "properties": {"dealname": f"Deal {item['id']}"}}
+                    for item in body.get("inputs", [])
+                ]
+            })
+
+        self.send_response(404)
+        self.end_headers()
+
+def test_company_deals_batch_read():
+    """Verifica que get_company_deals haga 2 peticiones en lugar de N+1"""
+
+    print("🧪 PRUEBA DE BATCH READ DE DEALS")
+    print("=" * 60)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHubSpotHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    original_base_url = hubspot.hubspot_client.base_url
+    original_cache = hubspot.hubspot_cache
+    hubspot.hubspot_client.base_url = f"http://127.0.0.1:{server.server_port}"
+    # Sin la caché de lectura persistente: los deals de una ejecución anterior evitarían peticiones
+    hubspot.hubspot_cache = None
+    received_requests.clear()
+
+    try:
+        result = hubspot.get_company_deals("company-1")
+    finally:
+        hubspot.hubspot_client.base_url = original_base_url
+        hubspot.hubspot_cache = original_cache
+        server.shutdown()
+
+    print(f"📊 Deals obtenidos: {len(result.get('data', []))}")
+    print(f"📡 Peticiones realizadas: {len(received_requests)} (antes: {NUM_DEALS + 1})")
+    for method, path in received_requests:
+        print(f"   - {method} {path}")
+
+    assert result.get('success'), result
+    assert len(result['data']) == NUM_DEALS
+    assert result['data'][0]['informacion_basica']['nombre'] == "Deal 0"
+    assert len(received_requests) == 2
+
+    print("✅ Deals obtenidos con 2 peticiones")
+
+if __name__ == "__main__":
+    test_company_deals_batch_read()
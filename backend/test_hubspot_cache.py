@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Script de prueba de la caché de lectura de HubSpot
+Verifica que una segunda lectura del mismo contacto no vuelva a pedir empresa ni negocios,
+que los perfiles más amplios no se sirvan de lecturas más reducidas y que las escrituras propias
+(campo de dolor, upsert, llamada) invaliden la entrada, incluso con una lectura en curso
+"""
+
+import os
+import sys
+import time
+
+# Agregar el directorio actual al path para importar el módulo
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from api import hubspot, hubspot_fields
+from benchmark_stubs import StubBehavior, StubServer, hubspot_routes
+from storage.cache import InMemoryCache
+
+EMAIL = "ana.cache@empresa.com"
+CONTACT_ROUTE = 'GET /crm/v3/objects/contacts/([^/]+)'
+COMPANY_ROUTE = 'GET /crm/v3/objects/companies/(\\d+)'
+DEALS_ROUTE = 'POST /crm/v3/objects/deals/batch/read'
+
+class CachedHubSpot:
+    """HubSpot simulado con una caché en memoria propia de la prueba"""
+
+    def __enter__(self):
+        self.server = StubServer("hubspot", hubspot_routes(), StubBehavior(latency_ms=0))
+        self.original = (hubspot.hubspot_client.base_url, hubspot.HUBSPOT_API_KEY,
+                         hubspot_fields.HUBSPOT_API_KEY, hubspot.hubspot_cache)
+        hubspot.hubspot_client.base_url = self.server.start()
+        hubspot.HUBSPOT_API_KEY = hubspot_fields.HUBSPOT_API_KEY = "test"
+        hubspot.hubspot_cache = InMemoryCache(name="test_hubspot_objects")
+        return self
+
+    def __exit__(self, *exc_info):
+        (hubspot.hubspot_client.base_url, hubspot.HUBSPOT_API_KEY,
+         hubspot_fields.HUBSPOT_API_KEY, hubspot.hubspot_cache) = self.original
+        self.server.stop()
+
+    def requests(self, route):
+        return self.server.stats().get(route, {}).get('requests', 0)
+
+def test_second_read_served_from_cache():
+    """La segunda lectura no vuelve a pedir contacto (con sus IDs de engagements), empresa ni negocios"""
+
+    print("🧪 PRUEBA DE CACHÉ DE LECTURA DE HUBSPOT")
+    print("=" * 60)
+
+    with CachedHubSpot() as stub:
+        first = hubspot.get_contact_info(EMAIL)
+        second = hubspot.get_contact_info(EMAIL.upper())
+        print(f"📊 Peticiones: {stub.server.stats()}")
+
+        assert first['success'] and second['success']
+        assert second['data']['contact_info'] == first['data']['contact_info']
+        assert second['data']['company_info'] == first['data']['company_info']
+        assert second['data']['engagements'] == first['data']['engagements']
+        assert stub.requests(CONTACT_ROUTE) == 1
+        assert stub.requests(COMPANY_ROUTE) == 1
+        assert stub.requests(DEALS_ROUTE) == 1
+
+    print("✅ Contacto, empresa y negocios leídos una sola vez")
+
+def test_profiles_only_reuse_wider_reads():
+    """Una lectura full sirve a minimal, pero una minimal no sirve a full"""
+
+    with CachedHubSpot() as stub:
+        hubspot.get_contact_by_email(EMAIL, profile="minimal")
+        hubspot.get_contact_by_email(EMAIL, profile="full")
+        assert stub.requests(CONTACT_ROUTE) == 2
+
+        result = hubspot.get_contact_by_email(EMAIL, profile="minimal")
+        assert stub.requests(CONTACT_ROUTE) == 2
+        assert list(result['data']) == ["informacion_basica", "estado"]
+
+def test_writes_invalidate_contact():
+    """Actualizar el campo de dolor, hacer upsert o registrar la llamada obliga a releer el contacto"""
+
+    with CachedHubSpot() as stub:
+        contact_id = hubspot.get_contact_by_email(EMAIL)['contact_id']
+
+        writes = [
+            lambda: hubspot_fields.update_contact_pain_field(contact_id, "Mi nivel de recompra es muy bajo"),
+            lambda: hubspot.upsert_contact({"email": EMAIL, "jobtitle": "Directora Comercial"}),
+            lambda: hubspot.create_conversation_engagement(contact_id, {"summary": "Resumen"})
+        ]
+
+        for expected_reads, write in enumerate(writes, start=2):
+            assert write()['success']
+            hubspot.get_contact_by_email(EMAIL)
+            hubspot.get_contact_by_email(EMAIL)
+            assert stub.requests(CONTACT_ROUTE) == expected_reads
+
+def test_read_in_flight_during_write_is_not_cached():
+    """Una lectura iniciada antes de una escritura no vuelve a llenar la caché al terminar"""
+
+    with CachedHubSpot():
+        contact = {"id": "42", "properties": {"email": EMAIL}}
+        read_started = time.time()
+        hubspot.invalidate_contact("42")
+        hubspot._cache_object('contacts', contact, ["email"], read_started)
+
+        assert hubspot._cached_object('contacts', "42", ["email"]) is None
+
+        hubspot._cache_object('contacts', contact, ["email"], time.time())
+        assert hubspot._cached_object('contacts', "42", ["email"]) == contact
+
+def test_deals_batch_only_reads_missing():
+    """El batch read de negocios solo pide los que no están en caché y conserva el orden"""
+
+    with CachedHubSpot() as stub:
+        hubspot.get_deals_batch(["11", "12"])
+        result = hubspot.get_deals_batch(["13", "11", "12"])
+
+        assert [deal['informacion_basica']['id'] for deal in result['data']] == ["13", "11", "12"]
+        assert stub.requests(DEALS_ROUTE) == 2
+
+if __name__ == "__main__":
+    test_second_read_served_from_cache()
+    test_profiles_only_reuse_wider_reads()
+    test_writes_invalidate_contact()
+    test_read_in_flight_during_write_is_not_cached()
+    test_deals_batch_only_reads_missing()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Script de prueba del lector de engagements (IDs con el contacto o asociaciones v4 + batch read v3)
+Verifica paginación completa, orden del más reciente al más antiguo, presupuesto máximo,
+filtro since con corte temprano y selección de tipos y propiedades
+"""
+
+import os
+import sys
+from datetime import datetime, timezone
+
+# Agregar el directorio actual al path para importar el módulo
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import benchmark_stubs
+from api import hubspot
+from benchmark_stubs import StubBehavior, StubServer, hubspot_routes
+
+CONTACT_ID = "7"
+CONTACT_ROUTE = 'GET /crm/v3/objects/contacts/([^/]+)'
+BATCH_ROUTE = 'POST /crm/v3/objects/(meetings|calls|emails|tasks|notes)/batch/read'
+ASSOCIATIONS_ROUTE = 'GET /crm/v4/objects/contacts/(\\d+)/associations/(companies|meetings|calls|emails|tasks|notes)'
+
+class RecordingStub(StubServer):
+    """HubSpot simulado que además guarda los cuerpos de los batch read"""
+
+    def __init__(self):
+        super().__init__("hubspot", hubspot_routes(), StubBehavior(latency_ms=0))
+        self.batch_bodies = []
+
+    def _dispatch(self, method, raw_path, body):
+        if raw_path.endswith('/batch/read'):
+            self.batch_bodies.append((raw_path, body))
+        return super()._dispatch(method, raw_path, body)
+
+def read_engagements(engagements_per_type, **kwargs):
+    """Ejecuta iter_contact_engagements contra el simulador y retorna (engagements, stub)"""
+    original_counts = dict(benchmark_stubs.ENGAGEMENTS_PER_CONTACT)
+    original_base_url = hubspot.hubspot_client.base_url
+    server = RecordingStub()
+    try:
+        benchmark_stubs.ENGAGEMENTS_PER_CONTACT.clear()
+        benchmark_stubs.ENGAGEMENTS_PER_CONTACT.update(engagements_per_type)
+        hubspot.hubspot_client.base_url = server.start()
+        return list(hubspot.iter_contact_engagements(CONTACT_ID, **kwargs)), server
+    finally:
+        benchmark_stubs.ENGAGEMENTS_PER_CONTACT.clear()
+        benchmark_stubs.ENGAGEMENTS_PER_CONTACT.update(original_counts)
+        hubspot.hubspot_client.base_url = original_base_url
+        server.stop()
+
+def timestamps(engagements):
+    return [engagement['timestamp'] for engagement in engagements]
+
+def test_full_pagination_newest_first():
+    """Los IDs llegan con el contacto; un tipo con más de una página se lista completo en la API v4"""
+
+    print("🧪 PRUEBA DE PAGINACIÓN COMPLETA")
+    print("=" * 60)
+
+    engagements, server = read_engagements({"emails": 620, "notes": 3}, types=["EMAIL", "NOTE"])
+    stats = server.stats()
+    print(f"📊 {len(engagements)} engagements, peticiones: {stats}")
+
+    assert len(engagements) == 623
+    assert len({engagement['id'] for engagement in engagements}) == 623
+    assert timestamps(engagements) == sorted(timestamps(engagements), reverse=True)
+    assert stats[CONTACT_ROUTE]['requests'] == 1
+    assert stats[ASSOCIATIONS_ROUTE]['requests'] == 2
+    assert stats[BATCH_ROUTE]['requests'] == 8
+
+    print("✅ Todas las páginas leídas")
+
+def test_max_count_stops_early():
+    """Con un presupuesto pequeño solo se lee un lote de ese tamaño por tipo"""
+
+    engagements, server = read_engagements({"emails": 300, "calls": 300}, types=["EMAIL", "CALL"], max_count=5)
+
+    assert len(engagements) == 5
+    assert server.stats()[BATCH_ROUTE]['requests'] == 2
+    assert all(len(body['inputs']) == 5 for _, body in server.batch_bodies)
+
+def test_since_filters_and_stops():
+    """since descarta los engagements anteriores y no lee lotes más antiguos"""
+
+    # El simulador asigna un día por índice a partir de 2023-11-14: el índice 250 cae el 2024-07-21
+    since = datetime(2024, 7, 21, tzinfo=timezone.utc)
+    engagements, server = read_engagements({"notes": 400}, types=["NOTE"], since=since, chunk_size=50)
+
+    assert len(engagements) == 150
+    assert all(engagement['timestamp'] >= "2024-07-21" for engagement in engagements)
+    # De 8 lotes se leen 4: el cuarto ya es anterior a since y corta la lectura
+    assert server.stats()[BATCH_ROUTE]['requests'] == 4
+
+def test_types_and_fields_selection():
+    """Solo se consultan los tipos pedidos, sin HTML de emails salvo que se pida"""
+
+    engagements, server = read_engagements({"emails": 2, "meetings": 2}, types=["EMAIL"])
+    _, body = server.batch_bodies[0]
+
+    assert {engagement['tipo'] for engagement in engagements} == {"EMAIL"}
+    assert "hs_email_html" not in body['properties']
+    assert engagements[0]['asunto'].startswith("hs_email_subject")
+
+    engagements, server = read_engagements({"emails": 2}, types=["EMAIL"],
+                                           fields={"EMAIL": ["hs_email_subject", "hs_email_html"]})
+    _, body = server.batch_bodies[0]
+
+    assert body['properties'] == ["hs_timestamp", "hs_email_subject", "hs_email_html"]
+    assert 'hs_email_html' in engagements[0]
+
+def test_get_contact_engagements_reports_errors():
+    """Un error de HubSpot se reporta sin excepción, con los engagements leídos hasta entonces"""
+
+    server = StubServer("hubspot", [], StubBehavior(latency_ms=0))
+    original_base_url = hubspot.hubspot_client.base_url
+    try:
+        hubspot.hubspot_client.base_url = server.start()
+        result = hubspot.get_contact_engagements(CONTACT_ID, types=["NOTE"])
+    finally:
+        hubspot.hubspot_client.base_url = original_base_url
+        server.stop()
+
+    assert not result['success']
+    assert result['data'] == []
+
+if __name__ == "__main__":
+    test_full_pagination_newest_first()
+    test_max_count_stops_early()
+    test_since_filters_and_stops()
+    test_types_and_fields_selection()
+    test_get_contact_engagements_reports_errors()
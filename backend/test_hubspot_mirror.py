@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Script de prueba de la réplica local de HubSpot
+Verifica que el sync traiga contactos y empresas por lastmodifieddate página a página, avance el
+watermark y reinicie la consulta al llegar al tope de la búsqueda, que get_contact_info lea de la
+réplica y vuelva a HubSpot si el contacto falta, está desactualizado, el sync está atrasado o la
+réplica falla al leer la empresa, y que el sync completo elimine los objetos borrados
+"""
+
+import os
+import sys
+import sqlite3
+import tempfile
+
+# Agregar el directorio actual al path para importar el módulo
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from api import hubspot, hubspot_sync
+from benchmark_stubs import StubBehavior, StubServer, hubspot_routes, mirror_dataset
+from storage.hubspot_mirror import HubSpotMirror
+
+CONTACT_ROUTE = 'GET /crm/v3/objects/contacts/([^/]+)'
+COMPANY_ROUTE = 'GET /crm/v3/objects/companies/(\\d+)'
+SEARCH_ROUTE = 'POST /crm/v3/objects/contacts/search'
+
+class MirroredHubSpot:
+    """HubSpot simulado con una réplica en un archivo temporal y la caché de lectura desactivada"""
+
+    def __init__(self, contacts=25, search_max_results=10000):
+        self.dataset = mirror_dataset(contacts)
+        self.search_max_results = search_max_results
+
+    def __enter__(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.server = StubServer("hubspot", hubspot_routes(self.dataset, self.search_max_results),
+                                 StubBehavior(latency_ms=0))
+        self.original = (hubspot.hubspot_client.base_url, hubspot.HUBSPOT_API_KEY, hubspot.hubspot_cache,
+                         hubspot.hubspot_mirror, hubspot.HUBSPOT_MIRROR_ENABLED,
+                         hubspot_sync.HUBSPOT_SEARCH_MAX_RESULTS, hubspot_sync.HUBSPOT_SEARCH_PAGE_SIZE)
+        hubspot.hubspot_client.base_url = self.server.start()
+        hubspot.HUBSPOT_API_KEY = "test"
+        hubspot.hubspot_cache = None
+        hubspot.hubspot_mirror = HubSpotMirror(os.path.join(self.tmp.name, "mirror.db"))
+        hubspot.HUBSPOT_MIRROR_ENABLED = True
+        hubspot_sync.HUBSPOT_SEARCH_MAX_RESULTS = self.search_max_results
+        hubspot_sync.HUBSPOT_SEARCH_PAGE_SIZE = 10
+        return self
+
+    def __exit__(self, *exc_info):
+        (hubspot.hubspot_client.base_url, hubspot.HUBSPOT_API_KEY, hubspot.hubspot_cache,
+         hubspot.hubspot_mirror, hubspot.HUBSPOT_MIRROR_ENABLED,
+         hubspot_sync.HUBSPOT_SEARCH_MAX_RESULTS, hubspot_sync.HUBSPOT_SEARCH_PAGE_SIZE) = self.original
+        self.server.stop()
+        self.tmp.cleanup()
+
+    @property
+    def mirror(self):
+        return hubspot.hubspot_mirror
+
+    def requests(self, route):
+        return self.server.stats().get(route, {}).get('requests', 0)
+
+def test_sync_pages_and_advances_watermark():
+    """El primer sync trae todo en páginas; el siguiente solo lo modificado desde el watermark"""
+
+    print("🧪 PRUEBA DE LA RÉPLICA LOCAL DE HUBSPOT")
+    print("=" * 60)
+
+    with MirroredHubSpot(contacts=25) as stub:
+        first = hubspot_sync.run_sync()
+        print(f"📊 Primer sync: {first}")
+
+        assert first['contacts']['objects'] == 25 and first['contacts']['pages'] == 3
+        assert stub.mirror.count('contacts') == 25 and stub.mirror.count('companies') == 25
+        assert stub.mirror.sync_lag('contacts') < 5
+
+        last_modified = stub.dataset['contacts'][-1]['properties']['lastmodifieddate']
+        assert first['contacts']['watermark'] == hubspot._parse_timestamp(last_modified).timestamp()
+
+        stub.dataset['contacts'][3]['properties'].update(
+            jobtitle="Directora Comercial", lastmodifieddate="2030-01-01T00:00:00.000Z")
+
+        second = hubspot_sync.sync_object_type('contacts')
+
+        # GTE: vuelve a traer el último objeto del sync anterior además del modificado
+        assert second['objects'] == 2 and second['pages'] == 1
+        entry = stub.mirror.get_contact_by_email("contacto3@example.com")
+        assert entry['data']['properties']['jobtitle'] == "Directora Comercial"
+
+    print("✅ Sync paginado e incremental por lastmodifieddate")
+
+def test_sync_restarts_query_at_search_cap():
+    """Al llegar al tope de paginación la consulta se reinicia desde el último lastmodifieddate"""
+
+    with MirroredHubSpot(contacts=45, search_max_results=20) as stub:
+        summary = hubspot_sync.sync_object_type('contacts')
+
+        # Cada reinicio vuelve a traer el objeto del watermark (GTE)
+        assert stub.mirror.count('contacts') == 45
+        assert 'error' not in summary and summary['objects'] > 45
+
+def test_contact_info_served_from_mirror():
+    """Con el contacto replicado no se lee el contacto ni la empresa de HubSpot"""
+
+    with MirroredHubSpot(contacts=5) as stub:
+        hubspot_sync.run_sync()
+        result = hubspot.get_contact_info("Contacto2@Example.com", profile="agent_context")
+
+        assert result['success']
+        data = result['data']
+        assert data['contact_info']['informacion_basica']['nombre'] == "Ana Réplica 2"
+        assert data['company_info']['company_details']['informacion_basica']['id'] == \
+            stub.dataset['companies'][2]['id']
+        assert len(data['company_info']['deals']) == 3 and data['engagements']
+        # Del contacto solo se leen los IDs de sus engagements
+        assert stub.requests(CONTACT_ROUTE) == 1 and stub.requests(COMPANY_ROUTE) == 0
+
+        enriched = hubspot.enrich_prospect_with_hubspot_data({"emailCorporativo": "contacto2@example.com"})
+        assert enriched['data']['hubspot_data']['contact_id'] == data['contact_id']
+        assert stub.requests(COMPANY_ROUTE) == 0
+
+def test_falls_back_to_live_reads():
+    """Contacto ausente, desactualizado por una escritura propia o sync atrasado: se lee de HubSpot"""
+
+    # Sin caché de lectura, cada lectura en vivo vuelve a pedir la empresa; desde la réplica no
+    with MirroredHubSpot(contacts=5) as stub:
+        hubspot.get_contact_info("contacto1@example.com")
+        assert stub.requests(COMPANY_ROUTE) == 1, "Sin sync exitoso no se usa la réplica"
+
+        hubspot_sync.run_sync()
+
+        result = hubspot.get_contact_info("nuevo@example.com")
+        assert result['success'] and stub.requests(COMPANY_ROUTE) == 2
+
+        contact_id = hubspot.get_contact_info("contacto1@example.com")['data']['contact_id']
+        assert stub.requests(COMPANY_ROUTE) == 2
+        hubspot.invalidate_contact(contact_id)
+        result = hubspot.get_contact_info("contacto1@example.com")
+        assert result['data']['contact_info']['informacion_basica']['nombre'] == "Ana Pérez"
+        assert stub.requests(COMPANY_ROUTE) == 3
+
+        # El siguiente sync vuelve a traer el contacto y quita la marca
+        stub.dataset['contacts'][1]['properties']['lastmodifieddate'] = "2030-01-01T00:00:00.000Z"
+        hubspot_sync.sync_object_type('contacts')
+        hubspot.get_contact_info("contacto1@example.com")
+        assert stub.requests(COMPANY_ROUTE) == 3
+
+        original_max_lag = hubspot.HUBSPOT_MIRROR_MAX_LAG
+        try:
+            hubspot.HUBSPOT_MIRROR_MAX_LAG = -1
+            hubspot.get_contact_info("contacto1@example.com")
+            assert stub.requests(COMPANY_ROUTE) == 4
+        finally:
+            hubspot.HUBSPOT_MIRROR_MAX_LAG = original_max_lag
+
+def test_company_mirror_error_falls_back_to_api():
+    """Un error de SQLite al leer la empresa de la réplica no se propaga: la empresa se lee de HubSpot"""
+
+    with MirroredHubSpot(contacts=3) as stub:
+        hubspot_sync.run_sync()
+
+        def broken_get_object(object_type, object_id):
+            raise sqlite3.OperationalError("database is locked")
+
+        stub.mirror.get_object = broken_get_object
+        result = hubspot.get_contact_info("contacto1@example.com")
+
+        assert result['success']
+        assert result['data']['contact_info']['informacion_basica']['nombre'] == "Ana Réplica 1"
+        assert result['data']['company_info']['company_details']['informacion_basica']['id'] == \
+            stub.dataset['companies'][1]['id']
+        assert stub.requests(COMPANY_ROUTE) == 1
+
+def test_full_resync_removes_deleted_objects():
+    """Solo el sync completo detecta los objetos borrados en HubSpot"""
+
+    with MirroredHubSpot(contacts=10) as stub:
+        hubspot_sync.run_sync()
+        del stub.dataset['contacts'][:4]
+
+        hubspot_sync.sync_object_type('contacts')
+        assert stub.mirror.count('contacts') == 10
+
+        summary = hubspot_sync.sync_object_type('contacts', full=True)
+        assert summary['deleted'] == 4 and stub.mirror.count('contacts') == 6
+        assert stub.mirror.get_contact_by_email("contacto0@example.com") is None
+
+def test_lease_is_exclusive():
+    """Mientras otro proceso tiene el turno el sync se omite sin error, y un --full no reinicia el watermark"""
+
+    with MirroredHubSpot(contacts=3) as stub:
+        hubspot_sync.run_sync()
+        watermark = stub.mirror.get_state('contacts')['watermark']
+        searches = stub.requests(SEARCH_ROUTE)
+        assert stub.mirror.acquire_lease('contacts', "otro-host:1", 60)
+
+        results = hubspot_sync.run_sync()
+        full = hubspot_sync.sync_object_type('contacts', full=True)
+
+        assert results['contacts']['skipped'] == "lease" and full['skipped'] == "lease"
+        assert 'skipped' not in results['companies']
+        assert stub.requests(SEARCH_ROUTE) == searches
+        state = stub.mirror.get_state('contacts')
+        assert state['watermark'] == watermark and state['last_error'] is None
+
+        stub.mirror.release_lease('contacts', "otro-host:1")
+        assert 'skipped' not in hubspot_sync.sync_object_type('contacts')
+
+def test_recent_pass_is_skipped():
+    """Un worker no repite la pasada que otro hizo hace menos de un intervalo"""
+
+    with MirroredHubSpot(contacts=3) as stub:
+        hubspot_sync.run_sync(min_interval=60)
+        searches = stub.requests(SEARCH_ROUTE)
+
+        results = hubspot_sync.run_sync(min_interval=60)
+
+        assert results['contacts']['skipped'] == "recent"
+        assert stub.requests(SEARCH_ROUTE) == searches
+
+if __name__ == "__main__":
+    test_sync_pages_and_advances_watermark()
+    test_sync_restarts_query_at_search_cap()
+    test_contact_info_served_from_mirror()
+    test_falls_back_to_live_reads()
+    test_company_mirror_error_falls_back_to_api()
+    test_full_resync_removes_deleted_objects()
+    test_lease_is_exclusive()
+    test_recent_pass_is_skipped()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Script de prueba de la cadena de lecturas de get_contact_info
+Verifica que contacto, empresa y negocios tomen 3 peticiones con asociaciones en línea (más un
+batch read por tipo de engagement, con los IDs leídos junto al contacto),
+el NOT_FOUND por email y el respaldo a la API v4 cuando las asociaciones vienen paginadas
+"""
+
+import os
+import sys
+
+# Agregar el directorio actual al path para importar el módulo
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from api import hubspot
+from benchmark_stubs import StubBehavior, StubServer, hubspot_routes
+
+def run_against(routes, email):
+    """Ejecuta get_contact_info contra un HubSpot simulado y retorna (resultado, peticiones por ruta)"""
+    server = StubServer("hubspot", routes, StubBehavior(latency_ms=0))
+    original_base_url = hubspot.hubspot_client.base_url
+    original_api_key = hubspot.HUBSPOT_API_KEY
+    original_cache = hubspot.hubspot_cache
+    try:
+        hubspot.hubspot_client.base_url = server.start()
+        hubspot.HUBSPOT_API_KEY = "test"
+        # Sin caché de lectura: se cuentan las peticiones de la cadena completa
+        hubspot.hubspot_cache = None
+        return hubspot.get_contact_info(email), server.stats()
+    finally:
+        hubspot.hubspot_client.base_url = original_base_url
+        hubspot.HUBSPOT_API_KEY = original_api_key
+        hubspot.hubspot_cache = original_cache
+        server.stop()
+
+def test_enrichment_request_count():
+    """Contacto (con empresa y engagements en línea), empresa, batch de negocios y un batch por tipo de engagement"""
+
+    print("🧪 PRUEBA DE PETICIONES POR ENRIQUECIMIENTO")
+    print("=" * 60)
+
+    result, stats = run_against(hubspot_routes(), "Ana.Lectura@Empresa.com")
+    total = sum(counters["requests"] for counters in stats.values())
+    print(f"📊 {total} peticiones: {list(stats)}")
+
+    assert result['success'], result
+    assert result['data']['contact_info']['informacion_basica']['email'] == "ana.lectura@empresa.com"
+    assert result['data']['company_info']['company_details']
+    assert len(result['data']['company_info']['deals']) == 3
+    assert len(result['data']['engagements']) == 15
+    # 3 de la cadena contacto -> empresa -> negocios + 5 batch read de engagements (uno por tipo)
+    assert total == 8
+    assert 'GET /crm/v4/objects/contacts/(\\d+)/associations/(companies|meetings|calls|emails|tasks|notes)' not in stats
+    assert 'POST /crm/v3/objects/contacts/search' not in stats
+    assert 'GET /crm/v4/objects/companies/(\\d+)/associations/deals' not in stats
+
+    print("✅ 8 peticiones por enriquecimiento, sin listar asociaciones de engagements")
+
+def test_contact_not_found():
+    """Un 404 de la lectura por email se reporta como NOT_FOUND"""
+
+    routes = [('GET', r'/crm/v3/objects/contacts/([^/]+)', lambda match, body, query: (404, {"status": "error"}))]
+    result, _ = run_against(routes, "nadie@empresa.com")
+
+    assert not result['success']
+    assert result['code'] == 'NOT_FOUND'
+
+def test_paginated_deal_associations_fall_back_to_v4():
+    """Si la empresa tiene más negocios de los incluidos en línea se consulta la lista completa"""
+
+    def company_with_more_deals(match, body, query):
+        return 200, {"id": match.group(1), "properties": {"name": "Empresa"}, "associations": {"deals": {
+            "results": [{"id": "1", "type": "company_to_deal"}],
+            "paging": {"next": {"after": "1", "link": "..."}}
+        }}}
+
+    routes = [route for route in hubspot_routes() if route[1] != r'/crm/v3/objects/companies/(\d+)']
+    routes.append(('GET', r'/crm/v3/objects/companies/(\d+)', company_with_more_deals))
+
+    result, stats = run_against(routes, "ana@empresa.com")
+
+    assert result['success'], result
+    assert stats['GET /crm/v4/objects/companies/(\\d+)/associations/deals']['requests'] == 1
+    assert len(result['data']['company_info']['deals']) == 3
+
+if __name__ == "__main__":
+    test_enrichment_request_count()
+    test_contact_not_found()
+    test_paginated_deal_associations_fall_back_to_v4()
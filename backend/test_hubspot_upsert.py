@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el upsert de contactos por email (batch upsert de HubSpot)
+Usa un servidor HTTP local que simula HubSpot y cuenta las peticiones
+"""
+
+import os
+import sys
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Agregar el directorio actual al path para importar el módulo
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from api import hubspot
+
+EXISTING_EMAILS = {"existente@empresa.com"}
+received_requests = []
+
+class StubHubSpotHandler(BaseHTTPRequestHandler):
+    """Simula el endpoint batch upsert de contactos de HubSpot"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        received_requests.append((self.path, body))
+
+        if not self.path.endswith('/contacts/batch/upsert'):
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        results = []
+        for item in body.get("inputs", []):
+            assert item["idProperty"] == "email"
+            results.append({
+                "id": f"id-{item['id']}",
+                "new": item["id"] not in EXISTING_EMAILS,
+                "properties": item["properties"]
+            })
+
+        payload = json.dumps({"status": "COMPLETE", "results": results}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+def run_with_stub(fn):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHubSpotHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    original_base_url = hubspot.hubspot_client.base_url
+    original_cache = hubspot.hubspot_cache
+    hubspot.hubspot_client.base_url = f"http://127.0.0.1:{server.server_port}"
+    hubspot.hubspot_cache = None
+    received_requests.clear()
+
+    try:
+        return fn()
+    finally:
+        hubspot.hubspot_client.base_url = original_base_url
+        hubspot.hubspot_cache = original_cache
+        server.shutdown()
+
+def test_upsert_existing_contact_single_request():
+    """Verifica que un prospecto recurrente se actualice con una sola petición"""
+
+    print("🧪 PRUEBA DE UPSERT DE CONTACTO")
+    print("=" * 60)
+
+    prospect = {
+        "nombres": "Ana",
+        "apellidos": "Pérez",
+        "compania": "Empresa",
+        "emailCorporativo": "Existente@Empresa.com",
+        "rol": "CEO"
+    }
+    enriched = {"informacion_basica": {"industria": "Software"}}
+
+    result = run_with_stub(lambda: hubspot.upsert_contact(hubspot.build_contact_properties(prospect, enriched)))
+
+    print(f"📡 Peticiones realizadas: {len(received_requests)} (antes: 3)")
+
+    assert result == {"success": True, "contact_id": "id-existente@empresa.com", "created": False}
+    assert len(received_requests) == 1
+    properties = received_requests[0][1]["inputs"][0]["properties"]
+    assert properties["industry"] == "Software y tecnologías SaaS"
+
+    print("✅ Contacto actualizado con 1 petición")
+
+def test_upsert_batch_chunks_and_dedupes():
+    """Verifica que el upsert masivo agrupe de a 100 y elimine emails repetidos"""
+
+    print("🧪 PRUEBA DE UPSERT MASIVO")
+    print("=" * 60)
+
+    contacts = [{"email": f"contacto{i}@empresa.com", "firstname": f"C{i}"} for i in range(150)]
+    contacts.append({"email": "CONTACTO0@empresa.com", "firstname": "Repetido"})
+
+    result = run_with_stub(lambda: hubspot.upsert_contacts_batch(contacts))
+
+    print(f"📊 Contactos procesados: {len(result['data'])}")
+    print(f"📡 Peticiones realizadas: {len(received_requests)}")
+
+    assert result['success'], result
+    assert len(result['data']) == 150
+    assert len(received_requests) == 2
+    assert [len(body["inputs"]) for _, body in received_requests] == [100, 50]
+    assert received_requests[0][1]["inputs"][0]["properties"]["firstname"] == "Repetido"
+
+    print("✅ 150 contactos en 2 peticiones")
+
+if __name__ == "__main__":
+    test_upsert_existing_contact_single_request()
+    test_upsert_batch_chunks_and_dedupes()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Script de prueba de la cola de trabajos durable
+Verifica que un fallo del handler reintente el trabajo, que un huérfano que agotó sus intentos se dé
+por fallido, que los trabajos terminados se eliminen tras la retención, que un fallo de HubSpot u
+OpenAI al procesar una transcripción reintente el trabajo en lugar de completarlo, y que el reintento
+no duplique una llamada que HubSpot ya había creado
+"""
+
+import os
+import sys
+import time
+import tempfile
+from datetime import datetime, timedelta
+
+# Agregar el directorio actual al path para importar el módulo
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from storage.job_queue import JobQueue, STATUS_DONE, STATUS_FAILED, STATUS_PENDING
+
+def build_queue(**kwargs):
+    """Cola en un archivo temporal sin hilos worker; los trabajos se ejecutan a mano con _claim_next y run_job"""
+    return JobQueue(db_file=os.path.join(tempfile.mkdtemp(), "jobs.db"), num_workers=0, backoff_base=0.01, **kwargs)
+
+def run_next(queue):
+    job = queue._claim_next()
+    assert job is not None
+    queue.run_job(job)
+    return queue.get_job(job['id'])
+
+def test_failed_handler_is_retried():
+    """Una excepción deja el trabajo pendiente con backoff; el siguiente intento lo completa"""
+
+    print("🧪 PRUEBA DE LA COLA DE TRABAJOS")
+    print("=" * 60)
+
+    queue = build_queue(max_attempts=3)
+    calls = []
+
+    def flaky(payload):
+        calls.append(payload)
+        if len(calls) == 1:
+            raise RuntimeError("HubSpot 502")
+        return {"ok": True}
+
+    queue.register_handler("flaky", flaky)
+    job_id = queue.enqueue("flaky", {"n": 1})
+
+    job = run_next(queue)
+    assert job['status'] == STATUS_PENDING and job['error'] == "HubSpot 502"
+
+    time.sleep(0.05)
+    job = run_next(queue)
+    print(f"📊 Trabajo {job_id}: {job['status']} tras {job['attempts']} intentos")
+    assert job['status'] == STATUS_DONE and job['attempts'] == 2 and job['result'] == {"ok": True}
+
+    print("✅ Trabajo reintentado y completado")
+
+def test_orphan_respects_max_attempts():
+    """Un trabajo 'running' con el lease vencido solo se vuelve a tomar si le quedan intentos"""
+
+    queue = build_queue(max_attempts=2, lease_timeout=0)
+    queue.register_handler("crash", lambda payload: {"ok": True})
+    job_id = queue.enqueue("crash", {})
+
+    # Dos workers que mueren con el trabajo tomado
+    assert queue._claim_next()['attempts'] == 1
+    assert queue._claim_next()['attempts'] == 2
+
+    assert queue._claim_next() is None
+    job = queue.get_job(job_id)
+    assert job['status'] == STATUS_FAILED and "agotar los intentos" in job['error']
+
+def test_prune_removes_finished_jobs():
+    """La retención elimina los terminados y fallidos antiguos, nunca los pendientes"""
+
+    queue = build_queue()
+    queue.register_handler("ok", lambda payload: {"ok": True})
+    done_id = queue.enqueue("ok", {"transcript": ["..."]})
+    run_next(queue)
+    pending_id = queue.enqueue("ok", {})
+
+    old = (datetime.now() - timedelta(days=8)).isoformat()
+    queue.db.execute("UPDATE jobs SET updated_at = ?", (old,))
+
+    assert queue.prune(7 * 86400) == 1
+    assert queue.get_job(done_id) is None
+    assert queue.get_job(pending_id)['status'] == STATUS_PENDING
+
+def test_transcript_failures_retry_the_job():
+    """Si HubSpot rechaza la actualización del dolor, el trabajo se reintenta y no se crea la llamada"""
+
+    import app
+    from agents.conversation_analyzer import ConversationAnalysis, ConversationAnalysisError
+
+    class FakeStorage:
+        def get_mapping(self, conversation_id):
+            return {"hubspot_id": "42", "prospect_data": {"nombres": "Ana"}}
+
+    class FakeAnalyzer:
+        def __init__(self, error=None):
+            self.error = error
+
+        def analyze_conversation(self, transcript, prospect_data, raise_on_error=False):
+            assert raise_on_error
+            if self.error:
+                raise self.error
+            return ConversationAnalysis(summary="Resumen", pain_point="Mi nivel de recompra es muy bajo",
+                                        pain_confidence=0.9, key_insights=[], next_steps="", qualification_score=8)
+
+        def get_pain_mapping(self, pain_point):
+            return pain_point
+
+    engagements = []
+    original = (app.conversation_storage, app.get_conversation_analyzer, app.update_contact_pain_field,
+                app.create_conversation_engagement)
+    try:
+        app.conversation_storage = FakeStorage()
+        app.update_contact_pain_field = lambda hubspot_id, value: {"success": False, "error": "500"}
+        app.create_conversation_engagement = lambda hubspot_id, data: engagements.append(data) or {"success": True}
+
+        queue = build_queue()
+        queue.register_handler("transcript", app.process_conversation_transcript)
+
+        app.get_conversation_analyzer = lambda: FakeAnalyzer()
+        queue.enqueue("transcript", {"conversation_id": "c1", "transcript": []})
+        job = run_next(queue)
+        assert job['status'] == STATUS_PENDING and "dolores_de_venta" in job['error']
+        assert engagements == []
+
+        app.get_conversation_analyzer = lambda: FakeAnalyzer(ConversationAnalysisError("OpenAI 503"))
+        queue.enqueue("transcript", {"conversation_id": "c2", "transcript": []})
+        job = run_next(queue)
+        assert job['status'] == STATUS_PENDING and job['error'] == "OpenAI 503"
+    finally:
+        (app.conversation_storage, app.get_conversation_analyzer, app.update_contact_pain_field,
+         app.create_conversation_engagement) = original
+
+def test_transcript_retry_does_not_duplicate_call():
+    """Si HubSpot creó la llamada pero el intento falló después (timeout), el reintento no la vuelve a crear"""
+
+    import app
+    from api import hubspot
+    from agents.conversation_analyzer import ConversationAnalysis
+    from benchmark_stubs import StubBehavior, StubServer, hubspot_routes
+
+    class FakeStorage:
+        def get_mapping(self, conversation_id):
+            return {"hubspot_id": "42", "prospect_data": {"nombres": "Ana", "apellidos": "Pérez"}}
+
+    class FakeAnalyzer:
+        def analyze_conversation(self, transcript, prospect_data, raise_on_error=False):
+            return ConversationAnalysis(summary="Resumen", pain_point="Mi nivel de recompra es muy bajo",
+                                        pain_confidence=0.9, key_insights=[], next_steps="", qualification_score=8)
+
+        def get_pain_mapping(self, pain_point):
+            return pain_point
+
+    def create_then_time_out(hubspot_id, data):
+        result = create_call(hubspot_id, data)
+        if len(created) == 0:
+            created.append(result['call_id'])
+            return {"success": False, "error": "Read timed out"}
+        return result
+
+    server = StubServer("hubspot", hubspot_routes(), StubBehavior(latency_ms=0))
+    created = []
+    create_call = app.create_conversation_engagement
+    original = (app.conversation_storage, app.get_conversation_analyzer, app.update_contact_pain_field,
+                app.create_conversation_engagement, hubspot.hubspot_client.base_url, hubspot.HUBSPOT_API_KEY,
+                hubspot.hubspot_cache)
+    try:
+        app.conversation_storage = FakeStorage()
+        app.get_conversation_analyzer = lambda: FakeAnalyzer()
+        app.update_contact_pain_field = lambda hubspot_id, value: {"success": True}
+        app.create_conversation_engagement = create_then_time_out
+        hubspot.hubspot_client.base_url = server.start()
+        hubspot.HUBSPOT_API_KEY = "test"
+        hubspot.hubspot_cache = None
+
+        queue = build_queue()
+        queue.register_handler("transcript", app.process_conversation_transcript)
+        queue.enqueue("transcript", {"conversation_id": "c1", "transcript": [], "call_timestamp": 1760000000123})
+
+        job = run_next(queue)
+        assert job['status'] == STATUS_PENDING and "timed out" in job['error']
+
+        time.sleep(0.05)
+        job = run_next(queue)
+        assert job['status'] == STATUS_DONE
+        assert job['result']['updates']['call_id'] == created[0]
+        assert server.stats()['POST /crm/v3/objects/calls']['requests'] == 1
+    finally:
+        (app.conversation_storage, app.get_conversation_analyzer, app.update_contact_pain_field,
+         app.create_conversation_engagement, hubspot.hubspot_client.base_url, hubspot.HUBSPOT_API_KEY,
+         hubspot.hubspot_cache) = original
+        server.stop()
+
+if __name__ == "__main__":
+    test_failed_handler_is_retried()
+    test_orphan_respects_max_attempts()
+    test_prune_removes_finished_jobs()
+    test_transcript_failures_retry_the_job()
+    test_transcript_retry_does_not_duplicate_call()
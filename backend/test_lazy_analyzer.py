@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Script de prueba de la inicialización diferida del analizador de conversaciones
+Importar la app no debe importar LangChain/OpenAI; el analizador se crea una sola vez en el primer uso
+"""
+
+import os
+import sys
+import subprocess
+import threading
+
+# Agregar el directorio actual al path para importar el módulo
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def test_app_import_does_not_load_langchain():
+    """Importar app (y responder /health) no carga langchain_openai"""
+
+    print("🧪 PRUEBA DE IMPORTACIÓN DIFERIDA")
+    print("=" * 60)
+
+    snippet = (
+        "import sys\n"
+        "from app import app\n"
+        "assert app.test_client().get('/health').status_code == 200\n"
+        "print('langchain_openai' in sys.modules)\n"
+    )
+    result = subprocess.run([sys.executable, '-c', snippet], cwd=BACKEND_DIR,
+                            capture_output=True, text=True, check=True)
+
+    print(f"📦 langchain_openai cargado tras importar app: {result.stdout.strip()}")
+    assert result.stdout.strip().splitlines()[-1] == 'False'
+
+    print("✅ La app arranca sin importar LangChain")
+
+def test_accessor_creates_single_instance():
+    """Hilos concurrentes obtienen la misma instancia del analizador"""
+
+    print("\n🧪 PRUEBA DE ACCESO CONCURRENTE AL ANALIZADOR")
+    print("=" * 60)
+
+    from agents import conversation_analyzer as analyzer_module
+
+    instances = []
+    threads = [
+        threading.Thread(target=lambda: instances.append(analyzer_module.get_conversation_analyzer()))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(instances) == 8
+    assert all(instance is instances[0] for instance in instances)
+    assert analyzer_module.conversation_analyzer is instances[0]
+
+    print("✅ Una sola instancia compartida por todos los hilos")
+
+if __name__ == "__main__":
+    test_app_import_does_not_load_langchain()
+    test_accessor_creates_single_instance()
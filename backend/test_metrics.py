@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Script de prueba del endpoint /metrics
+Verifica el formato de exposición, la agregación entre workers y las métricas por ruta
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+
+# Agregar el directorio actual al path para importar el módulo
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from api.metrics import MetricsRegistry, COUNTER, HISTOGRAM, GAUGE, endpoint_family
+
+def build_registry():
+    registry = MetricsRegistry(db_file=os.path.join(tempfile.mkdtemp(), "metrics.db"))
+    registry.describe('requests_total', COUNTER, "Peticiones")
+    registry.describe('latency_seconds', HISTOGRAM, "Latencia")
+    registry.describe('in_flight', GAUGE, "En curso")
+    registry.describe('cache_hits_total', COUNTER, "Aciertos")
+    registry.describe('cache_misses_total', COUNTER, "Fallos")
+    registry.describe('cache_hit_ratio', GAUGE, "Tasa de aciertos")
+    return registry
+
+def publish_foreign_snapshot(registry, process, values, age=0.0):
+    """Simula la copia publicada por otro worker"""
+    registry._database().execute(
+        "INSERT OR REPLACE INTO metrics_snapshots (process, pid, updated_at, payload) VALUES (?, ?, ?, ?)",
+        (process, 1, time.time() - age, json.dumps(values))
+    )
+
+def test_endpoint_family():
+    """Los IDs y emails se reemplazan para acotar la cardinalidad"""
+
+    assert endpoint_family("https://api.hubapi.com/crm/v3/objects/contacts/123/associations/companies") == \
+        "/crm/v3/objects/contacts/:id/associations/companies"
+    assert endpoint_family("/crm/v3/objects/contacts/search") == "/crm/v3/objects/contacts/search"
+    assert endpoint_family("https://api.apollo.io/v1/organizations/enrich?domain=a.com") == "/v1/organizations/enrich"
+
+def test_render_and_aggregate_workers():
+    """Contadores e histogramas se suman entre workers; gauges de workers inactivos se ignoran"""
+
+    print("🧪 PRUEBA DE AGREGACIÓN ENTRE WORKERS")
+    print("=" * 60)
+
+    registry = build_registry()
+    labels = {"route": "/webhook"}
+    registry.inc('requests_total', labels, 2)
+    registry.observe('latency_seconds', 0.03, labels)
+    registry.inc('in_flight', amount=1)
+    registry.inc('cache_hits_total', {"cache": "apollo"}, 3)
+    registry.inc('cache_misses_total', {"cache": "apollo"}, 1)
+
+    key = json.dumps(labels, sort_keys=True)
+    publish_foreign_snapshot(registry, "otro-worker", {
+        "requests_total": {key: 5},
+        "latency_seconds": {key: {"buckets": [0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1, 1, 1, 1], "sum": 0.4, "count": 1}},
+        "in_flight": {"{}": 4},
+        "cache_hits_total": {json.dumps({"cache": "apollo"}): 1},
+        "cache_misses_total": {json.dumps({"cache": "apollo"}): 3}
+    })
+    publish_foreign_snapshot(registry, "worker-terminado", {
+        "requests_total": {key: 10},
+        "in_flight": {"{}": 100}
+    }, age=3600)
+
+    output = registry.render()
+    print(output)
+
+    assert '# TYPE requests_total counter' in output
+    assert 'requests_total{route="/webhook"} 17' in output
+    assert 'latency_seconds_bucket{le="0.05",route="/webhook"} 1' in output
+    assert 'latency_seconds_bucket{le="0.5",route="/webhook"} 2' in output
+    assert 'latency_seconds_bucket{le="+Inf",route="/webhook"} 2' in output
+    assert 'latency_seconds_count{route="/webhook"} 2' in output
+    assert 'in_flight 5' in output
+    assert 'cache_hit_ratio{cache="apollo"} 0.5' in output
+
+    print("✅ Copias de los workers sumadas correctamente")
+
+def test_flask_route_metrics():
+    """Las peticiones se cuentan por plantilla de ruta y /metrics responde en texto plano"""
+
+    from app import app
+
+    client = app.test_client()
+    client.get('/health')
+    client.get('/api/conversation/conv-123/processing')
+
+    response = client.get('/metrics')
+    output = response.data.decode('utf-8')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    assert 'http_requests_total{method="GET",route="/health",status="200"}' in output
+    assert 'route="/api/conversation/<conversation_id>/processing"' in output
+    assert 'conv-123' not in output
+    assert 'http_request_duration_seconds_bucket{le="+Inf",method="GET",route="/health"}' in output
+
+if __name__ == "__main__":
+    test_endpoint_family()
+    test_render_and_aggregate_workers()
+    test_flask_route_metrics()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el límite de tasa y los reintentos de llamadas salientes
+Usa un servidor HTTP local que responde 429 con Retry-After y 503 antes de responder 200
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Agregar el directorio actual al path para importar el módulo
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from api.http_client import HTTPClient
+from api.rate_limiter import OutboundProvider, TokenBucket, parse_retry_after, provider_from_env
+
+# Respuestas a entregar en orden antes de responder 200
+scripted_statuses = []
+received_requests = []
+
+class StubProviderHandler(BaseHTTPRequestHandler):
+    """Responde los estados programados y luego 200"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def _respond(self):
+        received_requests.append((self.command, time.monotonic()))
+        status = scripted_statuses.pop(0) if scripted_statuses else 200
+
+        payload = json.dumps({"status": status}).encode('utf-8')
+        self.send_response(status)
+        if status == 429:
+            self.send_header('Retry-After', '1')
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        self._respond()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self._respond()
+
+def build_client(server, rate=100, burst=100):
+    provider = OutboundProvider("stub", rate=rate, burst=burst, max_retries=3, backoff_base=0.05)
+    return HTTPClient(f"http://127.0.0.1:{server.server_port}", provider=provider, name="stub")
+
+def test_retry_after_and_server_errors():
+    """Verifica que un 429 espere Retry-After y un 503 se reintente en peticiones idempotentes"""
+
+    print("🧪 PRUEBA DE REINTENTOS 429 / 5xx")
+    print("=" * 60)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubProviderHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    try:
+        client = build_client(server)
+        scripted_statuses[:] = [429, 503]
+        received_requests.clear()
+
+        response = client.get("/objects")
+        first_gap = received_requests[1][1] - received_requests[0][1]
+
+        # Un POST no idempotente no se reintenta ante 5xx (pudo haberse procesado)
+        scripted_statuses[:] = [503]
+        post_response = client.post("/objects", json={})
+    finally:
+        server.shutdown()
+
+    stats = client.provider.stats()
+    print(f"📊 Contadores: {stats}")
+
+    assert response.status_code == 200
+    assert first_gap >= 1.0
+    assert post_response.status_code == 503
+    assert stats['throttled'] == 1 and stats['server_errors'] == 1 and stats['retries'] == 2
+
+    print("✅ 429 respetó Retry-After y 503 se reintentó solo en GET")
+
+def test_token_bucket_queues_bursts():
+    """Verifica que una ráfaga por encima del límite espere turno en lugar de fallar"""
+
+    print("🧪 PRUEBA DE TOKEN BUCKET")
+    print("=" * 60)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubProviderHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    try:
+        client = build_client(server, rate=20, burst=5)
+        received_requests.clear()
+        started = time.monotonic()
+
+        threads = [threading.Thread(target=client.get, args=("/objects",)) for _ in range(25)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        elapsed = time.monotonic() - started
+    finally:
+        server.shutdown()
+
+    stats = client.provider.stats()
+    print(f"⏱️ 25 peticiones en {elapsed:.2f}s (límite 20/s, ráfaga 5); en cola: {stats['queued']}")
+
+    assert len(received_requests) == 25
+    assert elapsed >= 0.9
+    assert stats['queued'] >= 15 and stats['queue_timeouts'] == 0
+
+    print("✅ Ráfaga encolada dentro del límite de tasa")
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert TokenBucket(1, 1).reserve(0) == 0.0
+
+def test_rejected_call_refunds_provider_token():
+    """Si el límite del endpoint rechaza la llamada, el token ya reservado del proveedor se devuelve"""
+
+    from api.rate_limiter import RateLimitExceeded
+
+    provider = OutboundProvider("test_refund", rate=1, burst=2, max_queue_wait=0.5)
+    search = TokenBucket(rate=0.1, capacity=1, name="test_refund_search")
+    calls = []
+
+    provider.call(lambda: calls.append(1), lambda result, error: None, extra_buckets=[search])
+
+    for _ in range(3):
+        try:
+            provider.call(lambda: calls.append(1), lambda result, error: None, extra_buckets=[search])
+            raise AssertionError("La búsqueda debería rechazarse por su propio límite")
+        except RateLimitExceeded:
+            pass
+
+    # Al proveedor le queda el token que no consumieron las búsquedas rechazadas
+    assert provider.bucket.reserve(0) == 0.0
+    assert len(calls) == 1 and provider.stats()['queue_timeouts'] == 3
+
+def test_account_limit_split_across_workers():
+    """Con WEB_CONCURRENCY workers, cada proceso usa su parte del límite por cuenta"""
+
+    original = os.environ.get('WEB_CONCURRENCY')
+    try:
+        os.environ['WEB_CONCURRENCY'] = "4"
+        provider = provider_from_env('TEST_SPLIT_', default_rate=10, default_burst=2)
+        assert provider.bucket.rate == 2.5 and provider.bucket.capacity == 1.0
+
+        os.environ['WEB_CONCURRENCY'] = "1"
+        provider = provider_from_env('TEST_SINGLE_', default_rate=10, default_burst=2)
+        assert provider.bucket.rate == 10 and provider.bucket.capacity == 2
+    finally:
+        if original is None:
+            os.environ.pop('WEB_CONCURRENCY', None)
+        else:
+            os.environ['WEB_CONCURRENCY'] = original
+
+if __name__ == "__main__":
+    test_parse_retry_after()
+    test_retry_after_and_server_errors()
+    test_token_bucket_queues_bursts()
+    test_rejected_call_refunds_provider_token()
+    test_account_limit_split_across_workers()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Script de prueba de los perfiles de lectura de HubSpot y Apollo
+Verifica que cada perfil limite las propiedades pedidas a HubSpot y las secciones procesadas,
+y que Apollo solo devuelva raw_data con el perfil full sin alterar el resultado en caché
+"""
+
+import os
+import sys
+from urllib.parse import parse_qs, urlparse
+
+# Agregar el directorio actual al path para importar el módulo
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from api import apollo, hubspot
+from benchmark_stubs import StubBehavior, StubServer, apollo_routes, hubspot_routes
+
+class RecordingStub(StubServer):
+    """HubSpot simulado que además guarda las propiedades pedidas en cada lectura"""
+
+    def __init__(self):
+        super().__init__("hubspot", hubspot_routes(), StubBehavior(latency_ms=0))
+        self.requested_properties = {}
+
+    def _dispatch(self, method, raw_path, body):
+        parsed = urlparse(raw_path)
+        if method == 'GET' and parsed.path.startswith('/crm/v3/objects/'):
+            object_type = parsed.path.split('/')[4]
+            self.requested_properties[object_type] = parse_qs(parsed.query).get('properties', [])
+        return super()._dispatch(method, raw_path, body)
+
+def read_contact(profile):
+    """Ejecuta get_contact_info con un perfil contra el simulador y retorna (resultado, stub)"""
+    server = RecordingStub()
+    original_base_url = hubspot.hubspot_client.base_url
+    original_api_key = hubspot.HUBSPOT_API_KEY
+    original_cache = hubspot.hubspot_cache
+    try:
+        hubspot.hubspot_client.base_url = server.start()
+        hubspot.HUBSPOT_API_KEY = "test"
+        hubspot.hubspot_cache = None
+        return hubspot.get_contact_info("ana.perfiles@empresa.com", profile=profile), server
+    finally:
+        hubspot.hubspot_client.base_url = original_base_url
+        hubspot.HUBSPOT_API_KEY = original_api_key
+        hubspot.hubspot_cache = original_cache
+        server.stop()
+
+def test_hubspot_profiles_drive_properties_and_sections():
+    """minimal pide y construye menos que agent_context, y este menos que full"""
+
+    print("🧪 PRUEBA DE PERFILES DE LECTURA DE HUBSPOT")
+    print("=" * 60)
+
+    minimal, minimal_server = read_contact("minimal")
+    full, full_server = read_contact("full")
+
+    for label, server in (("minimal", minimal_server), ("full", full_server)):
+        print(f"📊 {label}: {[(name, len(props)) for name, props in server.requested_properties.items()]}")
+
+    assert minimal['success'] and full['success']
+    assert full_server.requested_properties['contacts'] == hubspot.CONTACT_PROPERTIES
+    assert full_server.requested_properties['companies'] == hubspot.COMPANY_PROPERTIES
+    assert set(minimal_server.requested_properties['contacts']) == {
+        "firstname", "lastname", *hubspot.CONTACT_SECTIONS["informacion_basica"].values(),
+        *hubspot.CONTACT_SECTIONS["estado"].values()
+    }
+
+    assert list(minimal['data']['contact_info']) == ["informacion_basica", "estado"]
+    assert list(minimal['data']['company_info']['company_details']) == ["informacion_basica"]
+    assert list(full['data']['contact_info']) == list(hubspot.CONTACT_SECTIONS)
+    assert minimal['data']['contact_info']['informacion_basica'] == full['data']['contact_info']['informacion_basica']
+
+    _, agent_properties = hubspot.read_profile("agent_context", "contact")
+    assert len(minimal_server.requested_properties['contacts']) < len(agent_properties) < len(hubspot.CONTACT_PROPERTIES)
+
+    print("✅ Propiedades y secciones según el perfil")
+
+def test_process_contact_data_layout():
+    """Sin secciones se construye la estructura completa con id y nombre primero"""
+
+    processed = hubspot.process_contact_data({"id": "1", "properties": {"firstname": "Ana", "lastname": "Pérez"}})
+
+    assert list(processed['informacion_basica'])[:3] == ["id", "nombre", "email"]
+    assert processed['informacion_basica']['nombre'] == "Ana Pérez"
+    assert processed['notas'] == {"num_notas": "", "num_notas_contactadas": ""}
+
+    try:
+        hubspot.read_profile("todo", "contact")
+        assert False, "Un perfil desconocido debe fallar"
+    except ValueError:
+        pass
+
+def test_apollo_profiles_project_cached_result():
+    """Los perfiles comparten la misma entrada de caché; solo full recibe raw_data"""
+
+    server = StubServer("apollo", apollo_routes(), StubBehavior(latency_ms=0))
+    original_base_url = apollo.APOLLO_BASE_URL
+    try:
+        apollo.APOLLO_BASE_URL = server.start()
+        minimal = apollo.enrich_company_data("perfiles.com", profile="minimal")
+        agent = apollo.enrich_company_data("perfiles.com", profile="agent_context")
+        full = apollo.enrich_company_data("https://www.perfiles.com/", profile="full")
+        cached = apollo.apollo_cache.get("perfiles.com")
+        requests_made = server.stats()['GET /organizations/enrich']['requests']
+    finally:
+        apollo.APOLLO_BASE_URL = original_base_url
+        apollo.apollo_cache.delete("perfiles.com")
+        apollo.apollo_stale_cache.delete("perfiles.com")
+        server.stop()
+
+    assert requests_made == 1
+    assert 'raw_data' not in minimal and 'raw_data' not in agent
+    assert full['raw_data']['organization']['primary_domain'] == "perfiles.com"
+    assert set(minimal['data']) == {"informacion_basica", "contacto", "financiera", "fecha_consulta", "fuente"}
+    assert agent['data'] == full['data']
+    assert 'raw_data' in cached and 'ubicaciones' in cached['data']
+
+if __name__ == "__main__":
+    test_hubspot_profiles_drive_properties_and_sections()
+    test_process_contact_data_layout()
+    test_apollo_profiles_project_cached_result()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Script de prueba de la coalescencia de peticiones (single-flight)
+Verifica que llamadores concurrentes de una clave compartan una sola ejecución, que una excepción
+del líder llegue a todos los que esperan y que la clave se libere al terminar
+"""
+
+import os
+import sys
+import time
+import threading
+
+# Agregar el directorio actual al path para importar el módulo
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from api.single_flight import SingleFlight
+
+def run_concurrently(flight, key, fn, callers):
+    """Lanza callers hilos sobre la misma clave y retorna (resultados, excepciones) cuando todos terminan"""
+    results, errors = [], []
+    release = threading.Event()
+
+    def blocking_fn():
+        release.wait(2)
+        return fn()
+
+    def caller():
+        try:
+            results.append(flight.do(key, blocking_fn))
+        except Exception as e:
+            errors.append(e)
+
+    shared_before = flight.stats()['shared']
+    threads = [threading.Thread(target=caller) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+
+    # El líder queda bloqueado hasta que todos los seguidores se unieron a su llamada
+    deadline = time.time() + 2
+    while flight.stats()['shared'] - shared_before < callers - 1 and time.time() < deadline:
+        time.sleep(0.01)
+    release.set()
+
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+def test_followers_share_one_call():
+    """Diez llamadores concurrentes ejecutan la función una sola vez y reciben el mismo resultado"""
+
+    print("🧪 PRUEBA DE SINGLE-FLIGHT")
+    print("=" * 60)
+
+    flight = SingleFlight(name="test_share")
+    calls = []
+
+    results, errors = run_concurrently(flight, "acme.com", lambda: calls.append(1) or {"success": True}, 10)
+
+    stats = flight.stats()
+    print(f"📊 Stats: {stats}")
+    assert errors == [] and len(calls) == 1
+    assert results == [{"success": True}] * 10
+    assert stats['executed'] == 1 and stats['shared'] == 9
+
+    print("✅ Una sola llamada para 10 peticiones concurrentes")
+
+def test_exception_reaches_all_waiters():
+    """Si el líder falla, todos los llamadores reciben la misma excepción"""
+
+    flight = SingleFlight(name="test_error")
+
+    def failing():
+        raise TimeoutError("Apollo no respondió")
+
+    results, errors = run_concurrently(flight, "acme.com", failing, 5)
+
+    assert results == [] and len(errors) == 5
+    assert all(isinstance(error, TimeoutError) for error in errors)
+    assert flight.stats()['in_flight'] == 0
+
+def test_key_released_after_completion():
+    """Terminada la llamada, la clave se libera y la siguiente petición vuelve a ejecutar la función"""
+
+    flight = SingleFlight(name="test_release")
+    calls = []
+
+    assert flight.do("acme.com", lambda: calls.append(1) or len(calls)) == 1
+    assert flight.stats()['in_flight'] == 0
+    assert flight.do("acme.com", lambda: calls.append(1) or len(calls)) == 2
+
+    # Otra clave no espera a la llamada en curso
+    release = threading.Event()
+    thread = threading.Thread(target=flight.do, args=("lenta.com", lambda: release.wait(2)))
+    thread.start()
+    while flight.stats()['in_flight'] == 0:
+        time.sleep(0.01)
+    assert flight.do("otra.com", lambda: "rápida") == "rápida"
+    release.set()
+    thread.join()
+
+    stats = flight.stats()
+    assert stats['in_flight'] == 0 and stats['executed'] == 4 and stats['shared'] == 0
+
+if __name__ == "__main__":
+    test_followers_share_one_call()
+    test_exception_reaches_all_waiters()
+    test_key_released_after_completion()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Script de prueba del almacenamiento de mapeos en SQLite
+Verifica la migración única desde el archivo JSON anterior y que volver a almacenar un mapeo
+actualice sus datos sin perder la fecha de creación, igual que en el backend JSON
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+
+# Agregar el directorio actual al path para importar el módulo
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from storage.sqlite_conversation_storage import SQLiteConversationStorage
+from storage.conversation_storage import ConversationStorage
+
+LEGACY_MAPPINGS = {
+    "conv-1": {"conversation_id": "conv-1", "hubspot_id": "101", "prospect_data": {"nombres": "Ana"},
+               "created_at": "2024-01-01T10:00:00", "updated_at": "2024-01-01T10:00:00"},
+    "conv-2": {"conversation_id": "conv-2", "hubspot_id": "102", "prospect_data": {"nombres": "Luis"},
+               "created_at": "2024-01-02T10:00:00", "updated_at": "2024-01-02T10:00:00"}
+}
+
+def build_storage(tmp):
+    return SQLiteConversationStorage(os.path.join(tmp, "mappings.db"), os.path.join(tmp, "mappings.json"))
+
+def write_legacy(tmp, mappings):
+    with open(os.path.join(tmp, "mappings.json"), 'w', encoding='utf-8') as f:
+        json.dump(mappings, f)
+
+def test_migrates_json_once():
+    """El JSON se importa al abrir la base y no se vuelve a importar aunque cambie"""
+
+    print("🧪 PRUEBA DEL ALMACENAMIENTO SQLITE DE MAPEOS")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_legacy(tmp, LEGACY_MAPPINGS)
+        storage = build_storage(tmp)
+
+        assert storage.get_hubspot_id("conv-1") == "101"
+        assert storage.get_mapping("conv-2")['created_at'] == "2024-01-02T10:00:00"
+        assert [m['conversation_id'] for m in storage.find_by_hubspot_id("102")] == ["conv-2"]
+
+        # Escrito ya en SQLite: una migración posterior no lo sobrescribiría
+        storage.store_mapping("conv-1", "201", {"nombres": "Ana María"})
+        write_legacy(tmp, {**LEGACY_MAPPINGS, "conv-3": {"hubspot_id": "103"}})
+
+        reopened = build_storage(tmp)
+        assert reopened.get_mapping("conv-3") is None
+        assert reopened.get_hubspot_id("conv-1") == "201"
+        migrated_at = reopened.db.execute(
+            "SELECT COUNT(*) FROM storage_meta WHERE key = 'json_migrated_at'").fetchone()[0]
+        assert migrated_at == 1
+
+    print("✅ Migración desde JSON única e idempotente")
+
+def assert_store_keeps_created_at(storage):
+    """Almacena dos veces el mismo mapeo y verifica que solo created_at se conserve"""
+    assert storage.store_mapping("conv-1", "101", {"nombres": "Ana"})
+    first = storage.get_mapping("conv-1")
+
+    time.sleep(0.01)
+    assert storage.store_mapping("conv-1", "201", {"nombres": "Ana María"})
+    second = storage.get_mapping("conv-1")
+
+    assert second['created_at'] == first['created_at']
+    assert second['updated_at'] > first['updated_at']
+    assert second['hubspot_id'] == "201" and second['prospect_data'] == {"nombres": "Ana María"}
+    return second
+
+def test_store_mapping_keeps_created_at():
+    """Volver a almacenar actualiza hubspot_id, datos y updated_at, pero no created_at"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = build_storage(tmp)
+        second = assert_store_keeps_created_at(storage)
+        assert storage.find_by_hubspot_id("101") == []
+
+        row = storage.db.execute(
+            "SELECT created_at FROM conversation_mappings WHERE conversation_id = 'conv-1'").fetchone()
+        assert row['created_at'] == second['created_at']
+
+def test_json_backend_keeps_created_at():
+    """El backend JSON (CONVERSATION_STORAGE_BACKEND=json) aplica la misma regla"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage_file = os.path.join(tmp, "mappings.json")
+        second = assert_store_keeps_created_at(ConversationStorage(storage_file))
+
+        # También al recargar desde el archivo
+        assert ConversationStorage(storage_file).get_mapping("conv-1")['created_at'] == second['created_at']
+
+if __name__ == "__main__":
+    test_migrates_json_once()
+    test_store_mapping_keeps_created_at()
+    test_json_backend_keeps_created_at()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el pipeline de etapas con dependencias y presupuesto de latencia
+"""
+
+import os
+import sys
+import time
+
+# Agregar el directorio actual al path para importar el módulo
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from api.stage_pipeline import StagePipeline, STAGE_OK, STAGE_TIMEOUT
+
+def slow(seconds, value):
+    def stage(*dependencies):
+        time.sleep(seconds)
+        return {"value": value, "dependencies": list(dependencies)}
+    return stage
+
+def test_independent_stages_run_in_parallel():
+    """Verifica que las etapas independientes corran en paralelo y la dependiente reciba su resultado"""
+
+    print("🧪 PRUEBA DE ETAPAS EN PARALELO")
+    print("=" * 60)
+
+    pipeline = StagePipeline(budget=5, name="test")
+    pipeline.add_stage('apollo', slow(0.4, "apollo"))
+    pipeline.add_stage('hubspot_enrichment', slow(0.4, "hubspot"))
+    pipeline.add_stage('hubspot_contact', slow(0.2, "contact"), depends_on=['apollo'])
+
+    result = pipeline.run()
+
+    print(f"⏱️ Total: {result['total_ms']} ms (secuencial: 1000 ms)")
+
+    assert not result['partial']
+    assert result['total_ms'] < 900
+    assert all(stage['status'] == STAGE_OK for stage in result['stages'].values())
+    assert result['values']['hubspot_contact']['dependencies'][0]['value'] == "apollo"
+    assert result['stages']['hubspot_contact']['started_ms'] >= 400
+
+    print("✅ Etapas independientes en paralelo")
+
+def test_stage_deadline_returns_partial_result():
+    """Verifica que una etapa lenta no bloquee la respuesta y su dependiente reciba None"""
+
+    print("🧪 PRUEBA DE DEADLINE POR ETAPA")
+    print("=" * 60)
+
+    pipeline = StagePipeline(budget=5, name="test")
+    pipeline.add_stage('apollo', slow(2, "apollo"), timeout=0.2)
+    pipeline.add_stage('hubspot_contact', slow(0.1, "contact"), depends_on=['apollo'])
+
+    result = pipeline.run()
+
+    print(f"⏱️ Total: {result['total_ms']} ms")
+
+    assert result['partial']
+    assert result['total_ms'] < 1000
+    assert result['stages']['apollo']['status'] == STAGE_TIMEOUT
+    assert result['values']['apollo'] is None
+    assert result['values']['hubspot_contact']['dependencies'] == [None]
+
+    print("✅ Resultado parcial dentro del deadline")
+
+if __name__ == "__main__":
+    test_independent_stages_run_in_parallel()
+    test_stage_deadline_returns_partial_result()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Script de prueba del logging estructurado
+Verifica que el volumen de log no dependa del tamaño de la transcripción y el formato JSON
+"""
+
+import io
+import os
+import sys
+import json
+import logging
+
+# Agregar el directorio actual al path para importar el módulo
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from api import structured_logging
+from api.structured_logging import JSONFormatter, TextFormatter, cap, log_payload
+
+def build_logger(name, formatter, level=logging.INFO):
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(formatter)
+    logger = logging.getLogger(name)
+    logger.handlers = [handler]
+    logger.setLevel(level)
+    logger.propagate = False
+    return logger, stream
+
+def build_webhook(num_messages):
+    return {
+        "event_type": "application.transcription_ready",
+        "conversation_id": "conv-123",
+        "properties": {
+            "replica_id": "r1",
+            "transcript": [{"role": "user", "content": "hola " * 50} for _ in range(num_messages)]
+        }
+    }
+
+def test_cap_bounds_large_values():
+    """Textos y estructuras grandes se truncan sin serializarse completos"""
+
+    assert cap(42) == 42
+    assert cap("corto") == "corto"
+    assert len(cap("x" * 10000, 100)) < 130
+    assert len(cap(build_webhook(5000))) < 400
+
+def test_log_volume_independent_of_transcript_size():
+    """El evento del webhook mide lo mismo con 10 o 10000 mensajes y no incluye la transcripción"""
+
+    print("🧪 PRUEBA DE VOLUMEN DE LOG")
+    print("=" * 60)
+
+    sizes = {}
+    for num_messages in (10, 10000):
+        logger, stream = build_logger("test_volume", JSONFormatter())
+        log_payload(logger, "Webhook recibido", build_webhook(num_messages), conversation_id="conv-123")
+        output = stream.getvalue()
+        sizes[num_messages] = len(output)
+
+        entry = json.loads(output)
+        assert entry["msg"] == "Webhook recibido"
+        assert entry["conversation_id"] == "conv-123"
+        assert "hola" not in output
+
+    print(f"📏 Bytes de log por evento: {sizes}")
+    assert sizes[10] == sizes[10000]
+
+    print("✅ Volumen de log constante")
+
+def test_debug_payload_sampling():
+    """El payload truncado solo se registra en DEBUG y según la tasa de muestreo"""
+
+    original_rate = structured_logging.LOG_PAYLOAD_SAMPLE_RATE
+    try:
+        structured_logging.LOG_PAYLOAD_SAMPLE_RATE = 1.0
+        logger, stream = build_logger("test_sampling_debug", TextFormatter(), level=logging.DEBUG)
+        log_payload(logger, "Webhook recibido", build_webhook(1000))
+        lines = stream.getvalue().splitlines()
+        assert len(lines) == 2
+        assert "muestra del payload" in lines[1]
+        assert len(lines[1]) < 1000
+
+        structured_logging.LOG_PAYLOAD_SAMPLE_RATE = 0.0
+        logger, stream = build_logger("test_sampling_off", TextFormatter(), level=logging.DEBUG)
+        log_payload(logger, "Webhook recibido", build_webhook(1000))
+        assert len(stream.getvalue().splitlines()) == 1
+
+        logger, stream = build_logger("test_sampling_info", TextFormatter(), level=logging.INFO)
+        structured_logging.LOG_PAYLOAD_SAMPLE_RATE = 1.0
+        log_payload(logger, "Webhook recibido", build_webhook(1000))
+        assert len(stream.getvalue().splitlines()) == 1
+    finally:
+        structured_logging.LOG_PAYLOAD_SAMPLE_RATE = original_rate
+
+if __name__ == "__main__":
+    test_cap_bounds_large_values()
+    test_log_volume_independent_of_transcript_size()
+    test_debug_payload_sampling()
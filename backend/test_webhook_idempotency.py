@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Script de prueba de la deduplicación de webhooks de transcripción
+Verifica que un reintento retorne el resultado original, que un duplicado durante el procesamiento
+síncrono no apunte a un estado inexistente, que un evento abandonado o fallido se reprocese una
+sola vez aunque lleguen reintentos concurrentes, y la migración de bases sin started_at
+"""
+
+import os
+import sys
+import sqlite3
+import tempfile
+
+# Agregar el directorio actual al path para importar el módulo
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import app
+from storage.idempotency_store import IdempotencyStore
+from storage.job_queue import JobQueue, STATUS_FAILED
+
+PAYLOAD = {
+    "event_type": "application.transcription_ready",
+    "conversation_id": "c1",
+    "properties": {"replica_id": "r1", "transcript": [{"role": "user", "content": "Hola"}]}
+}
+
+class FakeStorage:
+    def get_mapping(self, conversation_id):
+        return {"hubspot_id": "42", "prospect_data": {"nombres": "Ana"}}
+
+class WebhookHarness:
+    """App con almacén de idempotencia y cola en archivos temporales, y procesamiento simulado"""
+
+    def __init__(self, mode):
+        self.mode = mode
+        self.processed = []
+
+    def process(self, job_payload):
+        self.processed.append(job_payload['conversation_id'])
+        return {"status": "success", "run": len(self.processed)}
+
+    def __enter__(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.original = (app.webhook_idempotency, app.job_queue, app.conversation_storage,
+                         app.process_conversation_transcript, app.TRANSCRIPT_PROCESSING_MODE)
+        app.webhook_idempotency = IdempotencyStore(os.path.join(self.tmp.name, "idempotency.db"),
+                                                   in_progress_timeout=60)
+        app.job_queue = JobQueue(db_file=os.path.join(self.tmp.name, "jobs.db"), num_workers=0)
+        app.conversation_storage = FakeStorage()
+        app.process_conversation_transcript = self.process
+        app.TRANSCRIPT_PROCESSING_MODE = self.mode
+        self.client = app.app.test_client()
+        return self
+
+    def __exit__(self, *exc_info):
+        (app.webhook_idempotency, app.job_queue, app.conversation_storage,
+         app.process_conversation_transcript, app.TRANSCRIPT_PROCESSING_MODE) = self.original
+        self.tmp.cleanup()
+
+    @property
+    def store(self):
+        return app.webhook_idempotency
+
+    def post(self):
+        response = self.client.post('/webhook', json=PAYLOAD)
+        return response.status_code, response.get_json()
+
+    def fingerprint(self):
+        return self.store.fingerprint("c1", PAYLOAD['event_type'], PAYLOAD['properties']['transcript'])
+
+def test_sync_duplicate_returns_original_result():
+    """Modo sync: el reintento retorna el resultado guardado sin volver a procesar"""
+
+    print("🧪 PRUEBA DE DEDUPLICACIÓN DE WEBHOOKS")
+    print("=" * 60)
+
+    with WebhookHarness('sync') as harness:
+        status, first = harness.post()
+        assert status == 200 and first['run'] == 1
+
+        status, duplicate = harness.post()
+        print(f"📊 Duplicado: {status} {duplicate}")
+        assert status == 200 and duplicate['duplicate'] and duplicate['run'] == 1
+        assert harness.processed == ["c1"]
+
+    print("✅ Reintento deduplicado")
+
+def test_sync_duplicate_while_in_progress():
+    """Un duplicado durante el procesamiento síncrono recibe 409 sin status_url; si el original murió, se retoma"""
+
+    with WebhookHarness('sync') as harness:
+        fingerprint = harness.fingerprint()
+        assert harness.store.claim(fingerprint, "c1")[0]
+
+        status, body = harness.post()
+        assert status == 409 and body['status'] == "processing" and 'status_url' not in body
+        assert harness.processed == []
+
+        # El worker que tomó el evento murió hace más de in_progress_timeout
+        harness.store.db.execute("UPDATE webhook_events SET started_at = started_at - 120")
+        status, body = harness.post()
+        assert status == 200 and body['run'] == 1 and harness.processed == ["c1"]
+
+        status, body = harness.post()
+        assert status == 200 and body['duplicate']
+
+def test_async_duplicate_points_to_job():
+    """Modo async: el duplicado de un trabajo en curso retorna su job_id; uno fallido se vuelve a encolar"""
+
+    with WebhookHarness('async') as harness:
+        status, first = harness.post()
+        assert status == 202 and first['job_id']
+
+        status, duplicate = harness.post()
+        assert status == 202 and duplicate['job_id'] == first['job_id'] and duplicate['duplicate']
+        processing = harness.client.get(duplicate['status_url'])
+        assert processing.status_code == 200
+
+        app.job_queue.db.execute("UPDATE jobs SET status = ?", (STATUS_FAILED,))
+        status, retried = harness.post()
+        assert status == 202 and retried['job_id'] != first['job_id'] and 'duplicate' not in retried
+
+def test_reclaim_is_atomic():
+    """De dos reintentos que leyeron el mismo registro fallido, solo uno lo retoma"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = IdempotencyStore(os.path.join(tmp, "idempotency.db"))
+        store.claim("f1", "c1")
+        store.attach_job("f1", 7)
+        record = store.claim("f1", "c1")[1]
+
+        assert store.reclaim("f1", record)
+        assert not store.reclaim("f1", record)
+
+        store.save_result("f1", {"status": "success"})
+        assert not store.reclaim("f1", store.claim("f1", "c1")[1])
+
+def test_migrates_store_without_started_at():
+    """Una base creada antes de started_at se migra; sus eventos en curso usan created_at"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, "idempotency.db")
+        conn = sqlite3.connect(db_file)
+        conn.execute("""CREATE TABLE webhook_events (fingerprint TEXT PRIMARY KEY, event_key TEXT,
+                        job_id INTEGER, result TEXT, created_at REAL NOT NULL, expires_at REAL NOT NULL)""")
+        conn.execute("INSERT INTO webhook_events VALUES ('f1', 'c1', NULL, NULL, 0, 9999999999)")
+        conn.commit()
+        conn.close()
+
+        store = IdempotencyStore(db_file)
+        record = store.claim("f1", "c1")[1]
+        assert record['started_at'] is None and store.is_abandoned(record)
+        assert store.reclaim("f1", record)
+
+if __name__ == "__main__":
+    test_sync_duplicate_returns_original_result()
+    test_sync_duplicate_while_in_progress()
+    test_async_duplicate_points_to_job()
+    test_reclaim_is_atomic()
+    test_migrates_store_without_started_at()